@@ -145,11 +145,6 @@ class SpindleGen(NailgunTask):
         )
         java_synthetic_target = build_graph.get_target(java_synthetic_address)
 
-        # NOTE(pl): This bypasses the convenience function (Target.inject_dependency) in order
-        # to improve performance.  Note that we can walk the transitive dependee subgraph once
-        # for transitive invalidation rather than walking a smaller subgraph for every single
-        # dependency injected.  This walk is done below, after the scala synthetic target is
-        # injected.
         for concrete_dependency_address in build_graph.dependencies_of(target.address):
           build_graph.inject_dependency(
             dependent=java_synthetic_target.address,
@@ -179,24 +174,17 @@ class SpindleGen(NailgunTask):
           java_sources=[java_synthetic_target.address.spec],
         )
 
-        # NOTE(pl): This bypasses the convenience function (Target.inject_dependency) in order
-        # to improve performance.  Note that we can walk the transitive dependee subgraph once
-        # for transitive invalidation rather than walking a smaller subgraph for every single
-        # dependency injected.  This walk also covers the invalidation for the java synthetic
-        # target above.
+        # NB: Each injected dependency invalidates the transitive fingerprints of its dependent and
+        # their dependees, but the walk stops at targets already invalidated, so this touches each
+        # affected dependee once in total rather than once per dependency injected.
         for dependent_address in build_graph.dependents_of(target.address):
           build_graph.inject_dependency(dependent=dependent_address,
                                         dependency=synthetic_target.address)
-        # NOTE(pl): See the above comment.  The same note applies.
         for concrete_dependency_address in build_graph.dependencies_of(target.address):
           build_graph.inject_dependency(
             dependent=synthetic_target.address,
             dependency=concrete_dependency_address,
           )
-        build_graph.walk_transitive_dependee_graph(
-          [target.address],
-          work=lambda t: t.mark_transitive_invalidation_hash_dirty(),
-        )
 
         if target in self.context.target_roots:
           self.context.target_roots.append(synthetic_target)
@@ -25,6 +25,8 @@ _DEFAULT_ANTLR_DEPS = {
 
 class AntlrGen(SimpleCodegenTask, NailgunTask):
 
+  _supports_concurrent_execution = True
+
   class AmbiguousPackageError(TaskError):
     """Raised when a java package cannot be unambiguously determined for a JavaAntlrLibrary."""
 
@@ -27,6 +27,8 @@ from pants.util.memo import memoized_property
 
 class ApacheThriftGen(SimpleCodegenTask):
 
+  _supports_concurrent_execution = True
+
   @classmethod
   def register_options(cls, register):
     super(ApacheThriftGen, cls).register_options(register)
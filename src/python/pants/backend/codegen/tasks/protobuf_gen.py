@@ -30,6 +30,8 @@ from pants.util.memo import memoized_property
 
 class ProtobufGen(SimpleCodegenTask):
 
+  _supports_concurrent_execution = True
+
   @classmethod
   def global_subsystems(cls):
     return super(ProtobufGen, cls).global_subsystems() + (BinaryUtil.Factory,)
@@ -8,6 +8,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import logging
 import os
 from abc import abstractmethod
+from functools import partial
 
 from twitter.common.collections import OrderedSet
 
@@ -17,6 +18,8 @@ from pants.base.address_lookup_error import AddressLookupError
 from pants.base.build_environment import get_buildroot
 from pants.base.build_graph import sort_targets
 from pants.base.exceptions import TaskError
+from pants.base.execution_graph import ExecutionFailure, ExecutionGraph, Job
+from pants.base.worker_pool import WorkerPool
 from pants.base.workunit import WorkUnitLabel
 from pants.util.dirutil import safe_rmtree, safe_walk
 from pants.util.memo import memoized_property
@@ -29,6 +32,11 @@ logger = logging.getLogger(__name__)
 class SimpleCodegenTask(Task):
   """A base-class for code generation for a single target language."""
 
+  # Whether the isolated strategy may call execute_codegen from several threads at once, each time
+  # with a single target whose dependencies have already been generated.  Subclasses that set this
+  # must not modify state shared between targets in execute_codegen.
+  _supports_concurrent_execution = False
+
   @classmethod
   def product_types(cls):
     # NB(gmalmquist): This is a hack copied from the old CodeGen base class to get the round manager
@@ -58,6 +66,11 @@ class SimpleCodegenTask(Task):
                     'IsolatedCodegenStrategy will associate generated sources with '
                     'least-dependent targets that generate them.',
                advanced=True)
+      if cls._supports_concurrent_execution:
+        register('--worker-count', advanced=True, type=int, default=1,
+                 help='Generate code for up to this many targets concurrently when using the '
+                      'isolated strategy.  A target is only generated once the targets it '
+                      'depends on have been.')
 
   @classmethod
   def get_fingerprint_strategy(cls):
@@ -245,25 +258,19 @@ class SimpleCodegenTask(Task):
 
         build_graph = self.context.build_graph
 
-        # NB(pl): This bypasses the convenience function (Target.inject_dependency) in order
-        # to improve performance.  Note that we can walk the transitive dependee subgraph once
-        # for transitive invalidation rather than walking a smaller subgraph for every single
-        # dependency injected.
+        # NB: Each injected dependency invalidates the transitive fingerprints of its dependent and
+        # their dependees, but the walk stops at targets already invalidated, so this touches each
+        # affected dependee once in total rather than once per dependency injected.
         for dependent_address in build_graph.dependents_of(target.address):
           build_graph.inject_dependency(
             dependent=dependent_address,
             dependency=synthetic_target.address,
           )
-        # NB(pl): See the above comment.  The same note applies.
         for concrete_dependency_address in build_graph.dependencies_of(target.address):
           build_graph.inject_dependency(
             dependent=synthetic_target.address,
             dependency=concrete_dependency_address,
           )
-        build_graph.walk_transitive_dependee_graph(
-          build_graph.dependencies_of(target.address),
-          work=lambda t: t.mark_transitive_invalidation_hash_dirty(),
-        )
 
         if target in self.context.target_roots:
           self.context.target_roots.append(synthetic_target)
@@ -368,13 +375,64 @@ class SimpleCodegenTask(Task):
       return 'isolated'
 
     def execute_codegen(self, targets):
-      with self._task.context.new_workunit(name='execute', labels=[WorkUnitLabel.MULTITOOL]):
+      with self._task.context.new_workunit(name='execute',
+                                           labels=[WorkUnitLabel.MULTITOOL]) as workunit:
         ordered = [target for target in reversed(sort_targets(targets)) if target in targets]
-        for target in ordered:
-          with self._task.context.new_workunit(name=target.address.spec):
-            # TODO(gm): add a test-case to ensure this is correctly eliminating stale generated code.
-            safe_rmtree(self._task.codegen_workdir(target))
-            self._do_execute_codegen([target])
+        worker_count = self._worker_count()
+        if worker_count > 1 and len(ordered) > 1:
+          self._execute_codegen_concurrently(workunit, ordered, worker_count)
+        else:
+          for target in ordered:
+            self._execute_codegen_for_target(target)
+
+    def _worker_count(self):
+      if not self._task._supports_concurrent_execution:
+        return 1
+      return max(1, self._task.get_options().worker_count)
+
+    def _execute_codegen_for_target(self, target):
+      with self._task.context.new_workunit(name=target.address.spec):
+        # TODO(gm): add a test-case to ensure this is correctly eliminating stale generated code.
+        safe_rmtree(self._task.codegen_workdir(target))
+        self._do_execute_codegen([target])
+
+    def _execute_codegen_concurrently(self, workunit, ordered, worker_count):
+      """Generates the code for the `ordered` targets on up to `worker_count` threads.
+
+      A target is only generated once the targets among `ordered` that it depends on have been, and
+      isn't generated at all if any of them fail.  Failures are reported in the order of `ordered`,
+      rather than in the order they happened in, so a run's errors don't depend on its timing.
+      """
+      invalid_targets = set(ordered)
+      failures = {}
+
+      def generate(target):
+        try:
+          self._execute_codegen_for_target(target)
+        except Exception as e:
+          failures[target] = e
+          raise
+
+      jobs = []
+      for target in ordered:
+        dependencies = [dep.address.spec for dep in target.closure()
+                        if dep in invalid_targets and dep is not target]
+        jobs.append(Job(target.address.spec, partial(generate, target), dependencies))
+
+      worker_pool = WorkerPool(workunit, self._task.context.run_tracker, worker_count)
+      try:
+        ExecutionGraph(jobs).execute(worker_pool, self._task.context.log, max_workers=worker_count)
+      except ExecutionFailure as e:
+        failed = [target for target in ordered if target in failures]
+        if not failed:
+          raise TaskError(e)
+        raise TaskError('Failed to generate {count} of {total} targets:\n  {failures}'
+                        .format(count=len(failed), total=len(ordered),
+                                failures='\n  '.join('{}: {}'.format(target.address.spec,
+                                                                      failures[target])
+                                                      for target in failed)))
+      finally:
+        worker_pool.shutdown()
 
     def find_sources(self, target):
       """Determines what sources were generated by the target after the fact.
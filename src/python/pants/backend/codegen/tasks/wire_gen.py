@@ -30,6 +30,8 @@ logger = logging.getLogger(__name__)
 
 class WireGen(JvmToolTaskMixin, SimpleCodegenTask):
 
+  _supports_concurrent_execution = True
+
   @classmethod
   def register_options(cls, register):
     super(WireGen, cls).register_options(register)
@@ -13,6 +13,8 @@ from pants.base.address import Addresses
 class FromTarget(object):
   """Used in a BUILD file to redirect the value of the sources= attribute to another target.
   """
+  parse_cacheable = True
+
   class ExpectedAddressError(Exception):
     """Thrown if an object that is not an address is added to an import attribute.
     """
@@ -44,6 +44,8 @@ from pants.goal.task_registrar import TaskRegistrar as task
 
 class BuildFilePath(object):
   """Returns path containing this ``BUILD`` file."""
+  parse_cacheable = True
+
   def __init__(self, parse_context):
     self.rel_path = parse_context.rel_path
 
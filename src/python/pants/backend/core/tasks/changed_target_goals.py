@@ -51,6 +51,9 @@ class ChangedTargetTask(ChangedFileTaskMixin, NoopExecTask):
     changed_addresses = change_calculator.changed_target_addresses()
     readable = ''.join(sorted('\n\t* {}'.format(addr.reference()) for addr in changed_addresses))
     logger.info('Operating on changed {} target(s): {}'.format(len(changed_addresses), readable))
+    # Targets found via the target index may not have been loaded.
+    for addr in changed_addresses:
+      build_graph.inject_address_closure(addr)
     return [build_graph.get_target(addr) for addr in changed_addresses]
 
 
@@ -6,7 +6,6 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import os
-from collections import defaultdict
 
 from twitter.common.collections import OrderedSet
 
@@ -14,6 +13,7 @@ from pants.backend.core.tasks.console_task import ConsoleTask
 from pants.base.build_environment import get_buildroot
 from pants.base.exceptions import TaskError
 from pants.base.source_root import SourceRoot
+from pants.base.target_index import TargetIndex
 
 
 class ReverseDepmap(ConsoleTask):
@@ -30,6 +30,9 @@ class ReverseDepmap(ConsoleTask):
              help="Identifies target types to include. Multiple type inclusions "
                   "can be specified at once in a comma separated list or else by "
                   "using multiple instances of this flag.")
+    register('--index', advanced=True, metavar='<path>',
+             help='Persist the index of dependees at this path, so that later runs only re-parse '
+                  'the BUILD files that changed since.')
 
   def __init__(self, *args, **kwargs):
     super(ReverseDepmap, self).__init__(*args, **kwargs)
@@ -67,42 +70,19 @@ class ReverseDepmap(ConsoleTask):
     else:
       buildfiles = address_mapper.scan_buildfiles(get_buildroot(), spec_excludes=self._spec_excludes)
 
-    build_graph = self.context.build_graph
-    build_file_parser = self.context.build_file_parser
+    target_index = TargetIndex(self.get_options().index,
+                               self.context.address_mapper,
+                               self.context.build_graph)
 
-    dependees_by_target = defaultdict(set)
-    for build_file in buildfiles:
-      address_map = build_file_parser.parse_build_file(build_file)
-      for address in address_map.keys():
-        build_graph.inject_address_closure(address)
-      for address in address_map.keys():
-        target = build_graph.get_target(address)
-        # TODO(John Sirois): tighten up the notion of targets written down in a BUILD by a
-        # user vs. targets created by pants at runtime.
-        target = self.get_concrete_target(target)
-        for dependency in target.dependencies:
-          dependency = self.get_concrete_target(dependency)
-          dependees_by_target[dependency].add(target)
-
-    roots = set(self.context.target_roots)
+    roots = OrderedSet(self.context.target_roots)
     if self._closed:
       for root in roots:
         yield root.address.spec
 
-    for dependant in self.get_dependants(dependees_by_target, roots):
-      yield dependant.address.spec
-
-  def get_dependants(self, dependees_by_target, roots):
-    check = set(roots)
-    known_dependants = set()
-    while True:
-      dependants = set(known_dependants)
-      for target in check:
-        dependants.update(dependees_by_target[target])
-      check = dependants - known_dependants
-      if not check or not self._transitive:
-        return dependants - set(roots)
-      known_dependants = dependants
-
-  def get_concrete_target(self, target):
-    return target.concrete_derived_from
+    # TODO(John Sirois): tighten up the notion of targets written down in a BUILD by a
+    # user vs. targets created by pants at runtime.
+    root_addresses = set(root.concrete_derived_from.address for root in roots)
+    for dependee in target_index.walk_dependees(root_addresses, buildfiles,
+                                                transitive=self._transitive):
+      yield dependee.spec
+    target_index.save()
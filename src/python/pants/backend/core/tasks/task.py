@@ -14,10 +14,12 @@ from hashlib import sha1
 
 from twitter.common.collections.orderedset import OrderedSet
 
-from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from pants.base.build_invalidator import CacheKeyGenerator, create_build_invalidator
 from pants.base.cache_manager import InvalidationCacheManager, InvalidationCheck
 from pants.base.exceptions import TaskError
+from pants.base.file_digest_cache import FileDigestCache
 from pants.base.fingerprint_strategy import TaskIdentityFingerprintStrategy
+from pants.base.target_durations import TargetDurations
 from pants.base.worker_pool import Work
 from pants.cache.artifact_cache import UnreadableArtifact, call_insert, call_use_cached_files
 from pants.cache.cache_setup import CacheSetup
@@ -78,7 +80,7 @@ class TaskBase(Optionable, AbstractClass):
 
     A tuple of subsystem types.
     """
-    return tuple()
+    return (FileDigestCache.Factory, TargetDurations.Factory)
 
   @classmethod
   def task_subsystems(cls):
@@ -176,6 +178,7 @@ class TaskBase(Optionable, AbstractClass):
       self.context.options.for_global_scope().pants_workdir,
       'build_invalidator',
       self.stable_name())
+    self._build_invalidator_type = self.context.options.for_global_scope().build_invalidator
 
     self._cache_factory = CacheSetup.create_cache_factory_for_task(self)
 
@@ -246,7 +249,8 @@ class TaskBase(Optionable, AbstractClass):
 
   def invalidate(self):
     """Invalidates all targets for this task."""
-    BuildInvalidator(self._build_invalidator_dir).force_invalidate_all()
+    create_build_invalidator(self._build_invalidator_dir,
+                             self._build_invalidator_type).force_invalidate_all()
 
   def create_cache_manager(self, invalidate_dependents, fingerprint_strategy=None):
     """Creates a cache manager that can be used to invalidate targets on behalf of this task.
@@ -264,7 +268,9 @@ class TaskBase(Optionable, AbstractClass):
                                     invalidate_dependents,
                                     fingerprint_strategy=fingerprint_strategy,
                                     invalidation_report=self.context.invalidation_report,
-                                    task_name=type(self).__name__)
+                                    task_name=type(self).__name__,
+                                    invalidator_type=self._build_invalidator_type,
+                                    target_durations=TargetDurations.Factory.create())
 
   @property
   def cache_target_dirs(self):
@@ -426,9 +432,11 @@ class TaskBase(Optionable, AbstractClass):
     uncached_vts = OrderedSet(vts)
 
     read_cache = self._cache_factory.get_read_cache()
-    items = [(read_cache, vt.cache_key) for vt in vts]
-
-    res = self.context.subproc_map(call_use_cached_files, items)
+    if read_cache.supports_bulk_lookup:
+      res = read_cache.bulk_use_cached_files([vt.cache_key for vt in vts])
+    else:
+      items = [(read_cache, vt.cache_key) for vt in vts]
+      res = self.context.subproc_map(call_use_cached_files, items)
 
     for vt, was_in_cache in zip(vts, res):
       if was_in_cache:
@@ -10,7 +10,8 @@ import re
 from pants.backend.core.tasks.console_task import ConsoleTask
 from pants.base.build_environment import get_scm
 from pants.base.exceptions import TaskError
-from pants.base.source_mapper import SpecSourceMapper
+from pants.base.source_mapper import IndexedSourceMapper, SpecSourceMapper
+from pants.base.target_index import TargetIndex
 from pants.goal.workspace import ScmWorkspace
 
 
@@ -27,7 +28,13 @@ class ChangeCalculator(object):
                diffspec=None,
                include_dependees=None,
                exclude_target_regexp=None,
-               spec_excludes=None):
+               spec_excludes=None,
+               target_index=None):
+    """
+    :param TargetIndex target_index: An optional index to find the owners and dependees of changed
+                                     sources with, instead of parsing BUILD files.  It is saved once
+                                     changed targets are found.
+    """
 
     self._scm = scm
     self._workspace = workspace
@@ -40,13 +47,17 @@ class ChangeCalculator(object):
     self._include_dependees = include_dependees
     self._exclude_target_regexp = exclude_target_regexp
     self._spec_excludes = spec_excludes
+    self._target_index = target_index
 
     self._mapper_cache = None
 
   @property
   def _mapper(self):
     if self._mapper_cache is None:
-      self._mapper_cache = SpecSourceMapper(self._address_mapper, self._build_graph, self._fast)
+      if self._target_index:
+        self._mapper_cache = IndexedSourceMapper(self._target_index, self._fast)
+      else:
+        self._mapper_cache = SpecSourceMapper(self._address_mapper, self._build_graph, self._fast)
     return self._mapper_cache
 
   def changed_files(self):
@@ -76,6 +87,11 @@ class ChangeCalculator(object):
     if self._include_dependees == 'none':
       return changed
 
+    if self._include_dependees in ('direct', 'transitive') and self._target_index:
+      return self._target_index.dependees(changed,
+                                          transitive=self._include_dependees == 'transitive',
+                                          spec_excludes=self._spec_excludes)
+
     # Load the whole build graph since we need it for dependee finding in either remaining case.
     for address in self._address_mapper.scan_addresses(spec_excludes=self._spec_excludes):
       self._build_graph.inject_address_closure(address)
@@ -102,6 +118,8 @@ class ChangeCalculator(object):
     """
     # Find changed targets (and maybe their dependees).
     changed = self._find_changed_targets()
+    if self._target_index:
+      self._target_index.save()
 
     # Remove any that match the exclude_target_regexp list.
     excludes = [re.compile(pattern) for pattern in self._exclude_target_regexp]
@@ -116,6 +134,9 @@ class ChangedFileTaskMixin(object):
   Changes are calculated relative to a ref/tree-ish (defaults to HEAD), and changed files are then
   mapped to targets using LazySourceMapper. LazySourceMapper can optionally be used in "fast" mode,
   which stops searching for additional owners for a given source once a one is found.
+
+  Optionally, the owners and dependees of changed files are found using a persistent TargetIndex,
+  so that only the BUILD files that changed since it was last used are parsed.
   """
   @classmethod
   def register_change_file_options(cls, register):
@@ -127,6 +148,12 @@ class ChangedFileTaskMixin(object):
              help='Calculate changes contained within given scm spec (commit range/sha/ref/etc).')
     register('--include-dependees', choices=['none', 'direct', 'transitive'], default='none',
              help='Include direct or transitive dependees of changed targets.')
+    register('--target-index', advanced=True, metavar='<path>',
+             help='Find the owners and dependees of changed files using the persistent index at '
+                  'this path, which only re-parses the BUILD files that changed since it was last '
+                  'used.  Dependencies that targets derive from options, e.g. scala libraries on '
+                  'the scala runtime, are recorded as of the last time their BUILD files were '
+                  'parsed, so delete the index after changing such options.')
 
   @classmethod
   def change_calculator(cls, options, address_mapper, build_graph, scm=None, workspace=None, spec_excludes=None):
@@ -134,6 +161,9 @@ class ChangedFileTaskMixin(object):
     if scm is None:
       raise TaskError('No SCM available.')
     workspace = workspace or ScmWorkspace(scm)
+    target_index = None
+    if options.target_index:
+      target_index = TargetIndex(options.target_index, address_mapper, build_graph)
 
     return ChangeCalculator(scm,
                             workspace,
@@ -146,7 +176,8 @@ class ChangedFileTaskMixin(object):
                             # NB: exclude_target_regexp is a global scope option registered
                             # elsewhere
                             exclude_target_regexp=options.exclude_target_regexp,
-                            spec_excludes=spec_excludes)
+                            spec_excludes=spec_excludes,
+                            target_index=target_index)
 
 
 class WhatChanged(ChangedFileTaskMixin, ConsoleTask):
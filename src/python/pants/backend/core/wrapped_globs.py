@@ -50,10 +50,45 @@ class FilesetWithSpec(object):
     return self.files[index]
 
 
+class _FilesCalculator(object):
+  """Lazily calculates the files matched by a FilesetRelPathWrapper call.
+
+  Unlike a closure, this can be pickled, e.g., along with the other results of parsing a BUILD
+  file in a worker process, without calculating the files up front.
+  """
+
+  def __init__(self, wrapper_type, root, args, kwargs, excludes):
+    self._wrapper_type = wrapper_type
+    self._root = root
+    self._args = args
+    self._kwargs = kwargs
+    self._excludes = excludes
+    self.called = False
+
+  def __call__(self):
+    self.called = True
+    result = self._wrapper_type.wrapped_fn(root=self._root, *self._args, **self._kwargs)
+
+    for exclude in self._excludes:
+      result -= exclude
+
+    return result
+
+
 class FilesetRelPathWrapper(object):
 
   def __init__(self, parse_context):
     self.rel_path = parse_context.rel_path
+    self._files_calculators = []
+
+  @property
+  def parse_cacheable(self):
+    """True unless the BUILD file being parsed has examined the files matched so far.
+
+    The files matched are otherwise only computed when first needed, after parsing, so the results
+    of parsing a BUILD file that uses globs don't depend on the files present; see BuildFileParser.
+    """
+    return not any(files_calculator.called for files_calculator in self._files_calculators)
 
   def __call__(self, *args, **kwargs):
     root = os.path.join(get_buildroot(), self.rel_path)
@@ -71,17 +106,11 @@ class FilesetRelPathWrapper(object):
       if self._is_glob_dir_outside_root(glob, root):
         raise ValueError('Invalid glob {}, points outside BUILD file root dir {}'.format(glob, root))
 
-    def files_calculator():
-      result = self.wrapped_fn(root=root, *args, **kwargs)
-
-      for exclude in excludes:
-        result -= exclude
-
-      return result
-
     buildroot = get_buildroot()
     rel_root = os.path.relpath(root, buildroot)
     filespec = self.to_filespec(args, root=rel_root, excludes=excludes)
+    files_calculator = _FilesCalculator(type(self), root, args, kwargs, excludes)
+    self._files_calculators.append(files_calculator)
     return FilesetWithSpec(rel_root, filespec, files_calculator)
 
   @staticmethod
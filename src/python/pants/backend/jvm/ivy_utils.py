@@ -6,6 +6,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import errno
+import json
 import logging
 import os
 import pkgutil
@@ -14,6 +15,7 @@ import xml.etree.ElementTree as ET
 from collections import OrderedDict, defaultdict, namedtuple
 from contextlib import contextmanager
 from copy import deepcopy
+from hashlib import sha1
 
 from twitter.common.collections import OrderedSet, maybe_list
 
@@ -25,7 +27,7 @@ from pants.base.generator import Generator, TemplateData
 from pants.base.revision import Revision
 from pants.base.target import Target
 from pants.ivy.ivy_subsystem import IvySubsystem
-from pants.util.dirutil import safe_mkdir, safe_open
+from pants.util.dirutil import safe_concurrent_rename, safe_mkdir, safe_open, safe_rmtree
 
 
 IvyModule = namedtuple('IvyModule', ['ref', 'artifact', 'callers'])
@@ -76,13 +78,38 @@ class IvyModuleRef(object):
 class IvyInfo(object):
 
   def __init__(self):
+    self._modules = []  # The modules in the order they were added, for `encode`.
     self.modules_by_ref = {}  # Map from ref to referenced module.
     # Map from ref of caller to refs of modules required by that caller.
     self._deps_by_caller = defaultdict(OrderedSet)
     # Map from _unversioned_ ref to OrderedSet of IvyArtifact instances.
     self._artifacts_by_ref = defaultdict(OrderedSet)
 
+  @classmethod
+  def decode(cls, data):
+    """Recreates an IvyInfo from the form returned by `encode`."""
+    refs = [IvyModuleRef(*ref) for ref in data['refs']]
+    info = cls()
+    for ref_index, artifact, caller_indexes in data['modules']:
+      info.add_module(IvyModule(refs[ref_index], artifact, [refs[i] for i in caller_indexes]))
+    return info
+
+  def encode(self):
+    """Returns a compact json-serializable form of this info, for `decode`.
+
+    Each distinct ref is listed once, and modules refer to refs by their index in that list.
+    """
+    refs = OrderedDict()
+
+    def index(ref):
+      return refs.setdefault((ref.org, ref.name, ref.rev, ref.classifier), len(refs))
+
+    modules = [[index(module.ref), module.artifact, [index(caller) for caller in module.callers]]
+               for module in self._modules]
+    return {'refs': list(refs), 'modules': modules}
+
   def add_module(self, module):
+    self._modules.append(module)
     self.modules_by_ref[module.ref] = module
     if not module.artifact:
       # Module was evicted, so do not record information about it
@@ -169,6 +196,15 @@ class IvyUtils(object):
 
   ivy_lock = threading.RLock()
 
+  # Resolves that opt into running concurrently only serialize with resolves of the same ivy.xml,
+  # as those write the same files, using these: ivy.xml path -> lock.
+  _resolve_locks = defaultdict(threading.RLock)
+  _resolve_locks_lock = threading.Lock()
+
+  # Memoizes parsed reports: report path -> ((mtime, size) of the report, IvyInfo).
+  _parsed_reports = {}
+  _parsed_reports_lock = threading.Lock()
+
   IVY_TEMPLATE_PACKAGE_NAME = __name__
   IVY_TEMPLATE_PATH = os.path.join('tasks', 'templates', 'ivy_resolve', 'ivy.mustache')
 
@@ -178,6 +214,15 @@ class IvyUtils(object):
     """Raised when the ivy report cannot be found."""
     pass
 
+  @classmethod
+  @contextmanager
+  def resolve_lock(cls, ivyxml):
+    """Holds the lock for generating and resolving the given ivy.xml concurrently with others."""
+    with cls._resolve_locks_lock:
+      lock = cls._resolve_locks[ivyxml]
+    with lock:
+      yield
+
   @staticmethod
   def _generate_exclude_template(exclude):
     return TemplateData(org=exclude.org, name=exclude.name)
@@ -291,7 +336,27 @@ class IvyUtils(object):
     if not os.path.exists(path):
       raise cls.IvyResolveReportError('Missing expected ivy output file {}'.format(path))
 
-    return cls._parse_xml_report(path)
+    with cls._parsed_reports_lock:
+      stamp, ivy_info = cls._parsed_reports.get(path, (None, None))
+    if stamp is None or stamp != cls._report_stamp(path):
+      ivy_info = cls._parse_xml_report(path)
+      cls.remember_parsed_report(resolve_hash_name, conf, ivy_info)
+    return ivy_info
+
+  @classmethod
+  def remember_parsed_report(cls, resolve_hash_name, conf, ivy_info):
+    """Makes `parse_xml_report` return `ivy_info` for the report until the report changes.
+
+    :param IvyInfo ivy_info: The info in the report, as it is now.
+    """
+    path = cls.xml_report_path(resolve_hash_name, conf)
+    with cls._parsed_reports_lock:
+      cls._parsed_reports[path] = (cls._report_stamp(path), ivy_info)
+
+  @staticmethod
+  def _report_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
 
   @classmethod
   def _parse_xml_report(cls, path):
@@ -346,6 +411,13 @@ class IvyUtils(object):
 
   @classmethod
   def generate_ivy(cls, targets, jars, excludes, ivyxml, confs, resolve_hash_name=None):
+    safe_mkdir(os.path.dirname(ivyxml))
+    with open(ivyxml, 'w') as output:
+      output.write(cls.render_ivy(targets, jars, excludes, confs, resolve_hash_name))
+
+  @classmethod
+  def render_ivy(cls, targets, jars, excludes, confs, resolve_hash_name=None):
+    """Returns the content of the ivy.xml that resolves the given jars."""
     if resolve_hash_name:
       org = IvyUtils.INTERNAL_ORG_NAME
       name = resolve_hash_name
@@ -377,12 +449,10 @@ class IvyUtils(object):
         excludes=excludes,
         overrides=overrides)
 
-    safe_mkdir(os.path.dirname(ivyxml))
-    with open(ivyxml, 'w') as output:
-      generator = Generator(pkgutil.get_data(__name__, cls.IVY_TEMPLATE_PATH),
-                            root_dir=get_buildroot(),
-                            lib=template_data)
-      generator.write(output)
+    generator = Generator(pkgutil.get_data(__name__, cls.IVY_TEMPLATE_PATH),
+                          root_dir=get_buildroot(),
+                          lib=template_data)
+    return generator.render()
 
   @classmethod
   def calculate_classpath(cls, targets, gather_excludes=True):
@@ -478,12 +548,31 @@ class IvyUtils(object):
       except Revision.BadRevision as e:
         raise TaskError('Failed to parse jar revision', e)
 
+  @classmethod
+  def has_mutable_jars(cls, jars):
+    """Returns True if any of the jars may change without changing revision."""
+    return any(cls._is_mutable(jar) for jar in jars)
+
   @staticmethod
   def _is_mutable(jar):
     if jar.mutable is not None:
       return jar.mutable
     return False
 
+  @classmethod
+  def has_dynamic_jars(cls, jars):
+    """Returns True if any of the jars asks for a revision ivy may resolve differently over time."""
+    return any(cls.is_dynamic_revision(jar.rev) for jar in jars)
+
+  @staticmethod
+  def is_dynamic_revision(rev):
+    """Returns True if `rev` names a dynamic revision, e.g. `latest.integration`, `1.0+` or
+    `[1.0,2.0)`, rather than a fixed one."""
+    if not rev:
+      return False
+    return (rev.startswith('latest.') or rev.endswith('+') or
+            (rev[0] in '[](' and rev[-1] in '[])'))
+
   @classmethod
   def _generate_jar_template(cls, jar, confs):
     template = TemplateData(
@@ -497,3 +586,175 @@ class IvyUtils(object):
         artifacts=jar.artifacts,
         configurations=maybe_list(confs))
     return template
+
+
+class IvyResolveCache(object):
+  """Remembers the outcome of ivy resolves by their inputs, so repeat resolves need no ivy run.
+
+  Resolves are keyed by the ivy.xml they resolve, the confs, the ivy settings and any extra ivy
+  args.  An entry holds the raw classpath ivy produced along with each conf's xml report, both as
+  is and pre-parsed into a compact IvyInfo.
+
+  Resolve reports and ivy.xml files name the module resolved after the resolve's hash, which
+  varies with the targets involved rather than with what they resolve to, so entries are stored
+  with that name swapped for a placeholder, letting any set of targets with the same resolve
+  inputs share an entry.
+
+  Entries list paths in the ivy cache, so they are only used while all those paths still exist.
+  Resolves that ask for a dynamic revision, directly or transitively, may resolve differently the
+  next time they run, so they are not stored.
+  """
+
+  # Bump this to ignore all existing entries.
+  _VERSION = 1
+
+  # Stands in for the resolve hash name in stored entries.
+  _RESOLVE_PLACEHOLDER = '__pants_resolve__'
+
+  def __init__(self, root):
+    """
+    :param string root: The directory to store entries under.
+    """
+    self._root = root
+
+  def resolve_key(self, targets, jars, excludes, confs, ivy_settings=None, args=None,
+                  ivy_classpath=None, bootstrap_jar_url=None):
+    """Returns the key of the resolve of the given jars, as `IvyUtils.generate_ivy` would do it.
+
+    :param string ivy_settings: The path of the ivysettings.xml used, if any.
+    :param list args: Any extra args passed to ivy.
+    :param list ivy_classpath: The classpath of the ivy running the resolve.
+    :param string bootstrap_jar_url: Where the jar ivy was bootstrapped with was fetched from.
+    """
+    hasher = sha1()
+    hasher.update(str(self._VERSION))
+    for path in ivy_classpath or ():
+      hasher.update(b'\0ivy=')
+      hasher.update(path)
+    if bootstrap_jar_url:
+      hasher.update(b'\0bootstrap=')
+      hasher.update(bootstrap_jar_url)
+    ivy_xml = IvyUtils.render_ivy(targets, jars, excludes, confs,
+                                  resolve_hash_name=self._RESOLVE_PLACEHOLDER)
+    hasher.update(ivy_xml.encode('utf-8'))
+    for conf in sorted(confs):
+      hasher.update(b'\0conf=')
+      hasher.update(conf)
+    if ivy_settings:
+      hasher.update(b'\0settings=')
+      if os.path.isfile(ivy_settings):
+        with open(ivy_settings, 'rb') as fp:
+          hasher.update(fp.read())
+      else:
+        hasher.update(ivy_settings)
+    for arg in args or ():
+      hasher.update(b'\0arg=')
+      hasher.update(arg)
+    return hasher.hexdigest()
+
+  def store(self, resolve_key, resolve_hash_name, confs, raw_classpath_file):
+    """Stores the outcome of the resolve with the given key, which has just run.
+
+    :param string resolve_hash_name: The hash name the resolve ran under.
+    :param list confs: The confs resolved.
+    :param string raw_classpath_file: The classpath file ivy wrote.
+    """
+    report_paths = dict((conf, IvyUtils.xml_report_path(resolve_hash_name, conf)) for conf in confs)
+    if not all(os.path.exists(path) for path in report_paths.values()):
+      return
+    if any(self._has_dynamic_revisions(path) for path in report_paths.values()):
+      logger.debug('Not storing resolve {} as it has dynamic revisions'.format(resolve_hash_name))
+      return
+    with open(raw_classpath_file, 'r') as fp:
+      classpath = filter(None, fp.read().strip().split(os.pathsep))
+    ivy_infos = dict((conf, IvyUtils.parse_xml_report(resolve_hash_name, conf).encode())
+                     for conf in confs)
+
+    entry_dir = self._entry_dir(resolve_key)
+    tmp_dir = '{}.tmp.{}.{}'.format(entry_dir, os.getpid(), threading.current_thread().ident)
+    safe_rmtree(tmp_dir)
+    safe_mkdir(tmp_dir)
+    try:
+      for conf, report_path in report_paths.items():
+        with open(report_path, 'rb') as fp:
+          report = fp.read().decode('utf-8')
+        with open(os.path.join(tmp_dir, '{}.xml'.format(conf)), 'wb') as fp:
+          fp.write(self._generalize(report, resolve_hash_name).encode('utf-8'))
+      entry = json.dumps({'version': self._VERSION, 'classpath': classpath, 'ivy_infos': ivy_infos})
+      with open(os.path.join(tmp_dir, 'entry.json'), 'wb') as fp:
+        fp.write(self._generalize(entry, resolve_hash_name).encode('utf-8'))
+      safe_concurrent_rename(tmp_dir, entry_dir)
+    finally:
+      safe_rmtree(tmp_dir)
+
+  def restore(self, resolve_key, resolve_hash_name, confs, raw_classpath_file):
+    """Recreates the outcome of the resolve with the given key under the given hash name.
+
+    Writes the raw classpath file and each conf's xml report, just as running the resolve would,
+    and primes `IvyUtils.parse_xml_report` with the pre-parsed reports.
+
+    :returns: True if the outcome was restored, or False if there is no usable entry for the
+              resolve, in which case it must be run.
+    """
+    entry = self._load_entry(resolve_key, resolve_hash_name, confs)
+    if entry is None or not all(os.path.exists(path) for path in entry['classpath']):
+      return False
+    entry_dir = self._entry_dir(resolve_key)
+    for conf in confs:
+      with open(os.path.join(entry_dir, '{}.xml'.format(conf)), 'rb') as fp:
+        report = self._specialize(fp.read().decode('utf-8'), resolve_hash_name)
+      with safe_open(IvyUtils.xml_report_path(resolve_hash_name, conf), 'wb') as fp:
+        fp.write(report.encode('utf-8'))
+    with safe_open(raw_classpath_file, 'w') as fp:
+      fp.write(os.pathsep.join(entry['classpath']))
+    self._remember_ivy_infos(entry, resolve_hash_name, confs)
+    return True
+
+  def prime(self, resolve_key, resolve_hash_name, confs):
+    """Primes `IvyUtils.parse_xml_report` with the pre-parsed reports of an up to date resolve.
+
+    :returns: True if the reports were primed.
+    """
+    entry = self._load_entry(resolve_key, resolve_hash_name, confs)
+    if entry is None:
+      return False
+    self._remember_ivy_infos(entry, resolve_hash_name, confs)
+    return True
+
+  @staticmethod
+  def _has_dynamic_revisions(report_path):
+    for caller in ET.parse(report_path).getroot().findall('dependencies/module/revision/caller'):
+      if any(IvyUtils.is_dynamic_revision(caller.get(attr))
+             for attr in ('rev', 'rev-constraint-default', 'rev-constraint-dynamic')):
+        return True
+    return False
+
+  def _entry_dir(self, resolve_key):
+    return os.path.join(self._root, resolve_key)
+
+  def _load_entry(self, resolve_key, resolve_hash_name, confs):
+    try:
+      with open(os.path.join(self._entry_dir(resolve_key), 'entry.json'), 'rb') as fp:
+        entry = json.loads(self._specialize(fp.read().decode('utf-8'), resolve_hash_name))
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return None
+    except ValueError:
+      logger.debug('Ignoring corrupt ivy resolve cache entry {}'.format(resolve_key))
+      return None
+    if entry.get('version') != self._VERSION or not set(confs) <= set(entry['ivy_infos']):
+      return None
+    return entry
+
+  def _remember_ivy_infos(self, entry, resolve_hash_name, confs):
+    for conf in confs:
+      if os.path.exists(IvyUtils.xml_report_path(resolve_hash_name, conf)):
+        ivy_info = IvyInfo.decode(entry['ivy_infos'][conf])
+        IvyUtils.remember_parsed_report(resolve_hash_name, conf, ivy_info)
+
+  def _generalize(self, text, resolve_hash_name):
+    return text.replace(resolve_hash_name, self._RESOLVE_PLACEHOLDER)
+
+  def _specialize(self, text, resolve_hash_name):
+    return text.replace(self._RESOLVE_PLACEHOLDER, resolve_hash_name)
@@ -82,8 +82,10 @@ class IvyImports(IvyTaskMixin, NailgunTask):
           self.context.log.info('Mapping import jars for {target}: \n  {jars}'.format(
             target=target.address.spec,
             jars='\n  '.join(self._str_jar(s) for s in jars)))
-          self.mapjars(imports_map, target, executor, jars=jars)
           imported_targets.append(target)
+      self.mapjars_for_targets(imports_map,
+                               [(target, target.imported_jars) for target in imported_targets],
+                               executor)
 
     # Reconstruct the ivy_imports target -> mapdir  mapping for targets that are
     # valid from walking the build cache
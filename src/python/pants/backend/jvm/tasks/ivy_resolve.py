@@ -165,8 +165,9 @@ class IvyResolve(IvyTaskMixin, NailgunTask):
     create_jardeps_for = self.context.products.isrequired('jar_dependencies')
     if create_jardeps_for:
       genmap = self.context.products.get('jar_dependencies')
-      for target in filter(create_jardeps_for, targets):
-        self.mapjars(genmap, target, executor=executor)
+      self.mapjars_for_targets(genmap,
+                               [(target, None) for target in filter(create_jardeps_for, targets)],
+                               executor)
 
   def check_artifact_cache_for(self, invalidation_check):
     # Ivy resolution is an output dependent on the entire target set, and is not divisible
@@ -6,6 +6,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import copy
+import functools
 import logging
 import os
 import shutil
@@ -14,16 +15,18 @@ from hashlib import sha1
 
 from twitter.common.collections import maybe_list
 
-from pants.backend.jvm.ivy_utils import IvyUtils
+from pants.backend.jvm.ivy_utils import IvyResolveCache, IvyUtils
 from pants.backend.jvm.targets.jar_library import JarLibrary
 from pants.backend.jvm.targets.jvm_target import JvmTarget
 from pants.base.cache_manager import VersionedTargetSet
 from pants.base.exceptions import TaskError
 from pants.base.fingerprint_strategy import FingerprintStrategy
+from pants.base.worker_pool import Work, WorkerPool
 from pants.ivy.bootstrapper import Bootstrapper
 from pants.ivy.ivy_subsystem import IvySubsystem
+from pants.java.executor import SubprocessExecutor
 from pants.java.util import execute_runner
-from pants.util.dirutil import safe_mkdir
+from pants.util.dirutil import safe_mkdir, safe_open
 
 
 logger = logging.getLogger(__name__)
@@ -76,6 +79,16 @@ class IvyTaskMixin(object):
     register('--soft-excludes', action='store_true', default=False, advanced=True,
              help='If a target depends on a jar that is excluded by another target '
                   'resolve this jar anyway')
+    register('--resolve-cache', action='store_true', default=True, advanced=True,
+             help='Remember the outcome of resolves by their inputs in the ivy cache dir, and reuse '
+                  'it rather than running ivy when the same jars are resolved again, even for '
+                  'different targets. Resolves of mutable jars, or of dynamic revisions like '
+                  'latest.integration, 1.0+ or [1.0,2.0), are never reused.')
+    register('--resolve-concurrency', type=int, default=1, advanced=True,
+             help='Run up to this many independent resolves at once, e.g. those mapping the jars '
+                  'of each of several targets, each in its own JVM. Concurrent resolves share the '
+                  'ivy cache, so configure ivy to lock it, e.g. with lockStrategy="artifact-lock" '
+                  'in ivysettings.xml, before raising this.')
 
   # Protect writes to the global map of jar path -> symlinks to that jar.
   symlink_map_lock = threading.Lock()
@@ -127,6 +140,7 @@ class IvyTaskMixin(object):
         else:
           report_paths.append(report_path)
       target_workdir = os.path.join(ivy_workdir, resolve_hash_name)
+      resolve_key_file = os.path.join(target_workdir, 'resolve_key')
       target_classpath_file = os.path.join(target_workdir, 'classpath')
       raw_target_classpath_file = target_classpath_file + '.raw'
       raw_target_classpath_file_tmp = raw_target_classpath_file + '.tmp'
@@ -138,30 +152,63 @@ class IvyTaskMixin(object):
 
       # Note that it's possible for all targets to be valid but for no classpath file to exist at
       # target_classpath_file, e.g., if we previously built a superset of targets.
+      resolve_cache = self._resolve_cache()
       if report_missing or invalidation_check.invalid_vts or not os.path.exists(raw_target_classpath_file):
-        args = ['-cachepath', raw_target_classpath_file_tmp] + (custom_args if custom_args else [])
-
-        self.exec_ivy(
-            target_workdir=target_workdir,
-            targets=global_vts.targets,
-            args=args,
-            executor=executor,
-            ivy=ivy,
-            workunit_name=workunit_name,
-            confs=confs,
-            use_soft_excludes=self.get_options().soft_excludes,
-            resolve_hash_name=resolve_hash_name)
-
-        if not os.path.exists(raw_target_classpath_file_tmp):
-          raise TaskError('Ivy failed to create classpath file at {}'
-                          .format(raw_target_classpath_file_tmp))
-        shutil.move(raw_target_classpath_file_tmp, raw_target_classpath_file)
-        logger.debug('Moved ivy classfile file to {dest}'.format(dest=raw_target_classpath_file))
+        use_soft_excludes = self.get_options().soft_excludes
+        jars, excludes = IvyUtils.calculate_classpath(global_vts.targets,
+                                                      gather_excludes=not use_soft_excludes)
+        resolve_key = None
+        if (resolve_cache and not IvyUtils.has_mutable_jars(jars) and
+            not IvyUtils.has_dynamic_jars(jars)):
+          bootstrap_jar_url = IvySubsystem.global_instance().get_options().bootstrap_jar_url
+          resolve_key = resolve_cache.resolve_key(global_vts.targets, jars, excludes, report_confs,
+                                                  ivy_settings=ivy.ivy_settings, args=custom_args,
+                                                  ivy_classpath=ivy.classpath,
+                                                  bootstrap_jar_url=bootstrap_jar_url)
+
+        if resolve_key and resolve_cache.restore(resolve_key, resolve_hash_name, report_confs,
+                                                 raw_target_classpath_file):
+          logger.debug('Restored resolve {} from the resolve cache'.format(resolve_hash_name))
+        else:
+          args = ['-cachepath', raw_target_classpath_file_tmp] + (custom_args if custom_args else [])
+
+          self.exec_ivy(
+              target_workdir=target_workdir,
+              targets=global_vts.targets,
+              args=args,
+              executor=executor,
+              ivy=ivy,
+              workunit_name=workunit_name,
+              confs=confs,
+              jars=jars,
+              excludes=excludes,
+              use_soft_excludes=use_soft_excludes,
+              resolve_hash_name=resolve_hash_name)
+
+          if not os.path.exists(raw_target_classpath_file_tmp):
+            raise TaskError('Ivy failed to create classpath file at {}'
+                            .format(raw_target_classpath_file_tmp))
+          shutil.move(raw_target_classpath_file_tmp, raw_target_classpath_file)
+          logger.debug('Moved ivy classfile file to {dest}'.format(dest=raw_target_classpath_file))
+
+          if resolve_key:
+            resolve_cache.store(resolve_key, resolve_hash_name, report_confs,
+                                raw_target_classpath_file)
+
+        # Remember the key so later runs that find the resolve up to date can use the pre-parsed
+        # reports stored with it.
+        with safe_open(resolve_key_file, 'w') as fp:
+          fp.write(resolve_key or '')
 
         if self.artifact_cache_writes_enabled():
           self.update_artifact_cache([(global_vts, [raw_target_classpath_file])])
       else:
         logger.debug("Using previously resolved reports: {}".format(report_paths))
+        if resolve_cache and os.path.exists(resolve_key_file):
+          with open(resolve_key_file, 'r') as fp:
+            resolve_key = fp.read().strip()
+          if resolve_key:
+            resolve_cache.prime(resolve_key, resolve_hash_name, report_confs)
 
     # Make our actual classpath be symlinks, so that the paths are uniform across systems.
     # Note that we must do this even if we read the raw_target_classpath_file from the artifact
@@ -181,6 +228,12 @@ class IvyTaskMixin(object):
       stripped_classpath = [path.strip() for path in classpath]
       return (stripped_classpath, resolve_hash_name)
 
+  def _resolve_cache(self):
+    if not self.get_options().resolve_cache:
+      return None
+    cache_dir = IvySubsystem.global_instance().get_options().cache_dir
+    return IvyResolveCache(os.path.join(cache_dir, 'pants-resolves'))
+
   def mapjar_workdir(self, target):
     return os.path.join(self.workdir, 'mapped-jars', target.id)
 
@@ -217,6 +270,41 @@ class IvyTaskMixin(object):
       (u'com.example', u'bar', u'default') => .../.pants.d/test/IvyImports/mapped-jars/unpack.foo/com.example/bar/default
         [u'com.example-bar-0.0.1.jar']
     """
+    self.mapjars_for_targets(genmap, [(target, jars)], executor)
+
+  def mapjars_for_targets(self, genmap, targets_and_jars, executor):
+    """Resolves jars for each of several targets, as `mapjars` does for one.
+
+    Up to `--resolve-concurrency` resolves run at once.
+
+    :param genmap: The jar_dependencies ProductMapping entry for the required products.
+    :param targets_and_jars: (target, jars) pairs, where jars are the jars to resolve for the
+                             target, or None to resolve the target's own.
+    :param executor: The executor to run ivy with when running resolves one at a time.
+    """
+    targets_and_jars = list(targets_and_jars)
+    concurrency = min(self.get_options().resolve_concurrency, len(targets_and_jars))
+    if concurrency <= 1:
+      for target, jars in targets_and_jars:
+        self._resolve_mapped_jars(target, jars, executor, workunit_name='map-jars')
+        self._map_resolved_jars(genmap, target)
+      return
+
+    # Ivy is not thread safe, so concurrent resolves can't share a nailgun server: each runs in a
+    # JVM of its own instead.
+    subprocess_executor = SubprocessExecutor(executor.distribution if executor else None)
+    resolve = functools.partial(self._resolve_mapped_jars, executor=subprocess_executor,
+                                workunit_name='ivy', concurrent=True)
+    with self.context.new_workunit(name='map-jars') as workunit:
+      worker_pool = WorkerPool(workunit, self.context.run_tracker, concurrency)
+      try:
+        worker_pool.submit_work_and_wait(Work(resolve, targets_and_jars))
+      finally:
+        worker_pool.shutdown()
+    for target, _ in targets_and_jars:
+      self._map_resolved_jars(genmap, target)
+
+  def _resolve_mapped_jars(self, target, jars, executor, workunit_name, concurrent=False):
     mapdir = self.mapjar_workdir(target)
     safe_mkdir(mapdir, clean=True)
     ivyargs = self._get_ivy_args(mapdir)
@@ -228,10 +316,13 @@ class IvyTaskMixin(object):
                   args=ivyargs,
                   confs=confs,
                   ivy=Bootstrapper.default_ivy(),
-                  workunit_name='map-jars',
+                  workunit_name=workunit_name,
                   jars=jars,
-                  use_soft_excludes=False)
+                  use_soft_excludes=False,
+                  concurrent=concurrent)
 
+  def _map_resolved_jars(self, genmap, target):
+    mapdir = self.mapjar_workdir(target)
     for org in os.listdir(mapdir):
       orgdir = os.path.join(mapdir, org)
       if os.path.isdir(orgdir):
@@ -259,8 +350,10 @@ class IvyTaskMixin(object):
                ivy=None,
                workunit_name='ivy',
                jars=None,
+               excludes=None,
                use_soft_excludes=False,
-               resolve_hash_name=None):
+               resolve_hash_name=None,
+               concurrent=False):
     ivy_jvm_options = copy.copy(self.get_options().jvm_options)
     # Disable cache in File.getCanonicalPath(), makes Ivy work with -symlink option properly on ng.
     ivy_jvm_options.append('-Dsun.io.useCanonCaches=false')
@@ -272,7 +365,7 @@ class IvyTaskMixin(object):
       jars, excludes = IvyUtils.calculate_classpath(targets,
                                                     gather_excludes=not use_soft_excludes)
     else:
-      excludes = set()
+      excludes = excludes or set()
 
     ivy_args = ['-ivy', ivyxml]
 
@@ -281,7 +374,10 @@ class IvyTaskMixin(object):
     ivy_args.extend(confs_to_resolve)
     ivy_args.extend(args)
 
-    with IvyUtils.ivy_lock:
+    # Resolves are serialized, unless their caller runs them concurrently with ones that write
+    # distinct files.
+    lock = IvyUtils.resolve_lock(ivyxml) if concurrent else IvyUtils.ivy_lock
+    with lock:
       IvyUtils.generate_ivy(targets, jars, excludes, ivyxml, confs_to_resolve, resolve_hash_name)
       runner = ivy.runner(jvm_options=ivy_jvm_options, args=ivy_args, executor=executor)
       try:
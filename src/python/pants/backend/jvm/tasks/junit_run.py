@@ -9,6 +9,8 @@ import copy
 import fnmatch
 import os
 import sys
+import threading
+import time
 from abc import abstractmethod
 from collections import defaultdict, namedtuple
 
@@ -20,6 +22,8 @@ from pants.backend.jvm.tasks.jvm_task import JvmTask
 from pants.backend.jvm.tasks.jvm_tool_task_mixin import JvmToolTaskMixin
 from pants.base.build_environment import get_buildroot
 from pants.base.exceptions import TargetDefinitionException, TaskError, TestFailedTaskError
+from pants.base.target_durations import TargetDurations
+from pants.base.worker_pool import Work, WorkerPool
 from pants.base.workunit import WorkUnitLabel
 from pants.binaries import binary_util
 from pants.java.jar.shader import Shader
@@ -67,6 +71,9 @@ class _JUnitRunner(object):
 
   The default behavior is to just run JUnit tests."""
 
+  # The name test class durations are recorded under in the TargetDurations.
+  _CLASS_DURATIONS_KEY = 'JUnitRun.classes'
+
   @classmethod
   def register_options(cls, register, register_jvm_tool):
     register('--skip', action='store_true', help='Skip running junit.')
@@ -74,6 +81,9 @@ class _JUnitRunner(object):
              help='Fail fast on the first test failure in a suite.')
     register('--batch-size', advanced=True, type=int, default=sys.maxint,
              help='Run at most this many tests in a single test process.')
+    register('--worker-count', advanced=True, type=int, default=1,
+             help='Run up to this many batches of tests concurrently, each in its own test '
+                  'process.  Ignored when measuring coverage.')
     register('--test', action='append',
              help='Force running of just these tests.  Tests can be specified using any of: '
                   '[classname], [classname]#[methodname], [filename] or [filename]#[methodname]')
@@ -85,6 +95,14 @@ class _JUnitRunner(object):
     register('--test-shard', advanced=True,
              help='Subset of tests to run, in the form M/N, 0 <= M < N. '
                   'For example, 1/3 means run tests number 2, 5, 8, 11, ...')
+    register('--test-shard-mode', advanced=True, choices=['position', 'duration'],
+             default='position',
+             help="How to divide tests into shards. 'position' deals tests out by their position. "
+                  "'duration' deals test classes out so that shards take about as long to run, "
+                  "going by how long the classes took in past runs. Every shard must start from "
+                  "the same past durations to agree on the partitioning, so runs sharded by "
+                  "duration consult the durations on record but don't add to them; see "
+                  "--target-durations-persist.")
     register('--suppress-output', action='store_true', default=True,
              help='Redirect test output to files in .pants.d/test/junit.')
     register('--cwd', advanced=True,
@@ -108,6 +126,7 @@ class _JUnitRunner(object):
     options = task_exports.task_options
     self._tests_to_run = options.test
     self._batch_size = options.batch_size
+    self._worker_count = max(1, options.worker_count)
     self._fail_fast = options.fail_fast
     self._working_dir = options.cwd or get_buildroot()
     self._args = copy.copy(task_exports.args)
@@ -125,9 +144,23 @@ class _JUnitRunner(object):
     self._args.append('-parallel-threads')
     self._args.append(str(options.parallel_threads))
 
+    self._test_shard = None
     if options.test_shard:
-      self._args.append('-test-shard')
-      self._args.append(options.test_shard)
+      if options.test_shard_mode == 'duration':
+        self._test_shard = self._parse_test_shard(options.test_shard)
+      else:
+        self._args.append('-test-shard')
+        self._args.append(options.test_shard)
+
+  @staticmethod
+  def _parse_test_shard(test_shard):
+    try:
+      shard, total = map(int, test_shard.split('/'))
+    except ValueError:
+      raise TaskError("Invalid test shard '{}', should be of the form M/N".format(test_shard))
+    if not 0 <= shard < total:
+      raise TaskError("Invalid test shard '{}', M must be >= 0 and < N".format(test_shard))
+    return shard, total
 
   def execute(self, targets):
     # We only run tests within java_tests/junit_tests targets.
@@ -138,6 +171,7 @@ class _JUnitRunner(object):
     # Thus, we filter out the non-java-tests targets first but
     # keep the original targets set intact for coverages.
     tests_and_targets = self._collect_test_targets(targets)
+    tests_and_targets = self._maybe_shard_by_duration(tests_and_targets)
 
     if not tests_and_targets:
       return
@@ -151,12 +185,17 @@ class _JUnitRunner(object):
 
     def _do_report(exception=None):
       self.report(targets, tests_and_targets.keys(), tests_failed_exception=exception)
+    start_time = time.time()
     try:
       self.run(tests_and_targets)
       _do_report(exception=None)
     except TaskError as e:
       _do_report(exception=e)
       raise
+    finally:
+      # Shards run one after another must all partition from the same durations.
+      if not self._test_shard:
+        self._record_test_durations(tests_and_targets, start_time)
 
   def instrument(self, targets, tests, compute_junit_classpath):
     """Called from coverage classes. Run any code instrumentation needed.
@@ -217,6 +256,32 @@ class _JUnitRunner(object):
     else:
       return tests_from_targets
 
+  def _maybe_shard_by_duration(self, tests_and_targets):
+    """Returns the tests, and their targets, in our test shard when sharding by duration."""
+    if not self._test_shard:
+      return tests_and_targets
+    shard, total = self._test_shard
+    test_classes = OrderedSet(test.partition('#')[0] for test in tests_and_targets)
+    shard_classes = set(TargetDurations.Factory.create().balanced_shard(
+      self._CLASS_DURATIONS_KEY, test_classes, shard, total))
+    return dict((test, target) for test, target in tests_and_targets.items()
+                if test.partition('#')[0] in shard_classes)
+
+  def _record_test_durations(self, tests_and_targets, start_time):
+    """Records how long each test class run since `start_time` took, going by its junit xml report.
+    """
+    target_durations = TargetDurations.Factory.create()
+    for test_class in set(test.partition('#')[0] for test in tests_and_targets):
+      filename = os.path.join(self._task_exports.workdir, 'TEST-{0}.xml'.format(test_class))
+      # Skip reports left over from earlier runs, e.g. of tests --fail-fast kept from running.
+      if os.path.exists(filename) and os.path.getmtime(filename) >= int(start_time):
+        try:
+          secs = float(XmlParser.from_file(filename).get_attribute('testsuite', 'time'))
+        except (XmlParser.XmlError, ValueError) as e:
+          self._context.log.debug('Not recording the duration of {}: {}'.format(test_class, e))
+        else:
+          target_durations.record(self._CLASS_DURATIONS_KEY, test_class, secs, 1)
+
   def _get_failed_targets(self, tests_and_targets):
     """Return a list of failed targets.
 
@@ -253,32 +318,45 @@ class _JUnitRunner(object):
                  classpath_append=()):
     extra_jvm_options = extra_jvm_options or []
 
-    result = 0
-    for workdir, tests in self._tests_by_workdir(tests_to_targets).items():
-      for batch in self._partition(tests):
-        # Batches of test classes will likely exist within the same targets: dedupe them.
-        relevant_targets = set(map(tests_to_targets.get, batch))
-        classpath = self._task_exports.classpath(relevant_targets,
-                                                 cp=self._task_exports.tool_classpath('junit'))
-        complete_classpath = OrderedSet()
-        complete_classpath.update(classpath_prepend)
-        complete_classpath.update(classpath)
-        complete_classpath.update(classpath_append)
-        with binary_util.safe_args(batch, self._task_exports.task_options) as batch_tests:
-          self._context.log.debug('CWD = {}'.format(workdir))
-          result += abs(execute_java(
-            classpath=complete_classpath,
-            main=main,
-            jvm_options=self._task_exports.jvm_options + extra_jvm_options,
-            args=self._args + batch_tests + [u'-xmlreport'],
-            workunit_factory=self._context.new_workunit,
-            workunit_name='run',
-            workunit_labels=[WorkUnitLabel.TEST],
-            cwd=workdir,
-          ))
+    def complete_classpath_for(batch):
+      # Batches of test classes will likely exist within the same targets: dedupe them.
+      relevant_targets = set(map(tests_to_targets.get, batch))
+      classpath = self._task_exports.classpath(relevant_targets,
+                                               cp=self._task_exports.tool_classpath('junit'))
+      complete_classpath = OrderedSet()
+      complete_classpath.update(classpath_prepend)
+      complete_classpath.update(classpath)
+      complete_classpath.update(classpath_append)
+      return complete_classpath
+
+    def run_batch(workdir, batch, complete_classpath):
+      with binary_util.safe_args(batch, self._task_exports.task_options) as batch_tests:
+        self._context.log.debug('CWD = {}'.format(workdir))
+        return abs(execute_java(
+          classpath=complete_classpath,
+          main=main,
+          jvm_options=self._task_exports.jvm_options + extra_jvm_options,
+          args=self._args + batch_tests + [u'-xmlreport'],
+          workunit_factory=self._context.new_workunit,
+          workunit_name='run',
+          workunit_labels=[WorkUnitLabel.TEST],
+          cwd=workdir,
+        ))
 
+    result = 0
+    tests_by_workdir = self._tests_by_workdir(tests_to_targets)
+    if self._worker_count == 1:
+      for workdir, tests in tests_by_workdir.items():
+        for batch in self._partition(tests):
+          result += run_batch(workdir, batch, complete_classpath_for(batch))
           if result != 0 and self._fail_fast:
             break
+    else:
+      # Computing classpaths consults products, so do it all up front rather than in the workers.
+      batches = [(workdir, batch, complete_classpath_for(batch))
+                 for workdir, tests in tests_by_workdir.items()
+                 for batch in self._partition(tests)]
+      result = self._run_batches_concurrently(run_batch, batches)
 
     if result != 0:
       failed_targets = self._get_failed_targets(tests_to_targets)
@@ -288,6 +366,35 @@ class _JUnitRunner(object):
         failed_targets=failed_targets
       )
 
+  def _run_batches_concurrently(self, run_batch, batches):
+    """Runs `run_batch` over `batches` on up to `--worker-count` threads, each running one test
+    process at a time.
+
+    With `--fail-fast`, no new batches are started once one has failed.
+
+    Each batch writes its reports to the shared output directory, one per test class, so batches
+    never clobber each other's results.
+
+    :returns: The sum of the absolute exit codes of the batches run.
+    """
+    failed = threading.Event()
+
+    def run(*batch):
+      if self._fail_fast and failed.is_set():
+        return 0
+      result = run_batch(*batch)
+      if result != 0:
+        failed.set()
+      return result
+
+    with self._context.new_workunit(name='run-batches') as workunit:
+      worker_pool = WorkerPool(workunit, self._context.run_tracker,
+                               min(self._worker_count, len(batches)))
+      try:
+        return sum(worker_pool.submit_work_and_wait(Work(run, batches)))
+      finally:
+        worker_pool.shutdown()
+
   def _infer_workdir(self, target):
     if target.cwd is not None:
       return target.cwd
@@ -397,6 +504,9 @@ class _Coverage(_JUnitRunner):
     self._coverage_open = options.coverage_open
     self._coverage_force = options.coverage_force
 
+    # Each test process merges its coverage data into the same file, so they must run serially.
+    self._worker_count = 1
+
   @abstractmethod
   def instrument(self, targets, tests, compute_junit_classpath):
     pass
@@ -17,6 +17,7 @@ from pants.backend.jvm.tasks.jvm_compile.jvm_compile_isolated_strategy import \
 from pants.backend.jvm.tasks.jvm_compile.jvm_dependency_analyzer import JvmDependencyAnalyzer
 from pants.backend.jvm.tasks.nailgun_task import NailgunTaskBase
 from pants.base.fingerprint_strategy import TaskIdentityFingerprintStrategy
+from pants.base.target_durations import TargetDurations
 from pants.base.workunit import WorkUnitLabel
 from pants.goal.products import MultipleRootedProducts
 from pants.option.custom_types import list_option
@@ -228,6 +229,11 @@ class JvmCompile(NailgunTaskBase, GroupMember):
                                           self._name,
                                           self.select_source)
 
+  @property
+  def nailgun_pool_size(self):
+    # One compiler JVM per concurrent compilation.
+    return self._strategy.worker_count
+
   def _fingerprint_strategy(self):
     return TaskIdentityFingerprintStrategy(self)
 
@@ -319,13 +325,25 @@ class JvmCompile(NailgunTaskBase, GroupMember):
         ' (',
         progress_message,
         ').')
-      with self.context.new_workunit('compile', labels=[WorkUnitLabel.COMPILER]):
+      with self.context.new_workunit('compile', labels=[WorkUnitLabel.COMPILER]) as workunit:
         # The compiler may delete classfiles, then later exit on a compilation error. Then if the
         # change triggering the error is reverted, we won't rebuild to restore the missing
         # classfiles. So we force-invalidate here, to be on the safe side.
         vts.force_invalidate()
         self.compile(self._args, classpath, sources, outdir, upstream_analysis, analysis_file,
                      log_file, settings)
+      self._record_durations(vts, workunit.duration())
+
+  def _record_durations(self, vts, secs):
+    """Records the time spent compiling vts, shared between its targets by their sizes.
+
+    These durations feed the cost estimates used to partition and schedule future compiles.
+    """
+    target_durations = TargetDurations.Factory.create()
+    total_units = max(1, sum(vt.num_chunking_units for vt in vts.versioned_targets))
+    for vt in vts.versioned_targets:
+      target_durations.record(type(self).__name__, vt.target.id,
+                              secs * vt.num_chunking_units / total_units, vt.num_chunking_units)
 
   def check_artifact_cache(self, vts):
     post_process_cached_vts = lambda cvts: self._strategy.post_process_cached_vts(cvts)
@@ -12,15 +12,14 @@ from collections import OrderedDict, defaultdict
 
 from pants.backend.jvm.tasks.classpath_util import ClasspathUtil
 from pants.backend.jvm.tasks.jvm_compile.compile_context import IsolatedCompileContext
-from pants.backend.jvm.tasks.jvm_compile.execution_graph import (ExecutionFailure, ExecutionGraph,
-                                                                 Job)
 from pants.backend.jvm.tasks.jvm_compile.jvm_compile_strategy import JvmCompileStrategy
 from pants.backend.jvm.tasks.jvm_compile.resource_mapping import ResourceMapping
 from pants.base.build_environment import get_buildroot
 from pants.base.exceptions import TaskError
+from pants.base.execution_graph import ExecutionFailure, ExecutionGraph, Job
 from pants.base.worker_pool import Work, WorkerPool
 from pants.util.contextutil import open_zip
-from pants.util.dirutil import safe_mkdir, safe_walk
+from pants.util.dirutil import safe_mkdir, safe_mkdir_for, safe_walk
 from pants.util.fileutil import atomic_copy
 
 
@@ -51,6 +50,7 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
     self._analysis_dir = os.path.join(workdir, 'isolated-analysis')
     self._classes_dir = os.path.join(workdir, 'isolated-classes')
     self._logs_dir = os.path.join(workdir, 'isolated-logs')
+    self._critical_path_report_file = os.path.join(workdir, 'isolated-critical-path.txt')
     self._jars_dir = os.path.join(workdir, 'isolated-jars')
 
     self._capture_log = options.capture_log
@@ -68,6 +68,10 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
   def name(self):
     return 'isolated'
 
+  @property
+  def worker_count(self):
+    return self._worker_count
+
   def compile_context(self, target):
     analysis_file = JvmCompileStrategy._analysis_for_target(self._analysis_dir, target)
     classes_dir = os.path.join(self._classes_dir, target.id)
@@ -255,7 +259,8 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
                       # If compilation and analysis work succeeds, validate the vts.
                       # Otherwise, fail it.
                       on_success=vts.update,
-                      on_failure=vts.force_invalidate))
+                      on_failure=vts.force_invalidate,
+                      size=max(1, vts.estimated_cost)))
     return jobs
 
   def compile_chunk(self,
@@ -289,9 +294,19 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
 
     exec_graph = ExecutionGraph(jobs)
     try:
-      exec_graph.execute(self._worker_pool, self.context.log)
+      exec_graph.execute(self._worker_pool, self.context.log, max_workers=self._worker_count)
     except ExecutionFailure as e:
       raise TaskError("Compilation failure: {}".format(e))
+    finally:
+      self._write_critical_path_report(exec_graph)
+
+  def _write_critical_path_report(self, exec_graph):
+    report = exec_graph.format_critical_path_report()
+    self.context.log.debug(report)
+    safe_mkdir_for(self._critical_path_report_file)
+    with open(self._critical_path_report_file, 'w') as fp:
+      fp.write(report)
+      fp.write('\n')
 
   def compute_resource_mapping(self, compile_contexts):
     return ResourceMapping(self._classes_dir)
@@ -5,6 +5,7 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import itertools
 import os
 import textwrap
 from contextlib import closing
@@ -112,6 +113,13 @@ class ZincCompile(JvmCompile):
   def create_analysis_tools(self):
     return AnalysisTools(self.context.java_home, ZincAnalysisParser(), ZincAnalysis)
 
+  def prepare_execute(self, chunks):
+    # Start zinc for each target we may compile concurrently while we prepare analysis and other
+    # compilers run.
+    num_targets = len(list(itertools.chain(*chunks)))
+    self.prewarm_nailguns(self.zinc_classpath(), self._jvm_options, count=num_targets)
+    super(ZincCompile, self).prepare_execute(chunks)
+
   def zinc_classpath(self):
     # Zinc takes advantage of tools.jar if it's presented in classpath.
     # For example com.sun.tools.javac.Main is used for in process java compilation.
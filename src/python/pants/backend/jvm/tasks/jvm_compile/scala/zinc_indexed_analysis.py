@@ -0,0 +1,511 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import json
+import os
+import re
+import struct
+import zlib
+from collections import OrderedDict
+
+from pants.backend.jvm.tasks.jvm_compile.analysis_parser import ParseError, raise_on_eof
+from pants.base.build_environment import get_buildroot
+
+
+class IndexedZincAnalysis(object):
+  """A zinc analysis stored in a binary format indexed by record, so it can be used piecemeal.
+
+  The zinc text format is a version line followed by a series of sections, each a header line, an
+  item count line and that many `key -> value` lines, so any use of a text analysis means parsing
+  all of it.  Here each section's values are instead grouped into one record per key, and each
+  section has an index of the offset of each of its records.  Splitting out the analysis of some
+  sources, or looking up their products or deps, reads just the indexes of the sections involved
+  and the records for those sources.
+
+  A file holds, in order:
+
+  - The magic bytes.
+  - The records: the utf-8 values of each key in each section, one per line.
+  - The section indexes: each a zlib-compressed json list of [key, offset, length, count] per
+    record, in record order.
+  - The table: json of the version line and, for each section, its header and the offset and
+    length of its index.
+  - The trailer: the offset and length of the table, followed by the magic bytes again.
+
+  Section indexes are only read when first needed.
+  """
+
+  MAGIC = b'ZINCIDX1'
+
+  _TRAILER = struct.Struct(b'>QQ8s')
+
+  # Relations sections of internal deps, which are source -> source, and of their external
+  # counterparts, which are source -> class.
+  _INTERNAL_TO_EXTERNAL_DEPS = OrderedDict([
+    ('direct source dependencies', 'direct external dependencies'),
+    ('public inherited source dependencies', 'public inherited external dependencies'),
+    ('member reference internal dependencies', 'member reference external dependencies'),
+    ('inheritance internal dependencies', 'inheritance external dependencies'),
+  ])
+
+  _SOURCE_SECTIONS = frozenset(['products', 'binary dependencies', 'used names', 'source stamps',
+                                'internal apis', 'source infos'] +
+                               _INTERNAL_TO_EXTERNAL_DEPS.keys() +
+                               _INTERNAL_TO_EXTERNAL_DEPS.values())
+
+  _STAMPS_SECTIONS = frozenset(['product stamps', 'source stamps', 'binary stamps'])
+
+  # How a split decides which of a section's records belong to it.
+  _SOURCE = 'source'  # Keyed by source file.
+  _PRODUCT = 'product'  # Keyed by class file produced by a source.
+  _BINARY = 'binary'  # Keyed by binary dep of a source.
+  _EXTERNAL_API = 'external api'  # Keyed by external class depended on by a source.
+  _GLOBAL = 'global'  # Shared by all sources.
+
+  # TODO(benjy): Temporary hack until we inject a dep on the scala runtime jar.
+  _SCALALIB_RE = re.compile(r'scala-library-\d+\.\d+\.\d+\.jar$')
+
+  @classmethod
+  def is_indexed_analysis(cls, path):
+    """Returns True if the file at `path` holds an indexed analysis, rather than a text one."""
+    with open(path, 'rb') as fp:
+      return fp.read(len(cls.MAGIC)) == cls.MAGIC
+
+  @classmethod
+  def from_text(cls, infile, path):
+    """Converts the zinc text analysis read from `infile` to an indexed analysis at `path`.
+
+    :returns: The indexed analysis.
+    """
+    with raise_on_eof(infile):
+      version_line = infile.next().decode('utf-8')
+      with _Writer(path, version_line) as writer:
+        for line in infile:
+          line = line.decode('utf-8')
+          if not line.endswith(':\n'):
+            raise ParseError('Expected a section header. Found: "{}"'.format(line))
+          records = OrderedDict()
+          for _ in range(cls._parse_num_items(infile.next())):
+            key, sep, value = infile.next().decode('utf-8').rstrip('\n').partition(' -> ')
+            if not sep:
+              raise ParseError('Expected "<key> -> <value>" in {}'.format(line[:-2]))
+            records.setdefault(key, []).append(value)
+          writer.write_section(line[:-2],
+                               [(key, cls._encode(values)) for key, values in records.items()])
+    return cls(path)
+
+  @classmethod
+  def from_text_path(cls, text_path, path):
+    """Converts the zinc text analysis at `text_path` to an indexed analysis at `path`."""
+    with open(text_path, 'rb') as infile:
+      return cls.from_text(infile, path)
+
+  @classmethod
+  def merge_to_path(cls, analyses, path):
+    """Merges the given indexed analyses into one at `path`.
+
+    Where analyses have records for the same key, the record in the later analysis wins, as for
+    a source recompiled since the earlier analysis.  Deps on classes that the merged analysis now
+    has sources for become deps on those sources.
+
+    :returns: The merged analysis.
+    """
+    first = analyses[0]
+    headers = first.headers
+    roles = first._roles()
+    merged = []
+    for i, role in enumerate(roles):
+      if role == cls._GLOBAL:
+        merged.append(OrderedDict(first._raw_records(i)))
+      else:
+        records = {}
+        for analysis in analyses:
+          records.update(analysis._raw_records(i))
+        merged.append(records)
+
+    # Classes with sources in the merged analysis, mapped to their sources.
+    class_names = first._relations_class_names_section()
+    sources_by_class = {}
+    if class_names is not None:
+      for source, record in merged[class_names].items():
+        for class_name in cls._decode(record):
+          sources_by_class[class_name] = source
+
+    for internal_header, external_header in cls._INTERNAL_TO_EXTERNAL_DEPS.items():
+      if internal_header not in headers or external_header not in headers:
+        continue
+      internal = merged[headers.index(internal_header)]
+      external = merged[headers.index(external_header)]
+      for source, record in external.items():
+        classes = cls._decode(record)
+        internalized = [sources_by_class[c] for c in classes if c in sources_by_class]
+        if internalized:
+          deps = cls._decode(internal[source]) if source in internal else []
+          internal[source] = cls._encode(deps + [d for d in internalized if d not in deps])
+          remaining = [c for c in classes if c not in sources_by_class]
+          if remaining:
+            external[source] = cls._encode(remaining)
+          else:
+            del external[source]
+
+    with _Writer(path, first.version_line) as writer:
+      for i, (header, role) in enumerate(zip(headers, roles)):
+        records = merged[i]
+        if role == cls._EXTERNAL_API:
+          records = dict((c, api) for c, api in records.items() if c not in sources_by_class)
+        writer.write_section(header, cls._ordered(records, role))
+    return cls(path)
+
+  @classmethod
+  def merge_from_paths(cls, analysis_paths, merged_analysis_path):
+    """Merges the indexed analyses at the given paths, as `merge_to_path` does."""
+    cls.merge_to_path([cls(path) for path in analysis_paths], merged_analysis_path)
+
+  def __init__(self, path):
+    """Opens the indexed analysis at `path`, reading just its table.
+
+    :raises: ParseError if the file is not an indexed analysis.
+    """
+    self._path = path
+    with open(path, 'rb') as fp:
+      if fp.read(len(self.MAGIC)) != self.MAGIC:
+        raise ParseError('{} is not an indexed zinc analysis'.format(path))
+      fp.seek(-self._TRAILER.size, os.SEEK_END)
+      table_offset, table_length, magic = self._TRAILER.unpack(fp.read(self._TRAILER.size))
+      if magic != self.MAGIC:
+        raise ParseError('{} is a truncated indexed zinc analysis'.format(path))
+      fp.seek(table_offset)
+      table = json.loads(fp.read(table_length).decode('utf-8'))
+    self._version_line = table['version_line']
+    self._sections = table['sections']
+    self._indexes = {}
+
+  @property
+  def path(self):
+    return self._path
+
+  @property
+  def version_line(self):
+    """The version line of the text analysis this analysis was converted from."""
+    return self._version_line
+
+  @property
+  def headers(self):
+    """The headers of the sections, in order.  Headers are not unique."""
+    return [header for header, _, _ in self._sections]
+
+  def keys(self, section):
+    """Returns the keys of the records of the given section, by section number, in order."""
+    return list(self._index(section)[0])
+
+  def num_items(self, section):
+    """Returns the number of items, i.e. key -> value pairs, in the given section."""
+    return sum(count for _, _, count in self._index(section)[1].values())
+
+  def records(self, section, keys=None):
+    """Yields (key, values) for the records of the given section, in record order.
+
+    :param keys: If specified, only the records with these keys are read.  Keys with no record in
+                 the section are skipped.
+    """
+    for key, record in self._raw_records(section, keys):
+      yield key, self._decode(record)
+
+  def _raw_records(self, section, keys=None):
+    # Yields (key, (data, count)) without decoding the data.
+    index_keys, index = self._index(section)
+    if keys is None:
+      keys = index_keys
+    else:
+      keys = sorted((key for key in set(keys) if key in index), key=lambda k: index[k][0])
+    if not keys:
+      return
+    with open(self._path, 'rb') as fp:
+      if len(keys) > len(index_keys) // 8:
+        # Reading past the unwanted records in between is faster than seeking over them.
+        start = index[keys[0]][0]
+        end_offset, end_length, _ = index[keys[-1]]
+        fp.seek(start)
+        data = fp.read(end_offset + end_length - start)
+        for key in keys:
+          offset, length, count = index[key]
+          yield key, (data[offset - start:offset - start + length], count)
+      else:
+        for key in keys:
+          offset, length, count = index[key]
+          fp.seek(offset)
+          yield key, (fp.read(length), count)
+
+  def sources(self):
+    """Returns the set of sources this analysis has records for."""
+    sources = set()
+    for i, role in enumerate(self._roles()):
+      if role == self._SOURCE:
+        sources.update(self.keys(i))
+    return sources
+
+  def to_text(self, outfile):
+    """Writes this analysis to `outfile` in the zinc text format."""
+    outfile.write(self._version_line.encode('utf-8'))
+    for i, header in enumerate(self.headers):
+      outfile.write('{}:\n{} items\n'.format(header, self.num_items(i)).encode('utf-8'))
+      for key, values in self.records(i):
+        for value in values:
+          outfile.write('{} -> {}\n'.format(key, value).encode('utf-8'))
+
+  def to_text_path(self, text_path):
+    """Writes this analysis to `text_path` in the zinc text format."""
+    with open(text_path, 'wb') as outfile:
+      self.to_text(outfile)
+
+  def products(self, sources=None):
+    """Returns a map of source -> list of class files it produced.
+
+    :param sources: If specified, only the products of these sources are read.
+    """
+    return dict(self._source_records('products', sources))
+
+  def deps(self, classes_dir, sources=None):
+    """Returns a map of source -> list of the binary, source and external deps of the source.
+
+    External deps, which are on classes, are mapped to the class files for those classes under
+    `classes_dir`.  All paths are absolute.
+
+    :param sources: If specified, only the deps of these sources are read.
+    """
+    ret = {}
+    for source, bin_deps in self._source_records('binary dependencies', sources):
+      ret.setdefault(source, []).extend(d for d in bin_deps if not self._SCALALIB_RE.search(d))
+    for source, src_deps in self._source_records('direct source dependencies', sources):
+      ret.setdefault(source, []).extend(src_deps)
+    for source, classes in self._source_records('direct external dependencies', sources):
+      ret.setdefault(source, []).extend(
+        os.path.join(classes_dir, c.replace('.', os.sep) + '.class') for c in classes)
+    return ret
+
+  def split_to_paths(self, split_path_pairs, catchall_path=None):
+    """Splits this analysis into indexed analyses at the given paths.
+
+    Only the records of the sources in each split are read, along with those records of the
+    shared sections they refer to.
+
+    As for the zinc text format, deps of a source on sources in other splits become external deps
+    on a representative class of those sources.
+
+    :param split_path_pairs: A list of pairs (split, output_path) where split is a list of source
+                             files whose analysis is to be split out into output_path.  The source
+                             files may either be absolute paths, or relative to the build root.
+    :param string catchall_path: If specified, the analysis for any sources not mentioned in the
+                                 splits is split out to this path.
+    """
+    buildroot = get_buildroot()
+    splits = [(set(s if os.path.isabs(s) else os.path.join(buildroot, s) for s in split), path)
+              for split, path in split_path_pairs]
+    if catchall_path is not None:
+      mentioned = set()
+      for split, _ in splits:
+        mentioned.update(split)
+      splits.append((self.sources() - mentioned, catchall_path))
+    for split, path in splits:
+      self._write_split(split, path)
+
+  def _write_split(self, split, path):
+    headers = self.headers
+    roles = self._roles()
+    records = [None] * len(headers)
+    for i, role in enumerate(roles):
+      if role == self._SOURCE:
+        records[i] = dict(self._raw_records(i, split))
+
+    # Deps on sources outside the split become external deps on their representative classes.
+    class_names = self._relations_class_names_section()
+    representatives = {}
+    for internal_header, external_header in self._INTERNAL_TO_EXTERNAL_DEPS.items():
+      if internal_header not in headers or external_header not in headers:
+        continue
+      internal = records[headers.index(internal_header)]
+      external = records[headers.index(external_header)]
+      internal_deps = dict((source, self._decode(record)) for source, record in internal.items())
+      outside = set()
+      for deps in internal_deps.values():
+        outside.update(dep for dep in deps if dep not in split and dep not in representatives)
+      if outside and class_names is not None:
+        for source, classes in self.records(class_names, outside):
+          representatives[source] = classes[0]
+      for source, deps in internal_deps.items():
+        kept = [dep for dep in deps if dep in split]
+        if len(kept) == len(deps):
+          continue
+        if kept:
+          internal[source] = self._encode(kept)
+        else:
+          del internal[source]
+        externalized = [representatives[dep] for dep in deps
+                        if dep not in split and dep in representatives]
+        if externalized:
+          classes = self._decode(external[source]) if source in external else []
+          external[source] = self._encode(classes + [c for c in externalized if c not in classes])
+
+    def referenced(header):
+      values = set()
+      if header in headers:
+        for record in records[headers.index(header)].values():
+          values.update(self._decode(record))
+      return values
+
+    products = referenced('products')
+    binaries = referenced('binary dependencies')
+    externals = set()
+    for external_header in self._INTERNAL_TO_EXTERNAL_DEPS.values():
+      externals.update(referenced(external_header))
+
+    for i, role in enumerate(roles):
+      if role == self._PRODUCT:
+        records[i] = dict(self._raw_records(i, products))
+      elif role == self._BINARY:
+        records[i] = dict(self._raw_records(i, binaries))
+      elif role == self._EXTERNAL_API:
+        apis = dict(self._raw_records(i, externals))
+        # The apis of classes that were internal before the split are those of their sources.
+        sources_by_representative = dict((c, s) for s, c in representatives.items()
+                                         if c in externals and c not in apis)
+        if 'internal apis' in headers and sources_by_representative:
+          for source, api in self._raw_records(headers.index('internal apis'),
+                                               sources_by_representative.values()):
+            apis[representatives[source]] = api
+        records[i] = apis
+      elif role == self._GLOBAL:
+        records[i] = OrderedDict(self._raw_records(i))
+
+    with _Writer(path, self._version_line) as writer:
+      for i, (header, role) in enumerate(zip(headers, roles)):
+        writer.write_section(header, self._ordered(records[i], role))
+
+  def _source_records(self, header, sources):
+    if header not in self.headers:
+      return ()
+    if sources is not None:
+      buildroot = get_buildroot()
+      sources = [s if os.path.isabs(s) else os.path.join(buildroot, s) for s in sources]
+    return self.records(self.headers.index(header), sources)
+
+  def _relations_class_names_section(self):
+    for i, (header, role) in enumerate(zip(self.headers, self._roles())):
+      if header == 'class names' and role == self._SOURCE:
+        return i
+    return None
+
+  def _roles(self):
+    roles = []
+    seen_stamps = False
+    for header in self.headers:
+      seen_stamps = seen_stamps or header in self._STAMPS_SECTIONS
+      if header == 'class names':
+        # Both the relations, as source -> class, and the stamps, as binary -> class, have a
+        # 'class names' section.
+        roles.append(self._BINARY if seen_stamps else self._SOURCE)
+      elif header in self._SOURCE_SECTIONS:
+        roles.append(self._SOURCE)
+      elif header == 'product stamps':
+        roles.append(self._PRODUCT)
+      elif header == 'binary stamps':
+        roles.append(self._BINARY)
+      elif header == 'external apis':
+        roles.append(self._EXTERNAL_API)
+      else:
+        roles.append(self._GLOBAL)
+    return roles
+
+  @classmethod
+  def _ordered(cls, records, role):
+    if role == cls._GLOBAL:
+      return records.items()
+    return [(key, records[key]) for key in sorted(records)]
+
+  @staticmethod
+  def _decode(record):
+    data, _ = record
+    return data.decode('utf-8').split('\n')
+
+  @staticmethod
+  def _encode(values):
+    return '\n'.join(values).encode('utf-8'), len(values)
+
+  @staticmethod
+  def _parse_num_items(line):
+    try:
+      num_items, sep = line.split(b' ', 1)
+      if sep == b'items\n':
+        return int(num_items)
+    except ValueError:
+      pass
+    raise ParseError('Expected: "<num> items". Found: "{0}"'.format(line))
+
+  def _index(self, section):
+    # Returns the keys of the section's records in order, and a map of key -> (offset, length,
+    # count) of each record.
+    index = self._indexes.get(section)
+    if index is None:
+      _, offset, length = self._sections[section]
+      with open(self._path, 'rb') as fp:
+        fp.seek(offset)
+        entries = json.loads(zlib.decompress(fp.read(length)).decode('utf-8'))
+      index = ([entry[0] for entry in entries],
+               dict((key, (record_offset, record_length, count))
+                    for key, record_offset, record_length, count in entries))
+      self._indexes[section] = index
+    return index
+
+
+class _Writer(object):
+  """Writes an indexed analysis one section at a time."""
+
+  def __init__(self, path, version_line):
+    self._path = path
+    self._version_line = version_line
+    self._sections = []
+    self._indexes = []
+    self._fp = None
+
+  def __enter__(self):
+    self._fp = open(self._path, 'wb')
+    self._fp.write(IndexedZincAnalysis.MAGIC)
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    try:
+      if exc_type is None:
+        self._finish()
+    finally:
+      self._fp.close()
+
+  def write_section(self, header, records):
+    """Writes a section of the given (key, (data, count)) records.
+
+    The data of a record is its utf-8 encoded values, one per line, and its count the number of
+    values.
+    """
+    index = []
+    offset = self._fp.tell()
+    for key, (data, count) in records:
+      index.append([key, offset, len(data), count])
+      self._fp.write(data)
+      offset += len(data)
+    self._sections.append(header)
+    self._indexes.append(index)
+
+  def _finish(self):
+    table = {'version_line': self._version_line, 'sections': []}
+    for header, index in zip(self._sections, self._indexes):
+      data = zlib.compress(json.dumps(index, separators=(',', ':')).encode('utf-8'))
+      table['sections'].append([header, self._fp.tell(), len(data)])
+      self._fp.write(data)
+    data = json.dumps(table).encode('utf-8')
+    table_offset = self._fp.tell()
+    self._fp.write(data)
+    self._fp.write(IndexedZincAnalysis._TRAILER.pack(table_offset, len(data),
+                                                     IndexedZincAnalysis.MAGIC))
@@ -5,7 +5,9 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import functools
 import os
+import threading
 
 from pants.backend.core.tasks.task import Task, TaskBase
 from pants.backend.jvm.tasks.jvm_tool_task_mixin import JvmToolTaskMixin
@@ -14,6 +16,7 @@ from pants.java import util
 from pants.java.distribution.distribution import Distribution
 from pants.java.executor import SubprocessExecutor
 from pants.java.nailgun_executor import NailgunExecutor, NailgunProcessGroup
+from pants.java.nailgun_pool import NailgunPool, PooledNailgunExecutor
 
 
 class NailgunTaskBase(JvmToolTaskMixin, TaskBase):
@@ -29,6 +32,9 @@ class NailgunTaskBase(JvmToolTaskMixin, TaskBase):
              help='Timeout (secs) for nailgun startup.')
     register('--nailgun-connect-attempts', advanced=True, default=5,
              help='Max attempts for nailgun connects.')
+    register('--nailgun-idle-timeout-seconds', advanced=True, type=int, default=3600,
+             help='Kill nailgun servers that have not been used for this many seconds the next '
+                  'time this task runs java.  0 to keep them running until killed.')
 
   def __init__(self, *args, **kwargs):
     super(NailgunTaskBase, self).__init__(*args, **kwargs)
@@ -38,6 +44,8 @@ class NailgunTaskBase(JvmToolTaskMixin, TaskBase):
     self._identity = '_'.join(id_tuple)
     self._executor_workdir = os.path.join(self.context.options.for_global_scope().pants_workdir,
                                           *id_tuple)
+    self._nailgun_pool_lock = threading.Lock()
+    self._nailgun_pool = None
     self.set_distribution()    # Use default until told otherwise.
     # TODO: Choose default distribution based on options.
 
@@ -48,31 +56,80 @@ class NailgunTaskBase(JvmToolTaskMixin, TaskBase):
     except Distribution.Error as e:
       raise TaskError(e)
 
+  @property
+  def nailgun_pool_size(self):
+    """The number of nailgun servers this task may run java in concurrently.
+
+    Subclasses that run java from several threads at once should override this.
+    """
+    return 1
+
   def create_java_executor(self):
-    """Create java executor that uses this task's ng daemon, if allowed.
+    """Create java executor that uses this task's ng daemons, if allowed.
+
+    Each invocation checks out one of the pool of servers `runjava` uses, so the two can be mixed.
 
     Call only in execute() or later. TODO: Enforce this.
     """
     if self.get_options().use_nailgun:
-      classpath = os.pathsep.join(self.tool_classpath('nailgun-server'))
-      return NailgunExecutor(self._identity,
-                             self._executor_workdir,
-                             classpath,
-                             self._dist,
-                             connect_timeout=self.get_options().nailgun_timeout_seconds,
-                             connect_attempts=self.get_options().nailgun_connect_attempts)
+      return PooledNailgunExecutor(self._get_nailgun_pool(), self._dist)
     else:
       return SubprocessExecutor(self._dist)
 
+  def _nailgun_classpath(self):
+    return os.pathsep.join(self.tool_classpath('nailgun-server'))
+
+  def _create_nailgun_executor(self, nailgun_classpath, index):
+    # The first instance keeps the identity servers had before they were pooled.
+    suffix = '_{}'.format(index) if index else ''
+    return NailgunExecutor(self._identity + suffix,
+                           self._executor_workdir + suffix,
+                           nailgun_classpath,
+                           self._dist,
+                           connect_timeout=self.get_options().nailgun_timeout_seconds,
+                           connect_attempts=self.get_options().nailgun_connect_attempts)
+
+  def _get_nailgun_pool(self):
+    with self._nailgun_pool_lock:
+      if self._nailgun_pool is None:
+        executor_factory = functools.partial(self._create_nailgun_executor,
+                                             self._nailgun_classpath())
+        self._nailgun_pool = NailgunPool(executor_factory,
+                                         self.nailgun_pool_size,
+                                         self.get_options().nailgun_idle_timeout_seconds)
+      return self._nailgun_pool
+
+  def prewarm_nailguns(self, classpath, jvm_options=None, count=None):
+    """Starts nailgun servers for running java with the given classpath and options, if allowed.
+
+    The servers start in the background, so that later calls to runjava with the same classpath and
+    options can find them running rather than wait for a JVM to start.
+
+    Call only in execute() or later.
+
+    :param int count: The most servers to start; by default `nailgun_pool_size`.
+    """
+    if self.get_options().use_nailgun:
+      self._get_nailgun_pool().prewarm(jvm_options, classpath, count=count)
+
   def runjava(self, classpath, main, jvm_options=None, args=None, workunit_name=None,
               workunit_labels=None, workunit_log_config=None):
     """Runs the java main using the given classpath and args.
 
     If --no-use-nailgun is specified then the java main is run in a freshly spawned subprocess,
-    otherwise a persistent nailgun server dedicated to this Task subclass is used to speed up
-    amortized run times.
+    otherwise one of a pool of persistent nailgun servers dedicated to this Task subclass is used to
+    speed up amortized run times.
     """
-    executor = self.create_java_executor()
+    if self.get_options().use_nailgun:
+      with self._get_nailgun_pool().checkout(jvm_options, classpath) as executor:
+        return self._runjava(executor, classpath, main, jvm_options, args, workunit_name,
+                             workunit_labels, workunit_log_config)
+    else:
+      return self._runjava(SubprocessExecutor(self._dist), classpath, main, jvm_options, args,
+                           workunit_name, workunit_labels, workunit_log_config)
+
+  def _runjava(self, executor, classpath, main, jvm_options, args, workunit_name, workunit_labels,
+               workunit_log_config):
     try:
       return util.execute_java(classpath=classpath,
                                main=main,
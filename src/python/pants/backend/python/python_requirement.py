@@ -8,6 +8,12 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 from pkg_resources import Requirement
 
 
+def _build_everywhere(python, platform):
+  # NB: A module level function rather than a lambda so that requirements can be pickled, e.g. to
+  # cache the results of parsing BUILD files.
+  return True
+
+
 class PythonRequirement(object):
   """Pants wrapper around pkg_resources.Requirement
 
@@ -40,7 +46,7 @@ class PythonRequirement(object):
     # TODO(pl): Change version_filter into a hashable flag instead of a lambda.
     # It definitely belongs in the invalidation hash, and it's only ever used
     # for differentiating between py3k and py2
-    self._version_filter = version_filter or (lambda py, pl: True)
+    self._version_filter = version_filter or _build_everywhere
     # TODO(wickman) Unify this with PythonTarget .compatibility
     self.compatibility = compatibility or ['']
 
@@ -13,6 +13,7 @@ import shutil
 import subprocess
 import time
 import traceback
+from collections import defaultdict
 from contextlib import contextmanager
 from textwrap import dedent
 
@@ -26,11 +27,13 @@ from pants.backend.python.targets.python_tests import PythonTests
 from pants.backend.python.tasks.python_task import PythonTask
 from pants.base.exceptions import TaskError, TestFailedTaskError
 from pants.base.target import Target
+from pants.base.target_durations import TargetDurations
 from pants.base.workunit import WorkUnit, WorkUnitLabel
 from pants.util.contextutil import (environment_as, temporary_dir, temporary_file,
                                     temporary_file_path)
 from pants.util.dirutil import safe_mkdir, safe_open
 from pants.util.strutil import safe_shlex_split
+from pants.util.xml_parser import XmlParser
 
 
 # Initialize logging, since tests do not run via pants_exe (where it is usually done)
@@ -107,6 +110,13 @@ class PytestRun(PythonTask):
     register('--shard',
              help='Subset of tests to run, in the form M/N, 0 <= M < N. For example, 1/3 means '
                   'run tests number 2, 5, 8, 11, ...')
+    register('--shard-mode', choices=['position', 'duration'], default='position',
+             help="How to divide tests into shards. 'position' deals tests out by their position. "
+                  "'duration' deals test modules out so that shards take about as long to run, "
+                  "going by how long the modules took in past runs. Every shard must start from "
+                  "the same past durations to agree on the partitioning, so runs sharded by "
+                  "duration consult the durations on record but don't add to them; see "
+                  "--target-durations-persist.")
 
   @classmethod
   def supports_passthru_args(cls):
@@ -155,12 +165,14 @@ class PytestRun(PythonTask):
   class InvalidShardSpecification(TaskError):
     """Indicates an invalid `--shard` option."""
 
-  @contextmanager
-  def _maybe_shard(self):
+  # The name test module durations are recorded under in the TargetDurations.
+  _MODULE_DURATIONS_KEY = 'PytestRun.modules'
+
+  def _parse_shard_spec(self):
+    """Returns the (shard, total) requested by the `--shard` option, or None if not sharding."""
     shard_spec = self.get_options().shard
     if not shard_spec:
-      yield []
-      return
+      return None
 
     components = shard_spec.split('/', 1)
     if len(components) != 2:
@@ -179,6 +191,27 @@ class PytestRun(PythonTask):
     if not (0 <= shard and shard < total):
       raise self.InvalidShardSpecification("Invalid shard specification '{}', shard must "
                                            "be >= 0 and < {}".format(shard_spec, total))
+    return shard, total
+
+  def _shards_by_duration(self):
+    return bool(self._parse_shard_spec()) and self.get_options().shard_mode == 'duration'
+
+  def _maybe_shard_by_duration(self, sources):
+    """Returns the test modules among `sources` in our `--shard` when sharding by duration."""
+    if not self._shards_by_duration():
+      return sources
+    shard, total = self._parse_shard_spec()
+    return TargetDurations.Factory.create().balanced_shard(self._MODULE_DURATIONS_KEY, sources,
+                                                            shard, total)
+
+  @contextmanager
+  def _maybe_shard(self):
+    shard_spec = self._parse_shard_spec()
+    if not shard_spec or self.get_options().shard_mode != 'position':
+      yield []
+      return
+
+    shard, total = shard_spec
     if total < 2:
       yield []
       return
@@ -206,15 +239,63 @@ class PytestRun(PythonTask):
       yield [path]
 
   @contextmanager
-  def _maybe_emit_junit_xml(self, targets):
-    args = []
+  def _emit_junit_xml(self, targets):
+    """Yields the path pytest should write its junit xml results to, and the args telling it to.
+
+    Results are written under `--junit-xml-dir` if specified, and otherwise to a temporary file:
+    either way we read how long tests took from them.
+    """
     xml_base = self.get_options().junit_xml_dir
     if xml_base and targets:
       xml_base = os.path.realpath(xml_base)
       xml_path = os.path.join(xml_base, Target.maybe_readable_identify(targets) + '.xml')
       safe_mkdir(os.path.dirname(xml_path))
-      args.append('--junitxml={}'.format(xml_path))
-    yield args
+      yield xml_path, ['--junitxml={}'.format(xml_path)]
+    else:
+      with temporary_file_path() as xml_path:
+        yield xml_path, ['--junitxml={}'.format(xml_path)]
+
+  @staticmethod
+  def _module_durations(junit_xml_path, sources):
+    """Returns the total seconds taken by the tests in each of `sources`, going by a junit xml
+    results file.
+
+    pytest names the class of each test case after the dotted path of its module, relative to a
+    root dir it picks, followed by the test's class name, if any; e.g.: `test_foo.FooTest`.
+    """
+    xml = XmlParser.from_file(junit_xml_path)
+
+    # Map every dotted suffix of each module path to its source, so we can match class names
+    # whatever root dir pytest picked.  Suffixes shared by several modules are ambiguous.
+    source_by_suffix = {}
+    for source in sources:
+      components = os.path.splitext(source)[0].split(os.sep)
+      for i in range(len(components)):
+        suffix = '.'.join(components[i:])
+        source_by_suffix[suffix] = None if suffix in source_by_suffix else source
+
+    durations = defaultdict(float)
+    for testcase in xml.parsed.getElementsByTagName('testcase'):
+      components = testcase.getAttribute('classname').split('.')
+      for i in range(len(components), 0, -1):
+        source = source_by_suffix.get('.'.join(components[:i]))
+        if source:
+          durations[source] += float(testcase.getAttribute('time') or 0)
+          break
+    return durations
+
+  def _record_module_durations(self, junit_xml_path, sources):
+    # Shards run one after another must all partition from the same durations.
+    if self._shards_by_duration() or not os.path.exists(junit_xml_path):
+      return
+    try:
+      durations = self._module_durations(junit_xml_path, sources)
+    except (XmlParser.XmlError, ValueError) as e:
+      self.context.log.debug('Not recording test durations: {}'.format(e))
+      return
+    target_durations = TargetDurations.Factory.create()
+    for source, secs in durations.items():
+      target_durations.record(self._MODULE_DURATIONS_KEY, source, secs, 1)
 
   DEFAULT_COVERAGE_CONFIG = dedent(b"""
     [run]
@@ -412,12 +493,12 @@ class PytestRun(PythonTask):
                             extra_requirements=self._TESTING_TARGETS) as chroot:
       pex = chroot.pex()
       with self._maybe_shard() as shard_args:
-        with self._maybe_emit_junit_xml(targets) as junit_args:
+        with self._emit_junit_xml(targets) as (junit_xml_path, junit_args):
           with self._maybe_emit_coverage_data(targets,
                                               chroot.path(),
                                               pex,
                                               workunit) as coverage_args:
-            yield pex, shard_args + junit_args + coverage_args
+            yield pex, junit_xml_path, shard_args + junit_args + coverage_args
 
   def _do_run_tests_with_args(self, pex, workunit, args):
     try:
@@ -480,13 +561,15 @@ class PytestRun(PythonTask):
       return PythonTestResult.rc(0)
 
     sources = list(itertools.chain(*[t.sources_relative_to_buildroot() for t in targets]))
+    sources = self._maybe_shard_by_duration(sources)
     if not sources:
       return PythonTestResult.rc(0)
 
-    with self._test_runner(targets, workunit) as (pex, test_args):
+    with self._test_runner(targets, workunit) as (pex, junit_xml_path, test_args):
 
       def run_and_analyze(resultlog_path):
         result = self._do_run_tests_with_args(pex, workunit, args)
+        self._record_module_durations(junit_xml_path, sources)
         failed_targets = self._get_failed_targets_from_resultlogs(resultlog_path, targets)
         return result.with_failed_targets(failed_targets)
 
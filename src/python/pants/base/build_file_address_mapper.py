@@ -46,20 +46,31 @@ class BuildFileAddressMapper(object):
   class BuildFileScanError(AddressLookupError):
     """ Raised when a problem was encountered scanning a tree of BUILD files."""
 
-  def __init__(self, build_file_parser, build_file_type):
+  def __init__(self, build_file_parser, build_file_type, scan_workers=0, address_maps=None):
     """Create a BuildFileAddressMapper.
 
     :param build_file_parser: An instance of BuildFileParser
     :param build_file_type: A subclass of BuildFile used to construct and cache BuildFile objects
+    :param int scan_workers: If greater than 1, `scan_addresses` parses BUILD files in a pool of
+                             this many processes.  Otherwise they are parsed serially.
+    :param dict address_maps: Optionally, the `address_maps` of another mapper of the same type of
+                              BUILD file, parsed with the same aliases, to start from.  They are
+                              used, and added to, in place.
     """
     self._build_file_parser = build_file_parser
-    self._spec_path_to_address_map_map = {}  # {spec_path: {address: addressable}} mapping
+    # {spec_path: {address: addressable}} mapping
+    self._spec_path_to_address_map_map = {} if address_maps is None else address_maps
     self._build_file_type = build_file_type
+    self._scan_workers = scan_workers
 
   @property
   def root_dir(self):
     return self._build_file_parser.root_dir
 
+  @property
+  def build_file_parser(self):
+    return self._build_file_parser
+
   def _raise_incorrect_address_error(self, build_file, wrong_target_name, targets):
     """Search through the list of targets and return those which originate from the same folder
     which wrong_target_name resides in.
@@ -115,7 +126,7 @@ class BuildFileAddressMapper(object):
     :raises AddressLookupError: if the path to the address is not found.
     :returns: A tuple of the natively mapped BuildFileAddress and the Addressable it points to.
     """
-    address_map = self._address_map_from_spec_path(address.spec_path)
+    address_map = self.address_map_from_spec_path(address.spec_path)
     if address not in address_map:
       build_file = self._build_file_type.from_cache(self.root_dir, address.spec_path, must_exist=False)
       self._raise_incorrect_address_error(build_file, address.target_name, address_map)
@@ -131,7 +142,7 @@ class BuildFileAddressMapper(object):
     _, addressable = self.resolve(address)
     return addressable
 
-  def _address_map_from_spec_path(self, spec_path):
+  def address_map_from_spec_path(self, spec_path):
     """Returns a resolution map of all addresses in a "directory" in the virtual address space.
 
     :returns {Address: (Address, <resolved Object>)}:
@@ -153,9 +164,18 @@ class BuildFileAddressMapper(object):
       self._spec_path_to_address_map_map[spec_path] = address_map
     return self._spec_path_to_address_map_map[spec_path]
 
+  @property
+  def address_maps(self):
+    """The address maps of the spec paths parsed so far, by spec path."""
+    return self._spec_path_to_address_map_map
+
+  def invalidate_spec_path(self, spec_path):
+    """Forgets the addresses parsed from the BUILD files of `spec_path`, e.g. as they've changed."""
+    self._spec_path_to_address_map_map.pop(spec_path, None)
+
   def addresses_in_spec_path(self, spec_path):
     """Returns only the addresses gathered by `address_map_from_spec_path`, with no values."""
-    return self._address_map_from_spec_path(spec_path).keys()
+    return self.address_map_from_spec_path(spec_path).keys()
 
   def from_cache(self, *args, **kwargs):
     """Return a BuildFile instance.  Args as per BuildFile.from_cache
@@ -202,7 +222,10 @@ class BuildFileAddressMapper(object):
     addresses = set()
     root = root or get_buildroot()
     try:
-      for build_file in self._build_file_type.scan_buildfiles(root, spec_excludes=spec_excludes):
+      build_files = self._build_file_type.scan_buildfiles(root, spec_excludes=spec_excludes)
+      if self._scan_workers > 1:
+        self._parse_spec_paths_in_parallel(build_files)
+      for build_file in build_files:
         for address in self.addresses_in_spec_path(build_file.spec_path):
           addresses.add(address)
     except BuildFile.BuildFileError as e:
@@ -210,3 +233,26 @@ class BuildFileAddressMapper(object):
       raise self.BuildFileScanError("{message}\n while scanning BUILD files in '{root}'."
                                     .format(message=e, root=root))
     return addresses
+
+  def _parse_spec_paths_in_parallel(self, build_files):
+    """Populates the address maps of the spec paths of the given BUILD files using a process pool.
+
+    Spec paths whose BUILD files could not be parsed out of process are parsed in-process, in scan
+    order, so that the first error raised, if any, is the one a serial scan would have raised.
+    """
+    unparsed = []
+    spec_paths = set(self._spec_path_to_address_map_map)
+    for build_file in build_files:
+      if build_file.spec_path not in spec_paths:
+        spec_paths.add(build_file.spec_path)
+        unparsed.append(build_file)
+    if not unparsed:
+      return
+
+    for build_file, mapping in self._build_file_parser.address_maps_from_build_files(
+        unparsed, self._scan_workers):
+      if mapping is None:
+        self.address_map_from_spec_path(build_file.spec_path)
+      else:
+        address_map = {address: (address, addressed) for address, addressed in mapping.items()}
+        self._spec_path_to_address_map_map[build_file.spec_path] = address_map
@@ -0,0 +1,100 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import errno
+import logging
+import os
+import uuid
+
+from six.moves import cPickle as pickle
+
+from pants.util.dirutil import safe_delete, safe_mkdir_for
+
+
+logger = logging.getLogger(__name__)
+
+
+class BuildFileParseCache(object):
+  """A persistent cache of BUILD file parse results, stored as one pickle per key under a directory.
+
+  Keys are opaque hex digests; BuildFileParser derives them from everything a parse result depends
+  on, so entries are never invalidated, only superseded.  Each entry belongs to a group, e.g. the
+  BUILD file it is the parse of, and storing an entry deletes the other entries of its group, so the
+  cache holds at most one entry per group.  See `BuildFileParser.parse_build_file`.
+  """
+
+  def __init__(self, cache_dir):
+    """
+    :param string cache_dir: The directory to store parse results under.
+    """
+    self._cache_dir = cache_dir
+    self.hits = 0
+    self.misses = 0
+
+  def _group_dir(self, group):
+    return os.path.join(self._cache_dir, group[:2], group)
+
+  def _path(self, group, key):
+    return os.path.join(self._group_dir(group), key)
+
+  def get(self, group, key):
+    """Returns the value stored under `key` in `group`, or None if there is none."""
+    try:
+      with open(self._path(group, key), 'rb') as fp:
+        value = pickle.load(fp)
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      value = None
+    except Exception as e:
+      # A corrupt entry, or one referring to a type that no longer exists; just parse again.
+      logger.debug('Ignoring unreadable parsed BUILD file cache entry {}: {}'.format(key, e))
+      value = None
+    if value is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+    return value
+
+  def put(self, group, key, value):
+    """Stores `value` under `key` in `group`, unless it can't be pickled.
+
+    Any other entries of the group are deleted.
+
+    :returns: True if the value was stored.
+    """
+    try:
+      data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+      logger.debug('Not caching unpicklable parse results under {}: {}'.format(key, e))
+      return False
+    # Write beside the entry and atomically swap it in, so concurrent readers, including other
+    # pants processes, never see a partial entry.
+    path = self._path(group, key)
+    safe_mkdir_for(path)
+    tmp_path = '{}.tmp.{}'.format(path, uuid.uuid4().hex)
+    try:
+      with open(tmp_path, 'wb') as fp:
+        fp.write(data)
+      os.rename(tmp_path, path)
+    finally:
+      safe_delete(tmp_path)
+    self._delete_superseded(group, key)
+    return True
+
+  def _delete_superseded(self, group, key):
+    group_dir = self._group_dir(group)
+    try:
+      names = os.listdir(group_dir)
+    except OSError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return
+    for name in names:
+      # Leave the temporary files of concurrent writers be.
+      if name != key and '.tmp.' not in name:
+        safe_delete(os.path.join(group_dir, name))
@@ -5,10 +5,22 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import dis
 import logging
+import multiprocessing
+import os
+import sys
+import types
 import warnings
+from hashlib import sha1
 
 import six
+from six.moves import cPickle as pickle
+
+from pants.base.address import BuildFileAddress
+from pants.base.hash_utils import hash_file
+from pants.base.source_root import SourceRoot
+from pants.version import VERSION as PANTS_VERSION
 
 
 logger = logging.getLogger(__name__)
@@ -51,10 +63,25 @@ class BuildFileParser(object):
   class ExecuteError(BuildFileParserError):
     """An exception was encountered executing code in the BUILD file"""
 
-  def __init__(self, build_configuration, root_dir, run_tracker=None):
+  # Names which, if referenced by a BUILD file, mean its parse may depend on more than its source,
+  # e.g. the contents of other files, so that its parse results must not be cached.
+  _UNCACHEABLE_NAMES = frozenset(['__import__', 'eval', 'execfile', 'file', 'input', 'open',
+                                  'raw_input', 'reload'])
+
+  def __init__(self, build_configuration, root_dir, run_tracker=None, parse_cache=None):
+    """
+    :param BuildConfiguration build_configuration: The aliases to expose to BUILD files.
+    :param string root_dir: The build root.
+    :param RunTracker run_tracker: An optional run tracker.
+    :param BuildFileParseCache parse_cache: An optional persistent cache of parse results.
+    """
     self._build_configuration = build_configuration
     self._root_dir = root_dir
     self.run_tracker = run_tracker
+    self._parse_cache = parse_cache
+    self._aliases_fingerprint = None
+    # BUILD files whose last parse depended on more than their source.
+    self._volatile_build_files = set()
 
   @property
   def root_dir(self):
@@ -64,6 +91,48 @@ class BuildFileParser(object):
     """Returns a copy of the registered build file aliases this build file parser uses."""
     return self._build_configuration.registered_aliases()
 
+  def is_volatile(self, build_file):
+    """Returns True if the last parse of `build_file` depended on more than its source.
+
+    E.g. on the files it read or the modules it imported, so that its parse results can't be
+    reused just because its source is unchanged.
+    """
+    return build_file in self._volatile_build_files
+
+  def address_maps_from_build_files(self, build_files, workers):
+    """Parses the families of the given BUILD files in a pool of `workers` processes.
+
+    Yields a `(build_file, address_map)` pair for each of the given BUILD files, in order.  The
+    address map is None for any BUILD file family which could not be parsed out of process.  This
+    includes families that fail to parse, so that callers can re-parse them in-process, in order,
+    and so raise exactly the errors that a serial parse would, and families that register source
+    roots, so that re-parsing them registers the roots in this process.
+
+    :param list build_files: The BUILD files to parse, at most one per family.
+    :param int workers: The number of worker processes to parse with.
+    """
+    # NB: The workers are forked, so they inherit this parser, and our registered aliases, as is.
+    pool = multiprocessing.Pool(workers, initializer=_init_parse_worker, initargs=(self,))
+    try:
+      work = [(type(build_file), build_file.root_dir, build_file.relpath)
+              for build_file in build_files]
+      results = pool.imap(_parse_build_file_family_in_worker, work, chunksize=8)
+      for build_file, result in zip(build_files, results):
+        if result is None:
+          yield build_file, None
+          continue
+        address_map = {}
+        for relpath, frozen_address_map in pickle.loads(result):
+          sibling_build_file = type(build_file).from_cache(build_file.root_dir, relpath)
+          address_map.update(self._thaw_address_map(sibling_build_file, frozen_address_map))
+        yield build_file, address_map
+      pool.close()
+    except BaseException:
+      pool.terminate()
+      raise
+    finally:
+      pool.join()
+
   def address_map_from_build_file(self, build_file):
     family_address_map_by_build_file = self.parse_build_file_family(build_file)
     address_map = {}
@@ -87,11 +156,127 @@ class BuildFileParser(object):
       family_address_map_by_build_file[bf] = bf_address_map
     return family_address_map_by_build_file
 
+  def _freeze_address_map(self, address_map):
+    """Returns a picklable form of the address map parsed from a single BUILD file.
+
+    Addressable types are typically generated classes which can't be pickled by reference, so each
+    addressable is recorded by the alias of its type and its instance state.
+    """
+    alias_by_addressable_type = dict((addressable_type, alias) for alias, addressable_type
+                                     in self.registered_aliases().addressables.items())
+    return [(address.target_name, alias_by_addressable_type[type(addressable)],
+             addressable.__dict__)
+            for address, addressable in address_map.items()]
+
+  def _thaw_address_map(self, build_file, frozen_address_map):
+    """Reconstitutes the address map of `build_file` from the output of `_freeze_address_map`."""
+    addressables = self.registered_aliases().addressables
+    address_map = {}
+    for name, alias, state in frozen_address_map:
+      addressable_type = addressables[alias]
+      addressable = addressable_type.__new__(addressable_type)
+      addressable.__dict__.update(state)
+      address_map[BuildFileAddress(build_file, name)] = addressable
+    return address_map
+
+  @property
+  def aliases_fingerprint(self):
+    """A fingerprint of the pants version, of the aliases exposed to BUILD files, and of the code
+    that defines them."""
+    if self._aliases_fingerprint is None:
+      hasher = sha1()
+      hasher.update(PANTS_VERSION)
+      module_names = set()
+      for alias_map in self.registered_aliases():
+        for alias, obj in sorted(alias_map.items()):
+          obj_type = obj if isinstance(obj, (type, types.FunctionType)) else type(obj)
+          hasher.update('{}={}.{};'.format(alias, obj_type.__module__, obj_type.__name__))
+          module_names.update(t.__module__ for t in getattr(obj_type, '__mro__', [obj_type]))
+      # Parse results hold instances of these types, e.g. jars, and were produced by their code,
+      # which plugins may change without a new pants version.
+      for module_name in sorted(module_names):
+        hasher.update('{}={};'.format(module_name, self._module_digest(module_name)))
+      self._aliases_fingerprint = hasher.hexdigest()
+    return self._aliases_fingerprint
+
+  @staticmethod
+  def _module_digest(module_name):
+    """Returns a digest of the code of the named module, as loaded.
+
+    If the module was loaded from somewhere that can't be read as a file, e.g. from within the zip
+    of a distribution, the path it was loaded from stands in for its code.
+    """
+    path = getattr(sys.modules.get(module_name), '__file__', None)
+    if not path:
+      return ''
+    source = path[:-1] if path.endswith(('.pyc', '.pyo')) else path
+    for candidate in (source, path):
+      if os.path.isfile(candidate):
+        return hash_file(candidate)
+    return sha1(path.encode('utf-8')).hexdigest()
+
+  @staticmethod
+  def _parse_cache_group(build_file):
+    hasher = sha1()
+    # The build root is included because the parse results of globs refer to it.
+    for component in (build_file.root_dir, build_file.relpath):
+      hasher.update(component.encode('utf-8'))
+      hasher.update(b'\0')
+    return hasher.hexdigest()
+
+  def _parse_cache_key(self, build_file, source):
+    hasher = sha1()
+    hasher.update(self.aliases_fingerprint)
+    hasher.update(self._parse_cache_group(build_file))
+    hasher.update(source)
+    return hasher.hexdigest()
+
+  def _is_cacheable(self, build_file_code, parse_globals):
+    """Returns True if the results of executing the code depend only on the code and the aliases.
+
+    BUILD files that import modules, read files, or use context aware objects that don't declare
+    themselves `parse_cacheable`, e.g. to register source roots or read requirements files, are
+    always parsed afresh.  The objects are consulted after the parse, so globs, say, can report
+    whether the BUILD file examined the files they match.  So are BUILD files that use exposed
+    objects that are functions, rather than types, unless they too declare themselves
+    `parse_cacheable`, since they may e.g. read files to compute the values they return.
+    """
+    aliases = self.registered_aliases()
+    uncacheable_names = set(self._UNCACHEABLE_NAMES)
+    uncacheable_names.update(alias for alias in aliases.context_aware_object_factories
+                             if not getattr(parse_globals[alias], 'parse_cacheable', False))
+    uncacheable_names.update(alias for alias, obj in aliases.objects.items()
+                             if callable(obj) and not isinstance(obj, type) and
+                             not getattr(obj, 'parse_cacheable', False))
+    import_opcodes = (dis.opmap['IMPORT_NAME'], dis.opmap['IMPORT_FROM'])
+
+    def cacheable(code):
+      if uncacheable_names.intersection(code.co_names):
+        return False
+      if any(op in import_opcodes for op in _iter_opcodes(code.co_code)):
+        return False
+      return all(cacheable(const) for const in code.co_consts if isinstance(const, types.CodeType))
+    return cacheable(build_file_code)
+
   def parse_build_file(self, build_file):
     """Capture Addressable instances from parsing `build_file`.
     Prepare a context for parsing, read a BUILD file from the filesystem, and return the
     Addressable instances generated by executing the code.
+
+    If this parser has a parse cache, the addressables of a BUILD file that is unchanged since it
+    was last parsed, with the same aliases, are served from the cache instead.
     """
+    cache_key = None
+    if self._parse_cache is not None:
+      try:
+        cache_key = self._parse_cache_key(build_file, build_file.source())
+      except Exception as e:
+        # The source will fail to read again below, and that's where we report it.
+        logger.debug('Failed to compute a parse cache key for {}: {}'.format(build_file, e))
+      if cache_key:
+        frozen_address_map = self._parse_cache.get(self._parse_cache_group(build_file), cache_key)
+        if frozen_address_map is not None:
+          return self._thaw_address_map(build_file, frozen_address_map)
 
     def _format_context_msg(lineno, offset, error_type, message):
       """Show the line of the BUILD file that has the error along with a few line of context"""
@@ -162,4 +347,49 @@ class BuildFileParser(object):
       logger.debug("  * {address}: {addressable}"
                    .format(address=address,
                            addressable=addressable))
+
+    if self._is_cacheable(build_file_code, parse_state.parse_globals):
+      self._volatile_build_files.discard(build_file)
+      if cache_key:
+        self._parse_cache.put(self._parse_cache_group(build_file), cache_key,
+                              self._freeze_address_map(address_map))
+    else:
+      self._volatile_build_files.add(build_file)
     return address_map
+
+
+def _iter_opcodes(co_code):
+  """Yields the opcodes of the given python 2 bytecode."""
+  i = 0
+  while i < len(co_code):
+    op = ord(co_code[i])
+    yield op
+    i += 3 if op >= dis.HAVE_ARGUMENT else 1
+
+
+# The state of a BUILD file parsing worker process; see `address_maps_from_build_files`.
+_worker_parser = None
+
+
+def _init_parse_worker(parser):
+  global _worker_parser
+  _worker_parser = parser
+
+
+def _parse_build_file_family_in_worker(args):
+  """Returns the pickled addressables of a BUILD file family, or None to defer to the parent."""
+  build_file_type, root_dir, relpath = args
+  try:
+    build_file = build_file_type.from_cache(root_dir, relpath)
+    # Source roots a BUILD file registers land in this process's SourceRoot registry, which the
+    # parent never sees, so families that register any are deferred to the parent to parse.
+    source_roots = SourceRoot.all_roots()
+    family_address_map_by_build_file = _worker_parser.parse_build_file_family(build_file)
+    if SourceRoot.all_roots() != source_roots:
+      return None
+    return pickle.dumps([(bf.relpath, _worker_parser._freeze_address_map(address_map))
+                         for bf, address_map in family_address_map_by_build_file.items()],
+                        pickle.HIGHEST_PROTOCOL)
+  except Exception:
+    # Parse errors, and addressables that can't be pickled, are left to the parent to deal with.
+    return None
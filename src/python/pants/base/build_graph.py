@@ -7,12 +7,14 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import logging
 import traceback
-from collections import OrderedDict, defaultdict, deque
+from array import array
+from collections import defaultdict, deque
 
 from twitter.common.collections import OrderedSet
 
 from pants.base.address import SyntheticAddress
 from pants.base.address_lookup_error import AddressLookupError
+from pants.base.compact_graph import CompactAdjacency, NodeInterner
 
 
 logger = logging.getLogger(__name__)
@@ -20,6 +22,10 @@ logger = logging.getLogger(__name__)
 
 class BuildGraph(object):
   """A directed acyclic graph of Targets and dependencies. Not necessarily connected.
+
+  Internally, each address is interned as a small integer id, and the dependency and dependee
+  edges between them are kept in compact integer arrays, so that graphs of hundreds of thousands of
+  targets stay small and cheap to walk.
   """
 
   class DuplicateAddressError(AddressLookupError):
@@ -40,13 +46,33 @@ class BuildGraph(object):
   def reset(self):
     """Clear out the state of the BuildGraph, in particular Target mappings and dependencies."""
     self._addresses_already_closed = set()
-    self._target_by_address = OrderedDict()
-    self._target_dependencies_by_address = defaultdict(OrderedSet)
-    self._target_dependees_by_address = defaultdict(set)
+    # Every address injected, or depended upon, has an id; only the former have a target.
+    self._address_ids = NodeInterner()
+    self._target_by_id = []
+    # NB: array typecodes must be native strings.
+    self._injected_ids = array(str('i'))
+    self._dependencies = CompactAdjacency()
+    self._dependees = CompactAdjacency()
     self._derived_from_by_derivative_address = {}
+    # The number of transitive target fingerprints computed (as opposed to served from memos).
+    self.transitive_invalidation_hashes_computed = 0
+
+  def _intern(self, address):
+    node_id = self._address_ids.intern(address)
+    if node_id == len(self._target_by_id):
+      self._target_by_id.append(None)
+    return node_id
+
+  def _target_id(self, address):
+    """Returns the id of the Target at `address`, raising KeyError if it hasn't been injected."""
+    node_id = self._address_ids.id_of(address)
+    if node_id is None or self._target_by_id[node_id] is None:
+      raise KeyError(address)
+    return node_id
 
   def contains_address(self, address):
-    return address in self._target_by_address
+    node_id = self._address_ids.id_of(address)
+    return node_id is not None and self._target_by_id[node_id] is not None
 
   def get_target_from_spec(self, spec, relative_to=''):
     """Converts `spec` into a SyntheticAddress and returns the result of `get_target`"""
@@ -55,29 +81,32 @@ class BuildGraph(object):
   def get_target(self, address):
     """Returns the Target at `address` if it has been injected into the BuildGraph, otherwise None.
     """
-    return self._target_by_address.get(address, None)
+    node_id = self._address_ids.id_of(address)
+    return None if node_id is None else self._target_by_id[node_id]
 
   def dependencies_of(self, address):
     """Returns the dependencies of the Target at `address`.
 
     This method asserts that the address given is actually in the BuildGraph.
     """
-    assert address in self._target_by_address, (
+    node_id = self._address_ids.id_of(address)
+    assert node_id is not None and self._target_by_id[node_id] is not None, (
       'Cannot retrieve dependencies of {address} because it is not in the BuildGraph.'
       .format(address=address)
     )
-    return self._target_dependencies_by_address[address]
+    return OrderedSet(self._address_ids.keys_of(self._dependencies.neighbors(node_id)))
 
   def dependents_of(self, address):
     """Returns the Targets which depend on the target at `address`.
 
     This method asserts that the address given is actually in the BuildGraph.
     """
-    assert address in self._target_by_address, (
+    node_id = self._address_ids.id_of(address)
+    assert node_id is not None and self._target_by_id[node_id] is not None, (
       'Cannot retrieve dependents of {address} because it is not in the BuildGraph.'
       .format(address=address)
     )
-    return self._target_dependees_by_address[address]
+    return set(self._address_ids.keys_of(self._dependees.neighbors(node_id)))
 
   def get_derived_from(self, address):
     """Get the target the specified target was derived from.
@@ -112,10 +141,10 @@ class BuildGraph(object):
     dependencies = dependencies or frozenset()
     address = target.address
 
-    if address in self._target_by_address:
+    if self.contains_address(address):
       raise ValueError('A Target {existing_target} already exists in the BuildGraph at address'
                        ' {address}.  Failed to insert {target}.'
-                       .format(existing_target=self._target_by_address[address],
+                       .format(existing_target=self.get_target(address),
                                address=address,
                                target=target))
 
@@ -129,7 +158,9 @@ class BuildGraph(object):
                                  derived_from=derived_from))
       self._derived_from_by_derivative_address[target.address] = derived_from.address
 
-    self._target_by_address[address] = target
+    node_id = self._intern(address)
+    self._target_by_id[node_id] = target
+    self._injected_ids.append(node_id)
 
     for dependency_address in dependencies:
       self.inject_dependency(dependent=address, dependency=dependency_address)
@@ -144,7 +175,7 @@ class BuildGraph(object):
       is being added.
     :param Address dependency: The dependency to be injected.
     """
-    if dependent not in self._target_by_address:
+    if not self.contains_address(dependent):
       raise ValueError('Cannot inject dependency from {dependent} on {dependency} because the'
                        ' dependent is not in the BuildGraph.'
                        .format(dependent=dependent, dependency=dependency))
@@ -157,30 +188,88 @@ class BuildGraph(object):
     # data structure of the topologically sorted graph which would have acceptable amortized
     # performance for inserting new nodes, and also cycle detection on each insert.
 
-    if dependency not in self._target_by_address:
+    if not self.contains_address(dependency):
       logger.warning('Injecting dependency from {dependent} on {dependency}, but the dependency'
                      ' is not in the BuildGraph.  This probably indicates a dependency cycle, but'
                      ' it is not an error until sort_targets is called on a subgraph containing'
                      ' the cycle.'
                      .format(dependent=dependent, dependency=dependency))
 
-    if dependency in self.dependencies_of(dependent):
+    dependent_id = self._address_ids.id_of(dependent)
+    dependency_id = self._intern(dependency)
+    if self._dependencies.has_edge(dependent_id, dependency_id):
       logger.debug('{dependent} already depends on {dependency}'
                    .format(dependent=dependent, dependency=dependency))
     else:
-      self._target_dependencies_by_address[dependent].add(dependency)
-      self._target_dependees_by_address[dependency].add(dependent)
+      self._dependencies.add_edge(dependent_id, dependency_id)
+      self._dependees.add_edge(dependency_id, dependent_id)
+      self.invalidate_transitive_invalidation_hashes(dependent)
+
+  def invalidate_transitive_invalidation_hashes(self, address):
+    """Invalidates the memoized transitive fingerprints of the target at `address` and its dependees.
+
+    A target's transitive fingerprint is only ever memoized after those of all its dependencies
+    are, and is invalidated along with them.  So the walk stops at any dependee that holds no
+    transitive fingerprint, since none of its own dependees can hold one derived from it either.
+    This keeps repeated invalidation, e.g. as codegen injects synthetic targets, proportional to
+    the number of fingerprints actually discarded rather than to the size of the dependee graph.
+
+    :param Address address: The address of a target whose transitive fingerprint has changed.
+    """
+    node_id = self._target_id(address)
+    self._target_by_id[node_id].clear_transitive_invalidation_hash()
+    to_walk = list(self._dependees.neighbors(node_id))
+    while to_walk:
+      dependee_id = to_walk.pop()
+      dependee = self._target_by_id[dependee_id]
+      if dependee.has_transitive_invalidation_hash:
+        dependee.clear_transitive_invalidation_hash()
+        to_walk.extend(self._dependees.neighbors(dependee_id))
 
   def targets(self, predicate=None):
     """Returns all the targets in the graph in no particular order.
 
     :param predicate: A target predicate that will be used to filter the targets returned.
     """
-    return filter(predicate, self._target_by_address.values())
+    target_by_id = self._target_by_id
+    return filter(predicate, [target_by_id[node_id] for node_id in self._injected_ids])
 
   def sorted_targets(self):
     """:return: targets ordered from most dependent to least."""
-    return sort_targets(self._target_by_address.values())
+    return sort_targets(self.targets())
+
+  def _walk(self, adjacency, addresses, work, predicate, postorder):
+    """Walks the closure of `addresses` over `adjacency` depth first, without recursing."""
+    target_by_id = self._target_by_id
+    walked = set()
+    stack = []
+
+    def visit(node_id):
+      """Visits the node, returning True if its neighbors are to be walked next."""
+      if node_id in walked:
+        return False
+      walked.add(node_id)
+      target = target_by_id[node_id]
+      if target is None:
+        raise KeyError(self._address_ids.key_of(node_id))
+      if predicate and not predicate(target):
+        return False
+      if not postorder:
+        work(target)
+      stack.append((target, iter(adjacency.neighbors(node_id))))
+      return True
+
+    for address in addresses:
+      visit(self._target_id(address))
+      while stack:
+        target, neighbors = stack[-1]
+        for neighbor_id in neighbors:
+          if visit(neighbor_id):
+            break
+        else:
+          stack.pop()
+          if postorder:
+            work(target)
 
   def walk_transitive_dependency_graph(self, addresses, work, predicate=None, postorder=False):
     """Given a work function, walks the transitive dependency closure of `addresses` using DFS.
@@ -195,20 +284,7 @@ class BuildGraph(object):
       walked, nor will its dependencies.  Thus predicate effectively trims out any subgraph
       that would only be reachable through Targets that fail the predicate.
     """
-    walked = set()
-    def _walk_rec(address):
-      if address not in walked:
-        walked.add(address)
-        target = self._target_by_address[address]
-        if not predicate or predicate(target):
-          if not postorder:
-            work(target)
-          for dep_address in self._target_dependencies_by_address[address]:
-            _walk_rec(dep_address)
-          if postorder:
-            work(target)
-    for address in addresses:
-      _walk_rec(address)
+    self._walk(self._dependencies, addresses, work, predicate, postorder)
 
   def walk_transitive_dependee_graph(self, addresses, work, predicate=None, postorder=False):
     """Identical to `walk_transitive_dependency_graph`, but walks dependees preorder (or postorder
@@ -217,20 +293,7 @@ class BuildGraph(object):
     This is identical to reversing the direction of every arrow in the DAG, then calling
     `walk_transitive_dependency_graph`.
     """
-    walked = set()
-    def _walk_rec(address):
-      if address not in walked:
-        walked.add(address)
-        target = self._target_by_address[address]
-        if not predicate or predicate(target):
-          if not postorder:
-            work(target)
-          for dep_address in self._target_dependees_by_address[address]:
-            _walk_rec(dep_address)
-          if postorder:
-            work(target)
-    for address in addresses:
-      _walk_rec(address)
+    self._walk(self._dependees, addresses, work, predicate, postorder)
 
   def transitive_dependees_of_addresses(self, addresses, predicate=None, postorder=False):
     """Returns all transitive dependees of `address`.
@@ -272,15 +335,18 @@ class BuildGraph(object):
       walked, nor will its dependencies.  Thus predicate effectively trims out any subgraph
       that would only be reachable through Targets that fail the predicate.
     """
+    target_by_id = self._target_by_id
     walked = OrderedSet()
-    to_walk = deque(addresses)
+    to_walk = deque(self._target_id(address) for address in addresses)
     while len(to_walk) > 0:
-      address = to_walk.popleft()
-      target = self._target_by_address[address]
+      node_id = to_walk.popleft()
+      target = target_by_id[node_id]
+      if target is None:
+        raise KeyError(self._address_ids.key_of(node_id))
       if target not in walked:
         if not predicate or predicate(target):
           walked.add(target)
-          to_walk.extend(self._target_dependencies_by_address[address])
+          to_walk.extend(self._dependencies.neighbors(node_id))
     return walked
 
   def inject_synthetic_target(self,
@@ -352,11 +418,13 @@ class BuildGraph(object):
         self.inject_address_closure(dep_address)
 
       if not self.contains_address(target_address):
-        target = self._target_addressable_to_target(target_address, target_addressable)
+        target = self.target_addressable_to_target(target_address, target_addressable)
         self.inject_target(target, dependencies=dep_addresses)
       else:
+        target_id = self._address_ids.id_of(target_address)
         for dep_address in dep_addresses:
-          if dep_address not in self.dependencies_of(target_address):
+          dep_id = self._address_ids.id_of(dep_address)
+          if dep_id is None or not self._dependencies.has_edge(target_id, dep_id):
             self.inject_dependency(target_address, dep_address)
         target = self.get_target(target_address)
 
@@ -371,7 +439,6 @@ class BuildGraph(object):
         if traversable_spec_target not in target.dependencies:
           self.inject_dependency(dependent=target.address,
                                  dependency=traversable_spec_target.address)
-          target.mark_transitive_invalidation_hash_dirty()
 
       for traversable_spec in target.traversable_specs:
         inject_spec_closure(traversable_spec)
@@ -381,9 +448,12 @@ class BuildGraph(object):
       raise self.TransitiveLookupError("{message}\n  referenced from {spec}"
                                        .format(message=e, spec=target_address.spec))
 
-  def _target_addressable_to_target(self, address, addressable):
+  def target_addressable_to_target(self, address, addressable):
     """Realizes a TargetAddressable into a Target at `address`.
 
+    The target is not injected into the graph, so it can be inspected, e.g. for the specs it
+    depends on, without resolving them.
+
     :param TargetAddressable addressable:
     :param Address address:
     """
@@ -421,28 +491,41 @@ def invert_dependencies(targets):
   roots = set()
   inverted_deps = defaultdict(OrderedSet)  # target -> dependent targets
   visited = set()
-  path = OrderedSet()
+
+  # NB: These walks keep explicit stacks rather than recursing, so that deep graphs can't exceed
+  # the interpreter's recursion limit.  The targets on the stack form the current path.
+  stack = []
+  path = set()
 
   def invert(target):
+    """Visits the target, returning True if its dependencies are to be inverted next."""
     if target in path:
-      path_list = list(path)
+      path_list = [dependee for dependee, _ in stack]
       cycle_head = path_list.index(target)
       cycle = path_list[cycle_head:] + [target]
       raise CycleException(cycle)
+    if target in visited:
+      return False
+    visited.add(target)
+    dependencies = target.dependencies
+    if not dependencies:
+      roots.add(target)
+      return False
     path.add(target)
-    if target not in visited:
-      visited.add(target)
-      if target.dependencies:
-        for dependency in target.dependencies:
-          inverted_deps[dependency].add(target)
-          invert(dependency)
-      else:
-        roots.add(target)
-
-    path.remove(target)
+    stack.append((target, iter(dependencies)))
+    return True
 
   for target in targets:
     invert(target)
+    while stack:
+      dependee, dependencies = stack[-1]
+      for dependency in dependencies:
+        inverted_deps[dependency].add(dependee)
+        if invert(dependency):
+          break
+      else:
+        stack.pop()
+        path.remove(dependee)
 
   return roots, inverted_deps
 
@@ -453,15 +536,25 @@ def sort_targets(targets):
   ordered = []
   visited = set()
 
+  stack = []
+
   def topological_sort(target):
-    if target not in visited:
-      visited.add(target)
-      if target in inverted_deps:
-        for dep in inverted_deps[target]:
-          topological_sort(dep)
-      ordered.append(target)
+    """Visits the target, returning True if its dependees are to be sorted next."""
+    if target in visited:
+      return False
+    visited.add(target)
+    stack.append((target, iter(inverted_deps[target] if target in inverted_deps else ())))
+    return True
 
   for root in roots:
     topological_sort(root)
+    while stack:
+      target, dependees = stack[-1]
+      for dependee in dependees:
+        if topological_sort(dependee):
+          break
+      else:
+        stack.pop()
+        ordered.append(target)
 
   return ordered
@@ -5,9 +5,11 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import atexit
 import errno
 import hashlib
 import os
+import threading
 from collections import namedtuple
 
 from pants.base.hash_utils import hash_all
@@ -94,7 +96,10 @@ class CacheKeyGenerator(object):
 # the inputs to the current version of that target set. That cache key can then be used
 # to look up build artifacts in an artifact cache.
 class BuildInvalidator(object):
-  """Invalidates build targets based on the SHA1 hash of source files and other inputs."""
+  """Invalidates build targets based on the SHA1 hash of source files and other inputs.
+
+  Stores one small `.hash` file per target set id under the invalidator root.
+  """
 
   def __init__(self, root):
     self._root = os.path.join(root, GLOBAL_CACHE_KEY_GEN_VERSION)
@@ -134,6 +139,12 @@ class BuildInvalidator(object):
     """
     return self._read_sha_by_id(id)
 
+  def flush(self):
+    """Persists any buffered updates.
+
+    Updates are written through immediately by this implementation, so this is a no-op.
+    """
+
   def _sha_file(self, cache_key):
     return self._sha_file_by_id(cache_key.id)
 
@@ -155,3 +166,186 @@ class BuildInvalidator(object):
       if e.errno != errno.ENOENT:
         raise
       return None  # File doesn't exist.
+
+
+class _InvalidatorLog(object):
+  """An in-memory map from target set id to hash, backed by an append-only log file.
+
+  Each record is a single `<id>\t<hash>\n` line; an empty hash is a tombstone for a
+  force-invalidated id. Records are only ever appended in whole-line writes, so a crash can at
+  worst leave a torn final line, which is discarded when the log is next loaded. The log is
+  compacted on load whenever it holds superseded, tombstoned or torn records.
+  """
+
+  def __init__(self, path):
+    self._path = path
+    self._lock = threading.Lock()
+    self._hashes = {}
+    self._pending = []
+    self._file_id = None
+    self._load()
+
+  @property
+  def is_stale(self):
+    """Returns True if the log file was removed or replaced behind our back, e.g., by `clean-all`."""
+    return self._file_id != self._stat_file_id()
+
+  def get(self, id):
+    with self._lock:
+      return self._hashes.get(id)
+
+  def put(self, id, hash):
+    with self._lock:
+      self._hashes[id] = hash
+      self._pending.append((id, hash))
+
+  def remove(self, id):
+    with self._lock:
+      if self._hashes.pop(id, None) is not None:
+        self._pending.append((id, ''))
+
+  def clear(self):
+    with self._lock:
+      self._hashes.clear()
+      del self._pending[:]
+      self._rewrite()
+
+  def flush(self):
+    with self._lock:
+      if self._pending:
+        data = ''.join(self._format_record(id, hash) for id, hash in self._pending)
+        with open(self._path, 'ab') as fp:
+          fp.write(data.encode('utf-8'))
+        del self._pending[:]
+        self._file_id = self._stat_file_id()
+
+  @staticmethod
+  def _format_record(id, hash):
+    return '{}\t{}\n'.format(id, hash)
+
+  def _stat_file_id(self):
+    try:
+      st = os.stat(self._path)
+    except OSError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return None
+    return st.st_dev, st.st_ino
+
+  def _load(self):
+    try:
+      with open(self._path, 'rb') as fp:
+        data = fp.read().decode('utf-8', 'replace')
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      data = ''
+
+    lines = data.split('\n')
+    # A log that ends cleanly leaves an empty string after the last newline; anything else is a
+    # record torn by a crash mid-append.
+    needs_compaction = lines.pop() != ''
+    for line in lines:
+      id, sep, hash = line.partition('\t')
+      if not sep or not id:
+        needs_compaction = True
+        continue
+      if hash:
+        if id in self._hashes:
+          needs_compaction = True
+        self._hashes[id] = hash
+      else:
+        self._hashes.pop(id, None)
+        needs_compaction = True
+
+    if needs_compaction:
+      self._rewrite()
+    else:
+      self._file_id = self._stat_file_id()
+
+  def _rewrite(self):
+    # Write the compacted log beside the live one and atomically swap it in, so a crash leaves
+    # either the old log or the new one but never a partial file.
+    tmp_path = '{}.tmp'.format(self._path)
+    with open(tmp_path, 'wb') as fp:
+      for id, hash in sorted(self._hashes.items()):
+        fp.write(self._format_record(id, hash).encode('utf-8'))
+      fp.flush()
+      os.fsync(fp.fileno())
+    os.rename(tmp_path, self._path)
+    self._file_id = self._stat_file_id()
+
+
+class IndexedBuildInvalidator(BuildInvalidator):
+  """A BuildInvalidator that keeps all hashes for a root in a single append-only log file.
+
+  The log is loaded once per process and shared by every invalidator instance for the same root;
+  updates are buffered in memory until `flush` is called.
+  """
+
+  _LOG_FILE_NAME = 'invalidator.log'
+
+  _logs = {}
+  _logs_lock = threading.Lock()
+
+  @classmethod
+  def _log_for(cls, root):
+    path = os.path.join(root, cls._LOG_FILE_NAME)
+    with cls._logs_lock:
+      log = cls._logs.get(path)
+      if log is None or log.is_stale:
+        log = _InvalidatorLog(path)
+        cls._logs[path] = log
+      return log
+
+  @classmethod
+  def flush_all(cls):
+    """Persists the buffered updates of every log loaded in this process."""
+    with cls._logs_lock:
+      logs = list(cls._logs.values())
+    for log in logs:
+      log.flush()
+
+  def __init__(self, root):
+    super(IndexedBuildInvalidator, self).__init__(root)
+    self._log = self._log_for(self._root)
+
+  def force_invalidate_all(self):
+    super(IndexedBuildInvalidator, self).force_invalidate_all()
+    self._log.clear()
+
+  def force_invalidate(self, cache_key):
+    self._log.remove(cache_key.id)
+
+  def flush(self):
+    self._log.flush()
+
+  def _write_sha(self, cache_key):
+    self._log.put(cache_key.id, cache_key.hash)
+
+  def _read_sha_by_id(self, id):
+    return self._log.get(id)
+
+
+# Don't lose updates made by callers that never flushed explicitly.
+atexit.register(IndexedBuildInvalidator.flush_all)
+
+
+BUILD_INVALIDATOR_TYPES = {
+  'files': BuildInvalidator,
+  'indexed': IndexedBuildInvalidator,
+}
+
+
+def create_build_invalidator(root, invalidator_type='files'):
+  """Returns a BuildInvalidator of the named type rooted at `root`.
+
+  :param string root: The directory to store invalidation state under.
+  :param string invalidator_type: One of the keys of `BUILD_INVALIDATOR_TYPES`.
+  """
+  try:
+    invalidator_cls = BUILD_INVALIDATOR_TYPES[invalidator_type]
+  except KeyError:
+    raise ValueError('Unknown build invalidator type {!r}, expected one of: {}'
+                     .format(invalidator_type, ', '.join(sorted(BUILD_INVALIDATOR_TYPES))))
+  return invalidator_cls(root)
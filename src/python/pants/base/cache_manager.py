@@ -8,7 +8,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import sys
 
 from pants.base.build_graph import sort_targets
-from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from pants.base.build_invalidator import CacheKeyGenerator, create_build_invalidator
 from pants.base.target import Target
 from pants.util.dirutil import safe_mkdir
 
@@ -51,6 +51,11 @@ class VersionedTargetSet(object):
       cache_manager.invalidation_report.add_vts(cache_manager, self.targets, self.cache_key,
                                                 self.valid, phase='init')
 
+  @property
+  def estimated_cost(self):
+    """The estimated cost of processing these targets, in chunking units."""
+    return self._cache_manager.estimate_cost(self)
+
   def update(self):
     self._cache_manager.update(self)
 
@@ -102,7 +107,7 @@ class InvalidationCheck(object):
 
   @classmethod
   def _partition_versioned_targets(cls, versioned_targets, partition_size_hint, vt_colors=None):
-    """Groups versioned targets so that each group has roughly the same number of sources.
+    """Groups versioned targets so that each group has roughly the same estimated cost.
 
     versioned_targets is a list of VersionedTarget objects  [vt1, vt2, vt3, vt4, vt5, vt6, ...].
 
@@ -110,7 +115,9 @@ class InvalidationCheck(object):
     same underlying targets. E.g., VT1 is the combination of [vt1, vt2, vt3], VT2 is the combination
     of [vt4, vt5] and VT3 is [vt6].
 
-    The new versioned targets are chosen to have roughly partition_size_hint sources.
+    The new versioned targets are chosen to cost roughly partition_size_hint chunking units, i.e.
+    sources.  Costs are estimated from how long the targets took to process in the past, where
+    known, and their number of sources otherwise.
 
     If vt_colors is specified, it must be a map from VersionedTarget -> opaque 'color' values.
     Two VersionedTargets will be in the same partition only if they have the same color.
@@ -127,20 +134,20 @@ class InvalidationCheck(object):
 
       def __init__(self):
         self.vts = []
-        self.total_chunking_units = 0
+        self.total_cost = 0
 
     current_group = VtGroup()
 
     def add_to_current_group(vt):
       current_group.vts.append(vt)
-      current_group.total_chunking_units += vt.num_chunking_units
+      current_group.total_cost += vt.estimated_cost
 
     def close_current_group():
       if len(current_group.vts) > 0:
         new_vt = VersionedTargetSet.from_versioned_targets(current_group.vts)
         res.append(new_vt)
         current_group.vts = []
-        current_group.total_chunking_units = 0
+        current_group.total_cost = 0
 
     current_color = None
     for vt in versioned_targets:
@@ -152,12 +159,12 @@ class InvalidationCheck(object):
           close_current_group()
           current_color = color
       add_to_current_group(vt)
-      if current_group.total_chunking_units > 1.5 * partition_size_hint and len(current_group.vts) > 1:
+      if current_group.total_cost > 1.5 * partition_size_hint and len(current_group.vts) > 1:
         # Too big. Close the current group without this vt and add it to the next one.
         current_group.vts.pop()
         close_current_group()
         add_to_current_group(vt)
-      elif current_group.total_chunking_units > partition_size_hint:
+      elif current_group.total_cost > partition_size_hint:
         close_current_group()
     close_current_group()  # Close the last group, if any.
 
@@ -203,11 +210,18 @@ class InvalidationCacheManager(object):
                invalidate_dependents,
                fingerprint_strategy=None,
                invalidation_report=None,
-               task_name=None):
+               task_name=None,
+               invalidator_type='files',
+               target_durations=None):
+    """
+    :param TargetDurations target_durations: If given, the past durations to estimate the cost of
+                                             processing targets from, for partitioning.
+    """
     self._cache_key_generator = cache_key_generator
     self._task_name = task_name or 'UNKNOWN'
+    self._target_durations = target_durations
     self._invalidate_dependents = invalidate_dependents
-    self._invalidator = BuildInvalidator(build_invalidator_dir)
+    self._invalidator = create_build_invalidator(build_invalidator_dir, invalidator_type)
     self._fingerprint_strategy = fingerprint_strategy
     self.invalidation_report = invalidation_report
 
@@ -217,6 +231,7 @@ class InvalidationCacheManager(object):
       self._invalidator.update(vt.cache_key)
       vt.valid = True
     self._invalidator.update(vts.cache_key)
+    self._invalidator.flush()
     vts.valid = True
 
   def force_invalidate(self, vts):
@@ -225,6 +240,7 @@ class InvalidationCacheManager(object):
       self._invalidator.force_invalidate(vt.cache_key)
       vt.valid = False
     self._invalidator.force_invalidate(vts.cache_key)
+    self._invalidator.flush()
     vts.valid = False
 
   def check(self,
@@ -271,6 +287,13 @@ class InvalidationCacheManager(object):
           yield VersionedTarget(self, target, target_key)
     return list(vt_iter())
 
+  def estimate_cost(self, vts):
+    """Returns the estimated cost of processing the given VersionedTargetSet, in chunking units."""
+    if self._target_durations is None:
+      return vts.num_chunking_units
+    return sum(self._target_durations.cost(self._task_name, vt.target.id, vt.num_chunking_units)
+               for vt in vts.versioned_targets)
+
   def needs_update(self, cache_key):
     return self._invalidator.needs_update(cache_key)
 
@@ -0,0 +1,142 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+from array import array
+from bisect import bisect_left
+
+
+# NB: array typecodes must be native strings.
+_INT = str('i')
+
+
+class NodeInterner(object):
+  """Assigns dense integer ids, starting from 0, to hashable keys in the order they are first seen.
+  """
+
+  def __init__(self):
+    self._id_by_key = {}
+    self._keys = []
+
+  def __len__(self):
+    return len(self._keys)
+
+  def __contains__(self, key):
+    return key in self._id_by_key
+
+  def intern(self, key):
+    """Returns the id of `key`, assigning it the next free one if it has none yet."""
+    node_id = self._id_by_key.get(key)
+    if node_id is None:
+      node_id = len(self._keys)
+      self._id_by_key[key] = node_id
+      self._keys.append(key)
+    return node_id
+
+  def id_of(self, key):
+    """Returns the id of `key`, or None if it has none."""
+    return self._id_by_key.get(key)
+
+  def key_of(self, node_id):
+    return self._keys[node_id]
+
+  def keys_of(self, node_ids):
+    keys = self._keys
+    return [keys[node_id] for node_id in node_ids]
+
+
+class CompactAdjacency(object):
+  """The ordered, directed edges out of each of a set of integer nodes, in compressed rows.
+
+  Most edges live in two flat integer arrays in compressed sparse row (CSR) form: the edges out of
+  node n are `edges[offsets[n]:offsets[n + 1]]`.  This costs a few bytes per edge, rather than the
+  hundreds a set or OrderedSet entry per edge, and per node, costs.
+
+  CSR rows can't grow in place, so the rows of nodes gaining edges since the arrays were last
+  packed are held in per-node arrays until enough accumulate that repacking them all is cheap,
+  relative to the edges added, at which point they are merged back in.
+
+  To answer `has_edge` without scanning rows, packed rows are also kept sorted in a parallel array
+  that shares their offsets, and pending rows are shadowed by sets.
+  """
+
+  # Never bother repacking fewer than this many modified rows.
+  _MIN_PENDING_ROWS = 1024
+
+  def __init__(self):
+    self._offsets = array(_INT, [0])
+    self._edges = array(_INT)
+    # Each of the packed rows in `_edges`, sorted.
+    self._sorted_edges = array(_INT)
+    # The complete rows of nodes modified since the last pack, by node, and their members.
+    self._pending_rows = {}
+    self._pending_members = {}
+
+  @property
+  def num_edges(self):
+    packed_rows = len(self._offsets) - 1
+    pending_edges = 0
+    for node, row in self._pending_rows.items():
+      pending_edges += len(row)
+      if node < packed_rows:
+        pending_edges -= self._offsets[node + 1] - self._offsets[node]
+    return len(self._edges) + pending_edges
+
+  def neighbors(self, node):
+    """Returns the nodes `node` has edges to, in the order the edges were added.
+
+    The returned sequence must not be modified.
+    """
+    row = self._pending_rows.get(node)
+    if row is not None:
+      return row
+    offsets = self._offsets
+    if node < len(offsets) - 1:
+      return self._edges[offsets[node]:offsets[node + 1]]
+    return ()
+
+  def has_edge(self, node, neighbor):
+    """Returns True if `node` has an edge to `neighbor`."""
+    members = self._pending_members.get(node)
+    if members is not None:
+      return neighbor in members
+    offsets = self._offsets
+    if node >= len(offsets) - 1:
+      return False
+    end = offsets[node + 1]
+    index = bisect_left(self._sorted_edges, neighbor, offsets[node], end)
+    return index < end and self._sorted_edges[index] == neighbor
+
+  def add_edge(self, node, neighbor):
+    """Adds an edge from `node` to `neighbor`; callers are responsible for avoiding duplicates."""
+    row = self._pending_rows.get(node)
+    if row is None:
+      row = array(_INT, self.neighbors(node))
+      self._pending_rows[node] = row
+      self._pending_members[node] = set(row)
+    row.append(neighbor)
+    self._pending_members[node].add(neighbor)
+    if len(self._pending_rows) > max(self._MIN_PENDING_ROWS, len(self._offsets) - 1):
+      self.pack()
+
+  def pack(self):
+    """Merges all pending rows into the CSR arrays."""
+    if not self._pending_rows:
+      return
+    num_nodes = max(len(self._offsets) - 1, max(self._pending_rows) + 1)
+    offsets = array(_INT, [0])
+    edges = array(_INT)
+    sorted_edges = array(_INT)
+    for node in range(num_nodes):
+      row = self.neighbors(node)
+      edges.extend(row)
+      sorted_edges.extend(sorted(row))
+      offsets.append(len(edges))
+    self._offsets = offsets
+    self._edges = edges
+    self._sorted_edges = sorted_edges
+    self._pending_rows = {}
+    self._pending_members = {}
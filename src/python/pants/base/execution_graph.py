@@ -6,6 +6,8 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import Queue as queue
+import heapq
+import time
 import traceback
 from collections import defaultdict
 
@@ -19,7 +21,7 @@ class Job(object):
   keys of its dependent jobs.
   """
 
-  def __init__(self, key, fn, dependencies, on_success=None, on_failure=None):
+  def __init__(self, key, fn, dependencies, on_success=None, on_failure=None, size=1):
     """
 
     :param key: Key used to reference and look up jobs
@@ -28,12 +30,16 @@ class Job(object):
     :param on_success: Zero parameter callback to run if job completes successfully. Run on main
                        thread.
     :param on_failure: Zero parameter callback to run if job completes successfully. Run on main
-                       thread."""
+                       thread.
+    :param size: The estimated cost of the job, in arbitrary units shared by all the jobs of a
+                 graph, e.g. a number of source files or of seconds.  Used to prioritize the jobs
+                 on the longest paths through the graph."""
     self.key = key
     self.fn = fn
     self.dependencies = dependencies
     self.on_success = on_success
     self.on_failure = on_failure
+    self.size = size
 
   def __call__(self):
     self.fn()
@@ -121,8 +127,12 @@ class JobExistsError(UnexecutableGraphError):
 class ExecutionGraph(object):
   """A directed acyclic graph of work to execute.
 
-  This is currently only used within jvm compile, but the intent is to unify it with the future
-  global execution graph.
+  Ready jobs are run in order of their priority: their own size plus that of the largest chain of
+  jobs waiting on them.  So, given fewer workers than ready jobs, the jobs heading the critical
+  path through the graph run first, rather than those which became ready first.
+
+  This is currently only used within jvm compile and isolated codegen, but the intent is to unify
+  it with the future global execution graph.
   """
 
   def __init__(self, job_list):
@@ -145,12 +155,36 @@ class ExecutionGraph(object):
     if len(self._job_keys_with_no_dependencies) == 0:
       raise NoRootJobError()
 
+    self._job_priority = self._compute_job_priorities()
+    # The (start, end) times of the jobs that ran in the last execution, by key.
+    self._job_times = {}
+    self._max_workers = None
+
   def format_dependee_graph(self):
     return "\n".join([
       "{} -> {{\n  {}\n}}".format(key, ',\n  '.join(self._dependees[key]))
       for key in self._job_keys_as_scheduled
     ])
 
+  def _compute_job_priorities(self):
+    """Returns the sum of the sizes along the largest path from each job through its dependees."""
+    # Visit jobs in a topological order, via Kahn's algorithm, and then accumulate in reverse.
+    unsatisfied_dependencies = dict((key, len(job.dependencies)) for key, job in self._jobs.items())
+    ordered = list(self._job_keys_with_no_dependencies)
+    for key in ordered:
+      for dependee in self._dependees[key]:
+        unsatisfied_dependencies[dependee] -= 1
+        if unsatisfied_dependencies[dependee] == 0:
+          ordered.append(dependee)
+
+    # Jobs in cycles are never reached, and never run, but are given a priority regardless.
+    job_priority = dict((key, job.size) for key, job in self._jobs.items())
+    for key in reversed(ordered):
+      dependees = self._dependees[key]
+      if dependees:
+        job_priority[key] += max(job_priority[dependee] for dependee in dependees)
+    return job_priority
+
   def _schedule(self, job):
     key = job.key
     dependency_keys = job.dependencies
@@ -165,17 +199,22 @@ class ExecutionGraph(object):
     for dep_name in dependency_keys:
       self._dependees[dep_name].append(key)
 
-  def execute(self, pool, log):
+  def execute(self, pool, log, max_workers=None):
     """Runs scheduled work, ensuring all dependencies for each element are done before execution.
 
     :param pool: A WorkerPool to run jobs on
     :param log: logger for logging debug information and progress
+    :param int max_workers: The number of jobs to have submitted to the pool at once, which should
+                            be its number of workers.  Further ready jobs are held back, so that
+                            they can be submitted in priority order as workers free up.  If None,
+                            all ready jobs are submitted immediately.
 
-    submits all the work without any dependencies to the worker pool
+    submits the work without any dependencies to the worker pool, highest priority first
     when a unit of work finishes,
       if it is successful
         calls success callback
-        checks for dependees whose dependencies are all successful, and submits them
+        checks for dependees whose dependencies are all successful, and readies them
+      submits the highest priority ready work while there are free workers
       if it fails
         calls failure callback
         marks dependees as failed and queues them directly into the finished work queue
@@ -190,22 +229,39 @@ class ExecutionGraph(object):
 
     status_table = StatusTable(self._job_keys_as_scheduled)
     finished_queue = queue.Queue()
+    self._job_times = {}
+    self._max_workers = max_workers
 
-    def submit_jobs(job_keys):
-      def worker(worker_key, work):
-        try:
-          work()
-          result = (worker_key, SUCCESSFUL, None)
-        except Exception as e:
-          result = (worker_key, FAILED, e)
-        finished_queue.put(result)
+    # The ready jobs not yet submitted, as (-priority, position as scheduled, key), so that ties
+    # are broken in favor of the jobs scheduled first.
+    ready_jobs = []
+    position_by_key = dict((key, i) for i, key in enumerate(self._job_keys_as_scheduled))
+    submitted_jobs = [0]  # The number of jobs submitted and not yet finished.
 
+    def ready(job_keys):
       for job_key in job_keys:
+        heapq.heappush(ready_jobs, (-self._job_priority[job_key], position_by_key[job_key], job_key))
+
+    def worker(worker_key, work):
+      start = time.time()
+      try:
+        work()
+        result = (worker_key, SUCCESSFUL, None)
+      except Exception as e:
+        result = (worker_key, FAILED, e)
+      self._job_times[worker_key] = (start, time.time())
+      finished_queue.put(result)
+
+    def submit_ready_jobs():
+      while ready_jobs and (max_workers is None or submitted_jobs[0] < max_workers):
+        _, _, job_key = heapq.heappop(ready_jobs)
         status_table.mark_as(QUEUED, job_key)
+        submitted_jobs[0] += 1
         pool.submit_async_work(Work(worker, [(job_key, (self._jobs[job_key]))]))
 
     try:
-      submit_jobs(self._job_keys_with_no_dependencies)
+      ready(self._job_keys_with_no_dependencies)
+      submit_ready_jobs()
 
       while not status_table.are_all_done():
         try:
@@ -218,6 +274,8 @@ class ExecutionGraph(object):
         finished_job = self._jobs[finished_key]
         direct_dependees = self._dependees[finished_key]
         status_table.mark_as(result_status, finished_key)
+        if result_status is not CANCELED:
+          submitted_jobs[0] -= 1
 
         # Queue downstream tasks.
         if result_status is SUCCESSFUL:
@@ -230,7 +288,7 @@ class ExecutionGraph(object):
           ready_dependees = [dependee for dependee in direct_dependees
                              if status_table.are_all_successful(self._jobs[dependee].dependencies)]
 
-          submit_jobs(ready_dependees)
+          ready(ready_dependees)
         else:  # Failed or canceled.
           try:
             finished_job.run_failure_callback()
@@ -247,6 +305,8 @@ class ExecutionGraph(object):
           log.error("{} failed: {}".format(finished_key, value))
         else:
           log.debug("{} finished with status {}".format(finished_key, result_status))
+
+        submit_ready_jobs()
     except ExecutionFailure:
       raise
     except Exception as e:
@@ -258,3 +318,52 @@ class ExecutionGraph(object):
 
     if status_table.has_failures():
       raise ExecutionFailure("Failed jobs: {}".format(', '.join(status_table.failed_keys())))
+
+  def format_critical_path_report(self):
+    """Returns a report on how well the last execution parallelized its jobs.
+
+    The achieved parallelism, i.e. the total time spent in jobs over the wall time, is compared to
+    the best possible given the number of workers and the critical path: the chain of dependent
+    jobs that took longest to run in sequence, which no amount of parallelism could shorten.
+    """
+    if not self._job_times:
+      return 'No jobs were run.'
+
+    # Every job finishes before any of its dependees starts, so this is a topological order.
+    keys = sorted(self._job_times, key=lambda key: tuple(reversed(self._job_times[key])))
+    durations = dict((key, end - start) for key, (start, end) in self._job_times.items())
+    # For each job, the duration of the longest chain of jobs ending with it, and its predecessor.
+    path_duration = {}
+    predecessor = {}
+    for key in keys:
+      ran_dependencies = [dep for dep in self._jobs[key].dependencies if dep in path_duration]
+      longest = max(ran_dependencies, key=path_duration.get) if ran_dependencies else None
+      predecessor[key] = longest
+      path_duration[key] = durations[key] + (path_duration[longest] if longest else 0)
+
+    key = max(keys, key=path_duration.get)
+    critical_path = []
+    while key is not None:
+      critical_path.append(key)
+      key = predecessor[key]
+    critical_path.reverse()
+
+    wall_time = (max(end for _, end in self._job_times.values()) -
+                 min(start for start, _ in self._job_times.values()))
+    total_time = sum(durations.values())
+    critical_path_time = path_duration[critical_path[-1]]
+    workers = self._max_workers or len(keys)
+    best_wall_time = max(critical_path_time, total_time / workers)
+
+    lines = [
+      'Ran {} jobs in {:.3f}s with up to {} workers.'.format(len(keys), wall_time, workers),
+      'Achieved parallelism: {:.2f} ({:.3f}s of jobs in {:.3f}s).'
+      .format(total_time / wall_time if wall_time else 1.0, total_time, wall_time),
+      'Best possible: {:.2f} (a {:.3f}s critical path of {} jobs; {:.3f}s of jobs over {} workers).'
+      .format(total_time / best_wall_time if best_wall_time else 1.0, critical_path_time,
+              len(critical_path), total_time / workers, workers),
+      'Critical path:',
+    ]
+    for key in critical_path:
+      lines.append('  {:>9.3f}s {} (size {})'.format(durations[key], key, self._jobs[key].size))
+    return '\n'.join(lines)
@@ -0,0 +1,171 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import threading
+import time
+
+from pants.base.hash_utils import hash_file
+from pants.subsystem.subsystem import Subsystem, SubsystemError
+from pants.util.json_store import JsonStore
+
+
+class FileDigestCache(object):
+  """A cache of sha1 file content digests keyed by each file's (mtime, size, inode) stat.
+
+  A file whose stat matches the recorded one is assumed unchanged, so looking up its digest costs
+  a single stat instead of a full read. If constructed with a path, the cache is loaded from that
+  file and `save` persists it for use by subsequent runs.
+
+  The cache used for source fingerprinting is created by the `FileDigestCache.Factory` subsystem.
+
+  A long-lived process that watches the filesystem for changes, e.g. the pants daemon, can `verify`
+  the entries of the files it watches once, and `invalidate` them as they change.  Digests of
+  verified files are then looked up without even a stat.
+  """
+
+  # Bump this to discard all existing persisted entries.
+  _VERSION = 1
+
+  # Files modified within this many seconds of being hashed are never cached: another write landing
+  # in the same mtime tick could leave the stat unchanged, so the stat can't vouch for the content.
+  # This comfortably covers the coarsest mtime granularity we're likely to see (2s, on FAT).
+  RACY_WINDOW_SECS = 2.0
+
+  class Factory(Subsystem):
+    options_scope = 'file-digest-cache'
+
+    # The caches created, by path.  A long-lived process, e.g. the pants daemon, keeps the cache it
+    # verifies across the runs it serves.
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    @classmethod
+    def register_options(cls, register):
+      super(FileDigestCache.Factory, cls).register_options(register)
+      register('--persist', advanced=True, action='store_true', default=True,
+               help='Remember source file digests across runs, keyed by file stat, so that '
+                    'unchanged files need not be re-read to fingerprint targets.')
+
+    @classmethod
+    def create(cls):
+      """Returns the FileDigestCache to use in this process.
+
+      Outside of a run that set up this subsystem, e.g. in unit tests, the cache returned is not
+      persisted.
+      """
+      path = None
+      try:
+        options = cls.global_instance().get_options()
+        if options.persist:
+          path = os.path.join(options.pants_workdir, 'file_digest_cache.json')
+      except SubsystemError:
+        pass
+      with cls._caches_lock:
+        cache = cls._caches.get(path)
+        if cache is None:
+          cache = cls._caches[path] = FileDigestCache(path)
+        return cache
+
+  def __init__(self, path=None):
+    """
+    :param string path: An optional file to load entries from and persist them to.
+    """
+    self._store = JsonStore(path, self._VERSION) if path else None
+    self._lock = threading.Lock()
+    self._entries = self._load()
+    # The paths whose entries are known to match their file's current content.
+    self._verified = set()
+    self._dirty = False
+    self.hits = 0
+    self.misses = 0
+
+  @staticmethod
+  def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_mtime, st.st_size, st.st_ino]
+
+  def digest(self, path):
+    """Returns the sha1 hexdigest of the contents of the file at `path`.
+
+    :param string path: The absolute path of the file to digest.
+    """
+    with self._lock:
+      entry = self._entries.get(path)
+      verified = path in self._verified
+    if verified:
+      self.hits += 1
+      return entry[3]
+
+    stat_key = self._stat_key(path)
+    if entry is not None and entry[:3] == stat_key:
+      self.hits += 1
+      return entry[3]
+
+    self.misses += 1
+    digest = hash_file(path)
+    # Only record the digest if the file was left alone while we read it and was not written so
+    # recently that its stat might still be ambiguous.
+    if stat_key == self._stat_key(path) and time.time() - stat_key[0] >= self.RACY_WINDOW_SECS:
+      with self._lock:
+        self._entries[path] = stat_key + [digest]
+        self._dirty = True
+    return digest
+
+  def verify(self, watched):
+    """Marks the entries of watched files that still match their file's stat as verified.
+
+    Entries persisted since this cache was loaded are picked up first.  The caller must `invalidate`
+    any watched file that changes after this is called.
+
+    :param watched: A predicate on absolute paths, returning True for those of watched files.
+    """
+    loaded = self._load()
+    with self._lock:
+      for path, entry in loaded.items():
+        if path not in self._verified:
+          self._entries[path] = entry
+      unverified = [(path, entry) for path, entry in self._entries.items()
+                    if path not in self._verified and watched(path)]
+    verified = []
+    for path, entry in unverified:
+      try:
+        if entry[:3] == self._stat_key(path):
+          verified.append(path)
+      except OSError:
+        pass
+    with self._lock:
+      self._verified.update(verified)
+
+  def invalidate(self, paths=None, dirs=None):
+    """Un-verifies the entries of the given files, and of all files under the given directories.
+
+    If neither is given, all entries are un-verified.  Un-verified entries are used as usual, if
+    their file's stat still matches.
+    """
+    with self._lock:
+      if paths is None and dirs is None:
+        self._verified.clear()
+        return
+      self._verified.difference_update(paths or ())
+      prefixes = tuple(os.path.join(d, '') for d in dirs or ())
+      if prefixes:
+        self._verified = set(path for path in self._verified if not path.startswith(prefixes))
+
+  def _load(self):
+    return (self._store and self._store.load()) or {}
+
+  def save(self):
+    """Persists any new entries, if this cache is backed by a file."""
+    if not self._store:
+      return
+    with self._lock:
+      if not self._dirty:
+        return
+      entries = dict(self._entries)
+      self._dirty = False
+    self._store.save(entries)
@@ -14,6 +14,7 @@ from twitter.common.collections import OrderedSet
 
 from pants.backend.core import wrapped_globs
 from pants.base.build_environment import get_buildroot
+from pants.base.file_digest_cache import FileDigestCache
 from pants.base.validation import assert_list
 from pants.util.meta import AbstractClass
 
@@ -142,12 +143,12 @@ class SourcesField(PayloadField):
     return [os.path.join(self.rel_path, source) for source in self.source_paths]
 
   def _compute_fingerprint(self):
+    digest_cache = FileDigestCache.Factory.create()
     hasher = sha1()
     hasher.update(self._rel_path)
     for source in sorted(self.relative_to_buildroot()):
       hasher.update(source)
-      with open(os.path.join(get_buildroot(), source), 'rb') as f:
-        hasher.update(f.read())
+      hasher.update(digest_cache.digest(os.path.join(get_buildroot(), source)))
     return hasher.hexdigest()
 
 
@@ -233,14 +234,14 @@ class PythonRequirementsField(frozenset, PayloadField):
 
 
 def hash_bundle(bundle):
+  digest_cache = FileDigestCache.Factory.create()
   hasher = sha1()
   hasher.update(bundle._rel_path)
   for abs_path in sorted(bundle.filemap.keys()):
     buildroot_relative_path = os.path.relpath(abs_path, get_buildroot())
     hasher.update(buildroot_relative_path)
     hasher.update(bundle.filemap[abs_path])
-    with open(abs_path, 'rb') as f:
-      hasher.update(f.read())
+    hasher.update(digest_cache.digest(abs_path))
   return hasher.hexdigest()
 
 
@@ -55,10 +55,10 @@ class SpecSourceMapper(SourceMapper):
 
   def _find_targets_for_source(self, source, build_files):
     for build_file in build_files:
-      address_map = self._address_mapper._address_map_from_spec_path(build_file.spec_path)
+      address_map = self._address_mapper.address_map_from_spec_path(build_file.spec_path)
       for address, addressable in address_map.values():
         self._build_graph.inject_address_closure(address)
-        target = self._build_graph._target_addressable_to_target(address, addressable)
+        target = self._build_graph.target_addressable_to_target(address, addressable)
         sources = target.payload.get_field('sources')
         if sources and not isinstance(sources, DeferredSourcesField) and sources.matches(source):
           yield address
@@ -147,10 +147,10 @@ class LazySourceMapper(SourceMapper):
     :param iterable<BuildFile> build_files: a family of BUILD files from which to map sources.
     """
     for build_file in build_files:
-      address_map = self._address_mapper._address_map_from_spec_path(build_file.spec_path)
+      address_map = self._address_mapper.address_map_from_spec_path(build_file.spec_path)
       for address, addressable in address_map.values():
         self._build_graph.inject_address_closure(address)
-        target = self._build_graph._target_addressable_to_target(address, addressable)
+        target = self._build_graph.target_addressable_to_target(address, addressable)
         if target.has_resources:
           for resource in target.resources:
             for item in resource.sources_relative_to_buildroot():
@@ -168,3 +168,23 @@ class LazySourceMapper(SourceMapper):
     """
     self._find_owners(source)
     return self._source_to_address[source]
+
+
+class IndexedSourceMapper(SourceMapper):
+  """Uses a persistent `TargetIndex` to identify the owner targets of a source.
+
+  Finds the same owners as a `SpecSourceMapper`, but only parses the BUILD files that changed since
+  the index was last updated.
+  """
+
+  def __init__(self, target_index, stop_after_match=False):
+    """
+    :param TargetIndex target_index: The index to map sources with.
+    :param bool stop_after_match: If `True` a search will not traverse into parent directories once
+      an owner is identified.
+    """
+    self._target_index = target_index
+    self._stop_after_match = stop_after_match
+
+  def target_addresses_for_source(self, source):
+    return self._target_index.owners(source, stop_after_match=self._stop_after_match)
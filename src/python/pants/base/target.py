@@ -251,9 +251,10 @@ class Target(AbstractTarget):
     pass
 
   def mark_invalidation_hash_dirty(self):
+    """Invalidates this target's fingerprints, along with the transitive ones of its dependees."""
     self._cached_fingerprint_map = {}
-    self._cached_transitive_fingerprint_map = {}
     self.mark_extra_invalidation_hash_dirty()
+    self.mark_transitive_invalidation_hash_dirty()
 
   def transitive_invalidation_hash(self, fingerprint_strategy=None):
     """
@@ -278,14 +279,36 @@ class Target(AbstractTarget):
         hasher.update(dep_hash)
       target_hash = self.invalidation_hash(fingerprint_strategy)
       if target_hash is None and not dep_hashes:
-        return None
-      dependencies_hash = hasher.hexdigest()[:12]
-      combined_hash = '{target_hash}.{deps_hash}'.format(target_hash=target_hash,
-                                                         deps_hash=dependencies_hash)
+        combined_hash = None
+      else:
+        dependencies_hash = hasher.hexdigest()[:12]
+        combined_hash = '{target_hash}.{deps_hash}'.format(target_hash=target_hash,
+                                                           deps_hash=dependencies_hash)
+      # NB: None is memoized too, since BuildGraph relies on a target only holding a transitive
+      # fingerprint if all of its dependencies do when deciding how far to propagate invalidation.
       self._cached_transitive_fingerprint_map[fingerprint_strategy] = combined_hash
+      if self._build_graph is not None:
+        self._build_graph.transitive_invalidation_hashes_computed += 1
     return self._cached_transitive_fingerprint_map[fingerprint_strategy]
 
+  @property
+  def has_transitive_invalidation_hash(self):
+    """Whether any transitive fingerprint of this target is currently memoized."""
+    return bool(self._cached_transitive_fingerprint_map)
+
   def mark_transitive_invalidation_hash_dirty(self):
+    """Invalidates the transitive fingerprints of this target and of its transitive dependees."""
+    if self._build_graph is not None and self._build_graph.contains_address(self.address):
+      self._build_graph.invalidate_transitive_invalidation_hashes(self.address)
+    else:
+      self.clear_transitive_invalidation_hash()
+
+  def clear_transitive_invalidation_hash(self):
+    """Invalidates the transitive fingerprints of just this target.
+
+    Callers are responsible for invalidating those of its dependees too; see
+    `BuildGraph.invalidate_transitive_invalidation_hashes`.
+    """
     self._cached_transitive_fingerprint_map = {}
     self.mark_extra_transitive_invalidation_hash_dirty()
 
@@ -293,12 +316,9 @@ class Target(AbstractTarget):
     pass
 
   def inject_dependency(self, dependency_address):
+    # NB: The BuildGraph invalidates our transitive fingerprint and those of our dependees.
     self._build_graph.inject_dependency(dependent=self.address, dependency=dependency_address)
 
-    def invalidate_dependee(dependee):
-      dependee.mark_transitive_invalidation_hash_dirty()
-    self._build_graph.walk_transitive_dependee_graph([self.address], work=invalidate_dependee)
-
   def has_sources(self, extension=''):
     """
     :param string extension: suffix of filenames to test for
@@ -0,0 +1,166 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import threading
+
+from pants.subsystem.subsystem import Subsystem, SubsystemError
+from pants.util.json_store import JsonStore
+
+
+class TargetDurations(object):
+  """Remembers how long each task took to process each target, for use as a cost model.
+
+  Each recorded duration is blended into an exponentially decaying average of the durations seen
+  for that task and target, so estimates follow targets as they change but aren't thrown by a
+  single slow (or cached) run.
+
+  Costs are expressed in chunking units (typically source files), the currency of partitioning:
+  a target's average duration is converted at the task's average rate in seconds per unit across
+  all the targets it has processed.  So a target that is slow to process for its size costs more
+  units than it has, and targets never seen before cost just the units they have.
+
+  The durations tasks record and consult are created by the `TargetDurations.Factory` subsystem.
+  """
+
+  # Bump this to discard all existing persisted durations.
+  _VERSION = 1
+
+  class Factory(Subsystem):
+    options_scope = 'target-durations'
+
+    # The durations created, by path.
+    _durations = {}
+    _durations_lock = threading.Lock()
+
+    @classmethod
+    def register_options(cls, register):
+      super(TargetDurations.Factory, cls).register_options(register)
+      register('--persist', advanced=True, action='store_true', default=True,
+               help='Remember how long tasks took to process each target across runs, to better '
+                    'balance partitions and schedule work.')
+
+    @classmethod
+    def create(cls):
+      """Returns the TargetDurations to use in this process.
+
+      Outside of a run that set up this subsystem, e.g. in unit tests, the durations returned are
+      not persisted.
+      """
+      path = None
+      try:
+        options = cls.global_instance().get_options()
+        if options.persist:
+          path = os.path.join(options.pants_workdir, 'target_durations.json')
+      except SubsystemError:
+        pass
+      with cls._durations_lock:
+        durations = cls._durations.get(path)
+        if durations is None:
+          durations = cls._durations[path] = TargetDurations(path)
+        return durations
+
+  def __init__(self, path=None, decay=0.5):
+    """
+    :param string path: An optional file to load durations from and persist them to.
+    :param float decay: The weight of the existing average when blending in a new duration, from 0,
+                        to only remember the latest duration, towards 1, to barely move.
+    """
+    self._store = JsonStore(path, self._VERSION) if path else None
+    self._decay = decay
+    self._lock = threading.Lock()
+    # task name -> target id -> [average secs, chunking units when last recorded].
+    self._durations = self._load()
+    # task name -> average secs per chunking unit, computed on demand.
+    self._rates = {}
+    self._dirty = False
+
+  def record(self, task_name, target_id, secs, num_chunking_units):
+    """Records that `task_name` took `secs` to process the target with id `target_id`."""
+    with self._lock:
+      durations = self._durations.setdefault(task_name, {})
+      entry = durations.get(target_id)
+      if entry is not None:
+        secs = self._decay * entry[0] + (1 - self._decay) * secs
+      durations[target_id] = [secs, num_chunking_units]
+      self._rates.pop(task_name, None)
+      self._dirty = True
+
+  def duration(self, task_name, target_id):
+    """Returns the average seconds `task_name` took to process the target, or None if unknown."""
+    with self._lock:
+      entry = self._durations.get(task_name, {}).get(target_id)
+    return None if entry is None else entry[0]
+
+  def cost(self, task_name, target_id, num_chunking_units):
+    """Returns the estimated cost, in chunking units, of `task_name` processing the target.
+
+    :param int num_chunking_units: The target's current number of chunking units, used as is if
+                                   there is no duration on record for it.
+    """
+    with self._lock:
+      entry = self._durations.get(task_name, {}).get(target_id)
+      if entry is None:
+        return num_chunking_units
+      rate = self._rate(task_name)
+    return entry[0] / rate if rate else num_chunking_units
+
+  def balanced_shard(self, task_name, keys, shard, num_shards):
+    """Returns the keys, e.g. test names, in one of `num_shards` shards of roughly equal duration.
+
+    Keys are dealt out longest first, each to the shard with the least total duration so far.
+    Keys with no duration on record are assumed to take the average duration of those with one.
+
+    Since the result depends only on the keys and the durations on record, separate processes with
+    the same durations agree on the partitioning, so they can each run one shard.
+
+    :param keys: The keys to partition.
+    :param int shard: The 0-based index of the shard to return the keys of.
+    :param int num_shards: The number of shards to partition the keys into.
+    :returns: The keys in the given shard, in their original order.
+    """
+    keys = list(keys)
+    with self._lock:
+      durations = self._durations.get(task_name, {})
+      recorded = dict((key, durations[key][0]) for key in keys if key in durations)
+    default = sum(recorded.values()) / len(recorded) if recorded else 1.0
+
+    def duration(key):
+      return recorded.get(key, default)
+
+    totals = [0.0] * num_shards
+    selected = set()
+    for key in sorted(set(keys), key=lambda k: (-duration(k), k)):
+      lightest = min(range(num_shards), key=lambda i: (totals[i], i))
+      totals[lightest] += duration(key)
+      if lightest == shard:
+        selected.add(key)
+    return [key for key in keys if key in selected]
+
+  def _rate(self, task_name):
+    rate = self._rates.get(task_name)
+    if rate is None:
+      durations = self._durations.get(task_name, {}).values()
+      total_units = sum(units for _, units in durations)
+      rate = sum(secs for secs, _ in durations) / total_units if total_units else 0
+      self._rates[task_name] = rate
+    return rate
+
+  def _load(self):
+    return (self._store and self._store.load()) or {}
+
+  def save(self):
+    """Persists any new durations, if these durations are backed by a file."""
+    if not self._store:
+      return
+    with self._lock:
+      if not self._dirty:
+        return
+      durations = dict((task_name, dict(by_target))
+                       for task_name, by_target in self._durations.items())
+      self._dirty = False
+    self._store.save(durations)
@@ -0,0 +1,256 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import json
+import os
+from collections import defaultdict, deque
+from hashlib import sha1
+
+from pants.backend.core.targets.resources import Resources
+from pants.backend.core.wrapped_globs import matches_filespec
+from pants.base.address import Addresses, SyntheticAddress
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants.base.file_digest_cache import FileDigestCache
+from pants.base.payload_field import DeferredSourcesField, SourcesField
+from pants.base.target import Target
+from pants.util.json_store import JsonStore
+
+
+class TargetIndex(object):
+  """A persistent index of the sources each target owns, and of the targets each one depends on.
+
+  The index holds a record per spec path: the source globs and dependency specs of each of the
+  targets defined by its BUILD files.  Records are read off the addressables that BUILD files
+  define, without injecting them, or anything they depend on, into the build graph.  Targets are
+  only constructed, to ask them, and then discarded, for types that derive more dependencies from
+  their arguments, e.g. jvm targets from their resources, or that own sources.  A record is only
+  rebuilt when the BUILD files of its spec path change, so that once the index is warm:
+
+  - the owners of a source are found by consulting the records of its ancestor directories, and of
+    the resources their targets depend on, without parsing any BUILD file that didn't change.
+  - the dependees of a target are found by consulting the records of all spec paths, without
+    loading the whole build graph.
+
+  Records of BUILD files whose parse depends on more than their source are rebuilt each time they
+  are used.  NB: any dependencies a target type derives from options, e.g. scala libraries from the
+  scala platform, are recorded as of the last time their BUILD file was parsed.
+  """
+
+  # Bump this to discard all existing persisted records.
+  _VERSION = 2
+
+  def __init__(self, path, address_mapper, build_graph):
+    """
+    :param string path: The file the index is loaded from, and saved to, or None to not persist it.
+    :param BuildFileAddressMapper address_mapper: The mapper to parse BUILD files with.
+    :param BuildGraph build_graph: The graph to construct the targets of changed BUILD files with.
+    """
+    self._address_mapper = address_mapper
+    self._build_graph = build_graph
+    self._root_dir = address_mapper.root_dir
+    # Records depend on the aliases BUILD files are parsed with.
+    version = [self._VERSION, address_mapper.build_file_parser.aliases_fingerprint]
+    self._store = JsonStore(path, version) if path else None
+    self._records = (self._store and self._store.load()) or {}
+    # The spec paths whose records are known to be up to date, or to not exist, in this run.
+    self._checked = set()
+    # Target types seen to own no sources, so whose targets need not be constructed.
+    self._sourceless_types = set()
+    self._dirty = False
+
+  def owners(self, source, stop_after_match=False):
+    """Returns the addresses of the targets that own `source`.
+
+    A target owns its sources, the sources of its resources and the BUILD file it is defined in.
+    Like a `SpecSourceMapper`, only targets defined in the directory of the source and its ancestors
+    are considered.
+
+    :param string source: The buildroot-relative path of a source; it needn't exist.
+    :param bool stop_after_match: If True, ancestor directories are not consulted once an owner is
+                                  found.
+    """
+    owners = set()
+    path = source
+    # a top-level source has empty dirname, so do/while instead of straight while loop.
+    while path:
+      path = os.path.dirname(path)
+      record = self._record(path)
+      if record:
+        for name, target in record['targets'].items():
+          if target['build_file'] == source or self._owns(target, source):
+            owners.add(SyntheticAddress(path, name))
+      if stop_after_match and owners:
+        break
+    return owners
+
+  def dependees(self, addresses, transitive=False, spec_excludes=None):
+    """Returns the given addresses, along with the addresses of their dependees.
+
+    All BUILD files are scanned for, and the records of the ones that changed are rebuilt.
+
+    :param addresses: The addresses to find the dependees of.
+    :param bool transitive: True to find transitive dependees, rather than just direct ones.
+    :param list spec_excludes: Paths under which BUILD files are not scanned for.
+    """
+    build_files = self._address_mapper.scan_buildfiles(self._root_dir, spec_excludes=spec_excludes)
+    dependees = set(self.walk_dependees(addresses, build_files, transitive=transitive))
+    dependees.update(SyntheticAddress.parse(address.spec) for address in addresses)
+    return dependees
+
+  def walk_dependees(self, addresses, build_files, transitive=False):
+    """Yields the addresses of the dependees of the given addresses, nearest first.
+
+    Dependees are found lazily, so a caller that has seen enough can stop consuming them.  None of
+    the given addresses are yielded.
+
+    :param addresses: The addresses to find the dependees of.
+    :param build_files: The BUILD files whose targets, and their siblings', are the candidate
+                        dependees, e.g. as scanned by the address mapper.  Their records are rebuilt
+                        if they changed.
+    :param bool transitive: True to also yield the dependees of dependees, and so on.
+    """
+    dependees_by_spec = defaultdict(set)
+    for spec_path in self._update(build_files):
+      for name, target in self._records[spec_path]['targets'].items():
+        for dependency in target['dependencies']:
+          dependees_by_spec[dependency].add(SyntheticAddress(spec_path, name).spec)
+
+    seen = set(address.spec for address in addresses)
+    queue = deque(sorted(seen))
+    while queue:
+      for dependee_spec in sorted(dependees_by_spec.get(queue.popleft(), ())):
+        if dependee_spec not in seen:
+          seen.add(dependee_spec)
+          yield SyntheticAddress.parse(dependee_spec)
+          if transitive:
+            queue.append(dependee_spec)
+
+  def save(self):
+    """Persists the index, if it is backed by a file and any of its records changed."""
+    if not self._store or not self._dirty:
+      return
+    self._store.save(self._records)
+    self._dirty = False
+
+  def _owns(self, target, source):
+    """Returns True if the target of `target`'s record owns `source`."""
+    if any(matches_filespec(source, filespec) for filespec in target['sources']):
+      return True
+    for dependency_spec in target['dependencies']:
+      dependency = self._target_record(dependency_spec)
+      if (dependency and dependency['resources'] and
+          any(matches_filespec(source, filespec) for filespec in dependency['sources'])):
+        return True
+    return False
+
+  def _target_record(self, spec):
+    """Returns the up to date record of the target at `spec`, or None if there is no such target."""
+    address = SyntheticAddress.parse(spec)
+    record = self._record(address.spec_path)
+    return record['targets'].get(address.target_name) if record else None
+
+  def _update(self, build_files):
+    """Brings the records of the given BUILD files up to date, and returns their spec paths."""
+    spec_paths = set(build_file.spec_path for build_file in build_files)
+    # Drop the records of spec paths that have no BUILD files left.
+    for spec_path in set(self._records) - spec_paths:
+      build_file = self._address_mapper.from_cache(self._root_dir, spec_path, must_exist=False)
+      if not build_file.file_exists():
+        del self._records[spec_path]
+        self._dirty = True
+    for spec_path in sorted(spec_paths):
+      self._record(spec_path)
+    return spec_paths & set(self._records)
+
+  def _record(self, spec_path):
+    """Returns the up to date record of `spec_path`, or None if it has no BUILD files."""
+    if spec_path in self._checked:
+      return self._records.get(spec_path)
+    self._checked.add(spec_path)
+
+    build_file = self._address_mapper.from_cache(self._root_dir, spec_path, must_exist=False)
+    if not build_file.file_exists():
+      if self._records.pop(spec_path, None) is not None:
+        self._dirty = True
+      return None
+
+    fingerprint = self._fingerprint(build_file)
+    record = self._records.get(spec_path)
+    if record is None or record['volatile'] or record['fingerprint'] != fingerprint:
+      parser = self._address_mapper.build_file_parser
+      rebuilt = {
+        'fingerprint': fingerprint,
+        'volatile': any(parser.is_volatile(sibling) for sibling in build_file.family()),
+        'targets': self._index(spec_path),
+      }
+      # Records are compared with persisted ones, so keep them in their persisted form.
+      rebuilt = json.loads(json.dumps(rebuilt))
+      if rebuilt != record:
+        self._records[spec_path] = rebuilt
+        self._dirty = True
+      record = rebuilt
+    return record
+
+  def _index(self, spec_path):
+    """Returns the sources and dependencies of each target defined in `spec_path`, by name."""
+    targets = {}
+    address_map = self._address_mapper.address_map_from_spec_path(spec_path)
+    for address, addressable in address_map.values():
+      target_type = addressable.target_type
+      specs = list(addressable.dependency_specs)
+      sources = []
+      derives_dependencies = self._derives_dependencies(addressable)
+      if derives_dependencies or target_type not in self._sourceless_types:
+        target = self._build_graph.target_addressable_to_target(address, addressable)
+        if derives_dependencies:
+          specs.extend(target.traversable_dependency_specs)
+        has_sources_fields = False
+        # Old-style python resources are sources owned by the target itself.
+        for key in ('sources', 'resources'):
+          field = target.payload.get_field(key)
+          if isinstance(field, SourcesField):
+            has_sources_fields = True
+            if not isinstance(field, DeferredSourcesField):
+              sources.append(field.filespec)
+        # Target types add their payload fields regardless of their arguments.
+        if not has_sources_fields:
+          self._sourceless_types.add(target_type)
+      try:
+        dependencies = set(SyntheticAddress.parse(spec, relative_to=spec_path).spec
+                           for spec in specs)
+      except ValueError as e:
+        raise BuildFileAddressMapper.InvalidAddressError('{}\n  referenced from {}'
+                                                         .format(e, address.spec))
+      targets[address.target_name] = {
+        'build_file': address.build_file.relpath,
+        'sources': sources,
+        'dependencies': sorted(dependencies),
+        'resources': issubclass(target_type, Resources),
+      }
+    return targets
+
+  @staticmethod
+  def _derives_dependencies(addressable):
+    """Returns True if the target of `addressable` may depend on more than its dependency specs."""
+    target_type = addressable.target_type
+    if target_type.traversable_dependency_specs is not Target.traversable_dependency_specs:
+      return True
+    # A target depends on the targets it takes its sources from.
+    return any(isinstance(value, Addresses) for value in addressable.kwargs.values())
+
+  def _fingerprint(self, build_file):
+    """Returns a fingerprint of `build_file` and its siblings."""
+    hasher = sha1()
+    for sibling in sorted(build_file.family(), key=lambda bf: bf.relpath):
+      hasher.update(sibling.relpath.encode('utf-8'))
+      hasher.update(b'\0')
+      if isinstance(sibling, FilesystemBuildFile):
+        hasher.update(FileDigestCache.Factory.create().digest(sibling.full_path))
+      else:
+        hasher.update(sha1(sibling.source()).hexdigest())
+    return hasher.hexdigest()
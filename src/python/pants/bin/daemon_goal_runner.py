@@ -0,0 +1,251 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import logging
+import os
+import sys
+import traceback
+
+from pants.base.address_lookup_error import AddressLookupError
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants.base.build_file_parse_cache import BuildFileParseCache
+from pants.base.build_file_parser import BuildFileParser
+from pants.base.file_digest_cache import FileDigestCache
+from pants.base.hash_utils import hash_file
+from pants.bin.goal_runner import GoalRunner
+from pants.option.options_bootstrapper import OptionsBootstrapper
+from pants.pantsd.pants_daemon import PantsDaemon
+from pants.pantsd.watcher import PollingWatcher, Watcher
+from pants.subsystem.subsystem import Subsystem
+from pants.version import VERSION as PANTS_VERSION
+
+
+logger = logging.getLogger(__name__)
+
+
+class DaemonGoalRunner(object):
+  """The runner of the pants daemon: keeps loaded backends and parsed BUILD files warm for runs.
+
+  Backends and plugins are loaded once, as for a `GoalRunner`.  All the BUILD files in the repo are
+  then parsed, and their address maps handed to each run, so runs only parse BUILD files that are
+  new or changed since.  BUILD files whose parse depends on more than their source, e.g. ones that
+  read other files, are parsed afresh by each run.
+
+  Changes are tracked by a `Watcher` on the build root, so that between runs only the BUILD files
+  that changed are re-parsed, and only the digests of the sources that changed are re-computed.
+
+  See `PantsDaemon` for how runs are served.
+  """
+
+  @staticmethod
+  def fingerprint(options_bootstrapper):
+    """Returns the fingerprint of the runs that a daemon with the given options can serve.
+
+    That is, of everything a `GoalRunner.load` depends on, and of the env and config that the
+    daemon's own options are read from.
+    """
+    options = options_bootstrapper.get_bootstrap_options().for_global_scope()
+    config_digests = []
+    for path in options_bootstrapper.get_config_paths():
+      try:
+        config_digests.append((path, hash_file(path)))
+      except (IOError, OSError):
+        config_digests.append((path, None))
+    return PantsDaemon.fingerprint(PANTS_VERSION, sys.executable, sys.path,
+                                   options.plugins, options.backend_packages, options.pythonpath,
+                                   options.pants_workdir, options.pants_distdir,
+                                   options.pants_supportdir, options.pants_bootstrapdir,
+                                   sorted(options_bootstrapper.get_option_env().items()),
+                                   config_digests)
+
+  def __init__(self, root_dir, options_bootstrapper, working_set, watcher=None):
+    """Loads backends and plugins for the given options, and starts watching the build root.
+
+    :param string root_dir: The build root.
+    :param options_bootstrapper: The options to load with.  Only their bootstrap options, and the
+                                 options that control the parsing of BUILD files and the digests of
+                                 sources, are used.
+    :param working_set: The working set with any plugins resolved.
+    :param watcher: The `Watcher` of the build root to use, if not the best available one.
+    """
+    # The rest of the command line that launched us is specific to its run, and isn't covered by
+    # our fingerprint, so read our options from just the bootstrap args, env and config.
+    options_bootstrapper = options_bootstrapper.bootstrap_only()
+    self._root_dir = os.path.realpath(root_dir)
+    self._goal_runner = GoalRunner(root_dir)
+    self._goal_runner.load(options_bootstrapper, working_set)
+
+    self._options = self._goal_runner.create_options(options_bootstrapper)
+    global_options = self._options.for_global_scope()
+    self._spec_excludes = global_options.spec_excludes
+    self._spec_exclude_prefixes = tuple(
+      os.path.join(os.path.realpath(os.path.join(self._root_dir, exclude)), '')
+      for exclude in self._spec_excludes or ())
+
+    # Start watching before reading anything, so no change goes unnoticed.  The workdir and distdir
+    # churn with every run, and only hold sources that pants itself writes.
+    self._watcher = watcher or Watcher.create(self._root_dir,
+                                              excludes=[global_options.pants_workdir,
+                                                        global_options.pants_distdir,
+                                                        '.git', '.pids'])
+    try:
+      self._watcher.start()
+    except Watcher.Error as e:
+      self._fall_back_to_polling(e)
+
+    parse_cache = None
+    if global_options.build_file_parse_cache:
+      parse_cache = BuildFileParseCache(os.path.join(global_options.pants_workdir,
+                                                     'build_file_parse_cache'))
+    build_configuration = self._goal_runner.build_configuration
+    self._build_file_parser = BuildFileParser(build_configuration=build_configuration,
+                                              root_dir=root_dir,
+                                              parse_cache=parse_cache)
+    self._address_mapper = BuildFileAddressMapper(self._build_file_parser, FilesystemBuildFile)
+
+    # Runs are forked from us, so they use the digest cache we keep verified.
+    Subsystem._options = self._options
+    try:
+      self._digest_cache = FileDigestCache.Factory.create()
+    finally:
+      Subsystem.reset()
+
+    # The spec paths whose address maps are handed to runs.
+    self._reusable = set()
+    # The spec paths to (re-)parse, and the directories to scan for BUILD files, at the next warm.
+    # None scans the whole build root.
+    self._unparsed = set()
+    self._rescan_dirs = set([None])
+
+  def warm(self):
+    """Parses the BUILD files that are new or changed, and verifies the digests of sources."""
+    spec_paths, self._unparsed = self._unparsed, set()
+    rescan_dirs, self._rescan_dirs = self._rescan_dirs, set()
+
+    # BUILD file aliases may consult subsystems.
+    Subsystem._options = self._options
+    try:
+      for rescan_dir in sorted(rescan_dirs):
+        if rescan_dir is None or os.path.isdir(os.path.join(self._root_dir, rescan_dir)):
+          for build_file in self._address_mapper.scan_buildfiles(self._root_dir,
+                                                                 base_path=rescan_dir,
+                                                                 spec_excludes=self._spec_excludes):
+            spec_paths.add(build_file.spec_path)
+
+      for spec_path in sorted(spec_paths):
+        if spec_path in self._reusable or self._is_spec_excluded(spec_path):
+          continue
+        try:
+          build_file = FilesystemBuildFile.from_cache(self._root_dir, spec_path)
+        except FilesystemBuildFile.BuildFileError:
+          # Its BUILD files are gone.
+          continue
+        try:
+          self._address_mapper.addresses_in_spec_path(spec_path)
+        except AddressLookupError as e:
+          # Runs will parse what we couldn't, and report the error.
+          logger.warning('Failed to parse {}: {}'.format(spec_path, e))
+          continue
+        if not any(self._build_file_parser.is_volatile(bf) for bf in build_file.family()):
+          self._reusable.add(spec_path)
+    finally:
+      Subsystem.reset()
+
+    self._digest_cache.verify(self._watcher.watches)
+
+  def invalidate_changed(self):
+    """Forgets the BUILD files and source digests that changed since the last call.
+
+    :returns: The parsed spec paths that were forgotten as their BUILD files changed, or None if
+              track of changes was lost and all of them were forgotten.
+    """
+    changes = self._watcher.drain()
+    if changes is None:
+      logger.warning('Lost track of changes under {}: re-parsing all BUILD files'
+                     .format(self._root_dir))
+      if self._watcher.exhausted:
+        # It won't track changes again, so we'd lose track of them at every call.
+        self._watcher.stop()
+        self._fall_back_to_polling('the watcher is exhausted')
+      for spec_path in list(self._address_mapper.address_maps):
+        self._address_mapper.invalidate_spec_path(spec_path)
+      self._reusable.clear()
+      self._rescan_dirs.add(None)
+      FilesystemBuildFile.clear_cache()
+      self._digest_cache.invalidate()
+      return None
+
+    changed = set()
+    for path in changes.files:
+      if FilesystemBuildFile._is_buildfile_name(os.path.basename(path)):
+        changed.add(os.path.dirname(path))
+    for spec_path in changed:
+      self._unparsed.add(spec_path)
+    if changes.dirs:
+      prefixes = tuple(os.path.join(d, '') for d in changes.dirs)
+      changed.update(spec_path for spec_path in self._reusable
+                     if spec_path in changes.dirs or spec_path.startswith(prefixes))
+      self._rescan_dirs.update(changes.dirs)
+
+    for spec_path in changed:
+      self._reusable.discard(spec_path)
+      self._address_mapper.invalidate_spec_path(spec_path)
+    # Forget volatile BUILD files too, so they're re-parsed along with the changed ones.
+    for spec_path in list(self._address_mapper.address_maps):
+      if spec_path not in self._reusable:
+        self._address_mapper.invalidate_spec_path(spec_path)
+        self._unparsed.add(spec_path)
+    if changed:
+      # BuildFiles are cached along with whether they exist.
+      FilesystemBuildFile.clear_cache()
+
+    self._digest_cache.invalidate(
+      paths=[os.path.join(self._root_dir, path) for path in changes.files],
+      dirs=[os.path.join(self._root_dir, path) for path in changes.dirs])
+    return sorted(changed)
+
+  def run(self, args, env, cwd):
+    """Performs a pants run with the given command line, in this process.
+
+    Meant to be called in a process forked from the daemon, as it changes the process' state.
+
+    :returns: The exit code of the run.
+    """
+    os.environ.clear()
+    os.environ.update(env)
+    os.chdir(cwd)
+    sys.argv = list(args)
+    Subsystem.reset()
+
+    address_maps = dict((spec_path, address_map) for spec_path, address_map
+                        in self._address_mapper.address_maps.items()
+                        if spec_path in self._reusable)
+    try:
+      self._goal_runner.setup_run(OptionsBootstrapper(env=env, args=args),
+                                  address_maps=address_maps)
+      return self._goal_runner.run()
+    except SystemExit as e:
+      if e.code is None or isinstance(e.code, int):
+        return e.code or 0
+      print(e.code, file=sys.stderr)
+      return 1
+    except KeyboardInterrupt:
+      print('Interrupted by user.', file=sys.stderr)
+      return 1
+    except Exception as e:
+      print('\nException caught:\n{}\nException message: {}\n'.format(traceback.format_exc(), e),
+            file=sys.stderr)
+      return 1
+
+  def _fall_back_to_polling(self, reason):
+    logger.warning('Falling back to polling for changes: {}'.format(reason))
+    self._watcher = PollingWatcher(self._root_dir, excludes=self._watcher.excludes)
+    self._watcher.start()
+
+  def _is_spec_excluded(self, spec_path):
+    return os.path.join(self._root_dir, spec_path, '').startswith(self._spec_exclude_prefixes)
@@ -6,6 +6,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import logging
+import os
 import sys
 
 import pkg_resources
@@ -14,11 +15,14 @@ from pants.backend.core.tasks.task import QuietTaskMixin
 from pants.base.build_environment import get_buildroot, get_scm
 from pants.base.build_file import FilesystemBuildFile
 from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants.base.build_file_parse_cache import BuildFileParseCache
 from pants.base.build_file_parser import BuildFileParser
 from pants.base.build_graph import BuildGraph
 from pants.base.cmd_line_spec_parser import CmdLineSpecParser
 from pants.base.extension_loader import load_plugins_and_backends
+from pants.base.file_digest_cache import FileDigestCache
 from pants.base.scm_build_file import ScmBuildFile
+from pants.base.target_durations import TargetDurations
 from pants.base.workunit import WorkUnit, WorkUnitLabel
 from pants.engine.round_engine import RoundEngine
 from pants.goal.context import Context
@@ -75,20 +79,28 @@ class GoalRunner(object):
   @property
   def subsystems(self):
     # Subsystems used outside of any task.
-    return SourceRootBootstrapper, Reporting, RunTracker
+    return (SourceRootBootstrapper, Reporting, RunTracker, FileDigestCache.Factory,
+            TargetDurations.Factory)
 
   def setup(self, options_bootstrapper, working_set):
+    self.load(options_bootstrapper, working_set)
+    self.setup_run(options_bootstrapper)
+
+  def load(self, options_bootstrapper, working_set):
+    """Loads plugins and backends and gathers the option scopes they know about.
+
+    Only the bootstrap options are consulted, so a process that has loaded can go on to set up
+    runs with different command lines, so long as their bootstrap options fingerprint the same.
+    See `pants.bin.daemon_goal_runner.DaemonGoalRunner.fingerprint`.
+    """
     bootstrap_options = options_bootstrapper.get_bootstrap_options()
     global_bootstrap_options = bootstrap_options.for_global_scope()
 
-    # The pants_version may be set in pants.ini for bootstrapping, so we make sure the user actually
-    # requested the version on the command line before deciding to print the version and exit.
-    if global_bootstrap_options.is_flagged('pants_version'):
-      print(global_bootstrap_options.pants_version)
-      self._exiter(0)
+    self._exit_with_version_if_requested(global_bootstrap_options)
 
     # Get logging setup prior to loading backends so that they can log as needed.
     self._setup_logging(global_bootstrap_options)
+    self._loaded_options_bootstrapper = options_bootstrapper
 
     # Add any extra paths to python path (eg for loading extra source backends)
     for path in global_bootstrap_options.pythonpath:
@@ -98,27 +110,41 @@ class GoalRunner(object):
     # Load plugins and backends.
     plugins = global_bootstrap_options.plugins
     backend_packages = global_bootstrap_options.backend_packages
-    build_configuration = load_plugins_and_backends(plugins, working_set, backend_packages)
+    self.build_configuration = load_plugins_and_backends(plugins, working_set, backend_packages)
 
     # Now that plugins and backends are loaded, we can gather the known scopes.
-    self.targets = []
-
     known_scope_infos = [GlobalOptionsRegistrar.get_scope_info()]
 
     # Add scopes for all needed subsystems.
-    subsystems = Subsystem.closure(set(self.subsystems) |
-                                   Goal.subsystems() |
-                                   build_configuration.subsystems())
-    for subsystem in subsystems:
+    self._all_subsystems = Subsystem.closure(set(self.subsystems) |
+                                             Goal.subsystems() |
+                                             self.build_configuration.subsystems())
+    for subsystem in self._all_subsystems:
       known_scope_infos.append(subsystem.get_scope_info())
 
     # Add scopes for all tasks in all goals.
     for goal in Goal.all():
       known_scope_infos.extend(filter(None, goal.known_scope_infos()))
+    self._known_scope_infos = known_scope_infos
+
+  def setup_run(self, options_bootstrapper, address_maps=None):
+    """Sets up a run of the goals on the command line, after a `load`.
+
+    :param options_bootstrapper: The options of the run.
+    :param dict address_maps: Optionally, the `BuildFileAddressMapper.address_maps` of BUILD files
+                              already parsed with the loaded aliases, e.g. as kept by the pants
+                              daemon.  Only used when BUILD files are read from the working tree.
+    """
+    self.targets = []
+
+    if options_bootstrapper is not self._loaded_options_bootstrapper:
+      global_bootstrap_options = options_bootstrapper.get_bootstrap_options().for_global_scope()
+      self._exit_with_version_if_requested(global_bootstrap_options)
+      # The run's logging options may differ from those we loaded with.
+      self._setup_logging(global_bootstrap_options)
 
     # Now that we have the known scopes we can get the full options.
-    self.options = options_bootstrapper.get_full_options(known_scope_infos)
-    self.register_options(subsystems)
+    self.options = self.create_options(options_bootstrapper)
 
     # Make the options values available to all subsystems.
     Subsystem._options = self.options
@@ -134,18 +160,28 @@ class GoalRunner(object):
     else:
       self.run_tracker.log(Report.INFO, '(To run a reporting server: ./pants server)')
 
-    self.build_file_parser = BuildFileParser(build_configuration=build_configuration,
+    parse_cache = None
+    if self.global_options.build_file_parse_cache:
+      parse_cache = BuildFileParseCache(os.path.join(self.global_options.pants_workdir,
+                                                     'build_file_parse_cache'))
+    self.build_file_parser = BuildFileParser(build_configuration=self.build_configuration,
                                              root_dir=self.root_dir,
-                                             run_tracker=self.run_tracker)
+                                             run_tracker=self.run_tracker,
+                                             parse_cache=parse_cache)
 
     rev = self.options.for_global_scope().build_file_rev
     if rev:
       ScmBuildFile.set_rev(rev)
       ScmBuildFile.set_scm(get_scm())
       build_file_type = ScmBuildFile
+      address_maps = None
     else:
       build_file_type = FilesystemBuildFile
-    self.address_mapper = BuildFileAddressMapper(self.build_file_parser, build_file_type)
+    self.address_mapper = BuildFileAddressMapper(
+      self.build_file_parser,
+      build_file_type,
+      scan_workers=self.options.for_global_scope().build_file_scan_workers,
+      address_maps=address_maps)
     self.build_graph = BuildGraph(run_tracker=self.run_tracker,
                                   address_mapper=self.address_mapper)
 
@@ -168,19 +204,25 @@ class GoalRunner(object):
   def global_options(self):
     return self.options.for_global_scope()
 
-  def register_options(self, subsystems):
+  def create_options(self, options_bootstrapper):
+    """Returns the full options for the command line of `options_bootstrapper`, after a `load`."""
+    options = options_bootstrapper.get_full_options(self._known_scope_infos)
+    self.register_options(options, self._all_subsystems)
+    return options
+
+  def register_options(self, options, subsystems):
     # Standalone global options.
-    GlobalOptionsRegistrar.register_options_on_scope(self.options)
+    GlobalOptionsRegistrar.register_options_on_scope(options)
 
     # Options for subsystems.
     for subsystem in subsystems:
-      subsystem.register_options_on_scope(self.options)
+      subsystem.register_options_on_scope(options)
 
     # TODO(benjy): Should Goals be subsystems? Or should the entire goal-running mechanism
     # be a subsystem?
     for goal in Goal.all():
       # Register task options.
-      goal.register_options(self.options)
+      goal.register_options(options)
 
   def _expand_goals_and_specs(self):
     goals = self.options.goals
@@ -232,6 +274,8 @@ class GoalRunner(object):
       fail()
       raise
     finally:
+      FileDigestCache.Factory.create().save()
+      TargetDurations.Factory.create().save()
       self.run_tracker.end()
       # Must kill nailguns only after run_tracker.end() is called, otherwise there may still
       # be pending background work that needs a nailgun.
@@ -287,6 +331,13 @@ class GoalRunner(object):
       invalidation_report.report()
     return result
 
+  def _exit_with_version_if_requested(self, global_bootstrap_options):
+    # The pants_version may be set in pants.ini for bootstrapping, so we make sure the user actually
+    # requested the version on the command line before deciding to print the version and exit.
+    if global_bootstrap_options.is_flagged('pants_version'):
+      print(global_bootstrap_options.pants_version)
+      self._exiter(0)
+
   def _setup_logging(self, global_options):
     # NB: quiet help says 'Squelches all console output apart from errors'.
     level = 'ERROR' if global_options.quiet else global_options.level.upper()
@@ -12,9 +12,12 @@ import traceback
 import warnings
 
 from pants.base.build_environment import get_buildroot
+from pants.bin.daemon_goal_runner import DaemonGoalRunner
 from pants.bin.goal_runner import GoalRunner
 from pants.bin.plugin_resolver import PluginResolver
 from pants.option.options_bootstrapper import OptionsBootstrapper
+from pants.pantsd.pants_daemon import PantsDaemon
+from pants.util.dirutil import safe_mkdir
 
 
 class _Exiter(object):
@@ -72,6 +75,11 @@ def _run(exiter):
 
   options_bootstrapper = OptionsBootstrapper()
 
+  if options_bootstrapper.get_bootstrap_options().for_global_scope().enable_pantsd:
+    result = _run_with_pantsd(root_dir, options_bootstrapper)
+    if result is not None:
+      exiter.do_exit(result)
+
   plugin_resolver = PluginResolver(options_bootstrapper)
   working_set = plugin_resolver.resolve()
 
@@ -82,6 +90,30 @@ def _run(exiter):
   exiter.do_exit(result)
 
 
+def _run_with_pantsd(root_dir, options_bootstrapper):
+  """Hands the run to the pants daemon for our bootstrap options, if it's serving runs.
+
+  Otherwise launches the daemon, unless it's already starting up, for later runs to use.
+
+  :returns: The exit code of the run, or None if the run must be performed locally.
+  """
+  pantsd = PantsDaemon(DaemonGoalRunner.fingerprint(options_bootstrapper))
+  if pantsd.is_running():
+    result = pantsd.execute(sys.argv, os.environ, os.getcwd())
+    if result is not None:
+      return result
+  elif not pantsd.is_launched():
+    def runner_factory():
+      working_set = PluginResolver(options_bootstrapper).resolve()
+      return DaemonGoalRunner(root_dir, options_bootstrapper, working_set)
+
+    log_dir = os.path.join(options_bootstrapper.get_bootstrap_options().for_global_scope()
+                           .pants_workdir, 'pantsd')
+    safe_mkdir(log_dir)
+    pantsd.launch(runner_factory, os.path.join(log_dir, 'pantsd.log'))
+  return None
+
+
 def main():
   exiter = _Exiter()
   try:
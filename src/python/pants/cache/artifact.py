@@ -6,12 +6,18 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import errno
+import gzip
+import importlib
 import os
 import shutil
 import tarfile
+import zlib
+from abc import abstractmethod
+from contextlib import closing
 
 from pants.util.contextutil import open_tar
-from pants.util.dirutil import safe_mkdir, safe_mkdir_for, safe_walk
+from pants.util.dirutil import safe_delete, safe_mkdir, safe_mkdir_for, safe_walk
+from pants.util.meta import AbstractClass
 
 
 class ArtifactError(Exception):
@@ -73,54 +79,363 @@ class DirectoryArtifact(Artifact):
         self._relpaths.add(relpath)
 
 
+class ArtifactCodec(AbstractClass):
+  """A compression scheme for the tar stream of a TarballArtifact."""
+
+  # The name by which the codec is selected and recorded in artifact headers.
+  name = None
+
+  # Exceptions, beyond those raised by tarfile, that indicate a corrupt compressed stream.
+  read_errors = ()
+
+  @classmethod
+  def is_available(cls):
+    """Returns True if the libraries this codec needs are installed."""
+    return True
+
+  @abstractmethod
+  def compressor(self, fileobj, level):
+    """Returns a writable file-like object that compresses into fileobj.
+
+    Closing the returned object must flush it without closing fileobj.
+    """
+
+  @abstractmethod
+  def decompressor(self, fileobj):
+    """Returns a readable file-like object that decompresses the remainder of fileobj."""
+
+
+class _UnclosedWriter(object):
+  """Forwards writes to a file object without ever closing it."""
+
+  def __init__(self, fileobj, on_close=None):
+    self._fileobj = fileobj
+    self._on_close = on_close
+
+  def write(self, data):
+    self._fileobj.write(data)
+
+  def close(self):
+    if self._on_close:
+      self._on_close()
+
+
+class GzipCodec(ArtifactCodec):
+  """Gzip compression.
+
+  In our tests, gzip is slightly less compressive than bzip2 on .class files, but decompression
+  times are much faster.
+
+  Gzip artifacts are written without a codec header, exactly as they always have been, so that
+  older versions of pants sharing a cache can still read them.
+  """
+  name = 'gzip'
+  read_errors = (IOError, EOFError, zlib.error)
+
+  def compressor(self, fileobj, level):
+    return gzip.GzipFile(filename='', mode='wb', compresslevel=level, fileobj=fileobj)
+
+  def decompressor(self, fileobj):
+    # Unlike GzipFile, this doesn't need to seek, so it can read straight from a network stream.
+    return _GzipReader(fileobj)
+
+
+class UncompressedCodec(ArtifactCodec):
+  """No compression: trades disk and network for CPU, e.g., for local or LAN caches."""
+  name = 'none'
+
+  def compressor(self, fileobj, level):
+    return _UnclosedWriter(fileobj)
+
+  def decompressor(self, fileobj):
+    return fileobj
+
+
+class Lz4Codec(ArtifactCodec):
+  """Fast LZ4 frame compression. Requires the optional `lz4` package."""
+  name = 'lz4'
+
+  @classmethod
+  def is_available(cls):
+    return _import_optional('lz4.frame') is not None
+
+  @property
+  def read_errors(self):
+    return (RuntimeError,)
+
+  def compressor(self, fileobj, level):
+    lz4_frame = _import_optional('lz4.frame')
+    return lz4_frame.LZ4FrameFile(fileobj, mode='wb', compression_level=level)
+
+  def decompressor(self, fileobj):
+    lz4_frame = _import_optional('lz4.frame')
+    return lz4_frame.LZ4FrameFile(fileobj, mode='rb')
+
+
+class ZstdCodec(ArtifactCodec):
+  """Zstandard compression. Requires the optional `zstandard` package."""
+  name = 'zstd'
+
+  @classmethod
+  def is_available(cls):
+    return _import_optional('zstandard') is not None
+
+  @property
+  def read_errors(self):
+    return (_import_optional('zstandard').ZstdError,)
+
+  def compressor(self, fileobj, level):
+    zstd = _import_optional('zstandard')
+    writer = zstd.ZstdCompressor(level=level).stream_writer(fileobj)
+    return _UnclosedWriter(writer, on_close=lambda: writer.flush(zstd.FLUSH_FRAME))
+
+  def decompressor(self, fileobj):
+    zstd = _import_optional('zstandard')
+    return zstd.ZstdDecompressor().stream_reader(fileobj)
+
+
+def _import_optional(module_name):
+  try:
+    return importlib.import_module(module_name)
+  except ImportError:
+    return None
+
+
+ARTIFACT_CODECS = dict((codec.name, codec) for codec in (GzipCodec, UncompressedCodec, Lz4Codec,
+                                                         ZstdCodec))
+
+
+def get_artifact_codec(name):
+  """Returns an instance of the named ArtifactCodec.
+
+  :raises: :class:`ArtifactError` if there is no such codec or it is not available.
+  """
+  codec_type = ARTIFACT_CODECS.get(name)
+  if codec_type is None:
+    raise ArtifactError('Unknown artifact codec {!r}, expected one of: {}'
+                        .format(name, ', '.join(sorted(ARTIFACT_CODECS))))
+  if not codec_type.is_available():
+    raise ArtifactError('Artifact codec {!r} is not available; is its library installed?'
+                        .format(name))
+  return codec_type()
+
+
 class TarballArtifact(Artifact):
-  """An artifact stored in a tarball."""
+  """An artifact stored in a tarball.
+
+  The tar stream is compressed with an ArtifactCodec. Gzip tarballs are stored bare, while those
+  of other codecs are preceded by a header naming the codec. Tarballs without a header, including
+  all those written before codecs were introduced, are read as gzip or uncompressed tar.
+  """
 
-  def __init__(self, artifact_root, tarfile, compression=9):
+  HEADER_MAGIC = b'\x89PANTSARTIFACT\n'
+
+  READ_SIZE_BYTES = 1024 * 1024
+
+  def __init__(self, artifact_root, tarfile, compression=9, codec='gzip'):
     Artifact.__init__(self, artifact_root)
     self._tarfile = tarfile
     self._compression = compression
+    self._codec = codec
 
   def collect(self, paths):
-    # In our tests, gzip is slightly less compressive than bzip2 on .class files,
-    # but decompression times are much faster.
-    mode = 'w:gz'
-
-    tar_kwargs = {'dereference': True, 'errorlevel': 2}
-    tar_kwargs['compresslevel'] = self._compression
-
-    with open_tar(self._tarfile, mode, **tar_kwargs) as tarout:
-      for path in paths or ():
-        # Adds dirs recursively.
-        relpath = os.path.relpath(path, self._artifact_root)
-        tarout.add(path, relpath)
-        self._relpaths.add(relpath)
+    codec = get_artifact_codec(self._codec)
+    with open(self._tarfile, 'wb') as outfile:
+      if not isinstance(codec, GzipCodec):
+        outfile.write(self.HEADER_MAGIC)
+        outfile.write(codec.name.encode('ascii') + b'\n')
+      with closing(codec.compressor(outfile, self._compression)) as compressed:
+        with open_tar(compressed, 'w|', dereference=True, errorlevel=2) as tarout:
+          for path in paths or ():
+            # Adds dirs recursively.
+            relpath = os.path.relpath(path, self._artifact_root)
+            tarout.add(path, relpath)
+            self._relpaths.add(relpath)
 
   def extract(self):
+    with open(self._tarfile, 'rb') as infile:
+      self.extract_from(iter(lambda: infile.read(self.READ_SIZE_BYTES), b''))
+
+  def extract_from(self, chunks, tee=None):
+    """Extract the tarball read sequentially from the given iterable of byte chunks.
+
+    If the tarball can't be read in full, the files already extracted from it are deleted, so that
+    no partial artifact is left behind to be mistaken for a whole one.
+
+    :param chunks: An iterable of the chunks of the tarball, e.g., as they arrive over the network.
+    :param tee: An optional file object to write each chunk to as it is consumed, so that the
+                tarball can be stored while it is being extracted. All of the chunks are written to
+                it, even those trailing the end of the compressed stream.
+    """
+    reader = _ChunkReader(chunks, tee=tee)
+    if reader.peek(len(self.HEADER_MAGIC)) == self.HEADER_MAGIC:
+      reader.read(len(self.HEADER_MAGIC))
+      codec = get_artifact_codec(reader.readline().strip().decode('ascii'))
+    else:
+      # A bare tarball: sniff for the gzip magic number.
+      codec = GzipCodec() if reader.peek(2) == b'\x1f\x8b' else UncompressedCodec()
+
+    extracted = []
     try:
-      with open_tar(self._tarfile, 'r', errorlevel=2) as tarin:
-        # Note: We create all needed paths proactively, even though extractall() can do this for us.
-        # This is because we may be called concurrently on multiple artifacts that share directories,
-        # and there will be a race condition inside extractall(): task T1 A) sees that a directory
-        # doesn't exist and B) tries to create it. But in the gap between A) and B) task T2 creates
-        # the same directory, so T1 throws "File exists" in B).
+      stream = _CountingReader(codec.decompressor(reader))
+      with open_tar(stream, 'r|', errorlevel=2) as tarin:
+        # Note: We create all needed paths proactively, rather than letting extract() do it for us.
+        # This is because we may be called concurrently on multiple artifacts that share
+        # directories, and there is a race condition inside extract(): task T1 A) sees that a
+        # directory doesn't exist and B) tries to create it. But in the gap between A) and B) task
+        # T2 creates the same directory, so T1 throws "File exists" in B).
         # This actually happened, and was very hard to debug.
         # Creating the paths here up front allows us to squelch that "File exists" error.
         paths = []
-        dirs = set()
-        for tarinfo in tarin.getmembers():
+        for tarinfo in tarin:
           paths.append(tarinfo.name)
-          if tarinfo.isdir():
-            dirs.add(tarinfo.name)
-          else:
-            dirs.add(os.path.dirname(tarinfo.name))
-        for d in dirs:
+          if not tarinfo.isdir():
+            extracted.append(tarinfo.name)
+          d = tarinfo.name if tarinfo.isdir() else os.path.dirname(tarinfo.name)
           try:
             os.makedirs(os.path.join(self._artifact_root, d))
           except OSError as e:
             if e.errno != errno.EEXIST:
               raise
-        tarin.extractall(self._artifact_root)
+          tarin.extract(tarinfo, self._artifact_root)
+        # Tarfile quietly stops at a truncated header rather than failing, so check that the
+        # stream continues on to hold the end-of-archive marker of two zero blocks.
+        stream.drain()
+        if stream.bytes_read < tarin.offset + 2 * tarfile.BLOCKSIZE:
+          raise tarfile.ReadError('unexpected end of data')
+        reader.drain()
         self._relpaths.update(paths)
-    except tarfile.ReadError as e:
+    except (tarfile.TarError, EOFError) + codec.read_errors as e:
+      self._delete(extracted)
       raise ArtifactError(str(e))
+    except Exception:
+      self._delete(extracted)
+      raise
+
+  def _delete(self, relpaths):
+    for relpath in relpaths:
+      safe_delete(os.path.join(self._artifact_root, relpath))
+
+
+class _BufferedReader(AbstractClass):
+  """A minimal readable file-like object over a sequence of byte chunks produced by a subclass."""
+
+  def __init__(self):
+    self._buffer = b''
+    self._pos = 0
+    self._exhausted = False
+
+  @abstractmethod
+  def _next_chunk(self):
+    """Returns the next non-empty chunk of data, or an empty string when there is no more."""
+
+  def _fill(self, size):
+    available = len(self._buffer) - self._pos
+    if self._exhausted or 0 <= size <= available:
+      return
+    parts = [self._buffer[self._pos:]]
+    while size < 0 or available < size:
+      chunk = self._next_chunk()
+      if not chunk:
+        self._exhausted = True
+        break
+      parts.append(chunk)
+      available += len(chunk)
+    self._buffer = b''.join(parts)
+    self._pos = 0
+
+  def peek(self, size):
+    """Returns up to the next size bytes, without consuming them."""
+    self._fill(size)
+    return self._buffer[self._pos:self._pos + size]
+
+  def read(self, size=-1):
+    if size is None:
+      size = -1
+    self._fill(size)
+    end = len(self._buffer) if size < 0 else min(self._pos + size, len(self._buffer))
+    data = self._buffer[self._pos:end]
+    self._pos = end
+    return data
+
+  def readline(self, limit=1024):
+    line = []
+    while len(line) < limit:
+      c = self.read(1)
+      line.append(c)
+      if c in (b'\n', b''):
+        break
+    return b''.join(line)
+
+
+class _ChunkReader(_BufferedReader):
+  """Reads from an iterable of byte chunks, optionally copying each chunk to a file as it goes."""
+
+  def __init__(self, chunks, tee=None):
+    super(_ChunkReader, self).__init__()
+    self._chunks = iter(chunks)
+    self._tee = tee
+
+  def _next_chunk(self):
+    for chunk in self._chunks:
+      if self._tee is not None:
+        self._tee.write(chunk)
+      if chunk:
+        return chunk
+    return b''
+
+  def drain(self):
+    """Consumes the remaining chunks, so that the tee sees all of them."""
+    while self._next_chunk():
+      pass
+
+
+class _GzipReader(_BufferedReader):
+  """Decompresses a single member gzip stream read sequentially from a file object."""
+
+  READ_SIZE_BYTES = 64 * 1024
+
+  def __init__(self, fileobj):
+    super(_GzipReader, self).__init__()
+    self._fileobj = fileobj
+    self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+  def _next_chunk(self):
+    while True:
+      data = self._fileobj.read(self.READ_SIZE_BYTES)
+      if not data:
+        if not self._at_end_of_stream():
+          raise EOFError('Compressed file ended before the end-of-stream marker was reached')
+        return b''
+      chunk = self._decompressor.decompress(data)
+      if chunk:
+        return chunk
+
+  def _at_end_of_stream(self):
+    # Once zlib has seen the gzip trailer, any further input is set aside as unused rather than
+    # decompressed, which we can probe for on a copy of the decompressor.
+    if self._decompressor.unused_data:
+      return True
+    probe = self._decompressor.copy()
+    try:
+      probe.decompress(b'\0')
+    except zlib.error:
+      return False
+    return probe.unused_data == b'\0'
+
+
+class _CountingReader(object):
+  """Counts the bytes read from a file object."""
+
+  def __init__(self, fileobj):
+    self._fileobj = fileobj
+    self.bytes_read = 0
+
+  def read(self, size=-1):
+    data = self._fileobj.read(size)
+    self.bytes_read += len(data)
+    return data
+
+  def drain(self):
+    while self.read(64 * 1024):
+      pass
@@ -60,6 +60,10 @@ class ArtifactCache(object):
   Subclasses implement the methods below to provide this functionality.
   """
 
+  # Whether `bulk_use_cached_files` does better than one `use_cached_files` call per key, e.g., by
+  # overlapping remote round-trips. If not, callers are free to parallelize lookups themselves.
+  supports_bulk_lookup = False
+
   def __init__(self, artifact_root):
     """Create an ArtifactCache.
 
@@ -135,6 +139,23 @@ class ArtifactCache(object):
     """
     pass
 
+  def bulk_has(self, cache_keys):
+    """Check for the presence of many artifacts at once.
+
+    :param list cache_keys: A list of CacheKey objects.
+    :returns: A list of booleans, one for each of the given keys, in order.
+    """
+    return [self.has(cache_key) for cache_key in cache_keys]
+
+  def bulk_use_cached_files(self, cache_keys):
+    """Use the files cached for each of the given keys.
+
+    :param list cache_keys: A list of CacheKey objects.
+    :returns: A list with one `use_cached_files` style result for each of the given keys, in order:
+              `True` for a hit, `False` for a miss or an UnreadableArtifact.
+    """
+    return [self.use_cached_files(cache_key) for cache_key in cache_keys]
+
   def delete(self, cache_key):
     """Delete the artifacts for the specified key.
 
@@ -12,7 +12,9 @@ import urlparse
 from six import string_types
 from six.moves import range
 
+from pants.cache.artifact import ARTIFACT_CODECS
 from pants.cache.artifact_cache import ArtifactCacheError
+from pants.cache.content_addressed_artifact_cache import ContentAddressedLocalArtifactCache
 from pants.cache.local_artifact_cache import LocalArtifactCache, TempLocalArtifactCache
 from pants.cache.pinger import Pinger
 from pants.cache.restful_artifact_cache import RESTfulArtifactCache
@@ -57,9 +59,32 @@ class CacheSetup(Subsystem):
                   'cache, a path of a filesystem cache, or a pipe-separated list of alternate '
                   'caches to choose from.')
     register('--compression-level', advanced=True, type=int, default=5, recursive=True,
-             help='The gzip compression level (0-9) for created artifacts.')
+             help='The compression level (0-9) for created artifacts.')
+    register('--codec', advanced=True, recursive=True, default='gzip',
+             choices=sorted(ARTIFACT_CODECS.keys()),
+             help="How to compress created artifacts. 'none' stores plain tarballs, which is "
+                  "fastest for local or LAN caches. 'lz4' and 'zstd' require the optional lz4 "
+                  "and zstandard packages. Reads detect the codec of each artifact.")
     register('--max-entries-per-target', advanced=True, recursive=True, type=int, default=None,
              help='Maximum number of old cache files to keep per task target pair')
+    register('--local-store', advanced=True, recursive=True, default='tarball',
+             choices=['tarball', 'content-addressed'],
+             help="How to store artifacts in local caches. 'tarball' stores a compressed tarball "
+                  "per artifact. 'content-addressed' stores each distinct file once, shared by all "
+                  "the artifacts (of all tasks) that contain it, and can be size-limited.")
+    register('--local-max-bytes', advanced=True, recursive=True, type=int, default=None,
+             help='The maximum size of a content-addressed local cache. Least recently used '
+                  'artifacts are evicted to stay within it.')
+    register('--local-hardlinks', advanced=True, recursive=True, action='store_true',
+             help='Restore files from a content-addressed local cache by hardlinking instead of '
+                  'copying them. Only safe if no tool modifies its outputs in place.')
+    register('--max-in-flight', advanced=True, recursive=True, type=int, default=8,
+             help='Maximum number of concurrent requests to make to a RESTful cache when looking '
+                  'up many artifacts at once.')
+    register('--bulk-exists', advanced=True, recursive=True, action='store_true',
+             help='Look up many artifacts at once in a RESTful cache with a single POST to its '
+                  '_exists endpoint, so that only the artifacts it has are requested. Only for '
+                  'services that implement the endpoint.')
 
   @classmethod
   def create_cache_factory_for_task(cls, task):
@@ -111,6 +136,11 @@ class CacheFactory(object):
     Returns None if no read cache is configured.
     """
     if self._options.write_to and not self._write_cache:
+      if self._options.write_to == self._options.read_from:
+        # Share the read cache, so that writes can benefit from what reads learned, e.g., which
+        # artifacts a remote cache is missing.
+        self._write_cache = self.get_read_cache()
+        return self._write_cache
       with self._cache_setup_lock:
         self._write_cache = self._do_create_artifact_cache(self._options.write_to, 'will write to')
     return self._write_cache
@@ -144,13 +174,28 @@ class CacheFactory(object):
     compression = self._options.compression_level
     if compression not in range(10):
       raise ValueError('compression_level must be an integer 0-9: {}'.format(compression))
+    codec = self._options.codec
+    if not ARTIFACT_CODECS[codec].is_available():
+      raise ValueError('The {} artifact codec is not available; is its library installed?'
+                       .format(codec))
     artifact_root = self._options.pants_workdir
 
     def create_local_cache(parent_path):
+      if self._options.local_store == 'content-addressed':
+        self._log.debug('{0} {1} content-addressed local artifact cache at {2}'
+                        .format(self._stable_name, action, parent_path))
+        return ContentAddressedLocalArtifactCache(
+          artifact_root, parent_path, compression,
+          namespace=self._stable_name,
+          max_bytes=self._options.local_max_bytes,
+          max_entries_per_target=self._options.max_entries_per_target,
+          use_hardlinks=self._options.local_hardlinks,
+          codec=codec)
       path = os.path.join(parent_path, self._stable_name)
       self._log.debug('{0} {1} local artifact cache at {2}'
                       .format(self._stable_name, action, path))
-      return LocalArtifactCache(artifact_root, path, compression, self._options.max_entries_per_target)
+      return LocalArtifactCache(artifact_root, path, compression,
+                                self._options.max_entries_per_target, codec=codec)
 
     def create_remote_cache(urls, local_cache):
       best_url = self.select_best_url(urls)
@@ -158,8 +203,10 @@ class CacheFactory(object):
         url = best_url.rstrip('/') + '/' + self._stable_name
         self._log.debug('{0} {1} remote artifact cache at {2}'
                         .format(self._stable_name, action, url))
-        local_cache = local_cache or TempLocalArtifactCache(artifact_root, compression)
-        return RESTfulArtifactCache(artifact_root, url, local_cache)
+        local_cache = local_cache or TempLocalArtifactCache(artifact_root, compression, codec=codec)
+        return RESTfulArtifactCache(artifact_root, url, local_cache,
+                                    max_in_flight=self._options.max_in_flight,
+                                    bulk_exists=self._options.bulk_exists)
 
     def is_local(string_spec):
       return string_spec.startswith('/') or string_spec.startswith('~')
@@ -169,7 +216,8 @@ class CacheFactory(object):
 
     def create_cache_from_string_spec(string_spec):
       if is_remote(string_spec):
-        return create_remote_cache(string_spec, TempLocalArtifactCache(artifact_root, compression))
+        return create_remote_cache(string_spec,
+                                   TempLocalArtifactCache(artifact_root, compression, codec=codec))
       elif is_local(string_spec):
         return create_local_cache(string_spec)
       else:
@@ -0,0 +1,324 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from pants.cache.artifact import ArtifactError, TarballArtifact
+from pants.cache.artifact_cache import UnreadableArtifact
+from pants.cache.local_artifact_cache import BaseLocalArtifactCache
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_delete, safe_mkdir, safe_mkdir_for, safe_walk
+
+
+logger = logging.getLogger(__name__)
+
+
+class ContentAddressedLocalArtifactCache(BaseLocalArtifactCache):
+  """A local artifact cache that stores each distinct file only once.
+
+  File contents are stored as blobs named by their sha1 digest, and each cache entry is a small
+  JSON manifest listing the files (and directories) of the artifact along with the digest of each
+  file. Identical files produced for different targets, or by different versions of the same
+  target, therefore share storage, and restoring an entry copies (or hardlinks) its blobs into
+  place rather than decompressing a tarball.
+
+  Several caches, e.g., those of different tasks, may share a cache root by using different
+  namespaces for their manifests; the blobs are then shared between them too.
+
+  The cache can be given a global byte budget, which is enforced by evicting the least recently
+  used entries across all namespaces, as tracked by the mtime of their manifests, and then any
+  blobs that no remaining entry refers to.
+  """
+
+  _BLOBS_DIR = 'blobs'
+  _MANIFESTS_DIR = 'manifests'
+  _MANIFEST_SUFFIX = '.json'
+
+  BLOB_READ_SIZE_BYTES = 1024 * 1024
+
+  def __init__(self, artifact_root, cache_root, compression, namespace='', max_bytes=None,
+               max_entries_per_target=None, use_hardlinks=False, codec='gzip'):
+    """
+    :param str artifact_root: The path under which cacheable products will be read/written.
+    :param str cache_root: The blobs and manifests are stored under this directory.
+    :param str namespace: The manifests of this cache are kept apart from those of other caches
+                          sharing the cache root under this name.
+    :param int compression: The compression level for tarballs created to back a remote cache.
+    :param int max_bytes: The maximum total size of stored blobs, or None for no limit.
+    :param int max_entries_per_target: The maximum number of entries to keep for each target.
+    :param bool use_hardlinks: Restore files by hardlinking them to their blobs rather than copying.
+                               This is faster and saves space, but any in-place modification of a
+                               restored file would corrupt the cache.  Files whose mode differs from
+                               their blob's are still copied, as a link shares the blob's mode.
+    :param str codec: The name of the ArtifactCodec to compress tarballs for a remote cache with.
+    """
+    super(ContentAddressedLocalArtifactCache, self).__init__(artifact_root, compression,
+                                                             codec=codec)
+    self._cache_root = os.path.realpath(os.path.expanduser(cache_root))
+    self._namespace = namespace
+    self._max_bytes = max_bytes
+    self._max_entries_per_target = max_entries_per_target
+    self._use_hardlinks = use_hardlinks
+    # An estimate of the total size of the blobs, computed on demand and maintained on insert, if
+    # there is a max_bytes budget.
+    self._total_bytes = None
+    safe_mkdir(self._cache_root)
+
+  def has(self, cache_key):
+    return os.path.isfile(self._manifest_for_key(cache_key))
+
+  def try_insert(self, cache_key, paths):
+    self._store_paths(cache_key, paths)
+
+  @contextmanager
+  def insert_paths(self, cache_key, paths):
+    self._store_paths(cache_key, paths)
+    # Also yield a tarball of the paths, for upload to a remote cache.
+    with super(ContentAddressedLocalArtifactCache, self).insert_paths(cache_key, paths) as tarball:
+      yield tarball
+
+  def _store_tarball(self, cache_key, src):
+    return src
+
+  def store_and_use_artifact(self, cache_key, src):
+    # The tarball itself isn't kept, so its contents are streamed straight into a staging dir.
+    with temporary_dir(root_dir=self._cache_root) as staging_dir:
+      try:
+        TarballArtifact(staging_dir, None).extract_from(src)
+      except ArtifactError as e:
+        logger.warn('Error while reading artifact for {0}: {1}'.format(cache_key.id, e))
+        return UnreadableArtifact(cache_key, e)
+      self._store_paths(cache_key, [os.path.join(staging_dir, name)
+                                    for name in os.listdir(staging_dir)],
+                        artifact_root=staging_dir)
+    return self.use_cached_files(cache_key)
+
+  def use_cached_files(self, cache_key):
+    manifest_path = self._manifest_for_key(cache_key)
+    restored = []
+    try:
+      manifest = self._read_manifest(manifest_path)
+      if manifest is None:
+        return False
+      for relpath in manifest['dirs']:
+        safe_mkdir(os.path.join(self.artifact_root, relpath))
+      for relpath, digest, mode in manifest['files']:
+        path = os.path.join(self.artifact_root, relpath)
+        self._restore_blob(digest, mode, path)
+        restored.append(path)
+      # Mark the entry as recently used.
+      os.utime(manifest_path, None)
+      return True
+    except Exception as e:
+      # Don't leave a partial artifact behind to be mistaken for a whole one.
+      for path in restored:
+        safe_delete(path)
+      logger.warn('Error while reading from local artifact cache: {0}'.format(e))
+      return UnreadableArtifact(cache_key, e)
+
+  def delete(self, cache_key):
+    safe_delete(self._manifest_for_key(cache_key))
+
+  def prune(self):
+    """Evicts least recently used entries until the blobs fit within the byte budget."""
+    if not self._max_bytes:
+      return
+
+    # Blobs written since the prune started may be for entries whose manifests have yet to land, so
+    # they are never evicted.
+    prune_start = int(time.time())
+    blob_sizes = {}
+    fresh_digests = set()
+    for digest, path in self._iter_blobs():
+      try:
+        blob_stat = os.stat(path)
+      except OSError:
+        continue  # Evicted concurrently.
+      blob_sizes[digest] = blob_stat.st_size
+      if blob_stat.st_mtime >= prune_start:
+        fresh_digests.add(digest)
+    self._total_bytes = sum(blob_sizes.values())
+    if self._total_bytes <= self._max_bytes:
+      return
+
+    manifests = []
+    refcounts = defaultdict(int)
+    for manifest_path in self._iter_manifests():
+      try:
+        mtime = os.path.getmtime(manifest_path)
+        manifest = self._read_manifest(manifest_path)
+      except (OSError, ValueError):
+        continue  # Deleted concurrently or corrupt; the latter has nothing we can count on.
+      if manifest is None:
+        continue
+      digests = set(digest for _, digest, _ in manifest['files'])
+      for digest in digests:
+        refcounts[digest] += 1
+      manifests.append((mtime, manifest_path, digests))
+
+    def evict_blob(digest):
+      if digest in fresh_digests:
+        return
+      safe_delete(self._blob_path(digest))
+      self._total_bytes -= blob_sizes.pop(digest)
+
+    # Orphaned blobs, e.g., of deleted entries, go first.
+    for digest in [d for d in blob_sizes if refcounts[d] == 0]:
+      evict_blob(digest)
+
+    for _, manifest_path, digests in sorted(manifests):
+      if self._total_bytes <= self._max_bytes:
+        break
+      safe_delete(manifest_path)
+      for digest in digests:
+        refcounts[digest] -= 1
+        if refcounts[digest] == 0 and digest in blob_sizes:
+          evict_blob(digest)
+
+  def _prune_target(self, target_dir):
+    """Removes all but the most recently used `max_entries_per_target` entries under target_dir."""
+    if not self._max_entries_per_target or not os.path.isdir(target_dir):
+      return
+    entries = [os.path.join(target_dir, name) for name in os.listdir(target_dir)]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for entry in entries[self._max_entries_per_target:]:
+      safe_delete(entry)
+
+  def _store_paths(self, cache_key, paths, artifact_root=None):
+    artifact_root = artifact_root or self.artifact_root
+    dirs = set()
+    files = {}
+    # The path of a file with the contents of each blob.
+    blob_sources = {}
+
+    def add_file(path):
+      relpath = os.path.relpath(path, artifact_root)
+      digest = self._store_blob(path)
+      blob_sources[digest] = path
+      files[relpath] = (digest, stat.S_IMODE(os.stat(path).st_mode))
+
+    for path in paths or ():
+      if os.path.isdir(path):
+        dirs.add(os.path.relpath(path, artifact_root))
+        for dir_name, dir_names, filenames in safe_walk(path, followlinks=True):
+          for name in dir_names:
+            dirs.add(os.path.relpath(os.path.join(dir_name, name), artifact_root))
+          for name in filenames:
+            add_file(os.path.join(dir_name, name))
+      else:
+        add_file(path)
+
+    manifest = {
+      'dirs': sorted(dirs),
+      'files': [[relpath, digest, mode] for relpath, (digest, mode) in sorted(files.items())],
+    }
+    manifest_path = self._manifest_for_key(cache_key)
+    self._atomic_write(manifest_path, lambda fp: json.dump(manifest, fp))
+    # A concurrent prune may have evicted a blob that was already stored before the manifest landed
+    # to refer to it.
+    for digest, path in blob_sources.items():
+      if not os.path.exists(self._blob_path(digest)):
+        self._write_blob(digest, path)
+    self._prune_target(os.path.dirname(manifest_path))
+    if self._max_bytes and self._total_bytes is not None and self._total_bytes > self._max_bytes:
+      self.prune()
+
+  def _store_blob(self, path):
+    hasher = hashlib.sha1()
+    with open(path, 'rb') as fp:
+      for chunk in iter(lambda: fp.read(self.BLOB_READ_SIZE_BYTES), b''):
+        hasher.update(chunk)
+    digest = hasher.hexdigest()
+    blob_path = self._blob_path(digest)
+    # The total size is only needed to stay within a budget.
+    if self._max_bytes and self._total_bytes is None:
+      self._total_bytes = sum(os.path.getsize(p) for _, p in self._iter_blobs())
+    if not os.path.exists(blob_path):
+      self._write_blob(digest, path)
+    return digest
+
+  def _write_blob(self, digest, path):
+    blob_path = self._blob_path(digest)
+    self._atomic_write(blob_path, lambda fp: self._copy_contents(path, fp))
+    if self._total_bytes is not None:
+      self._total_bytes += os.path.getsize(blob_path)
+
+  @staticmethod
+  def _copy_contents(src, dst_fp):
+    with open(src, 'rb') as src_fp:
+      shutil.copyfileobj(src_fp, dst_fp)
+
+  def _restore_blob(self, digest, mode, dst):
+    blob_path = self._blob_path(digest)
+    if not os.path.isfile(blob_path):
+      raise IOError(errno.ENOENT, 'Missing blob {} for {}'.format(digest, dst))
+    safe_mkdir_for(dst)
+    safe_delete(dst)
+    # A link shares the blob's mode, so is only good for files with the same mode.
+    if self._use_hardlinks and stat.S_IMODE(os.stat(blob_path).st_mode) == mode:
+      try:
+        os.link(blob_path, dst)
+        return
+      except OSError as e:
+        # E.g., the artifact root is on a different device; fall back to copying.
+        logger.debug('Failed to hardlink {} to {}: {}'.format(blob_path, dst, e))
+    shutil.copyfile(blob_path, dst)
+    os.chmod(dst, mode)
+
+  @staticmethod
+  def _atomic_write(path, write_func):
+    # Write beside the destination and rename into place, so concurrent readers, including other
+    # pants processes sharing the cache, never see a partially written file.
+    safe_mkdir_for(path)
+    tmp_path = '{}.tmp.{}'.format(path, uuid.uuid4().hex)
+    try:
+      with open(tmp_path, 'wb') as fp:
+        write_func(fp)
+      os.rename(tmp_path, path)
+    finally:
+      safe_delete(tmp_path)
+
+  @staticmethod
+  def _read_manifest(manifest_path):
+    try:
+      with open(manifest_path, 'rb') as fp:
+        return json.load(fp)
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return None
+
+  def _iter_blobs(self):
+    for dir_name, _, filenames in safe_walk(os.path.join(self._cache_root, self._BLOBS_DIR)):
+      for name in filenames:
+        if '.tmp.' not in name:
+          yield name, os.path.join(dir_name, name)
+
+  def _iter_manifests(self):
+    for dir_name, _, filenames in safe_walk(os.path.join(self._cache_root, self._MANIFESTS_DIR)):
+      for name in filenames:
+        if name.endswith(self._MANIFEST_SUFFIX):
+          yield os.path.join(dir_name, name)
+
+  def _blob_path(self, digest):
+    return os.path.join(self._cache_root, self._BLOBS_DIR, digest[:2], digest)
+
+  def _manifest_for_key(self, cache_key):
+    # Note: As in LocalArtifactCache, we use the id as well as the hash, because two different
+    # targets may have the same hash if both have no sources.
+    return os.path.join(self._cache_root, self._MANIFESTS_DIR, self._namespace, cache_key.id,
+                        cache_key.hash + self._MANIFEST_SUFFIX)
@@ -9,7 +9,7 @@ import logging
 import os
 from contextlib import contextmanager
 
-from pants.cache.artifact import TarballArtifact
+from pants.cache.artifact import ArtifactError, TarballArtifact
 from pants.cache.artifact_cache import ArtifactCache, UnreadableArtifact
 from pants.util.contextutil import temporary_file
 from pants.util.dirutil import safe_delete, safe_mkdir, safe_mkdir_for
@@ -20,18 +20,20 @@ logger = logging.getLogger(__name__)
 
 class BaseLocalArtifactCache(ArtifactCache):
 
-  def __init__(self, artifact_root, compression):
+  def __init__(self, artifact_root, compression, codec='gzip'):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
-    :param int compression: The gzip compression level for created artifacts.
+    :param int compression: The compression level for created artifacts.
                             Valid values are 0-9.
+    :param str codec: The name of the ArtifactCodec to compress created artifacts with.
     """
     super(BaseLocalArtifactCache, self).__init__(artifact_root)
     self._compression = compression
+    self._codec = codec
     self._cache_root = None
 
   def _artifact(self, path):
-    return TarballArtifact(self.artifact_root, path, self._compression)
+    return TarballArtifact(self.artifact_root, path, self._compression, codec=self._codec)
 
   @contextmanager
   def _tmpfile(self, cache_key, use):
@@ -49,12 +51,18 @@ class BaseLocalArtifactCache(ArtifactCache):
   def store_and_use_artifact(self, cache_key, src):
     """
       Read the contents of an tarball from an iterator and return an artifact stored in the cache
+
+      The tarball is extracted as it is read, and is only stored in the cache once it has been
+      read and extracted in full.  If it can't be, the files extracted from it are deleted.
     """
     with self._tmpfile(cache_key, 'read') as tmp:
-      for chunk in src:
-        tmp.write(chunk)
+      try:
+        self._artifact(tmp.name).extract_from(src, tee=tmp)
+      except ArtifactError as e:
+        logger.warn('Error while reading artifact for {0}: {1}'.format(cache_key.id, e))
+        return UnreadableArtifact(cache_key, e)
       tmp.close()
-      self._artifact(self._store_tarball(cache_key, tmp.name)).extract()
+      self._store_tarball(cache_key, tmp.name)
       return True
 
   def _store_tarball(self, cache_key, src):
@@ -65,14 +73,16 @@ class BaseLocalArtifactCache(ArtifactCache):
 class LocalArtifactCache(BaseLocalArtifactCache):
   """An artifact cache that stores the artifacts in local files."""
 
-  def __init__(self, artifact_root, cache_root, compression, max_entries_per_target=None):
+  def __init__(self, artifact_root, cache_root, compression, max_entries_per_target=None,
+               codec='gzip'):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
     :param str cache_root: The locally cached files are stored under this directory.
-    :param int compression: The gzip compression level for created artifacts (1-9 or false-y).
+    :param int compression: The compression level for created artifacts (1-9 or false-y).
     :param int max_entries_per_target: The maximum number of old cache files to leave behind on a cache miss.
+    :param str codec: The name of the ArtifactCodec to compress created artifacts with.
     """
-    super(LocalArtifactCache, self).__init__(artifact_root, compression)
+    super(LocalArtifactCache, self).__init__(artifact_root, compression, codec=codec)
     self._cache_root = os.path.realpath(os.path.expanduser(cache_root))
     self._max_entries_per_target = max_entries_per_target
     safe_mkdir(self._cache_root)
@@ -142,11 +152,12 @@ class TempLocalArtifactCache(BaseLocalArtifactCache):
   actually stores files between calls, but is useful for handling file IO for a remote cache.
   """
 
-  def __init__(self, artifact_root, compression):
+  def __init__(self, artifact_root, compression, codec='gzip'):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
     """
-    super(TempLocalArtifactCache, self).__init__(artifact_root, compression=compression)
+    super(TempLocalArtifactCache, self).__init__(artifact_root, compression=compression,
+                                                 codec=codec)
 
   def _store_tarball(self, cache_key, src):
     return src
@@ -7,6 +7,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import logging
 import urlparse
+from multiprocessing.pool import ThreadPool
 
 import requests
 from requests import RequestException
@@ -34,16 +35,37 @@ class RequestsSession(object):
     return cls._session
 
 class RESTfulArtifactCache(ArtifactCache):
-  """An artifact cache that stores the artifacts on a RESTful service."""
+  """An artifact cache that stores the artifacts on a RESTful service.
+
+  Many artifacts can be looked up at once via `bulk_has` and `bulk_use_cached_files`, which make
+  at most `max_in_flight` concurrent requests: `bulk_has` sends a `HEAD` request per key, while
+  `bulk_use_cached_files` just sends a `GET` per key, treating a 404 as a miss.
+
+  Services that support it can instead be asked for the existence of all the keys at once, by
+  constructing the cache with `bulk_exists=True`: the keys' newline-separated paths (relative to
+  the url base) are `POST`ed to `<url base>/_exists`, to which the service responds with the
+  newline-separated subset of paths it has, and with an `X-Pants-Bulk-Exists` header to mark the
+  response as one, and only the artifacts it has are then downloaded.  A service that doesn't mark
+  its response isn't probed again; one whose probe fails is sent per-key requests for that lookup
+  only.
+  """
 
   READ_SIZE_BYTES = 4 * 1024 * 1024
 
-  def __init__(self, artifact_root, url_base, local):
+  BULK_EXISTS_PATH = '_exists'
+
+  BULK_EXISTS_HEADER = 'X-Pants-Bulk-Exists'
+
+  supports_bulk_lookup = True
+
+  def __init__(self, artifact_root, url_base, local, max_in_flight=8, bulk_exists=False):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
     :param str url_base: The prefix for urls on some RESTful service. We must be able to PUT and
                          GET to any path under this base.
     :param BaseLocalArtifactCache local: local cache instance for storing and creating artifacts
+    :param int max_in_flight: The maximum number of concurrent requests made by bulk operations.
+    :param bool bulk_exists: True to probe for the existence of many keys in a single request.
     """
     super(RESTfulArtifactCache, self).__init__(artifact_root)
     parsed_url = urlparse.urlparse(url_base)
@@ -58,6 +80,10 @@ class RESTfulArtifactCache(ArtifactCache):
     self._netloc = parsed_url.netloc
     self._path_prefix = parsed_url.path.rstrip(b'/')
     self._localcache = local
+    self._max_in_flight = max_in_flight
+    self._bulk_exists_supported = bulk_exists
+    # Keys a bulk probe found to be absent, so that a subsequent insert can skip asking again.
+    self._known_missing = set()
 
   def try_insert(self, cache_key, paths):
     # Delegate creation of artifact to local cache.
@@ -68,16 +94,110 @@ class RESTfulArtifactCache(ArtifactCache):
         if not self._request('PUT', remote_path, body=infile):
           url = self._url_string(remote_path)
           raise NonfatalArtifactCacheError('Failed to PUT to {0}.'.format(url))
+    self._known_missing.discard(cache_key)
 
   def has(self, cache_key):
     if self._localcache.has(cache_key):
       return True
-    return self._request('HEAD', self._remote_path_for_key(cache_key)) is not None
+    if cache_key in self._known_missing:
+      return False
+    return self._remote_has(cache_key)
+
+  def bulk_has(self, cache_keys):
+    results = [self._localcache.has(cache_key) for cache_key in cache_keys]
+    remote_keys = [cache_key for cache_key, found in zip(cache_keys, results) if not found]
+    remote_found = self._bulk_remote_has(remote_keys)
+    return [found or remote_found[cache_key] for cache_key, found in zip(cache_keys, results)]
 
   def use_cached_files(self, cache_key):
     if self._localcache.has(cache_key):
       return self._localcache.use_cached_files(cache_key)
+    return self._fetch(cache_key)
+
+  def bulk_use_cached_files(self, cache_keys):
+    results = {}
+    remote_keys = []
+    for cache_key in cache_keys:
+      if self._localcache.has(cache_key):
+        results[cache_key] = self._localcache.use_cached_files(cache_key)
+      else:
+        remote_keys.append(cache_key)
+
+    remote_found = self._bulk_exists_probe(remote_keys)
+    if remote_found is None:
+      # A GET tells us whether the service has the artifact as well as a HEAD would, so without a
+      # probe we skip straight to downloading.
+      to_fetch = remote_keys
+    else:
+      to_fetch = []
+      for cache_key in remote_keys:
+        if remote_found[cache_key]:
+          to_fetch.append(cache_key)
+        else:
+          results[cache_key] = False
+          self._known_missing.add(cache_key)
+
+    for cache_key, result in zip(to_fetch, self._map_in_flight(self._fetch, to_fetch)):
+      results[cache_key] = result
+      if result is False:
+        self._known_missing.add(cache_key)
+    return [results[cache_key] for cache_key in cache_keys]
 
+  def _remote_has(self, cache_key):
+    return self._request('HEAD', self._remote_path_for_key(cache_key)) is not None
+
+  def _bulk_remote_has(self, cache_keys):
+    """Returns a dict from each of the given keys to whether the remote service has it."""
+    remote_found = self._bulk_exists_probe(cache_keys)
+    if remote_found is None:
+      remote_found = dict(zip(cache_keys, self._map_in_flight(self._remote_has, cache_keys)))
+    return remote_found
+
+  def _bulk_exists_probe(self, cache_keys):
+    """Asks the remote service which of the given keys it has in a single request.
+
+    Returns a dict from each of the given keys to whether the remote service has it, or None if
+    bulk existence probes are disabled, unsupported by the service or failed.
+    """
+    if not cache_keys:
+      return {}
+    if not self._bulk_exists_supported:
+      return None
+
+    paths_by_key = dict((cache_key, self._relative_path_for_key(cache_key))
+                        for cache_key in cache_keys)
+    body = '\n'.join(paths_by_key[cache_key] for cache_key in cache_keys)
+    try:
+      response = self._request('POST', '{0}/{1}'.format(self._path_prefix, self.BULK_EXISTS_PATH),
+                               body=body)
+    except NonfatalArtifactCacheError as e:
+      # Possibly transient, so only fall back for this lookup.
+      logger.debug('Bulk existence probe failed, falling back to per-key requests: {0}'.format(e))
+      return None
+
+    # Don't mistake e.g. a catch-all response for one listing no paths.
+    if response is not None and self.BULK_EXISTS_HEADER in response.headers:
+      present = set(response.text.splitlines())
+      return dict((cache_key, paths_by_key[cache_key] in present) for cache_key in cache_keys)
+    logger.warn('\n{0} does not support bulk existence probes, falling back to per-key requests.\n'
+                .format(self._url_string(self._path_prefix)))
+    self._bulk_exists_supported = False
+    return None
+
+  def _map_in_flight(self, func, items):
+    """Returns `map(func, items)`, with at most `max_in_flight` calls running concurrently."""
+    if len(items) <= 1:
+      return map(func, items)
+    pool = ThreadPool(processes=min(self._max_in_flight, len(items)))
+    try:
+      # We need to specify a timeout explicitly, because otherwise python ignores SIGINT when
+      # waiting on a condition variable, so we won't be able to ctrl-c out.
+      return pool.map_async(func, items, chunksize=1).get(timeout=1000000000)
+    finally:
+      pool.close()
+      pool.join()
+
+  def _fetch(self, cache_key):
     remote_path = self._remote_path_for_key(cache_key)
     try:
       response = self._request('GET', remote_path)
@@ -96,8 +216,11 @@ class RESTfulArtifactCache(ArtifactCache):
     remote_path = self._remote_path_for_key(cache_key)
     self._request('DELETE', remote_path)
 
+  def _relative_path_for_key(self, cache_key):
+    return '{0}/{1}.tgz'.format(cache_key.id, cache_key.hash)
+
   def _remote_path_for_key(self, cache_key):
-    return '{0}/{1}/{2}.tgz'.format(self._path_prefix, cache_key.id, cache_key.hash)
+    return '{0}/{1}'.format(self._path_prefix, self._relative_path_for_key(cache_key))
 
   # Returns a response if we get a 200, None if we get a 404 and raises an exception otherwise.
   def _request(self, method, path, body=None):
@@ -110,6 +233,8 @@ class RESTfulArtifactCache(ArtifactCache):
       response = None
       if 'PUT' == method:
         response = session.put(url, data=body, timeout=self._timeout_secs)
+      elif 'POST' == method:
+        response = session.post(url, data=body, timeout=self._timeout_secs)
       elif 'GET' == method:
         response = session.get(url, timeout=self._timeout_secs, stream=True)
       elif 'HEAD' == method:
@@ -44,7 +44,10 @@ class GoalExecutor(object):
           if explain:
             self._context.log.debug('Skipping execution of {} in explain mode'.format(name))
           else:
+            hashes_computed = self._transitive_invalidation_hashes_computed()
             task.execute()
+            self._context.log.debug('{} computed {} transitive target fingerprints'.format(
+              name, self._transitive_invalidation_hashes_computed() - hashes_computed))
 
       if explain:
         reversed_tasktypes_by_name = reversed(self._tasktypes_by_name.items())
@@ -52,6 +55,10 @@ class GoalExecutor(object):
             '{}->{}'.format(name, task_type.__name__) for name, task_type in reversed_tasktypes_by_name)
         print('{goal} [{goal_to_task}]'.format(goal=self._goal.name, goal_to_task=goal_to_task))
 
+  def _transitive_invalidation_hashes_computed(self):
+    build_graph = self._context.build_graph
+    return build_graph.transitive_invalidation_hashes_computed if build_graph else 0
+
 
 class RoundEngine(Engine):
   class DependencyError(ValueError):
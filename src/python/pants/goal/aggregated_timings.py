@@ -6,6 +6,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import os
+import threading
 from collections import defaultdict
 
 from pants.util.dirutil import safe_mkdir_for
@@ -14,14 +15,17 @@ from pants.util.dirutil import safe_mkdir_for
 class AggregatedTimings(object):
   """Aggregates timings over multiple invocations of 'similar' work.
 
-  If filepath is not none, stores the timings in that file. Useful for finding bottlenecks."""
+  If filepath is not none, stores the timings in that file when `write` is called. Useful for
+  finding bottlenecks."""
 
   def __init__(self, path=None):
     # Map path -> timing in seconds (a float)
     self._timings_by_path = defaultdict(float)
     self._tool_labels = set()
     self._path = path
-    safe_mkdir_for(self._path)
+    self._lock = threading.Lock()
+    if self._path:
+      safe_mkdir_for(self._path)
 
   def add_timing(self, label, secs, is_tool=False):
     """Aggregate timings by label.
@@ -29,9 +33,13 @@ class AggregatedTimings(object):
     secs - a double, so fractional seconds are allowed.
     is_tool - whether this label represents a tool invocation.
     """
-    self._timings_by_path[label] += secs
-    if is_tool:
-      self._tool_labels.add(label)
+    with self._lock:
+      self._timings_by_path[label] += secs
+      if is_tool:
+        self._tool_labels.add(label)
+
+  def write(self):
+    """Writes all the timings, sorted in decreasing order, to the file, if any."""
     # Check existence in case we're a clean-all. We don't want to write anything in that case.
     if self._path and os.path.exists(os.path.dirname(self._path)):
       with open(self._path, 'w') as f:
@@ -43,5 +51,8 @@ class AggregatedTimings(object):
 
     Each value is a dict: { path: <path>, timing: <timing in seconds> }
     """
-    return [{'label': x[0], 'timing': x[1], 'is_tool': x[0] in self._tool_labels}
-            for x in sorted(self._timings_by_path.items(), key=lambda x: x[1], reverse=True)]
+    with self._lock:
+      items = self._timings_by_path.items()
+      tool_labels = set(self._tool_labels)
+    return [{'label': x[0], 'timing': x[1], 'is_tool': x[0] in tool_labels}
+            for x in sorted(items, key=lambda x: x[1], reverse=True)]
@@ -20,6 +20,7 @@ from pants.base.worker_pool import SubprocPool, WorkerPool
 from pants.base.workunit import WorkUnit, WorkUnitLabel
 from pants.goal.aggregated_timings import AggregatedTimings
 from pants.goal.artifact_cache_stats import ArtifactCacheStats
+from pants.goal.workunit_timings import WorkUnitTimings
 from pants.reporting.report import Report
 from pants.subsystem.subsystem import Subsystem
 from pants.util.dirutil import relative_symlink, safe_file_dump
@@ -90,6 +91,11 @@ class RunTracker(Subsystem):
     # Time spent in a workunit, not including its children.
     self.self_timings = AggregatedTimings(os.path.join(self.run_info_dir, 'self_timings'))
 
+    # The timing of each workunit, as json lines.
+    self.workunit_timings = WorkUnitTimings(os.path.join(self.run_info_dir,
+                                                         'workunit_timings.jsonl'),
+                                            run_id=run_id)
+
     # Hit/miss stats for the artifact cache.
     self.artifact_cache_stats = \
       ArtifactCacheStats(os.path.join(self.run_info_dir, 'artifact_cache_stats'))
@@ -278,6 +284,11 @@ class RunTracker(Subsystem):
 
     self.end_workunit(self._main_root_workunit)
 
+    # Materialize the timings once, now that they're all in.
+    self.cumulative_timings.write()
+    self.self_timings.write()
+    self.workunit_timings.flush()
+
     outcome = self._main_root_workunit.outcome()
     if self._background_root_workunit:
       outcome = min(outcome, self._background_root_workunit.outcome())
@@ -299,6 +310,7 @@ class RunTracker(Subsystem):
     path, duration, self_time, is_tool = workunit.end()
     self.cumulative_timings.add_timing(path, duration, is_tool)
     self.self_timings.add_timing(path, self_time, is_tool)
+    self.workunit_timings.record(workunit, self_time)
 
   def get_background_root_workunit(self):
     if self._background_root_workunit is None:
@@ -0,0 +1,86 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import json
+import os
+import threading
+
+from pants.base.workunit import WorkUnit
+from pants.util.dirutil import safe_mkdir_for
+
+
+class WorkUnitTimings(object):
+  """Records the timing of every workunit of a run, for aggregation across runs.
+
+  Records are buffered and appended to the file in batches, one json object per line, so the
+  cost of recording stays constant however many workunits a run has.  Each record is:
+
+    {
+      "run_id": <the id of the run>,
+      "id": <the workunit's unique id>,
+      "parent_id": <the parent workunit's id, or null for a root>,
+      "path": <the workunit's path of names, e.g. "main:compile:jvm-compile">,
+      "labels": <the workunit's sorted labels>,
+      "start": <start time, in seconds since the epoch>,
+      "end": <end time, in seconds since the epoch>,
+      "duration": <seconds, including children>,
+      "self_time": <seconds, excluding children>,
+      "outcome": <e.g. "SUCCESS">
+    }
+  """
+
+  def __init__(self, path=None, run_id=None, buffer_size=1000):
+    """
+    :param string path: The file to append records to, or None to not record anything.
+    :param string run_id: The id of the run the records are for.
+    :param int buffer_size: The number of records to buffer before appending them to the file.
+    """
+    self._path = path
+    self._run_id = run_id
+    self._buffer_size = buffer_size
+    self._lock = threading.Lock()
+    self._buffer = []
+    if self._path:
+      safe_mkdir_for(self._path)
+
+  def record(self, workunit, self_time):
+    """Records the timing of the given ended workunit.
+
+    :param float self_time: The seconds spent in the workunit, excluding its children.
+    """
+    if not self._path:
+      return
+    record = {
+      'run_id': self._run_id,
+      'id': str(workunit.id),
+      'parent_id': str(workunit.parent.id) if workunit.parent else None,
+      'path': workunit.path(),
+      'labels': sorted(workunit.labels),
+      'start': workunit.start_time,
+      'end': workunit.end_time,
+      'duration': workunit.duration(),
+      'self_time': self_time,
+      'outcome': WorkUnit.outcome_string(workunit.outcome()),
+    }
+    with self._lock:
+      self._buffer.append(record)
+      if len(self._buffer) >= self._buffer_size:
+        self._flush()
+
+  def flush(self):
+    """Appends any buffered records to the file."""
+    with self._lock:
+      self._flush()
+
+  def _flush(self):
+    records, self._buffer = self._buffer, []
+    # Check existence in case we're a clean-all. We don't want to write anything in that case.
+    if records and os.path.exists(os.path.dirname(self._path)):
+      with open(self._path, 'a') as f:
+        for record in records:
+          f.write(json.dumps(record))
+          f.write('\n')
@@ -40,6 +40,11 @@ class Ivy(object):
 
     self._extra_jvm_options = extra_jvm_options or []
 
+  @property
+  def classpath(self):
+    """Returns the classpath ivy runs with, as a list of jar paths."""
+    return self._classpath
+
   @property
   def ivy_settings(self):
     """Returns the ivysettings.xml path used by this `Ivy` instance.
@@ -111,17 +111,23 @@ class NailgunSession(object):
 
   def _read_chunk(self, buff):
     while len(buff) < self.HEADER_LENGTH:
-      buff += self._sock.recv(self.BUFF_SIZE)
+      buff += self._recv()
 
     payload_length, command = struct.unpack(self.HEADER_FMT, buff[:self.HEADER_LENGTH])
     buff = buff[self.HEADER_LENGTH:]
     while len(buff) < payload_length:
-      buff += self._sock.recv(self.BUFF_SIZE)
+      buff += self._recv()
 
     payload = buff[:payload_length]
     rest = buff[payload_length:]
     return command, payload, rest
 
+  def _recv(self):
+    data = self._sock.recv(self.BUFF_SIZE)
+    if not data:
+      raise self.ProtocolError('Connection closed before the exit code was received')
+    return data
+
 
 class NailgunClient(object):
   """A client for the nailgun protocol that allows execution of java binaries within a resident vm.
@@ -74,7 +74,11 @@ class NailgunExecutor(Executor, ProcessManager):
   _PANTS_OWNER_ARG_PREFIX = b'-Dpants.nailgun.owner'
   _PANTS_NG_ARG = '='.join((_PANTS_NG_ARG_PREFIX, get_buildroot()))
 
-  _NAILGUN_SPAWN_LOCK = threading.Lock()
+  # Guards the spawn locks below, one per identity: spawning blocks until the new server is
+  # listening, so servers with different identities, like the instances of a NailgunPool, are
+  # spawned concurrently.
+  _NAILGUN_SPAWN_LOCKS_LOCK = threading.Lock()
+  _NAILGUN_SPAWN_LOCKS = {}
   _SELECT_WAIT = 1
   _PROCESS_NAME = b'java'
 
@@ -133,6 +137,32 @@ class NailgunExecutor(Executor, ProcessManager):
                                       repr(java_version))]
     return digest.hexdigest()
 
+  def fingerprint_for(self, jvm_options, classpath):
+    """Returns the fingerprint of a nailgun server able to run java with the given options.
+
+    :param list jvm_options: JVM options passed to the java invocation
+    :param list classpath: The classpath of the java invocation, sans the nailgun classpath
+    """
+    return self._fingerprint(maybe_list(jvm_options or ()),
+                             self._nailgun_classpath + maybe_list(classpath),
+                             self._distribution.version)
+
+  def is_running_for(self, fingerprint):
+    """Returns True if a nailgun server with the given fingerprint is running for this executor."""
+    return self.is_alive() and self.fingerprint == fingerprint and (
+      self.cmd == self._distribution.java)
+
+  def ensure_running(self, jvm_options, classpath):
+    """Ensures a nailgun server able to run java with the given options is running, spawning one
+    if needed.
+    """
+    self._get_nailgun_client(maybe_list(jvm_options or ()), maybe_list(classpath), None, None)
+
+  @property
+  def _spawn_lock(self):
+    with self._NAILGUN_SPAWN_LOCKS_LOCK:
+      return self._NAILGUN_SPAWN_LOCKS.setdefault(self._identity, threading.Lock())
+
   def _runner(self, classpath, main, jvm_options, args, cwd=None):
     """Runner factory. Called via Executor.execute()."""
     command = self._create_command(classpath, main, jvm_options, args)
@@ -172,10 +202,10 @@ class NailgunExecutor(Executor, ProcessManager):
   def _get_nailgun_client(self, jvm_options, classpath, stdout, stderr):
     """This (somewhat unfortunately) is the main entrypoint to this class via the Runner. It handles
        creation of the running nailgun server as well as creation of the client."""
+    new_fingerprint = self.fingerprint_for(jvm_options, classpath)
     classpath = self._nailgun_classpath + classpath
-    new_fingerprint = self._fingerprint(jvm_options, classpath, self._distribution.version)
 
-    with self._NAILGUN_SPAWN_LOCK:
+    with self._spawn_lock:
       running, updated = self._check_nailgun_state(new_fingerprint)
 
       if running and updated:
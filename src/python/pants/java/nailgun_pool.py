@@ -0,0 +1,220 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from pants.java.executor import Executor
+from pants.util.dirutil import safe_mkdir, touch
+
+
+logger = logging.getLogger(__name__)
+
+
+class NailgunPool(object):
+  """A fixed number of nailgun server instances for one tool, so it can be run concurrently.
+
+  Each instance is a NailgunExecutor with its own identity, and so its own persistent server.  An
+  instance serves one java invocation at a time: callers check one out for the duration of an
+  invocation, getting an instance whose server is already running with the invocation's
+  fingerprint (jvm options and classpath) if there is one, so that servers stay hot.
+
+  Servers idle for longer than the idle timeout are killed when instances are checked in, at most
+  once per idle scan interval.
+  """
+
+  def __init__(self, executor_factory, size, idle_timeout=None, idle_scan_interval=60):
+    """
+    :param executor_factory: A function from an instance index, in [0, size), to a NailgunExecutor
+                             for that instance.  It is called for each checkout, and so should be
+                             cheap, and must return executors with the same identity for the same
+                             index.
+    :param int size: The number of instances.
+    :param int idle_timeout: The number of seconds after which to kill idle servers, or None or 0 to
+                             keep them running indefinitely.
+    :param int idle_scan_interval: The minimum number of seconds between scans for idle servers.
+    """
+    if size < 1:
+      raise ValueError('A nailgun pool needs at least one instance, given {}'.format(size))
+    self._executor_factory = executor_factory
+    self._size = size
+    self._idle_timeout = idle_timeout or None
+    self._idle_scan_interval = idle_scan_interval
+    self._next_idle_scan = 0
+    self._condition = threading.Condition()
+    self._free = set(range(size))
+
+  @property
+  def size(self):
+    return self._size
+
+  @contextmanager
+  def checkout(self, jvm_options, classpath):
+    """Checks out the instance best suited to run java with the given options, waiting for one to
+    be free if need be.
+
+    Yields a NailgunExecutor that the caller has exclusive use of until the context exits.
+    """
+    index, executor = self._acquire(jvm_options, classpath)
+    try:
+      yield executor
+    finally:
+      self._release(index, executor)
+
+  def prewarm(self, jvm_options, classpath, count=None):
+    """Starts servers for running java with the given options in the background.
+
+    Returns immediately.  Instances being warmed are checked out until their server is listening, so
+    checkouts racing the warming wait for, and then get, a hot server.
+
+    :param int count: The number of instances to warm, by default all of them.
+    """
+    count = self._size if count is None else min(count, self._size)
+    with self._condition:
+      fingerprint = None
+      cold = []
+      for index in sorted(self._free):
+        executor = self._executor_factory(index)
+        fingerprint = fingerprint or executor.fingerprint_for(jvm_options, classpath)
+        if executor.is_running_for(fingerprint):
+          count -= 1
+        else:
+          cold.append((index, executor))
+      cold = cold[:max(0, count)]
+      for index, _ in cold:
+        self._free.remove(index)
+
+    def warm(index, executor):
+      try:
+        executor.ensure_running(jvm_options, classpath)
+      except Exception as e:
+        # Not fatal: the instance will just start cold when it is checked out.
+        logger.debug('Failed to prewarm {}: {}'.format(executor, e))
+      finally:
+        self._release(index, executor)
+
+    for index, executor in cold:
+      thread = threading.Thread(target=warm, args=(index, executor),
+                                name='nailgun-prewarm-{}'.format(executor.name))
+      thread.daemon = True
+      thread.start()
+
+  def _acquire(self, jvm_options, classpath):
+    with self._condition:
+      while not self._free:
+        self._condition.wait()
+      # Prefer an instance already running with the right fingerprint, then one not running at all,
+      # over one we'd have to kill and respawn.
+      best = None
+      fingerprint = None
+      for index in sorted(self._free):
+        executor = self._executor_factory(index)
+        fingerprint = fingerprint or executor.fingerprint_for(jvm_options, classpath)
+        if executor.is_running_for(fingerprint):
+          best = (index, executor)
+          break
+        if best is None or (best[1].is_alive() and not executor.is_alive()):
+          best = (index, executor)
+      self._free.remove(best[0])
+      return best
+
+  def _release(self, index, executor):
+    self._touch(executor)
+    with self._condition:
+      self._free.add(index)
+      self._condition.notify()
+      idle = self._checkout_idle()
+    # Killing a server can take a while, so do it without holding up checkouts of other instances.
+    for idle_index, idle_executor in idle:
+      try:
+        self._kill(idle_executor)
+      finally:
+        with self._condition:
+          self._free.add(idle_index)
+          self._condition.notify()
+
+  def _last_used_path(self, executor):
+    return os.path.join(executor.get_metadata_dir(), 'last_used')
+
+  def _touch(self, executor):
+    safe_mkdir(executor.get_metadata_dir())
+    touch(self._last_used_path(executor))
+
+  def _checkout_idle(self):
+    """Checks out the free instances whose servers have been idle for longer than the timeout.
+
+    Called with the condition held.  Returns a list of (index, executor) pairs, which is empty
+    unless an idle scan is due.
+    """
+    now = time.time()
+    if self._idle_timeout is None or now < self._next_idle_scan:
+      return []
+    self._next_idle_scan = now + self._idle_scan_interval
+
+    deadline = now - self._idle_timeout
+    idle = []
+    for index in sorted(self._free):
+      executor = self._executor_factory(index)
+      try:
+        last_used = os.path.getmtime(self._last_used_path(executor))
+      except OSError:
+        # Never used via a pool; the server predates it, so date it by its pid file instead.
+        try:
+          last_used = os.path.getmtime(executor.get_pid_path())
+        except OSError:
+          continue
+      if last_used < deadline:
+        idle.append((index, executor))
+    for index, _ in idle:
+      self._free.remove(index)
+    return idle
+
+  def _kill(self, executor):
+    if executor.is_alive():
+      logger.debug('Killing {} after {} idle seconds'.format(executor, self._idle_timeout))
+      try:
+        executor.terminate()
+      except executor.NonResponsiveProcess as e:
+        logger.warning('Failed to kill idle nailgun server: {}'.format(e))
+
+
+class PooledNailgunExecutor(Executor):
+  """Runs each java invocation in an instance checked out of a NailgunPool for its duration.
+
+  For callers that need a single long-lived Executor, so that they share the pool's servers with
+  callers that check instances out directly rather than run a server of their own.
+  """
+
+  def __init__(self, pool, distribution=None):
+    """
+    :param NailgunPool pool: The pool to check instances out of.
+    :param distribution: The java distribution the pool's instances run.
+    """
+    super(PooledNailgunExecutor, self).__init__(distribution=distribution)
+    self._pool = pool
+
+  def _runner(self, classpath, main, jvm_options, args, cwd=None):
+    command = self._create_command(classpath, main, jvm_options, args)
+
+    class Runner(self.Runner):
+      @property
+      def executor(this):
+        return self
+
+      @property
+      def command(this):
+        return list(command)
+
+      def run(this, stdout=None, stderr=None, cwd=None):
+        with self._pool.checkout(jvm_options, classpath) as executor:
+          runner = executor.runner(classpath, main, jvm_options=jvm_options, args=args)
+          return runner.run(stdout=stdout, stderr=stderr, cwd=cwd)
+
+    return Runner()
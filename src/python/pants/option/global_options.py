@@ -99,6 +99,12 @@ class GlobalOptionsRegistrar(Optionable):
     register('-d', '--logdir', advanced=True, metavar='<dir>',
              help='Write logs to files under this directory.')
 
+    # Registered in the bootstrap phase as the pants client reads it before loading anything.
+    register('--enable-pantsd', advanced=True, action='store_true', default=False,
+             help='Serve runs from a pants daemon that keeps backends loaded and BUILD files '
+                  'parsed between runs.  The first run launches the daemon and runs as usual, '
+                  'later runs with the same bootstrap options are handed to the daemon.')
+
   @classmethod
   def register_options(cls, register):
     """Register options not tied to any particular task or subsystem."""
@@ -138,13 +144,26 @@ class GlobalOptionsRegistrar(Optionable):
     register('--fail-fast', advanced=True, action='store_true',
              help='When parsing specs, will stop on the first erronous BUILD file encountered. '
                   'Otherwise, will parse all builds in a spec and then display an error.')
-    register('--cache-key-gen-version', advanced=True, default='200', recursive=True,
+    register('--cache-key-gen-version', advanced=True, default='201', recursive=True,
              help='The cache key generation. Bump this to invalidate every artifact for a scope.')
+    register('--build-invalidator', advanced=True, choices=['files', 'indexed'], default='files',
+             help="How to store per-task target invalidation state: 'files' writes one small file "
+                  "per target set, 'indexed' keeps a single append-only log per task that is "
+                  "loaded once per run.")
     register('--max-subprocess-args', advanced=True, type=int, default=100, recursive=True,
              help='Used to limit the number of arguments passed to some subprocesses by breaking'
              'the command up into multiple invocations')
     register('--print-exception-stacktrace', advanced=True, action='store_true',
              help='Print to console the full exception stack trace if encountered.')
+    register('--build-file-scan-workers', advanced=True, type=int, default=0,
+             help='When scanning for all the BUILD files under a directory, e.g. for ::, parse '
+                  'them in a pool of this many processes. 0 or 1 parse them serially.')
+    register('--build-file-parse-cache', advanced=True, action='store_true', default=False,
+             help='Remember the targets parsed from BUILD files across runs, keyed by the content '
+                  'of each BUILD file, so that unchanged BUILD files need not be re-executed. '
+                  'BUILD files that visibly read files, import modules or call exposed functions '
+                  'are always re-executed, but the objects they construct are trusted not to '
+                  'read files.')
     register('--build-file-rev', advanced=True,
              help='Read BUILD files from this scm rev instead of from the working tree.  This is '
              'useful for implementing pants-aware sparse checkouts.')
@@ -31,32 +31,7 @@ class OptionsBootstrapper(object):
     :rtype: :class:`Options`
     """
     if not self._bootstrap_options:
-      flags = set()
-      short_flags = set()
-
-      def capture_the_flags(*args, **kwargs):
-        for arg in args:
-          flags.add(arg)
-          if len(arg) == 2:
-            short_flags.add(arg)
-          elif is_boolean_flag(kwargs):
-            flags.add('--no-{}'.format(arg[2:]))
-
-      GlobalOptionsRegistrar.register_bootstrap_options(capture_the_flags)
-
-      def is_bootstrap_option(arg):
-        components = arg.split('=', 1)
-        if components[0] in flags:
-          return True
-        for flag in short_flags:
-          if arg.startswith(flag):
-            return True
-        return False
-
-      # Take just the bootstrap args, so we don't choke on other global-scope args on the cmd line.
-      # Stop before '--' since args after that are pass-through and may have duplicate names to our
-      # bootstrap options.
-      bargs = filter(is_bootstrap_option, itertools.takewhile(lambda arg: arg != '--', self._args))
+      bargs = self._bootstrap_args()
 
       configpaths = [self._configpath] if self._configpath else None
       pre_bootstrap_config = Config.load(configpaths)
@@ -91,6 +66,58 @@ class OptionsBootstrapper(object):
 
     return self._bootstrap_options
 
+  def bootstrap_only(self):
+    """:returns: An OptionsBootstrapper for the same option env and config, and just our bootstrap
+                 args.
+    :rtype: :class:`OptionsBootstrapper`
+    """
+    # Keep the binary name, if any, so the args split as ours do.
+    binary = [arg for arg in self._args[:1] if not arg.startswith('-')]
+    return OptionsBootstrapper(env=self.get_option_env(), configpath=self._configpath,
+                               args=binary + self._bootstrap_args())
+
+  def get_option_env(self):
+    """:returns: The env vars that options may be read from.
+    :rtype: dict
+    """
+    # Option values are only ever read from PANTS_ prefixed env vars.
+    return dict((key, value) for key, value in self._env.items() if key.startswith('PANTS_'))
+
+  def get_config_paths(self):
+    """:returns: The paths of the config files that options are read from, in order.
+    :rtype: list of string
+    """
+    self.get_bootstrap_options()
+    return self._post_bootstrap_config.sources()
+
+  def _bootstrap_args(self):
+    flags = set()
+    short_flags = set()
+
+    def capture_the_flags(*args, **kwargs):
+      for arg in args:
+        flags.add(arg)
+        if len(arg) == 2:
+          short_flags.add(arg)
+        elif is_boolean_flag(kwargs):
+          flags.add('--no-{}'.format(arg[2:]))
+
+    GlobalOptionsRegistrar.register_bootstrap_options(capture_the_flags)
+
+    def is_bootstrap_option(arg):
+      components = arg.split('=', 1)
+      if components[0] in flags:
+        return True
+      for flag in short_flags:
+        if arg.startswith(flag):
+          return True
+      return False
+
+    # Take just the bootstrap args, so we don't choke on other global-scope args on the cmd line.
+    # Stop before '--' since args after that are pass-through and may have duplicate names to our
+    # bootstrap options.
+    return filter(is_bootstrap_option, itertools.takewhile(lambda arg: arg != '--', self._args))
+
   def get_full_options(self, known_scope_infos):
     """Get the full Options instance bootstrapped by this object for the given known scopes.
 
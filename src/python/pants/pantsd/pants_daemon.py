@@ -0,0 +1,346 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import binascii
+import errno
+import hashlib
+import hmac
+import logging
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+import traceback
+
+from pants.java.nailgun_client import NailgunClient, NailgunSession
+from pants.pantsd.process_manager import ProcessManager
+
+
+logger = logging.getLogger(__name__)
+
+
+class PantsDaemon(ProcessManager):
+  """A long-lived process that serves pants runs from warm state.
+
+  The daemon holds a runner: an object that does the expensive, run-independent work of a pants
+  run, e.g. loading backends and parsing BUILD files, once, and that can then perform runs from
+  that state.  Clients talk to the daemon over the nailgun protocol, sending their argv, env and
+  working directory and streaming their stdio, so a `NailgunClient` is a complete client.
+
+  Each run is served in a child forked from the daemon, so runs start from the warm state and
+  can't pollute it.  Between runs the daemon asks its runner to drop any state made stale by
+  changes to the filesystem, and to warm up again.
+
+  A daemon serves runs with one fingerprint: that of the options its runner's state was built
+  from.  Clients with different options must not use it.
+
+  The daemon listens on a localhost port, so it only serves clients that can read the random token
+  it writes to a file only its user can read, and that send it in their env as `PANTSD_TOKEN`.
+  """
+
+  TOKEN_ENV_VAR = 'PANTSD_TOKEN'
+
+  # How often the daemon checks, while waiting for runs, that it is still the registered daemon.
+  POLL_INTERVAL = 1.0
+
+  @staticmethod
+  def fingerprint(*values):
+    """Returns a fingerprint of the given values, e.g. those of the options a runner depends on."""
+    hasher = hashlib.sha1()
+    for value in values:
+      hasher.update(repr(value).encode('utf-8'))
+      hasher.update(b'\0')
+    return hasher.hexdigest()
+
+  def __init__(self, fingerprint):
+    """
+    :param string fingerprint: The fingerprint of the runs this daemon can serve.
+    """
+    super(PantsDaemon, self).__init__(name='pantsd')
+    self._fingerprint = fingerprint
+
+  def get_fingerprint_path(self):
+    """Return the path to the file containing the fingerprint of the running daemon's runs."""
+    return os.path.join(self.get_metadata_dir(), 'fingerprint')
+
+  def get_token_path(self):
+    """Return the path to the file containing the token that clients must send."""
+    return os.path.join(self.get_metadata_dir(), 'token')
+
+  def is_launched(self):
+    """Returns True if a daemon for our fingerprint is running, whether or not it serves yet."""
+    if not self.is_alive():
+      return False
+    try:
+      return self._read_file(self.get_fingerprint_path()) == self._fingerprint
+    except (IOError, OSError):
+      return False
+
+  def is_running(self):
+    """Returns True if a daemon for our fingerprint is running and serving runs."""
+    return self.is_launched() and self.socket is not None
+
+  def launch(self, runner_factory, log_path):
+    """Launches a daemon for our fingerprint in the background, replacing any existing one.
+
+    Returns immediately: the daemon only starts accepting runs once its runner is warm.
+
+    :param runner_factory: A function returning the runner, called in the daemon.  A runner has
+                           `warm()` and `invalidate_changed()` methods, called by the daemon
+                           between runs, and a `run(args, env, cwd)` method returning an exit
+                           code, called in the forked child that serves a run.
+    :param string log_path: The file to send the daemon's own output to.
+    """
+    if self.is_alive():
+      self.terminate()
+    else:
+      self._purge_metadata()
+    # The daemon registers its own pid, once it has dropped its client's stdio.
+    self.daemonize(write_pid=False,
+                   post_fork_child_opts=dict(runner_factory=runner_factory, log_path=log_path))
+
+  def execute(self, args, env, cwd, ins=sys.stdin, out=sys.stdout, err=sys.stderr):
+    """Performs a run in the daemon, streaming its stdio.
+
+    :returns: The run's exit code, or None if the daemon could not be reached, in which case the
+              run was not started.
+    """
+    port = self.socket
+    if port is None:
+      return None
+    try:
+      token = self._read_file(self.get_token_path())
+    except (IOError, OSError):
+      return None
+    sock = NailgunClient(port=port).try_connect()
+    if sock is None:
+      return None
+    env = dict(env)
+    env[self.TOKEN_ENV_VAR] = token
+    try:
+      return NailgunSession(sock, ins, out, err).execute(cwd, 'pants', *args, **env)
+    finally:
+      sock.close()
+
+  def post_fork_child(self, runner_factory, log_path):
+    """Runs the daemon, in the daemonized child."""
+    # The daemon must not hold on to the stdio of the client that launched it.
+    log_fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    null_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null_fd, 0)
+    os.dup2(log_fd, 1)
+    os.dup2(log_fd, 2)
+    self._write_file(self.get_fingerprint_path(), self._fingerprint)
+    self.write_pid(os.getpid())
+    try:
+      self.serve(runner_factory())
+    finally:
+      # Leave the metadata to a daemon that replaced us.
+      if self._get_pid() == os.getpid():
+        self._purge_metadata_files()
+
+  def serve(self, runner):
+    """Serves runs with the given runner until another daemon takes over."""
+    runner.warm()
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    server.settimeout(self.POLL_INTERVAL)
+    token = self._write_token()
+    self.write_socket(server.getsockname()[1])
+    logger.info('pantsd {} serving on port {}'.format(os.getpid(), server.getsockname()[1]))
+
+    while self._get_pid() == os.getpid():
+      self._reap_children()
+      try:
+        conn, _ = server.accept()
+      except socket.timeout:
+        continue
+      conn.settimeout(None)
+      # The reader may buffer the start of the run's stdin, so the run's session reads on from it.
+      reader = _ChunkReader(conn)
+      try:
+        args, env, cwd = self._read_request(reader, token)
+      except (NailgunSession.ProtocolError, socket.error) as e:
+        logger.warning('Bad request: {}'.format(e))
+        conn.close()
+        continue
+
+      runner.invalidate_changed()
+      pid = os.fork()
+      if pid == 0:
+        server.close()
+        exit_code = 1
+        try:
+          exit_code = _RunSession(conn, reader).serve(runner, args, env, cwd)
+        except Exception:
+          logging.critical(traceback.format_exc())
+        finally:
+          os._exit(exit_code)
+      conn.close()
+      # Warm up for the next run while this one is served.
+      runner.warm()
+    server.close()
+
+  def _reap_children(self):
+    while True:
+      try:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+      except OSError as e:
+        if e.errno != errno.ECHILD:
+          raise
+        return
+      if pid == 0:
+        return
+
+  def _write_token(self):
+    """Writes a new random token to a file only our user can read, and returns it."""
+    token = binascii.hexlify(os.urandom(16)).decode('ascii')
+    path = self.get_token_path()
+    self._maybe_init_metadata_dir()
+    try:
+      os.unlink(path)
+    except OSError as e:
+      if e.errno != errno.ENOENT:
+        raise
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as fp:
+      fp.write(token)
+    return token
+
+  def _read_request(self, reader, token):
+    args = []
+    env = {}
+    cwd = None
+    while True:
+      command, payload = reader.read_chunk()
+      if command == b'A':
+        args.append(payload.decode('utf-8'))
+      elif command == b'E':
+        key, _, value = payload.decode('utf-8').partition('=')
+        env[key] = value
+      elif command == b'D':
+        cwd = payload.decode('utf-8')
+      elif command == b'C':
+        if not hmac.compare_digest(env.pop(self.TOKEN_ENV_VAR, '').encode('utf-8'),
+                                   token.encode('utf-8')):
+          raise NailgunSession.ProtocolError('Request without a valid token')
+        return args, env, cwd or self._buildroot
+      else:
+        raise NailgunSession.ProtocolError('Unexpected chunk {} before the command'.format(command))
+
+  def _purge_metadata_files(self):
+    for path in (self.get_pid_path(), self.get_socket_path(), self.get_fingerprint_path(),
+                 self.get_token_path()):
+      try:
+        os.unlink(path)
+      except OSError:
+        pass
+
+
+class _ChunkReader(object):
+  """Reads nailgun protocol chunks from a socket."""
+
+  def __init__(self, sock):
+    self._sock = sock
+    self._buff = b''
+
+  def read_chunk(self):
+    """Returns the next (command, payload) chunk.
+
+    :raises: NailgunSession.ProtocolError if the socket is closed mid-chunk, or before it.
+    """
+    header = self._read(NailgunSession.HEADER_LENGTH)
+    payload_length, command = struct.unpack(NailgunSession.HEADER_FMT, header)
+    return command, self._read(payload_length)
+
+  def _read(self, length):
+    while len(self._buff) < length:
+      data = self._sock.recv(NailgunSession.BUFF_SIZE)
+      if not data:
+        raise NailgunSession.ProtocolError('Connection closed mid-chunk')
+      self._buff += data
+    data, self._buff = self._buff[:length], self._buff[length:]
+    return data
+
+
+class _RunSession(object):
+  """Serves a single run over a client connection, in the forked child that performs it."""
+
+  def __init__(self, conn, reader):
+    self._conn = conn
+    self._reader = reader
+    self._send_lock = threading.Lock()
+
+  def serve(self, runner, args, env, cwd):
+    """Performs the run with our stdio connected to the client's, and returns its exit code."""
+    stdin_read, stdin_write = os.pipe()
+    stdout_read, stdout_write = os.pipe()
+    stderr_read, stderr_write = os.pipe()
+    for fd, target in ((stdin_read, 0), (stdout_write, 1), (stderr_write, 2)):
+      os.dup2(fd, target)
+      os.close(fd)
+
+    finished = threading.Event()
+    pumps = [threading.Thread(target=self._pump_output, args=(fd, command, finished))
+             for fd, command in ((stdout_read, b'1'), (stderr_read, b'2'))]
+    stdin_pump = threading.Thread(target=self._pump_input, args=(stdin_write,))
+    stdin_pump.daemon = True
+    for thread in pumps + [stdin_pump]:
+      thread.start()
+
+    exit_code = 1
+    try:
+      exit_code = runner.run(args, env, cwd)
+    finally:
+      sys.stdout.flush()
+      sys.stderr.flush()
+      # Close our ends of the output pipes, so the pumps see them out.  Processes the run left
+      # running, e.g. nailgun servers, may hold them open, so the pumps also stop once drained.
+      null_fd = os.open(os.devnull, os.O_RDWR)
+      os.dup2(null_fd, 1)
+      os.dup2(null_fd, 2)
+      finished.set()
+      for thread in pumps:
+        thread.join()
+      self._send(b'X', str(exit_code).encode('utf-8'))
+      self._conn.close()
+    return exit_code
+
+  def _send(self, command, payload):
+    header = struct.pack(NailgunSession.HEADER_FMT, len(payload), command)
+    with self._send_lock:
+      self._conn.sendall(header + payload)
+
+  def _pump_output(self, fd, command, finished):
+    while True:
+      # Check before polling: once the run has finished, everything it wrote is already readable.
+      done = finished.is_set()
+      readable, _, _ = select.select([fd], [], [], 0 if done else 0.1)
+      if readable:
+        data = os.read(fd, NailgunSession.BUFF_SIZE)
+        if not data:
+          return
+        self._send(command, data)
+      elif done:
+        return
+
+  def _pump_input(self, fd):
+    try:
+      while True:
+        command, payload = self._reader.read_chunk()
+        if command == b'0':
+          os.write(fd, payload)
+        elif command == b'.':
+          return
+    except (NailgunSession.ProtocolError, socket.error, OSError):
+      pass
+    finally:
+      os.close(fd)
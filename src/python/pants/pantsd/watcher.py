@@ -0,0 +1,429 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+from abc import abstractmethod
+from collections import namedtuple
+
+from pants.util.meta import AbstractClass
+
+
+logger = logging.getLogger(__name__)
+
+
+class Changes(namedtuple('Changes', ['files', 'dirs'])):
+  """The paths that changed under a watched root, relative to it.
+
+  :param files: The paths of files, or other non-directories, that were created, modified or
+                deleted.
+  :param dirs: The paths of directories that were created, deleted or moved.  Anything under them
+               may have changed too, without being listed.
+  """
+
+  def is_changed(self, path):
+    """Returns True if the file or directory at the given relative path may have changed."""
+    if path in self.files:
+      return True
+    while path:
+      if path in self.dirs:
+        return True
+      path = os.path.dirname(path)
+    return False
+
+
+class Watcher(AbstractClass):
+  """Keeps track of the paths that change under a root directory.
+
+  Changes accumulate from when the watcher is started, and are collected with `drain`.  Excluded
+  directories are not watched at all, e.g. so that writes to the pants workdir don't churn.
+  """
+
+  class Error(Exception):
+    """Indicates the watcher can't watch its root."""
+
+  @staticmethod
+  def create(root_dir, excludes=()):
+    """Returns a watcher for `root_dir`: an `InotifyWatcher` if possible, else a `PollingWatcher`.
+
+    The watcher is not started yet.
+    """
+    if InotifyWatcher.is_supported():
+      return InotifyWatcher(root_dir, excludes)
+    return PollingWatcher(root_dir, excludes)
+
+  def __init__(self, root_dir, excludes=()):
+    """
+    :param string root_dir: The directory to watch.
+    :param list excludes: Directories to ignore changes under, absolute or relative to `root_dir`.
+    """
+    self._root_dir = os.path.realpath(root_dir)
+    self._excludes = set()
+    for exclude in excludes:
+      path = os.path.realpath(os.path.join(self._root_dir, exclude))
+      relpath = os.path.relpath(path, self._root_dir)
+      if relpath != os.curdir and not relpath.startswith(os.pardir):
+        self._excludes.add(relpath)
+
+  @property
+  def root_dir(self):
+    return self._root_dir
+
+  @property
+  def excludes(self):
+    """The excluded directories, relative to the root."""
+    return sorted(self._excludes)
+
+  @property
+  def exhausted(self):
+    """True if this watcher can no longer track changes, and should be replaced by another."""
+    return False
+
+  def watches(self, path):
+    """Returns True if changes to the file at the given absolute path are tracked.
+
+    Files reached through symlinks, or that are symlinks themselves, are not: their content can
+    change without any change under the root.
+    """
+    relpath = os.path.relpath(path, self._root_dir)
+    return (not relpath.startswith(os.pardir) and not self._is_excluded(relpath) and
+            self._tracks(relpath))
+
+  @abstractmethod
+  def _tracks(self, relpath):
+    """Returns True if changes to the file at the given relative path, if not excluded, are tracked.
+    """
+
+  def _is_excluded(self, relpath):
+    while relpath:
+      if relpath in self._excludes:
+        return True
+      relpath = os.path.dirname(relpath)
+    return False
+
+  def _walk(self):
+    """Yields the relative path of each (directory, list of its entries) under the root."""
+    for root, dirs, files in os.walk(self._root_dir, topdown=True):
+      relroot = os.path.relpath(root, self._root_dir)
+      relroot = '' if relroot == os.curdir else relroot
+      dirs[:] = [d for d in dirs if not self._is_excluded(os.path.join(relroot, d))]
+      yield relroot, dirs, files
+
+  @abstractmethod
+  def start(self):
+    """Starts tracking changes.
+
+    :raises: `Watcher.Error` if the root, or a directory under it, can't be watched.
+    """
+
+  @abstractmethod
+  def stop(self):
+    """Stops tracking changes and releases any resources held."""
+
+  @abstractmethod
+  def drain(self):
+    """Returns the `Changes` since the last drain, or since the start.
+
+    Changes made before the call are always included.
+
+    :returns: The changes, or None if track of them was lost, in which case anything may have
+              changed.
+    """
+
+
+class PollingWatcher(Watcher):
+  """Finds changes by comparing the stats of everything under the root at each drain.
+
+  A fallback for platforms without a filesystem notification API, or when the watch limit is
+  reached.  Each drain walks the whole tree, but only stats: nothing is read.
+  """
+
+  def __init__(self, root_dir, excludes=()):
+    super(PollingWatcher, self).__init__(root_dir, excludes)
+    self._snapshot = None
+
+  def start(self):
+    if not os.path.isdir(self._root_dir):
+      raise self.Error('Not a directory: {}'.format(self._root_dir))
+    self._snapshot = self._take_snapshot()
+
+  def stop(self):
+    self._snapshot = None
+
+  def drain(self):
+    snapshot = self._take_snapshot()
+    files = set()
+    dirs = set()
+    for path, (is_dir, key) in snapshot.items():
+      previous = self._snapshot.get(path)
+      if previous is None or previous[0] != is_dir:
+        (dirs if is_dir else files).add(path)
+      elif not is_dir and previous[1] != key:
+        files.add(path)
+    for path, (is_dir, _) in self._snapshot.items():
+      if path not in snapshot:
+        (dirs if is_dir else files).add(path)
+    self._snapshot = snapshot
+    return Changes(files, dirs)
+
+  def _tracks(self, relpath):
+    entry = (self._snapshot or {}).get(relpath)
+    # Directories are walked without following symlinks, so only real paths are in the snapshot.
+    return entry is not None and not entry[0] and not stat.S_ISLNK(entry[1][3])
+
+  def _take_snapshot(self):
+    # relative path -> (is_dir, stat key).
+    snapshot = {}
+    for relroot, dirs, files in self._walk():
+      for name in dirs:
+        snapshot[os.path.join(relroot, name)] = (True, None)
+      for name in files:
+        relpath = os.path.join(relroot, name)
+        try:
+          st = os.lstat(os.path.join(self._root_dir, relpath))
+        except OSError:
+          continue
+        snapshot[relpath] = (False, (st.st_mtime, st.st_size, st.st_ino, st.st_mode))
+    return snapshot
+
+
+class InotifyWatcher(Watcher):
+  """Finds changes with Linux's inotify, so that no work is done for the paths that don't change.
+
+  Every directory under the root is watched.  Events are read as they arrive, by a background
+  thread, and again at each drain so that none are missed.  Once a directory fails to be watched,
+  e.g. as the watch limit is reached, the watcher is exhausted: it loses track of changes for good.
+  """
+
+  # From <sys/inotify.h>.
+  IN_MODIFY = 0x00000002
+  IN_ATTRIB = 0x00000004
+  IN_MOVED_FROM = 0x00000040
+  IN_MOVED_TO = 0x00000080
+  IN_CREATE = 0x00000100
+  IN_DELETE = 0x00000200
+  IN_DELETE_SELF = 0x00000400
+  IN_MOVE_SELF = 0x00000800
+  IN_Q_OVERFLOW = 0x00004000
+  IN_IGNORED = 0x00008000
+  IN_ONLYDIR = 0x01000000
+  IN_DONT_FOLLOW = 0x02000000
+  IN_ISDIR = 0x40000000
+  IN_NONBLOCK = os.O_NONBLOCK
+  IN_CLOEXEC = 0o2000000
+
+  WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+                IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+  EVENT_FMT = b'iIII'
+  EVENT_SIZE = struct.calcsize(EVENT_FMT)
+
+  _libc = None
+
+  @classmethod
+  def _get_libc(cls):
+    if cls._libc is None:
+      libc = ctypes.CDLL(ctypes.util.find_library(str('c')), use_errno=True)
+      libc.inotify_init1.argtypes = [ctypes.c_int]
+      libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+      libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+      cls._libc = libc
+    return cls._libc
+
+  @classmethod
+  def is_supported(cls):
+    """Returns True if inotify is available on this platform."""
+    if not sys.platform.startswith('linux'):
+      return False
+    try:
+      cls._get_libc()
+      return True
+    except (AttributeError, OSError):
+      return False
+
+  def __init__(self, root_dir, excludes=()):
+    super(InotifyWatcher, self).__init__(root_dir, excludes)
+    self._lock = threading.Lock()
+    self._fd = None
+    self._thread = None
+    self._stopping = threading.Event()
+    # Watch descriptor -> relative path of the watched directory, and back.
+    self._paths_by_wd = {}
+    self._wds_by_path = {}
+    self._files = set()
+    self._dirs = set()
+    self._lost_track = False
+    self._exhausted = False
+
+  @property
+  def exhausted(self):
+    return self._exhausted
+
+  def start(self):
+    libc = self._get_libc()
+    fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+    if fd < 0:
+      raise self.Error('Failed to initialize inotify: {}'.format(os.strerror(ctypes.get_errno())))
+    self._fd = fd
+    try:
+      self._watch_tree('')
+    except self.Error:
+      self.stop()
+      raise
+    self._stopping.clear()
+    self._thread = threading.Thread(target=self._read_forever, name='inotify-watcher')
+    self._thread.daemon = True
+    self._thread.start()
+
+  def stop(self):
+    self._stopping.set()
+    if self._thread:
+      self._thread.join()
+      self._thread = None
+    if self._fd is not None:
+      os.close(self._fd)
+      self._fd = None
+    self._paths_by_wd.clear()
+    self._wds_by_path.clear()
+
+  def drain(self):
+    with self._lock:
+      self._read_events()
+      changes = None if self._lost_track or self._exhausted else Changes(self._files, self._dirs)
+      self._files = set()
+      self._dirs = set()
+      self._lost_track = False
+      return changes
+
+  def _tracks(self, relpath):
+    with self._lock:
+      # Directories are walked without following symlinks, so only real paths are watched.
+      watched = os.path.dirname(relpath) in self._wds_by_path
+    return watched and not os.path.islink(os.path.join(self._root_dir, relpath))
+
+  def _read_forever(self):
+    while not self._stopping.is_set():
+      readable, _, _ = select.select([self._fd], [], [], 0.1)
+      if readable:
+        with self._lock:
+          if not self._stopping.is_set():
+            self._read_events()
+
+  def _read_events(self):
+    buff = b''
+    while True:
+      try:
+        data = os.read(self._fd, 64 * 1024)
+      except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EINTR):
+          break
+        raise
+      if not data:
+        break
+      buff += data
+    offset = 0
+    while offset + self.EVENT_SIZE <= len(buff):
+      wd, mask, _, length = struct.unpack_from(self.EVENT_FMT, buff, offset)
+      offset += self.EVENT_SIZE
+      name = buff[offset:offset + length].rstrip(b'\0').decode(sys.getfilesystemencoding())
+      offset += length
+      self._handle_event(wd, mask, name)
+
+  def _handle_event(self, wd, mask, name):
+    if mask & self.IN_Q_OVERFLOW:
+      self._lost_track = True
+      return
+    dirpath = self._paths_by_wd.get(wd)
+    if mask & self.IN_IGNORED:
+      # The directory is gone, or we stopped watching it.
+      if dirpath is not None:
+        self._unmap_watch(wd)
+      return
+    if dirpath is None:
+      return
+    if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+      if not dirpath:
+        logger.warning('The watched root {} was moved or deleted'.format(self._root_dir))
+        self._lost_track = True
+      # Otherwise the event on the parent directory accounts for it.
+      return
+    if not name:
+      return
+    path = os.path.join(dirpath, name)
+    if self._is_excluded(path):
+      return
+    if mask & self.IN_ISDIR:
+      if mask & (self.IN_MODIFY | self.IN_ATTRIB):
+        return
+      self._dirs.add(path)
+      if mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+        self._unwatch_tree(path)
+      elif not self._exhausted:
+        try:
+          self._watch_tree(path)
+        except self.Error as e:
+          # Changes under the directories we failed to watch would go unnoticed from here on.
+          logger.warning('Lost track of changes under {}: {}'.format(self._root_dir, e))
+          self._exhausted = True
+    else:
+      self._files.add(path)
+
+  def _watch_tree(self, relpath):
+    """Watches the given directory, and every directory under it."""
+    top = os.path.join(self._root_dir, relpath)
+    for root, dirs, _ in os.walk(top, topdown=True):
+      relroot = os.path.relpath(root, self._root_dir)
+      relroot = '' if relroot == os.curdir else relroot
+      dirs[:] = [d for d in dirs if not self._is_excluded(os.path.join(relroot, d))]
+      if not self._add_watch(relroot) and root == top and not relpath:
+        raise self.Error('Failed to watch {}'.format(self._root_dir))
+
+  def _add_watch(self, relpath):
+    """Watches the given directory, returning False if it is gone or can't be read.
+
+    :raises: `Watcher.Error` if the directory can't be watched for any other reason, e.g. as the
+             watch limit is reached.
+    """
+    path = os.path.join(self._root_dir, relpath).encode(sys.getfilesystemencoding())
+    wd = self._get_libc().inotify_add_watch(self._fd, path, self.WATCH_MASK)
+    if wd < 0:
+      err = ctypes.get_errno()
+      if err == errno.ENOSPC:
+        raise self.Error('Ran out of inotify watches watching {}.  Consider raising '
+                         'fs.inotify.max_user_watches'.format(self._root_dir))
+      elif err not in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+        raise self.Error('Failed to watch {}: {}'.format(path, os.strerror(err)))
+      return False
+    # A moved directory keeps its watch descriptor: forget its old path.
+    old_path = self._paths_by_wd.get(wd)
+    if old_path is not None and self._wds_by_path.get(old_path) == wd:
+      del self._wds_by_path[old_path]
+    self._paths_by_wd[wd] = relpath
+    self._wds_by_path[relpath] = wd
+    return True
+
+  def _unwatch_tree(self, relpath):
+    """Stops watching the given directory, and every directory under it."""
+    prefix = relpath + os.sep
+    for path, wd in list(self._wds_by_path.items()):
+      if path == relpath or path.startswith(prefix):
+        self._unmap_watch(wd)
+        # Fails harmlessly if the directory is already gone.
+        self._get_libc().inotify_rm_watch(self._fd, wd)
+
+  def _unmap_watch(self, wd):
+    path = self._paths_by_wd.pop(wd, None)
+    if path is not None and self._wds_by_path.get(path) == wd:
+      del self._wds_by_path[path]
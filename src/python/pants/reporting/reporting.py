@@ -17,6 +17,7 @@ from pants.reporting.plaintext_reporter import LabelFormat, PlainTextReporter, T
 from pants.reporting.quiet_reporter import QuietReporter
 from pants.reporting.report import Report, ReportingError
 from pants.reporting.reporting_server import ReportingServerManager
+from pants.reporting.trace_reporter import TraceReporter
 from pants.subsystem.subsystem import Subsystem
 from pants.util.dirutil import relative_symlink, safe_mkdir, safe_rmtree
 
@@ -34,6 +35,10 @@ class Reporting(Subsystem):
              help='Write reports to this dir.')
     register('--template-dir', advanced=True, metavar='<dir>', default=None,
              help='Find templates for rendering in this dir.')
+    register('--trace', advanced=True, action='store_true', default=True,
+             help='Write the timeline of the run\'s workunits to the run\'s reports dir, as '
+                  'Chrome trace-event json (trace.json) and as collapsed stacks for flamegraphs '
+                  '(flamegraph.txt).')
     register('--console-label-format', advanced=True, type=dict_option,
              default=PlainTextReporter.LABEL_FORMATTING,
              help='Controls the printing of workunit labels to the console.  Workunit types are '
@@ -84,6 +89,13 @@ class Reporting(Subsystem):
     html_reporter = HtmlReporter(run_tracker, html_reporter_settings)
     report.add_reporter('html', html_reporter)
 
+    if self.get_options().trace:
+      trace_reporter_settings = TraceReporter.Settings(
+        log_level=Report.INFO,
+        trace_file=os.path.join(run_dir, 'trace.json'),
+        flamegraph_file=os.path.join(run_dir, 'flamegraph.txt'))
+      report.add_reporter('trace', TraceReporter(run_tracker, trace_reporter_settings))
+
     # Add some useful RunInfo.
     run_tracker.run_info.add_info('default_report', html_reporter.report_path())
     port = ReportingServerManager().socket
@@ -0,0 +1,108 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+
+from pants.base.workunit import WorkUnit
+from pants.reporting.reporter import Reporter
+
+
+class TraceReporter(Reporter):
+  """Writes the timeline of a run's workunits for offline analysis.
+
+  Two files are written when the report closes, each optional, into existing directories:
+
+  - trace_file: The workunits as Chrome trace-event json, which can be loaded into
+    chrome://tracing or any compatible trace viewer.  Each workunit is a complete event on the
+    thread that ran it, so work on worker pool threads, including the background ones, shows up in
+    parallel with the main thread.
+  - flamegraph_file: The workunits as collapsed stacks, one `a;b;c <microseconds>` line per
+    workunit path, weighted by the time spent in the workunit outside its children, for input to
+    flamegraph.pl and similar tools.
+  """
+
+  Settings = namedtuple('Settings', Reporter.Settings._fields + ('trace_file', 'flamegraph_file'))
+
+  def __init__(self, run_tracker, settings):
+    super(TraceReporter, self).__init__(run_tracker, settings)
+    # Workunit id -> (thread ident, thread name) of the thread it started on.
+    self._threads_by_workunit = {}
+    self._ended = []
+
+  def start_workunit(self, workunit):
+    """Implementation of Reporter callback."""
+    thread = threading.current_thread()
+    self._threads_by_workunit[workunit.id] = (thread.ident, thread.name)
+
+  def end_workunit(self, workunit):
+    """Implementation of Reporter callback."""
+    if workunit.id not in self._threads_by_workunit:
+      # Started before this reporter was added, which only happens to roots.
+      self.start_workunit(workunit)
+    self._ended.append(workunit)
+
+  def close(self):
+    """Implementation of Reporter callback."""
+    if self.settings.trace_file:
+      self._write(self.settings.trace_file, json.dumps(self.trace_events()))
+    if self.settings.flamegraph_file:
+      self._write(self.settings.flamegraph_file,
+                  ''.join('{} {}\n'.format(stack, micros)
+                          for stack, micros in self.collapsed_stacks().items()))
+
+  def trace_events(self):
+    """Returns the ended workunits as a Chrome trace-event json object."""
+    pid = os.getpid()
+    origin = self.run_tracker.run_timestamp
+    tids = OrderedDict()
+    events = []
+    for workunit in self._ended:
+      ident, name = self._threads_by_workunit[workunit.id]
+      tid = tids.setdefault(ident, (len(tids) + 1, name))[0]
+      events.append({
+        'name': workunit.name,
+        'cat': ','.join(sorted(workunit.labels)) or 'workunit',
+        'ph': 'X',
+        'ts': self._micros(workunit.start_time - origin),
+        'dur': self._micros(workunit.duration()),
+        'pid': pid,
+        'tid': tid,
+        'args': {
+          'path': workunit.path(),
+          'outcome': WorkUnit.outcome_string(workunit.outcome()),
+          'cmd': workunit.cmd or '',
+        },
+      })
+    metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                 'args': {'name': self.run_tracker.run_info.get_info('id') or 'pants'}}]
+    for tid, name in tids.values():
+      metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                       'args': {'name': name}})
+    return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+  def collapsed_stacks(self):
+    """Returns an ordered map of collapsed stack -> microseconds spent in its innermost workunit."""
+    stacks = defaultdict(int)
+    for workunit in self._ended:
+      stack = ';'.join(w.name.replace(';', '_') for w in reversed(workunit.ancestors()))
+      # Children run concurrently can account for more than their parent's duration.
+      stacks[stack] += self._micros(max(0, workunit._self_time()))
+    return OrderedDict(sorted(stacks.items()))
+
+  @staticmethod
+  def _micros(secs):
+    return int(round(secs * 1000000))
+
+  @staticmethod
+  def _write(path, content):
+    # Check existence in case we're a clean-all. We don't want to write anything in that case.
+    if os.path.exists(os.path.dirname(path)):
+      with open(path, 'w') as fp:
+        fp.write(content)
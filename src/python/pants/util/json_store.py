@@ -0,0 +1,64 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import errno
+import json
+import logging
+
+from pants.util.dirutil import safe_concurrent_create
+
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStore(object):
+  """A json document persisted to a file, stamped with the version of its format.
+
+  Meant for state that can always be recomputed, e.g. caches and indexes: a missing or corrupt file,
+  or one stamped with another version, loads as no document at all.  Saves replace the file
+  wholesale, so concurrent readers, in this process or others, never see a partial document.
+  """
+
+  def __init__(self, path, version):
+    """
+    :param string path: The file to load the document from, and save it to.
+    :param version: A json-serializable value that a saved document must be stamped with to load,
+                    e.g. a format version number, or a list of it and a fingerprint of the inputs
+                    the document depends on.
+    """
+    self._path = path
+    # Compare with versions as they load, e.g. with tuples as lists.
+    self._version = json.loads(json.dumps(version))
+
+  @property
+  def path(self):
+    return self._path
+
+  def load(self):
+    """Returns the saved document, or None if there is none of our version."""
+    try:
+      with open(self._path, 'rb') as fp:
+        data = json.load(fp)
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return None
+    except ValueError:
+      logger.debug('Ignoring corrupt json store at {}'.format(self._path))
+      return None
+    if not isinstance(data, dict) or data.get('version') != self._version:
+      return None
+    return data.get('document')
+
+  def save(self, document):
+    """Saves the json-serializable `document`, replacing any saved before."""
+    data = json.dumps({'version': self._version, 'document': document})
+
+    def write(path):
+      with open(path, 'wb') as fp:
+        fp.write(data)
+    safe_concurrent_create(write, self._path)
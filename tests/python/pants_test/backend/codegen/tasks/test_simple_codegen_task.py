@@ -96,7 +96,7 @@ class SimpleCodegenTaskTest(TaskTestBase):
                          'Codegen workdir suffix should be stable given the same target!\n'
                          '  target: {}'.format(target.address.spec))
 
-  def _test_execute_strategy(self, strategy, expected_execution_count):
+  def _test_execute_strategy(self, strategy, expected_execution_count, **options):
     dummy_suffixes = ['a', 'b', 'c']
 
     self.add_to_build_file('gen-lib', '\n'.join(dedent('''
@@ -110,7 +110,7 @@ class SimpleCodegenTaskTest(TaskTestBase):
                        'org.pantsbuild.example Foo{0}'.format(suffix))
 
     targets = [self.target('gen-lib:{suffix}'.format(suffix=suffix)) for suffix in dummy_suffixes]
-    task = self._create_dummy_task(target_roots=targets, strategy=strategy)
+    task = self._create_dummy_task(target_roots=targets, strategy=strategy, **options)
     expected_targets = set(targets)
     found_targets = set(task.codegen_targets())
     self.assertEqual(expected_targets, found_targets,
@@ -128,6 +128,52 @@ class SimpleCodegenTaskTest(TaskTestBase):
   def test_execute_isolated(self):
     self._test_execute_strategy('isolated', 3)
 
+  def test_execute_isolated_concurrently(self):
+    self._test_execute_strategy('isolated', 3, worker_count=2)
+
+  def _create_dependent_dummy_targets(self):
+    # a <- b <- c, and a <- d; e is independent.
+    dependencies_by_name = {'a': [], 'b': [':a'], 'c': [':b'], 'd': [':a'], 'e': []}
+    self.add_to_build_file('gen-deps', '\n'.join(dedent('''
+      dummy_library(name='{name}',
+        sources=['org/pantsbuild/example/{name}.dummy'],
+        dependencies={dependencies},
+      )
+    ''').format(name=name, dependencies=dependencies)
+      for name, dependencies in sorted(dependencies_by_name.items())))
+    for name in dependencies_by_name:
+      self.create_file('gen-deps/org/pantsbuild/example/{}.dummy'.format(name),
+                       'org.pantsbuild.example {}'.format(name.upper()))
+    return [self.target('gen-deps:{}'.format(name)) for name in sorted(dependencies_by_name)]
+
+  def test_execute_isolated_concurrently_in_dependency_order(self):
+    targets = self._create_dependent_dummy_targets()
+    task = self._create_dummy_task(target_roots=targets, strategy='isolated', worker_count=3)
+    task.execute()
+
+    generated = task.generated_specs
+    self.assertEqual(sorted(t.address.spec for t in targets), sorted(generated))
+    for target in targets:
+      # NB: Skip the synthetic targets execute injected as dependencies.
+      for dependency in set(target.dependencies) & set(targets):
+        self.assertLess(generated.index(dependency.address.spec),
+                        generated.index(target.address.spec))
+
+  def test_execute_isolated_concurrently_fail(self):
+    targets = self._create_dependent_dummy_targets()
+    task = self._create_dummy_task(target_roots=targets, strategy='isolated', worker_count=3)
+    task.failing_specs = set(['gen-deps:b', 'gen-deps:e'])
+    with self.assertRaises(TaskError) as cm:
+      task.execute()
+
+    # The dependee of a failed target is not generated, but the rest are.
+    self.assertEqual(['gen-deps:a', 'gen-deps:d'], sorted(task.generated_specs))
+    message = str(cm.exception)
+    self.assertIn('Failed to generate 2 of 5 targets', message)
+    self.assertIn('gen-deps:b: Failed to generate target(s)', message)
+    self.assertIn('gen-deps:e: Failed to generate target(s)', message)
+    self.assertNotIn('gen-deps:c', message)
+
   def test_execute_fail(self):
     # Ensure whichever strategy is selected, it actually call execute_codegen to trigger our
     # DummyTask `should_fail` logic.  The isolated strategy, for example, short circuits that call
@@ -232,6 +278,7 @@ class SimpleCodegenTaskTest(TaskTestBase):
     """
     _forced_codegen_strategy = None
     _hard_forced_codegen_strategy = None
+    _supports_concurrent_execution = True
 
     def __init__(self, *vargs, **kwargs):
       super(SimpleCodegenTaskTest.DummyGen, self).__init__(*vargs, **kwargs)
@@ -239,7 +286,9 @@ class SimpleCodegenTaskTest(TaskTestBase):
       self._all_targets = None
       self.setup_for_testing(None, None)
       self.should_fail = False
+      self.failing_specs = set()
       self.execution_counts = 0
+      self.generated_specs = []
 
     def setup_for_testing(self, test_case, all_targets, forced_codegen_strategy=None,
                           hard_strategy_force=False):
@@ -283,6 +332,8 @@ class SimpleCodegenTaskTest(TaskTestBase):
     def execute_codegen(self, invalid_targets):
       self.execution_counts += 1
       if self.should_fail: raise TaskError('Failed to generate target(s)')
+      if any(t.address.spec in self.failing_specs for t in invalid_targets):
+        raise TaskError('Failed to generate target(s)')
       if self.codegen_strategy.name() == 'isolated':
         self._test_case.assertEqual(1, len(invalid_targets),
                                     'Codegen should execute individually in isolated mode.')
@@ -307,6 +358,7 @@ class SimpleCodegenTaskTest(TaskTestBase):
             f.write('package {0};\n\n'.format(package_name))
             f.write('public class {0} '.format(class_name))
             f.write('{\n\\\\ ... nothing ... \n}\n')
+      self.generated_specs.extend(t.address.spec for t in invalid_targets)
 
     def sources_generated_by_target(self, target):
       self._test_case.assertEqual('global', self.codegen_strategy.name(),
@@ -0,0 +1,149 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import unittest
+from io import BytesIO
+from textwrap import dedent
+
+from pants.backend.jvm.tasks.jvm_compile.analysis_parser import ParseError
+from pants.backend.jvm.tasks.jvm_compile.scala.zinc_indexed_analysis import IndexedZincAnalysis
+from pants.util.contextutil import temporary_dir
+
+
+class IndexedZincAnalysisTest(unittest.TestCase):
+
+  ANALYSIS = dedent("""
+    format version: 5
+    output mode:
+    1 items
+    0 -> single
+    products:
+    3 items
+    /src/A.scala -> /classes/A.class
+    /src/B.scala -> /classes/B.class
+    /src/C.scala -> /classes/C.class
+    binary dependencies:
+    1 items
+    /src/A.scala -> /jars/x.jar
+    direct source dependencies:
+    2 items
+    /src/A.scala -> /src/B.scala
+    /src/B.scala -> /src/C.scala
+    direct external dependencies:
+    1 items
+    /src/C.scala -> ext.D
+    class names:
+    3 items
+    /src/A.scala -> A
+    /src/B.scala -> B
+    /src/C.scala -> C
+    product stamps:
+    3 items
+    /classes/A.class -> lastModified(1)
+    /classes/B.class -> lastModified(2)
+    /classes/C.class -> lastModified(3)
+    source stamps:
+    3 items
+    /src/A.scala -> hash(a)
+    /src/B.scala -> hash(b)
+    /src/C.scala -> hash(c)
+    binary stamps:
+    1 items
+    /jars/x.jar -> lastModified(4)
+    class names:
+    1 items
+    /jars/x.jar -> x.X
+    internal apis:
+    3 items
+    /src/A.scala -> apiA
+    /src/B.scala -> apiB
+    /src/C.scala -> apiC
+    external apis:
+    1 items
+    ext.D -> apiD
+    compilations:
+    1 items
+    0 -> compilation
+  """).lstrip().encode('utf-8')
+
+  def setUp(self):
+    self.tmpdir_context = temporary_dir()
+    self.tmpdir = self.tmpdir_context.__enter__()
+    self.addCleanup(self.tmpdir_context.__exit__, None, None, None)
+    self.analysis = self.from_text(self.ANALYSIS, 'analysis.idx')
+
+  def from_text(self, text, name):
+    return IndexedZincAnalysis.from_text(BytesIO(text), os.path.join(self.tmpdir, name))
+
+  def to_text(self, analysis):
+    outfile = BytesIO()
+    analysis.to_text(outfile)
+    return outfile.getvalue()
+
+  def test_round_trip(self):
+    self.assertTrue(IndexedZincAnalysis.is_indexed_analysis(self.analysis.path))
+    self.assertEqual(self.ANALYSIS, self.to_text(IndexedZincAnalysis(self.analysis.path)))
+
+  def test_not_indexed(self):
+    path = os.path.join(self.tmpdir, 'analysis.txt')
+    with open(path, 'wb') as fp:
+      fp.write(self.ANALYSIS)
+    self.assertFalse(IndexedZincAnalysis.is_indexed_analysis(path))
+    with self.assertRaises(ParseError):
+      IndexedZincAnalysis(path)
+
+  def test_bad_text(self):
+    with self.assertRaises(ParseError):
+      self.from_text(b'format version: 5\nproducts:\n1 items\n', 'truncated.idx')
+    with self.assertRaises(ParseError):
+      self.from_text(b'format version: 5\nproducts:\n1 items\n/src/A.scala\n', 'bad.idx')
+
+  def test_products(self):
+    self.assertEqual({'/src/A.scala': ['/classes/A.class']},
+                     self.analysis.products(['/src/A.scala', '/src/Missing.scala']))
+    self.assertEqual(3, len(self.analysis.products()))
+
+  def test_deps(self):
+    self.assertEqual({'/src/A.scala': ['/jars/x.jar', '/src/B.scala'],
+                      '/src/C.scala': [os.path.join('/classes', 'ext', 'D.class')]},
+                     self.analysis.deps('/classes', ['/src/A.scala', '/src/C.scala']))
+
+  def test_split(self):
+    a_path = os.path.join(self.tmpdir, 'a.idx')
+    rest_path = os.path.join(self.tmpdir, 'rest.idx')
+    self.analysis.split_to_paths([(['/src/A.scala'], a_path)], catchall_path=rest_path)
+
+    a = IndexedZincAnalysis(a_path)
+    self.assertEqual({'/src/A.scala'}, a.sources())
+    headers = a.headers
+    records = lambda header: dict(a.records(headers.index(header)))
+    # A's dep on B, now in another split, is on B's class instead.
+    self.assertEqual({}, records('direct source dependencies'))
+    self.assertEqual({'/src/A.scala': ['B']}, records('direct external dependencies'))
+    self.assertEqual({'B': ['apiB']}, records('external apis'))
+    self.assertEqual({'/classes/A.class': ['lastModified(1)']}, records('product stamps'))
+    self.assertEqual({'/jars/x.jar': ['lastModified(4)']}, records('binary stamps'))
+    self.assertEqual({'0': ['compilation']}, records('compilations'))
+
+    rest = IndexedZincAnalysis(rest_path)
+    self.assertEqual({'/src/B.scala', '/src/C.scala'}, rest.sources())
+    self.assertEqual({}, rest.products(['/src/A.scala']))
+    self.assertEqual({'ext.D': ['apiD']}, dict(rest.records(rest.headers.index('external apis'))))
+    self.assertEqual({}, dict(rest.records(rest.headers.index('binary stamps'))))
+
+    # Merging the splits recovers the original, internal deps and all.
+    merged_path = os.path.join(self.tmpdir, 'merged.idx')
+    IndexedZincAnalysis.merge_from_paths([a_path, rest_path], merged_path)
+    self.assertEqual(self.ANALYSIS, self.to_text(IndexedZincAnalysis(merged_path)))
+
+  def test_merge_later_wins(self):
+    newer = self.from_text(self.ANALYSIS.replace(b'hash(a)', b'hash(a2)'), 'newer.idx')
+    merged = IndexedZincAnalysis.merge_to_path([self.analysis, newer],
+                                               os.path.join(self.tmpdir, 'merged.idx'))
+    self.assertEqual({'/src/A.scala': ['hash(a2)']},
+                     dict(merged.records(merged.headers.index('source stamps'), ['/src/A.scala'])))
@@ -0,0 +1,204 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import argparse
+import base64
+import os
+import random
+import time
+
+from pants.backend.jvm.tasks.jvm_compile.scala.zinc_indexed_analysis import IndexedZincAnalysis
+from pants.util.contextutil import temporary_dir
+
+
+# Compares the zinc text analysis format with the indexed one on the operations the global compile
+# strategy performs on its global analysis: splitting out the analysis of a few invalidated sources,
+# merging it back, and looking up products.
+#
+# The analysis is synthetic: each source produces a class or two, depends on a few nearby sources,
+# an external class and a jar, and has an api blob of a realistic size.
+#
+# Zinc only reads and writes the text format, so the indexed format only pays off for an analysis
+# kept in it between operations.  The "text to text" timings show what splitting and merging zinc's
+# text analyses by way of the indexed format costs, conversions included, for comparison with the
+# text format's split and merge.
+#
+# The text format timings need zincutils, and are skipped if it can't be imported.
+#
+# Run with: ./pants run tests/python/pants_test/backend/jvm/tasks/jvm_compile/scala:zinc_indexed_analysis_benchmark -- --help
+
+
+def write_text_analysis(path, num_sources, seed=0):
+  rng = random.Random(seed)
+  sources = ['/src/org/pantsbuild/pkg{}/Source{}.scala'.format(i // 20, i)
+             for i in range(num_sources)]
+  jars = ['/jars/lib{}.jar'.format(i) for i in range(200)]
+  externals = ['org.external.pkg{}.Class{}'.format(i // 20, i) for i in range(1000)]
+
+  sections = []
+
+  def section(header, items):
+    sections.append((header, items))
+
+  products = [(s, '/classes/{}.class'.format(s[5:-6])) for s in sources]
+  products += [(s, '/classes/{}$.class'.format(s[5:-6])) for s in sources if rng.random() < 0.3]
+  products.sort()
+  source_deps = sorted(set((s, sources[max(0, i - rng.randint(1, 100))])
+                           for i, s in enumerate(sources) if i > 0 for _ in range(3)))
+  external_deps = sorted((s, rng.choice(externals)) for s in sources)
+  binary_deps = sorted((s, rng.choice(jars)) for s in sources)
+  class_names = [(s, 'org.pantsbuild.{}'.format(s[5:-6].replace('/', '.'))) for s in sources]
+
+  def blob(size):
+    return base64.b64encode(os.urandom(size)).decode('ascii')
+
+  section('output mode', [('0', 'single')])
+  section('output directories', [('/src', '/classes')])
+  section('compile options', [('0', '-deprecation')])
+  section('javac options', [])
+  section('compiler version', [('0', '2.10.4')])
+  section('compile order', [('0', 'Mixed')])
+  section('name hashing', [('0', 'false')])
+  section('products', products)
+  section('binary dependencies', binary_deps)
+  section('direct source dependencies', source_deps)
+  section('direct external dependencies', external_deps)
+  section('public inherited source dependencies', source_deps[::5])
+  section('public inherited external dependencies', external_deps[::5])
+  section('member reference internal dependencies', [])
+  section('member reference external dependencies', [])
+  section('inheritance internal dependencies', [])
+  section('inheritance external dependencies', [])
+  section('class names', class_names)
+  section('used names', [])
+  section('product stamps', sorted((p, 'lastModified(1436000000000)') for _, p in products))
+  section('source stamps', [(s, blob(20)) for s in sources])
+  section('binary stamps', [(j, 'lastModified(1436000000000)') for j in jars])
+  section('class names', [(j, 'org.external.Lib{}'.format(i)) for i, j in enumerate(jars)])
+  section('internal apis', [(s, blob(1500)) for s in sources])
+  section('external apis', [(e, blob(1500)) for e in externals])
+  section('source infos', [(s, blob(30)) for s in sources])
+  section('compilations', [('0', blob(100))])
+
+  with open(path, 'wb') as fp:
+    fp.write(b'format version: 5\n')
+    for header, items in sections:
+      fp.write('{}:\n{} items\n'.format(header, len(items)).encode('utf-8'))
+      for key, value in items:
+        fp.write('{} -> {}\n'.format(key, value).encode('utf-8'))
+  return sources
+
+
+def timed(func, *args, **kwargs):
+  start = time.time()
+  result = func(*args, **kwargs)
+  return result, time.time() - start
+
+
+def report(name, secs):
+  print('{:<40} {:>10}'.format(name, '{:.2f}'.format(secs)))
+
+
+def benchmark_text(workdir, text_path, invalid, few):
+  try:
+    from pants.backend.jvm.tasks.jvm_compile.analysis_tools import AnalysisTools
+    from pants.backend.jvm.tasks.jvm_compile.scala.zinc_analysis import ZincAnalysis
+    from pants.backend.jvm.tasks.jvm_compile.scala.zinc_analysis_parser import ZincAnalysisParser
+  except ImportError as e:
+    print('Skipping the text format, which needs zincutils: {}'.format(e))
+    return
+  parser = ZincAnalysisParser()
+  tools = AnalysisTools(None, parser, ZincAnalysis)
+  invalid_path = os.path.join(workdir, 'invalid.txt')
+  valid_path = os.path.join(workdir, 'valid.txt')
+  merged_path = os.path.join(workdir, 'merged.txt')
+  _, secs = timed(tools.split_to_paths, text_path, [(invalid, invalid_path)], valid_path)
+  report('text: split', secs)
+  _, secs = timed(tools.merge_from_paths, [valid_path, invalid_path], merged_path)
+  report('text: merge', secs)
+  _, secs = timed(parser.parse_products_from_path, text_path, '/classes')
+  report('text: products', secs)
+  _, secs = timed(parser.parse_deps_from_path, text_path, lambda: {}, '/classes')
+  report('text: deps', secs)
+
+
+def split_text_by_way_of_indexed(workdir, text_path, invalid, invalid_path, valid_path):
+  analysis = IndexedZincAnalysis.from_text_path(text_path, os.path.join(workdir, 'split_in.idx'))
+  indexed_invalid_path = os.path.join(workdir, 'split_invalid.idx')
+  indexed_valid_path = os.path.join(workdir, 'split_valid.idx')
+  analysis.split_to_paths([(invalid, indexed_invalid_path)], indexed_valid_path)
+  IndexedZincAnalysis(indexed_invalid_path).to_text_path(invalid_path)
+  IndexedZincAnalysis(indexed_valid_path).to_text_path(valid_path)
+
+
+def merge_text_by_way_of_indexed(workdir, text_paths, merged_path):
+  analyses = [IndexedZincAnalysis.from_text_path(path,
+                                                 os.path.join(workdir, 'merge_in{}.idx'.format(i)))
+              for i, path in enumerate(text_paths)]
+  merged = IndexedZincAnalysis.merge_to_path(analyses, os.path.join(workdir, 'merged_out.idx'))
+  merged.to_text_path(merged_path)
+
+
+def benchmark_indexed(workdir, text_path, invalid, few):
+  indexed_path = os.path.join(workdir, 'analysis.idx')
+  analysis, secs = timed(IndexedZincAnalysis.from_text_path, text_path, indexed_path)
+  report('indexed: convert from text', secs)
+  print('{:<40} {:>10}'.format('indexed: size (MB)',
+                               '{:.1f}'.format(os.path.getsize(indexed_path) / (1024 * 1024))))
+  _, secs = timed(analysis.to_text_path, os.path.join(workdir, 'roundtrip.txt'))
+  report('indexed: convert to text', secs)
+
+  invalid_path = os.path.join(workdir, 'invalid.idx')
+  valid_path = os.path.join(workdir, 'valid.idx')
+  merged_path = os.path.join(workdir, 'merged.idx')
+  _, secs = timed(IndexedZincAnalysis(indexed_path).split_to_paths,
+                  [(invalid, invalid_path)], valid_path)
+  report('indexed: split', secs)
+  _, secs = timed(IndexedZincAnalysis.merge_from_paths, [valid_path, invalid_path], merged_path)
+  report('indexed: merge', secs)
+  _, secs = timed(IndexedZincAnalysis(indexed_path).products)
+  report('indexed: products', secs)
+  _, secs = timed(IndexedZincAnalysis(indexed_path).products, few)
+  report('indexed: products of {} sources'.format(len(few)), secs)
+  _, secs = timed(IndexedZincAnalysis(indexed_path).deps, '/classes')
+  report('indexed: deps', secs)
+  _, secs = timed(IndexedZincAnalysis(indexed_path).deps, '/classes', few)
+  report('indexed: deps of {} sources'.format(len(few)), secs)
+
+  invalid_text_path = os.path.join(workdir, 'invalid_via_indexed.txt')
+  valid_text_path = os.path.join(workdir, 'valid_via_indexed.txt')
+  _, secs = timed(split_text_by_way_of_indexed, workdir, text_path, invalid, invalid_text_path,
+                  valid_text_path)
+  report('indexed: split, text to text', secs)
+  _, secs = timed(merge_text_by_way_of_indexed, workdir, [valid_text_path, invalid_text_path],
+                  os.path.join(workdir, 'merged_via_indexed.txt'))
+  report('indexed: merge, text to text', secs)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark the text and indexed zinc analysis '
+                                               'formats.')
+  parser.add_argument('--sources', type=int, default=50000,
+                      help='The number of sources in the generated analysis.')
+  parser.add_argument('--invalid-fraction', type=float, default=0.01,
+                      help='The fraction of sources to split out and merge back in.')
+  args = parser.parse_args()
+
+  with temporary_dir() as workdir:
+    text_path = os.path.join(workdir, 'analysis.txt')
+    sources = write_text_analysis(text_path, args.sources)
+    print('Analysis: {} sources, {:.1f} MB of text'.format(
+      args.sources, os.path.getsize(text_path) / (1024 * 1024)))
+    rng = random.Random(1)
+    invalid = rng.sample(sources, max(1, int(len(sources) * args.invalid_fraction)))
+    few = invalid[:100]
+    benchmark_text(workdir, text_path, invalid, few)
+    benchmark_indexed(workdir, text_path, invalid, few)
+
+
+if __name__ == '__main__':
+  main()
@@ -93,6 +93,26 @@ class IvyImportsTest(NailgunTaskTestBase):
       # but should still populate the ivy_imports product by target.
       check_compile([])
 
+  def test_concurrent_resolves(self):
+    with self.sample_jarfile('foo.jar') as jar_filename:
+      for name in ('foo', 'bar'):
+        self.add_to_build_file('unpack', dedent('''
+                unpacked_jars(name='{name}',
+                  libraries=['unpack/jars:foo-jars'],
+                 )
+                '''.format(name=name)))
+      self._make_jar_library("0.0.1", jar_filename)
+      targets = [self.target('unpack:foo'), self.target('unpack:bar')]
+
+      self.set_options(use_nailgun=False, resolve_concurrency=2)
+      ivy_imports_task = self.create_task(self.context(target_roots=targets))
+      self.assertEquals(set(targets), set(ivy_imports_task.execute()))
+      ivy_imports_product = ivy_imports_task.context.products.get('ivy_imports')
+      for target in targets:
+        self.verify_product_mapping(ivy_imports_product, target=target,
+                                    org='com.example', name='bar', conf='default',
+                                    expected_jar_filenames=['com.example-bar-0.0.1.jar'])
+
   def verify_product_mapping(self, ivy_imports_product, target=None, org=None, name=None, conf=None,
       expected_jar_filenames=None):
     """Verify that the ivy_import_product is formatted correctly.
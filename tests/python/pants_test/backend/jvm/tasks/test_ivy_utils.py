@@ -5,6 +5,7 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import json
 import os
 import xml.etree.ElementTree as ET
 from textwrap import dedent
@@ -12,9 +13,10 @@ from textwrap import dedent
 from mock import Mock
 
 from pants.backend.core.register import build_file_aliases as register_core
-from pants.backend.jvm.ivy_utils import IvyModuleRef, IvyUtils
+from pants.backend.jvm.ivy_utils import IvyInfo, IvyModuleRef, IvyResolveCache, IvyUtils
 from pants.backend.jvm.register import build_file_aliases as register_jvm
 from pants.backend.jvm.targets.exclude import Exclude
+from pants.backend.jvm.targets.jar_dependency import JarDependency
 from pants.ivy.ivy_subsystem import IvySubsystem
 from pants.util.contextutil import temporary_dir, temporary_file_path
 from pants_test.base_test import BaseTest
@@ -249,6 +251,16 @@ class IvyUtilsGenerateIvyTest(IvyUtilsTestBase):
           },
           result1)
 
+  def test_encode_decode(self):
+    ivy_info = self.parse_ivy_report('tests/python/pants_test/tasks/ivy_utils_resources/report_with_diamond.xml')
+    decoded = IvyInfo.decode(json.loads(json.dumps(ivy_info.encode())))
+
+    self.assertEqual(ivy_info.modules_by_ref, decoded.modules_by_ref)
+    ref = IvyModuleRef("toplevel", "toplevelmodule", "latest")
+    collector = lambda r: set([r])
+    self.assertEqual(ivy_info.traverse_dependency_graph(ref, collector),
+                     decoded.traverse_dependency_graph(ref, collector))
+
   def find_single(self, elem, xpath):
     results = list(elem.findall(xpath))
     self.assertEqual(1, len(results))
@@ -336,3 +348,98 @@ class IvyUtilsGenerateIvyTest(IvyUtilsTestBase):
     ivy_info = IvyUtils._parse_xml_report(path)
     self.assertIsNotNone(ivy_info)
     return ivy_info
+
+
+class IvyResolveCacheTest(IvyUtilsTestBase):
+
+  def setUp(self):
+    super(IvyResolveCacheTest, self).setUp()
+    self.ivy_cache_dir = os.path.join(self.build_root, 'ivy2')
+    self.set_options_for_scope(IvySubsystem.options_scope, cache_dir=self.ivy_cache_dir)
+    # Initialize the ivy subsystem.
+    self.context()
+    self.resolve_cache = IvyResolveCache(os.path.join(self.ivy_cache_dir, 'pants-resolves'))
+    self.jars = [JarDependency('org1', 'name1', '0.0.1')]
+    self.jar_path = self.create_file('ivy2/org1/name1/jars/name1-0.0.1.jar')
+
+  def resolve_key(self, **kwargs):
+    return self.resolve_cache.resolve_key([], self.jars, [], ['default'], **kwargs)
+
+  def write_resolve(self, resolve_hash_name, rev='0.0.1'):
+    with open(IvyUtils.xml_report_path(resolve_hash_name, 'default'), 'w') as fp:
+      fp.write(dedent("""
+        <?xml version="1.0" encoding="UTF-8"?>
+        <ivy-report version="1.0">
+          <info organisation="internal" module="{name}" revision="latest.integration"/>
+          <dependencies>
+            <module organisation="org1" name="name1">
+              <revision name="0.0.1">
+                <caller organisation="internal" name="{name}" rev="{rev}"
+                        callerrev="latest.integration"/>
+                <artifacts>
+                  <artifact location="{jar}"></artifact>
+                </artifacts>
+              </revision>
+            </module>
+          </dependencies>
+        </ivy-report>
+      """).strip().format(name=resolve_hash_name, rev=rev, jar=self.jar_path))
+    return self.create_file('{}/classpath.raw'.format(resolve_hash_name), self.jar_path)
+
+  def test_resolve_key(self):
+    key = self.resolve_key()
+    self.assertEqual(key, self.resolve_key())
+    self.assertNotEqual(key, self.resolve_key(args=['-refresh']))
+    self.assertNotEqual(key, self.resolve_cache.resolve_key([], self.jars, [], ['default', 'sources']))
+    self.assertNotEqual(key, self.resolve_key(ivy_classpath=['ivy-2.4.0.jar']))
+    self.assertNotEqual(key, self.resolve_key(bootstrap_jar_url='https://example.com/ivy.jar'))
+    self.jars.append(JarDependency('org2', 'name2', '0.0.1'))
+    self.assertNotEqual(key, self.resolve_key())
+
+  def test_dynamic_revisions(self):
+    for rev in ('latest.integration', 'latest.release', '1.0+', '1.0.+', '[1.0,2.0]', '[1.0,)',
+                '(,2.0]', ']1.0,2.0['):
+      self.assertTrue(IvyUtils.is_dynamic_revision(rev), rev)
+    for rev in (None, '', '1.0', '1.0-SNAPSHOT', '2.4.0-rc1'):
+      self.assertFalse(IvyUtils.is_dynamic_revision(rev), rev)
+    self.assertFalse(IvyUtils.has_dynamic_jars(self.jars))
+    self.assertTrue(IvyUtils.has_dynamic_jars(self.jars + [JarDependency('org2', 'name2', '1+')]))
+
+  def test_transitively_dynamic_resolves_are_not_stored(self):
+    key = self.resolve_key()
+    raw_classpath_file = os.path.join(self.build_root, 'hash2', 'classpath.raw')
+    self.resolve_cache.store(key, 'hash1', ['default'], self.write_resolve('hash1', rev='[0.0.1,)'))
+    self.assertFalse(self.resolve_cache.restore(key, 'hash2', ['default'], raw_classpath_file))
+
+  def test_store_and_restore(self):
+    key = self.resolve_key()
+    raw_classpath_file = os.path.join(self.build_root, 'hash2', 'classpath.raw')
+    self.assertFalse(self.resolve_cache.restore(key, 'hash2', ['default'], raw_classpath_file))
+
+    self.resolve_cache.store(key, 'hash1', ['default'], self.write_resolve('hash1'))
+    self.assertTrue(self.resolve_cache.restore(key, 'hash2', ['default'], raw_classpath_file))
+
+    with open(raw_classpath_file) as fp:
+      self.assertEqual(self.jar_path, fp.read())
+    # The restored report and info are for the resolve under its new name.
+    report = ET.parse(IvyUtils.xml_report_path('hash2', 'default')).getroot()
+    self.assertEqual('hash2', self.find_single(report, 'info').get('module'))
+    ivy_info = IvyUtils.parse_xml_report('hash2', 'default')
+    self.assertEqual(
+      [IvyModuleRef('internal', 'hash2', 'latest.integration')],
+      ivy_info.modules_by_ref[IvyModuleRef('org1', 'name1', '0.0.1')].callers)
+
+    # Entries are only good while the jars they list are in the ivy cache.
+    os.unlink(self.jar_path)
+    self.assertFalse(self.resolve_cache.restore(key, 'hash3', ['default'], raw_classpath_file))
+
+  def test_prime(self):
+    key = self.resolve_key()
+    self.assertFalse(self.resolve_cache.prime(key, 'hash1', ['default']))
+    self.resolve_cache.store(key, 'hash1', ['default'], self.write_resolve('hash1'))
+    self.assertTrue(self.resolve_cache.prime(key, 'hash1', ['default']))
+
+  def find_single(self, elem, xpath):
+    results = list(elem.findall(xpath))
+    self.assertEqual(1, len(results))
+    return results[0]
@@ -7,20 +7,26 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import os
 import subprocess
+import threading
+import time
 from collections import defaultdict
 from textwrap import dedent
 
+import mock
+
 from pants.backend.core.targets.resources import Resources
 from pants.backend.jvm.targets.java_tests import JavaTests
 from pants.backend.jvm.tasks.junit_run import JUnitRun
 from pants.backend.python.targets.python_tests import PythonTests
 from pants.base.build_file_aliases import BuildFileAliases
 from pants.base.exceptions import TargetDefinitionException, TaskError
+from pants.base.target_durations import TargetDurations
 from pants.goal.products import MultipleRootedProducts
 from pants.ivy.bootstrapper import Bootstrapper
 from pants.ivy.ivy_subsystem import IvySubsystem
 from pants.java.distribution.distribution import Distribution
 from pants.java.executor import SubprocessExecutor
+from pants.util.dirutil import safe_open
 from pants_test.jvm.jvm_tool_task_test_base import JvmToolTaskTestBase
 from pants_test.subsystem.subsystem_util import subsystem_instance
 
@@ -159,3 +165,73 @@ class JUnitRunnerTest(JvmToolTaskTestBase):
     with self.assertRaisesRegexp(TargetDefinitionException,
                                  r'must include a non-empty set of sources'):
       task.execute()
+
+  def test_concurrent_batches_fail_fast(self):
+    self.set_options(worker_count=2, fail_fast=True)
+    task = self.create_task(self.context())
+    ran = []
+    b_started = threading.Event()
+
+    def run_batch(name):
+      ran.append(name)
+      if name == 'a':
+        b_started.wait(5)
+        return 1
+      if name == 'b':
+        # Still running when a fails, so neither worker starts another batch.
+        b_started.set()
+        time.sleep(0.1)
+      return 0
+
+    result = task._runner._run_batches_concurrently(run_batch, [('a',), ('b',), ('c',), ('d',)])
+    self.assertEqual(1, result)
+    self.assertEqual(['a', 'b'], sorted(ran))
+
+  def test_concurrent_batches(self):
+    self.set_options(worker_count=3)
+    task = self.create_task(self.context())
+    result = task._runner._run_batches_concurrently(lambda code: code, [(0,), (1,), (2,), (0,)])
+    self.assertEqual(3, result)
+
+  def test_shard_by_duration(self):
+    target_durations = TargetDurations()
+    target_durations.record('JUnitRun.classes', 'org.pantsbuild.SlowTest', 60.0, 1)
+    target_durations.record('JUnitRun.classes', 'org.pantsbuild.FastTest', 1.0, 1)
+    patcher = mock.patch.object(TargetDurations.Factory, 'create', return_value=target_durations)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+    tests_and_targets = {
+      'org.pantsbuild.SlowTest': 'slow',
+      'org.pantsbuild.FastTest#testOne': 'fast',
+      'org.pantsbuild.FastTest#testTwo': 'fast',
+      'org.pantsbuild.NewTest': 'new',
+    }
+    shards = []
+    for shard in range(2):
+      self.set_options(test_shard='{}/2'.format(shard), test_shard_mode='duration')
+      task = self.create_task(self.context())
+      shards.append(task._runner._maybe_shard_by_duration(tests_and_targets))
+    self.assertEqual({'org.pantsbuild.SlowTest': 'slow'}, shards[0])
+    self.assertEqual({'org.pantsbuild.FastTest#testOne': 'fast',
+                      'org.pantsbuild.FastTest#testTwo': 'fast',
+                      'org.pantsbuild.NewTest': 'new'}, shards[1])
+
+  def test_invalid_duration_shard(self):
+    self.set_options(test_shard='2/2', test_shard_mode='duration')
+    with self.assertRaises(TaskError):
+      self.create_task(self.context())
+
+  def test_record_test_durations(self):
+    target_durations = TargetDurations()
+    patcher = mock.patch.object(TargetDurations.Factory, 'create', return_value=target_durations)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+    task = self.create_task(self.context())
+    with safe_open(os.path.join(task.workdir, 'TEST-org.pantsbuild.FooTest.xml'), 'w') as fp:
+      fp.write('<testsuite name="org.pantsbuild.FooTest" failures="0" time="2.5"/>')
+    task._runner._record_test_durations({'org.pantsbuild.FooTest#testFoo': None,
+                                         'org.pantsbuild.BarTest': None}, 0)
+    self.assertEqual(2.5, target_durations.duration('JUnitRun.classes', 'org.pantsbuild.FooTest'))
+    self.assertIsNone(target_durations.duration('JUnitRun.classes', 'org.pantsbuild.BarTest'))
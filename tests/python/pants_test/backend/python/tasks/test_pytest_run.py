@@ -7,14 +7,17 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import glob
 import os
+import unittest
 import xml.dom.minidom as DOM
 from textwrap import dedent
 
 import coverage
+import mock
 
 from pants.backend.python.tasks.pytest_run import PytestRun
 from pants.base.exceptions import TestFailedTaskError
-from pants.util.contextutil import pushd
+from pants.base.target_durations import TargetDurations
+from pants.util.contextutil import pushd, temporary_file
 from pants_test.backend.python.tasks.python_task_test_base import PythonTaskTestBase
 
 
@@ -279,6 +282,33 @@ class PythonTestBuilderTest(PythonTestBuilderTestBase):
     self.run_failing_tests(targets=[self.red, self.green], failed_targets=[self.red], shard='0/2')
     self.run_tests(targets=[self.red, self.green], shard='1/2')
 
+  def test_sharding_by_duration(self):
+    target_durations = TargetDurations()
+    target_durations.record('PytestRun.modules', 'tests/test_core_red.py', 60.0, 1)
+    target_durations.record('PytestRun.modules', 'tests/test_core_green.py', 1.0, 1)
+    patcher = mock.patch.object(TargetDurations.Factory, 'create', return_value=target_durations)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+    self.run_failing_tests(targets=[self.all], failed_targets=[self.all], shard='0/2',
+                           shard_mode='duration')
+    self.run_tests(targets=[self.all], shard='1/2', shard_mode='duration')
+
+    # Neither shard's run changes the durations the other partitions from.
+    self.assertEqual(60.0, target_durations.duration('PytestRun.modules', 'tests/test_core_red.py'))
+    self.assertEqual(1.0, target_durations.duration('PytestRun.modules',
+                                                    'tests/test_core_green.py'))
+
+  def test_records_module_durations(self):
+    target_durations = TargetDurations()
+    patcher = mock.patch.object(TargetDurations.Factory, 'create', return_value=target_durations)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+    self.run_failing_tests(targets=[self.all], failed_targets=[self.all])
+    for source in ('tests/test_core_green.py', 'tests/test_core_red.py'):
+      self.assertIsNotNone(target_durations.duration('PytestRun.modules', source))
+
   def test_sharding_single(self):
     self.run_failing_tests(targets=[self.red], failed_targets=[self.red], shard='0/1')
 
@@ -299,3 +329,23 @@ class PythonTestBuilderTest(PythonTestBuilderTestBase):
 
     with self.assertRaises(PytestRun.InvalidShardSpecification):
       self.run_tests(targets=[self.green], shard='1/a')
+
+
+class PytestRunModuleDurationsTest(unittest.TestCase):
+
+  def test_module_durations(self):
+    with temporary_file() as fp:
+      fp.write(dedent("""
+        <testsuite errors="0" failures="0" skips="0" tests="4" time="7.0">
+          <testcase classname="foo.test_a.ATest" name="test_one" time="1.5"/>
+          <testcase classname="foo.test_a.ATest" name="test_two" time="2.0"/>
+          <testcase classname="test_b" name="test_three" time="3.0"/>
+          <testcase classname="test_common" name="test_four" time="0.5"/>
+        </testsuite>
+      """).strip().encode('utf-8'))
+      fp.close()
+      sources = ['tests/foo/test_a.py', 'tests/bar/test_b.py',
+                 'tests/foo/test_common.py', 'tests/bar/test_common.py']
+      # The test_common modules can't be told apart.
+      self.assertEqual({'tests/foo/test_a.py': 3.5, 'tests/bar/test_b.py': 3.0},
+                       dict(PytestRun._module_durations(fp.name, sources)))
@@ -0,0 +1,93 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import argparse
+import multiprocessing
+import os
+import time
+from textwrap import dedent
+
+from pants.base.build_configuration import BuildConfiguration
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants.base.build_file_parser import BuildFileParser
+from pants.base.build_root import BuildRoot
+from pants.base.extension_loader import load_backend
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_file_dump, touch
+
+
+# Compares serial and parallel BuildFileAddressMapper.scan_addresses, as used by `./pants list ::`,
+# over a generated tree of BUILD files, each globbing a few sources and depending on its neighbours.
+#
+# Run with: ./pants run tests/python/pants_test/base:build_file_scan_benchmark -- --help
+
+
+_BUILD_FILE_TEMPLATE = dedent("""
+  python_library(
+    name='lib',
+    sources=globs('*.py'),
+    dependencies=[{dependencies}],
+  )
+
+  python_tests(
+    name='tests',
+    sources=globs('test_*.py'),
+    dependencies=[':lib'],
+  )
+""")
+
+
+def create_tree(root, num_build_files, fanout=20):
+  """Creates num_build_files BUILD files under root, nested `fanout` directories wide."""
+  for i in range(num_build_files):
+    spec_path = os.path.join('src', *['d{}'.format(i // fanout ** depth % fanout)
+                                      for depth in range(3, -1, -1)])
+    dependencies = ', '.join("'{}:lib'".format(os.path.join(os.path.dirname(spec_path),
+                                                            'd{}'.format(j)))
+                             for j in range(min(i % fanout, 3)))
+    safe_file_dump(os.path.join(root, spec_path, 'BUILD'),
+                   _BUILD_FILE_TEMPLATE.format(dependencies=dependencies))
+    for name in ('a.py', 'b.py', 'test_a.py'):
+      touch(os.path.join(root, spec_path, name))
+
+
+def scan(root, scan_workers):
+  """Returns the number of addresses found and the seconds taken to find them."""
+  build_configuration = BuildConfiguration()
+  for backend in ('pants.backend.core', 'pants.backend.python'):
+    load_backend(build_configuration, backend)
+  FilesystemBuildFile.clear_cache()
+  build_file_parser = BuildFileParser(build_configuration, root)
+  address_mapper = BuildFileAddressMapper(build_file_parser, FilesystemBuildFile,
+                                          scan_workers=scan_workers)
+  start = time.time()
+  addresses = address_mapper.scan_addresses(root)
+  return len(addresses), time.time() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark serial and parallel BUILD file scans.')
+  parser.add_argument('--build-files', type=int, default=20000,
+                      help='The number of BUILD files in the generated tree.')
+  parser.add_argument('--workers', type=int, action='append',
+                      help='Scan with this many worker processes. May be repeated. Defaults to '
+                           'the number of cpus.')
+  args = parser.parse_args()
+
+  with temporary_dir() as root:
+    create_tree(root, args.build_files)
+    with BuildRoot().temporary(root):
+      print('Tree: {} BUILD files'.format(args.build_files))
+      print('{:>8} {:>10} {:>10}'.format('workers', 'addresses', 'seconds'))
+      for workers in [0] + (args.workers or [multiprocessing.cpu_count()]):
+        num_addresses, secs = scan(root, workers)
+        print('{:>8} {:>10} {:>10.2f}'.format(workers or 'serial', num_addresses, secs))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,93 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import argparse
+import gc
+import random
+import resource
+import sys
+import time
+
+from pants.base.address import SyntheticAddress
+from pants.base.build_graph import BuildGraph
+from pants.base.target import Target
+
+
+# Measures the memory used by, and the speed of common walks over, a BuildGraph of a synthetic
+# layered target graph shaped like a large monorepo: each target depends on a few targets in lower
+# layers, mostly nearby ones.
+#
+# The memory reported is the growth in peak RSS while building the graph, so run each size in a
+# fresh process for comparable numbers.
+#
+# Run with: ./pants run tests/python/pants_test/base:build_graph_benchmark -- --help
+
+
+def max_rss_mb():
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Linux reports kilobytes, OSX bytes.
+  return max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def build_graph(num_targets, mean_dependencies, seed=0):
+  """Returns a BuildGraph of num_targets targets and the addresses of its roots."""
+  rng = random.Random(seed)
+  graph = BuildGraph(address_mapper=None)
+  addresses = []
+  for i in range(num_targets):
+    address = SyntheticAddress.parse('src/java/org/pantsbuild/pkg{}:lib{}'.format(i // 10, i))
+    dependencies = set()
+    if i > 0:
+      for _ in range(rng.randint(0, 2 * mean_dependencies)):
+        # Mostly near neighbours, occasionally a distant, more foundational, target.
+        distance = int(rng.expovariate(1 / 50)) + 1 if rng.random() < 0.9 else rng.randint(1, i)
+        dependencies.add(addresses[max(0, i - distance)])
+    graph.inject_target(Target(name=address.target_name, address=address, build_graph=graph),
+                        dependencies=sorted(dependencies))
+    addresses.append(address)
+  roots = [address for address in addresses if not graph.dependents_of(address)]
+  return graph, roots
+
+
+def timed(func, *args, **kwargs):
+  start = time.time()
+  result = func(*args, **kwargs)
+  return result, time.time() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark BuildGraph memory use and walks.')
+  parser.add_argument('--targets', type=int, default=100000,
+                      help='The number of targets in the generated graph.')
+  parser.add_argument('--mean-dependencies', type=int, default=4,
+                      help='The mean number of direct dependencies of each target.')
+  args = parser.parse_args()
+
+  gc.collect()
+  rss_before = max_rss_mb()
+  (graph, roots), build_secs = timed(build_graph, args.targets, args.mean_dependencies)
+  gc.collect()
+  rss_mb = max_rss_mb() - rss_before
+  print('Graph: {} targets, {} roots'.format(args.targets, len(roots)))
+  print('{:<32} {:>10}'.format('build (s)', '{:.2f}'.format(build_secs)))
+  print('{:<32} {:>10}'.format('peak RSS growth (MB)', '{:.1f}'.format(rss_mb)))
+
+  closure, secs = timed(graph.transitive_subgraph_of_addresses, roots)
+  print('{:<32} {:>10}'.format('dependency closure (s)', '{:.2f}'.format(secs)))
+  _, secs = timed(graph.transitive_subgraph_of_addresses, roots, postorder=True)
+  print('{:<32} {:>10}'.format('postorder dependency closure (s)', '{:.2f}'.format(secs)))
+  _, secs = timed(graph.transitive_subgraph_of_addresses_bfs, roots)
+  print('{:<32} {:>10}'.format('bfs dependency closure (s)', '{:.2f}'.format(secs)))
+  leaves = [target.address for target in closure if not target.dependencies]
+  _, secs = timed(graph.transitive_dependees_of_addresses, leaves)
+  print('{:<32} {:>10}'.format('dependee closure (s)', '{:.2f}'.format(secs)))
+  _, secs = timed(graph.sorted_targets)
+  print('{:<32} {:>10}'.format('sorted targets (s)', '{:.2f}'.format(secs)))
+
+
+if __name__ == '__main__':
+  main()
@@ -52,6 +52,8 @@ class TestContext(Context):
 
     artifact_cache_stats = DummyArtifactCacheStats()
 
+    def register_thread(self, parent_workunit): pass
+
   @contextmanager
   def new_workunit(self, name, labels=None, cmd='', log_config=None):
     sys.stderr.write('\nStarting workunit {}\n'.format(name))
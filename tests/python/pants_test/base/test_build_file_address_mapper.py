@@ -11,6 +11,7 @@ from textwrap import dedent
 from pants.backend.core.targets.dependencies import Dependencies
 from pants.base.address import BuildFileAddress, SyntheticAddress
 from pants.base.address_lookup_error import AddressLookupError
+from pants.base.build_file import FilesystemBuildFile
 from pants.base.build_file_address_mapper import BuildFileAddressMapper
 from pants_test.base_test import BaseTest
 
@@ -75,6 +76,40 @@ class BuildFileAddressMapperTest(BaseTest):
     self.assertEquals(set([BuildFileAddress(root_build_file, 'foo')]),
                       self.address_mapper.scan_addresses(root=self.build_root, spec_excludes=spec_excludes))
 
+  def parallel_address_mapper(self):
+    return BuildFileAddressMapper(self.build_file_parser, FilesystemBuildFile, scan_workers=2)
+
+  def test_scan_addresses_in_parallel(self):
+    for i in range(20):
+      self.add_to_build_file('dir{0}/BUILD'.format(i), dedent('''
+        target(name="foo", dependencies=[":bar"])
+        target(name="bar")
+      '''))
+    self.add_to_build_file('dir0/BUILD.suffix', 'target(name="baz")')
+    serial_addresses = self.address_mapper.scan_addresses(root=self.build_root)
+    address_mapper = self.parallel_address_mapper()
+    self.assertEquals(serial_addresses, address_mapper.scan_addresses(root=self.build_root))
+    self.assertEquals(41, len(serial_addresses))
+    for address in serial_addresses:
+      _, serial_addressable = self.address_mapper.resolve(address)
+      _, addressable = address_mapper.resolve(address)
+      self.assertEquals(type(serial_addressable), type(addressable))
+      self.assertEquals(serial_addressable.kwargs, addressable.kwargs)
+      self.assertEquals(serial_addressable.dependency_specs, addressable.dependency_specs)
+
+  def test_scan_addresses_in_parallel_reports_errors_like_serial(self):
+    for i in range(10):
+      self.add_to_build_file('dir{0}/BUILD'.format(i), 'target(name="foo")')
+    self.add_to_build_file('dir3/BUILD', 'target(name="foo")')
+    self.add_to_build_file('dir7/BUILD', 'target(name=')
+
+    def scan_error(address_mapper):
+      with self.assertRaises(AddressLookupError) as cm:
+        address_mapper.scan_addresses(root=self.build_root)
+      return str(cm.exception)
+
+    self.assertEquals(scan_error(self.address_mapper), scan_error(self.parallel_address_mapper()))
+
   def test_raises_invalid_build_file_reference(self):
     # reference a BUILD file that doesn't exist
     with self.assertRaisesRegexp(BuildFileAddressMapper.InvalidBuildFileReference,
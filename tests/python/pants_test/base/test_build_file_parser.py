@@ -8,8 +8,10 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import os
 from textwrap import dedent
 
+import mock
 import pytest
 
+from pants.backend.core.wrapped_globs import Globs
 from pants.backend.jvm.artifact import Artifact
 from pants.backend.jvm.repository import Repository
 from pants.backend.jvm.targets.jar_dependency import JarDependency
@@ -19,8 +21,11 @@ from pants.backend.jvm.targets.scala_library import ScalaLibrary
 from pants.base.address import BuildFileAddress
 from pants.base.build_file import FilesystemBuildFile
 from pants.base.build_file_aliases import BuildFileAliases
+from pants.base.build_file_parse_cache import BuildFileParseCache
 from pants.base.build_file_parser import BuildFileParser
+from pants.base.source_root import SourceRoot
 from pants.base.target import Target
+from pants.util.contextutil import pushd
 from pants_test.base_test import BaseTest
 
 
@@ -179,6 +184,113 @@ class BuildFileParserExposedObjectTest(BaseTest):
     self.assertEqual(len(address_map), 0)
 
 
+def read_name(path):
+  with open(path) as fp:
+    return fp.read()
+
+
+class BuildFileParserParseCacheTest(BaseTest):
+
+  @property
+  def alias_groups(self):
+    return BuildFileAliases.create(targets={'fake': ErrorTarget},
+                                   objects={'read_name': read_name},
+                                   context_aware_object_factories={
+                                     'globs': Globs,
+                                     'source_root': SourceRoot.factory,
+                                   })
+
+  def setUp(self):
+    super(BuildFileParserParseCacheTest, self).setUp()
+    self.parse_cache_dir = os.path.join(self.pants_workdir, 'build_file_parse_cache')
+
+  def parse(self, relpath):
+    # A fresh parser and cache each time, as for a new pants run.
+    parse_cache = BuildFileParseCache(self.parse_cache_dir)
+    parser = BuildFileParser(self._build_configuration, self.build_root, parse_cache=parse_cache)
+    address_map = parser.parse_build_file(FilesystemBuildFile(self.build_root, relpath))
+    return address_map, parse_cache
+
+  def test_unchanged_build_file_hits(self):
+    self.add_to_build_file('a/BUILD', 'fake(name="foo", dependencies=[":bar"])\nfake(name="bar")\n')
+    address_map, parse_cache = self.parse('a/BUILD')
+    self.assertEqual((0, 1), (parse_cache.hits, parse_cache.misses))
+
+    cached_address_map, parse_cache = self.parse('a/BUILD')
+    self.assertEqual((1, 0), (parse_cache.hits, parse_cache.misses))
+    self.assertEqual(set(address_map), set(cached_address_map))
+    for address, addressable in cached_address_map.items():
+      self.assertEqual(address_map[address].target_type, addressable.target_type)
+      self.assertEqual(address_map[address].dependency_specs, addressable.dependency_specs)
+
+  def test_changed_build_file_misses(self):
+    self.add_to_build_file('a/BUILD', 'fake(name="foo")\n')
+    self.parse('a/BUILD')
+    self.add_to_build_file('a/BUILD', 'fake(name="bar")\n')
+    address_map, parse_cache = self.parse('a/BUILD')
+    self.assertEqual((0, 1), (parse_cache.hits, parse_cache.misses))
+    self.assertEqual(set(['foo', 'bar']), set(address.target_name for address in address_map))
+
+  def test_superseded_entries_are_deleted(self):
+    self.add_to_build_file('a/BUILD', 'fake(name="foo")\n')
+    self.parse('a/BUILD')
+    self.add_to_build_file('b/BUILD', 'fake(name="foo")\n')
+    self.parse('b/BUILD')
+    self.add_to_build_file('a/BUILD', 'fake(name="bar")\n')
+    self.parse('a/BUILD')
+    entries = [filename for _, _, filenames in os.walk(self.parse_cache_dir)
+               for filename in filenames]
+    self.assertEqual(2, len(entries))
+
+  def test_changed_alias_code_misses(self):
+    self.add_to_build_file('a/BUILD', 'fake(name="foo")\n')
+    self.parse('a/BUILD')
+    original_digest = BuildFileParser._module_digest
+
+    def module_digest(module_name):
+      if module_name == ErrorTarget.__module__:
+        return 'changed'
+      return original_digest(module_name)
+
+    with mock.patch.object(BuildFileParser, '_module_digest', side_effect=module_digest):
+      _, parse_cache = self.parse('a/BUILD')
+    self.assertEqual((0, 1), (parse_cache.hits, parse_cache.misses))
+
+  def test_globs_are_evaluated_afresh(self):
+    self.add_to_build_file('a/BUILD', 'fake(name="foo", sources=globs("*.py"))\n')
+    self.create_file('a/one.py')
+    self.parse('a/BUILD')
+    self.create_file('a/two.py')
+    address_map, parse_cache = self.parse('a/BUILD')
+    self.assertEqual(1, parse_cache.hits)
+    addressable = address_map.values()[0]
+    self.assertEqual(set(['one.py', 'two.py']), set(addressable.kwargs['sources']))
+
+  def test_examined_globs_are_not_cached(self):
+    self.add_to_build_file('a/BUILD', dedent("""
+      for source in globs("*.py"):
+        fake(name=source[:-3])
+      """))
+    self.create_file('a/one.py')
+    self.parse('a/BUILD')
+    self.create_file('a/two.py')
+    address_map, parse_cache = self.parse('a/BUILD')
+    self.assertEqual(0, parse_cache.hits)
+    self.assertEqual(set(['one', 'two']), set(address.target_name for address in address_map))
+
+  def test_side_effecting_build_files_are_not_cached(self):
+    self.add_to_build_file('a/BUILD', 'source_root("a")\nfake(name="foo")\n')
+    self.add_to_build_file('b/BUILD', 'import os\nfake(name="foo")\n')
+    self.add_to_build_file('c/BUILD', 'fake(name=open("c/NAME").read())\n')
+    self.add_to_build_file('d/BUILD', 'fake(name=read_name("c/NAME"))\n')
+    for relpath in ('a/BUILD', 'b/BUILD', 'c/BUILD', 'd/BUILD'):
+      self.create_file('c/NAME', 'foo')
+      with pushd(self.build_root):
+        self.parse(relpath)
+        _, parse_cache = self.parse(relpath)
+      self.assertEqual(0, parse_cache.hits, relpath)
+
+
 class BuildFileParserExposedContextAwareObjectFactoryTest(BaseTest):
 
   @staticmethod
@@ -7,7 +7,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 from pants.base.address import SyntheticAddress, parse_spec
 from pants.base.address_lookup_error import AddressLookupError
-from pants.base.build_graph import BuildGraph
+from pants.base.build_graph import BuildGraph, sort_targets
 from pants.base.target import Target
 from pants_test.base_test import BaseTest
 
@@ -269,3 +269,19 @@ class BuildGraphTest(BaseTest):
         '^Addresses in dependencies must be unique. \'other:b\' is referenced more than once.'
         '\s+referenced from :a$'):
       self.inject_address_closure('//:a')
+
+  def test_deep_graph(self):
+    # Walks and sorts must not be limited by the interpreter's recursion limit.
+    depth = 5000
+    targets = [self.make_target('deep:0')]
+    for i in range(1, depth):
+      targets.append(self.make_target('deep:{}'.format(i), dependencies=[targets[-1]]))
+
+    closure = self.build_graph.transitive_subgraph_of_addresses([targets[-1].address])
+    self.assertEqual(list(reversed(targets)), list(closure))
+    closure = self.build_graph.transitive_subgraph_of_addresses([targets[-1].address],
+                                                                postorder=True)
+    self.assertEqual(targets, list(closure))
+    dependees = self.build_graph.transitive_dependees_of_addresses([targets[0].address])
+    self.assertEqual(targets, list(dependees))
+    self.assertEqual(list(reversed(targets)), sort_targets([targets[-1]]))
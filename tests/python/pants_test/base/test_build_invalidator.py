@@ -10,8 +10,13 @@ import os
 import tempfile
 from contextlib import contextmanager
 
-from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+import pytest
+
+from pants.base.build_invalidator import (GLOBAL_CACHE_KEY_GEN_VERSION, BuildInvalidator, CacheKey,
+                                          CacheKeyGenerator, IndexedBuildInvalidator,
+                                          create_build_invalidator)
 from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_rmtree
 
 
 TEST_CONTENT = 'muppet'
@@ -58,3 +63,90 @@ def test_env(content=TEST_CONTENT):
 #     assert cache.needs_update(key)
 #     cache.update(key)
 #     assert not cache.needs_update(key)
+
+
+def _fresh_indexed_invalidator(root):
+  # Simulate a new pants run by dropping the logs this process has already loaded.
+  IndexedBuildInvalidator._logs.clear()
+  return IndexedBuildInvalidator(root)
+
+
+def _log_path(root):
+  return os.path.join(root, GLOBAL_CACHE_KEY_GEN_VERSION, 'invalidator.log')
+
+
+def test_indexed_update_and_persist():
+  with temporary_dir() as root:
+    invalidator = _fresh_indexed_invalidator(root)
+    key = CacheKey('a.b.c', 'deadbeef', 1)
+    assert invalidator.needs_update(key)
+    invalidator.update(key)
+    assert not invalidator.needs_update(key)
+    invalidator.flush()
+
+    invalidator = _fresh_indexed_invalidator(root)
+    assert 'deadbeef' == invalidator.existing_hash('a.b.c')
+    assert not invalidator.needs_update(key)
+    assert invalidator.needs_update(CacheKey('a.b.c', 'cafebabe', 1))
+
+
+def test_indexed_unflushed_updates_are_not_persisted():
+  with temporary_dir() as root:
+    invalidator = _fresh_indexed_invalidator(root)
+    invalidator.update(CacheKey('a', '1', 1))
+    assert _fresh_indexed_invalidator(root).existing_hash('a') is None
+
+
+def test_indexed_force_invalidate():
+  with temporary_dir() as root:
+    invalidator = _fresh_indexed_invalidator(root)
+    invalidator.update(CacheKey('a', '1', 1))
+    invalidator.update(CacheKey('b', '2', 1))
+    invalidator.flush()
+    invalidator.force_invalidate(CacheKey('a', '1', 1))
+    invalidator.flush()
+
+    invalidator = _fresh_indexed_invalidator(root)
+    assert invalidator.existing_hash('a') is None
+    assert '2' == invalidator.existing_hash('b')
+
+    invalidator.force_invalidate_all()
+    assert invalidator.existing_hash('b') is None
+    assert _fresh_indexed_invalidator(root).existing_hash('b') is None
+
+
+def test_indexed_compacts_and_drops_torn_record():
+  with temporary_dir() as root:
+    invalidator = _fresh_indexed_invalidator(root)
+    invalidator.update(CacheKey('a', '1', 1))
+    invalidator.flush()
+    invalidator.update(CacheKey('a', '2', 1))
+    invalidator.update(CacheKey('b', '3', 1))
+    invalidator.flush()
+    # Simulate a crash part way through appending a record.
+    with open(_log_path(root), 'ab') as fp:
+      fp.write(b'c\t4')
+
+    invalidator = _fresh_indexed_invalidator(root)
+    assert '2' == invalidator.existing_hash('a')
+    assert '3' == invalidator.existing_hash('b')
+    assert invalidator.existing_hash('c') is None
+    with open(_log_path(root), 'rb') as fp:
+      assert b'a\t2\nb\t3\n' == fp.read()
+
+
+def test_indexed_reloads_after_external_clean():
+  with temporary_dir() as root:
+    invalidator = IndexedBuildInvalidator(root)
+    invalidator.update(CacheKey('a', '1', 1))
+    invalidator.flush()
+    safe_rmtree(root)
+    assert IndexedBuildInvalidator(root).existing_hash('a') is None
+
+
+def test_create_build_invalidator():
+  with temporary_dir() as root:
+    assert type(create_build_invalidator(root)) is BuildInvalidator
+    assert type(create_build_invalidator(root, 'indexed')) is IndexedBuildInvalidator
+    with pytest.raises(ValueError):
+      create_build_invalidator(root, 'bogus')
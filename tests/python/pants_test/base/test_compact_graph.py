@@ -0,0 +1,75 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import random
+import unittest
+
+from pants.base.compact_graph import CompactAdjacency, NodeInterner
+
+
+class NodeInternerTest(unittest.TestCase):
+
+  def test_intern(self):
+    interner = NodeInterner()
+    self.assertEqual(0, interner.intern('a'))
+    self.assertEqual(1, interner.intern('b'))
+    self.assertEqual(0, interner.intern('a'))
+    self.assertEqual(2, len(interner))
+    self.assertIn('b', interner)
+    self.assertNotIn('c', interner)
+    self.assertIsNone(interner.id_of('c'))
+    self.assertEqual('b', interner.key_of(1))
+    self.assertEqual(['b', 'a'], interner.keys_of([1, 0]))
+
+
+class CompactAdjacencyTest(unittest.TestCase):
+
+  def assert_adjacency(self, expected, adjacency):
+    for node, neighbors in expected.items():
+      self.assertEqual(neighbors, list(adjacency.neighbors(node)))
+    self.assertEqual(sum(len(neighbors) for neighbors in expected.values()), adjacency.num_edges)
+
+  def test_empty(self):
+    adjacency = CompactAdjacency()
+    self.assertEqual([], list(adjacency.neighbors(0)))
+    self.assertEqual(0, adjacency.num_edges)
+
+  def test_preserves_insertion_order_across_packs(self):
+    rng = random.Random(0)
+    expected = dict((node, []) for node in range(3000))
+    adjacency = CompactAdjacency()
+    for _ in range(20000):
+      node = rng.randrange(3000)
+      neighbor = rng.randrange(3000)
+      expected[node].append(neighbor)
+      adjacency.add_edge(node, neighbor)
+    self.assert_adjacency(expected, adjacency)
+
+    adjacency.pack()
+    self.assert_adjacency(expected, adjacency)
+
+    # Growing a packed row.
+    adjacency.add_edge(7, 42)
+    expected[7].append(42)
+    self.assert_adjacency(expected, adjacency)
+
+  def test_has_edge(self):
+    rng = random.Random(0)
+    edges = set()
+    adjacency = CompactAdjacency()
+    for _ in range(20000):
+      edge = (rng.randrange(3000), rng.randrange(3000))
+      if edge not in edges:
+        edges.add(edge)
+        adjacency.add_edge(*edge)
+    # Some rows pending, some packed, then all packed.
+    for _ in range(2):
+      for node in range(3000):
+        for neighbor in range(0, 3000, 97):
+          self.assertEqual((node, neighbor) in edges, adjacency.has_edge(node, neighbor))
+      adjacency.pack()
+    self.assertFalse(adjacency.has_edge(3000, 0))
@@ -0,0 +1,123 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import hashlib
+import os
+import time
+import unittest
+
+from pants.base.file_digest_cache import FileDigestCache
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_file_dump
+
+
+class FileDigestCacheTest(unittest.TestCase):
+
+  def write(self, path, content, age_secs=60):
+    safe_file_dump(path, content)
+    mtime = time.time() - age_secs
+    os.utime(path, (mtime, mtime))
+
+  def test_digest(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'a.txt')
+      self.write(path, 'jake')
+      cache = FileDigestCache()
+      self.assertEqual(hashlib.sha1(b'jake').hexdigest(), cache.digest(path))
+      self.assertEqual(hashlib.sha1(b'jake').hexdigest(), cache.digest(path))
+      self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+  def test_stat_change_rehashes(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'a.txt')
+      self.write(path, 'jake')
+      cache = FileDigestCache()
+      cache.digest(path)
+      self.write(path, 'jones', age_secs=30)
+      self.assertEqual(hashlib.sha1(b'jones').hexdigest(), cache.digest(path))
+      self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+  def test_recently_modified_files_are_not_cached(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'a.txt')
+      self.write(path, 'jake', age_secs=0)
+      cache = FileDigestCache()
+      cache.digest(path)
+      cache.digest(path)
+      self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+  def test_persistence(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'a.txt')
+      cache_path = os.path.join(root, 'cache', 'digests.json')
+      self.write(path, 'jake')
+      cache = FileDigestCache(cache_path)
+      cache.digest(path)
+      cache.save()
+
+      cache = FileDigestCache(cache_path)
+      self.assertEqual(hashlib.sha1(b'jake').hexdigest(), cache.digest(path))
+      self.assertEqual((1, 0), (cache.hits, cache.misses))
+
+  def test_corrupt_cache_is_ignored(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'a.txt')
+      cache_path = os.path.join(root, 'digests.json')
+      self.write(path, 'jake')
+      safe_file_dump(cache_path, '{"version": 1, "entr')
+      cache = FileDigestCache(cache_path)
+      self.assertEqual(hashlib.sha1(b'jake').hexdigest(), cache.digest(path))
+      self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+  def test_verified_entries_skip_the_stat(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'a.txt')
+      cache_path = os.path.join(root, 'digests.json')
+      self.write(path, 'jake')
+      cache = FileDigestCache(cache_path)
+      writer = FileDigestCache(cache_path)
+      writer.digest(path)
+      writer.save()
+
+      # Entries persisted since the cache was loaded are verified too.
+      cache.verify(lambda p: p == path)
+      os.unlink(path)
+      self.assertEqual(hashlib.sha1(b'jake').hexdigest(), cache.digest(path))
+
+      cache.invalidate(paths=[path])
+      with self.assertRaises(OSError):
+        cache.digest(path)
+
+  def test_verify_skips_stale_and_unwatched_entries(self):
+    with temporary_dir() as root:
+      stale = os.path.join(root, 'stale.txt')
+      unwatched = os.path.join(root, 'unwatched.txt')
+      self.write(stale, 'jake')
+      self.write(unwatched, 'jake')
+      cache = FileDigestCache()
+      cache.digest(stale)
+      cache.digest(unwatched)
+      self.write(stale, 'jones', age_secs=30)
+
+      cache.verify(lambda p: p != unwatched)
+      self.assertEqual(hashlib.sha1(b'jones').hexdigest(), cache.digest(stale))
+      self.assertEqual(hashlib.sha1(b'jake').hexdigest(), cache.digest(unwatched))
+      self.assertEqual((1, 3), (cache.hits, cache.misses))
+
+  def test_invalidate_dirs(self):
+    with temporary_dir() as root:
+      paths = [os.path.join(root, 'a', 'a.txt'), os.path.join(root, 'ab', 'b.txt')]
+      cache = FileDigestCache()
+      for path in paths:
+        self.write(path, 'jake')
+        cache.digest(path)
+      cache.verify(lambda p: True)
+      cache.invalidate(dirs=[os.path.join(root, 'a')])
+      for path in paths:
+        self.write(path, 'jones', age_secs=30)
+      self.assertEqual(hashlib.sha1(b'jones').hexdigest(), cache.digest(paths[0]))
+      self.assertEqual(hashlib.sha1(b'jake').hexdigest(), cache.digest(paths[1]))
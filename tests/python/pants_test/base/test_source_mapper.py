@@ -5,9 +5,12 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
+
 from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.base.build_file_aliases import BuildFileAliases
-from pants.base.source_mapper import LazySourceMapper, SpecSourceMapper
+from pants.base.source_mapper import IndexedSourceMapper, LazySourceMapper, SpecSourceMapper
+from pants.base.target_index import TargetIndex
 from pants_test.base_test import BaseTest
 
 
@@ -102,3 +105,10 @@ class LazySourceMapperTest(SourceMapperTest, BaseTest):
 class SpecSourceMapperTest(SourceMapperTest, BaseTest):
   def set_mapper(self, fast=False):
     self._mapper = SpecSourceMapper(self.address_mapper, self.build_graph, fast)
+
+
+class IndexedSourceMapperTest(SourceMapperTest, BaseTest):
+  def set_mapper(self, fast=False):
+    target_index = TargetIndex(os.path.join(self.pants_workdir, 'target_index.json'),
+                               self.address_mapper, self.build_graph)
+    self._mapper = IndexedSourceMapper(target_index, fast)
@@ -12,7 +12,7 @@ from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.base.address import BuildFileAddress, SyntheticAddress
 from pants.base.build_file_aliases import BuildFileAliases
 from pants.base.payload import Payload
-from pants.base.payload_field import DeferredSourcesField
+from pants.base.payload_field import DeferredSourcesField, PrimitiveField
 from pants.base.target import Target
 from pants_test.base_test import BaseTest
 
@@ -25,6 +25,15 @@ class TestDeferredSourcesTarget(Target):
     })
     super(TestDeferredSourcesTarget, self).__init__(payload=payload, *args, **kwargs)
 
+class TestFingerprintedTarget(Target):
+  def __init__(self, value=None, *args, **kwargs):
+    payload = Payload()
+    payload.add_fields({
+      'value': PrimitiveField(value),
+    })
+    super(TestFingerprintedTarget, self).__init__(payload=payload, *args, **kwargs)
+
+
 class TargetTest(BaseTest):
   @property
   def alias_groups(self):
@@ -100,3 +109,33 @@ class TargetTest(BaseTest):
       context.build_graph.get_target(address)
     self.assertTrue('foobar = barfoo' in str(cm.exception))
     self.assertTrue('foo:bar' in str(cm.exception))
+
+  def test_transitive_invalidation_hash_is_incremental(self):
+    a = self.make_target(':a', TestFingerprintedTarget, value='a')
+    b = self.make_target(':b', TestFingerprintedTarget, dependencies=[a], value='b')
+    c = self.make_target(':c', TestFingerprintedTarget, dependencies=[b], value='c')
+    d = self.make_target(':d', TestFingerprintedTarget, dependencies=[a], value='d')
+    e = self.make_target(':e', TestFingerprintedTarget, value='e')
+    hashes = dict((t, t.transitive_invalidation_hash()) for t in (c, d, e))
+
+    def computed(func):
+      before = self.build_graph.transitive_invalidation_hashes_computed
+      func()
+      return self.build_graph.transitive_invalidation_hashes_computed - before
+
+    # Everything is memoized now.
+    self.assertEqual(0, computed(lambda: [t.transitive_invalidation_hash() for t in (c, d, e)]))
+
+    # Only b and its dependees are affected by a new dependency of b.
+    b.inject_dependency(e.address)
+    self.assertTrue(a.has_transitive_invalidation_hash)
+    self.assertFalse(b.has_transitive_invalidation_hash)
+    self.assertFalse(c.has_transitive_invalidation_hash)
+    self.assertTrue(d.has_transitive_invalidation_hash)
+    self.assertEqual(2, computed(lambda: [t.transitive_invalidation_hash() for t in (c, d, e)]))
+    self.assertNotEqual(hashes[c], c.transitive_invalidation_hash())
+    self.assertEqual(hashes[d], d.transitive_invalidation_hash())
+
+    # A change to a invalidates all of its dependees.
+    a.mark_invalidation_hash_dirty()
+    self.assertEqual(4, computed(lambda: [t.transitive_invalidation_hash() for t in (c, d)]))
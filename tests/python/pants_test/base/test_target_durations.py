@@ -0,0 +1,76 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import unittest
+
+from pants.base.target_durations import TargetDurations
+from pants.util.contextutil import temporary_dir
+
+
+class TargetDurationsTest(unittest.TestCase):
+
+  def test_decay(self):
+    durations = TargetDurations(decay=0.5)
+    self.assertIsNone(durations.duration('Compile', 'a'))
+    durations.record('Compile', 'a', 4.0, 2)
+    self.assertEqual(4.0, durations.duration('Compile', 'a'))
+    durations.record('Compile', 'a', 2.0, 2)
+    self.assertEqual(3.0, durations.duration('Compile', 'a'))
+    self.assertIsNone(durations.duration('Test', 'a'))
+
+  def test_cost(self):
+    durations = TargetDurations()
+    # Unknown targets cost their units.
+    self.assertEqual(7, durations.cost('Compile', 'a', 7))
+
+    # 10 units in 5 seconds overall: 0.5 seconds per unit.
+    durations.record('Compile', 'slow', 4.0, 2)
+    durations.record('Compile', 'fast', 1.0, 8)
+    self.assertEqual(8.0, durations.cost('Compile', 'slow', 2))
+    self.assertEqual(2.0, durations.cost('Compile', 'fast', 8))
+    self.assertEqual(3, durations.cost('Compile', 'new', 3))
+    self.assertEqual(2, durations.cost('Test', 'slow', 2))
+
+  def test_cost_without_units(self):
+    durations = TargetDurations()
+    durations.record('Compile', 'a', 4.0, 0)
+    self.assertEqual(0, durations.cost('Compile', 'a', 0))
+
+  def test_balanced_shard(self):
+    durations = TargetDurations()
+    for key, secs in (('a', 10.0), ('b', 6.0), ('c', 5.0), ('d', 4.0)):
+      durations.record('Test', key, secs, 1)
+    keys = ['a', 'b', 'c', 'd', 'e']
+    # Longest first, each to the lightest shard: a=10 to 0, e=6.25 (the average) to 1, b=6 to 1,
+    # c=5 to 0 and d=4 to 1, for totals of 15 and 16.25.
+    shards = [durations.balanced_shard('Test', keys, shard, 2) for shard in range(2)]
+    self.assertEqual([['a', 'c'], ['b', 'd', 'e']], shards)
+    self.assertEqual(keys, durations.balanced_shard('Test', keys, 0, 1))
+
+  def test_balanced_shard_without_durations(self):
+    durations = TargetDurations()
+    shards = [durations.balanced_shard('Test', ['c', 'a', 'b'], shard, 2) for shard in range(2)]
+    self.assertEqual([['c', 'a'], ['b']], shards)
+
+  def test_save_and_load(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'durations', 'durations.json')
+      durations = TargetDurations(path)
+      durations.save()
+      self.assertFalse(os.path.exists(path))
+
+      durations.record('Compile', 'a', 4.0, 2)
+      durations.save()
+      self.assertEqual(4.0, TargetDurations(path).duration('Compile', 'a'))
+
+  def test_corrupt_file(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'durations.json')
+      with open(path, 'w') as fp:
+        fp.write('{not json')
+      self.assertIsNone(TargetDurations(path).duration('Compile', 'a'))
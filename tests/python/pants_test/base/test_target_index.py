@@ -0,0 +1,183 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+from textwrap import dedent
+
+import mock
+
+from pants.backend.core.from_target import FromTarget
+from pants.backend.core.targets.dependencies import Dependencies
+from pants.backend.core.targets.resources import Resources
+from pants.backend.jvm.targets.java_library import JavaLibrary
+from pants.base.address import SyntheticAddress
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_aliases import BuildFileAliases
+from pants.base.target_index import TargetIndex
+from pants_test.base_test import BaseTest
+
+
+class TargetIndexTest(BaseTest):
+
+  @property
+  def alias_groups(self):
+    return BuildFileAliases.create(
+      targets={
+        'java_library': JavaLibrary,
+        'resources': Resources,
+        'target': Dependencies,
+      },
+      context_aware_object_factories={
+        'from_target': FromTarget,
+      },
+    )
+
+  def setUp(self):
+    super(TargetIndexTest, self).setUp()
+    self.index_path = os.path.join(self.pants_workdir, 'target_index.json')
+    self.add_to_build_file('a', dedent("""
+      java_library(name='a', sources=['A.java'])
+    """))
+    self.add_to_build_file('b', dedent("""
+      java_library(name='b', sources=['B.java'], dependencies=['a'])
+    """))
+    self.add_to_build_file('c', dedent("""
+      java_library(name='c', sources=['C.java'], dependencies=['b', 'd:res'])
+    """))
+    self.add_to_build_file('d', dedent("""
+      resources(name='res', sources=['d.txt'])
+    """))
+
+  def new_index(self):
+    """Returns an index loaded afresh, as by a new run."""
+    FilesystemBuildFile.clear_cache()
+    self.reset_build_graph()
+    return TargetIndex(self.index_path, self.address_mapper, self.build_graph)
+
+  def owners(self, index, source):
+    return set(address.spec for address in index.owners(source))
+
+  def dependees(self, index, spec, transitive=False):
+    return set(address.spec for address in
+               index.dependees([SyntheticAddress.parse(spec)], transitive=transitive))
+
+  def walk_dependees(self, index, spec, transitive=False):
+    build_files = self.address_mapper.scan_buildfiles(self.build_root)
+    return [address.spec for address in
+            index.walk_dependees([SyntheticAddress.parse(spec)], build_files,
+                                 transitive=transitive)]
+
+  def test_owners(self):
+    index = self.new_index()
+    self.assertEqual(set(['a:a']), self.owners(index, 'a/A.java'))
+    self.assertEqual(set(['a:a']), self.owners(index, 'a/BUILD'))
+    self.assertEqual(set(['d:res']), self.owners(index, 'd/d.txt'))
+    self.assertEqual(set(), self.owners(index, 'a/Unowned.java'))
+
+  def test_owners_of_resources(self):
+    self.add_to_build_file('r', dedent("""
+      java_library(name='r', sources=['R.java'], resources=['r/data'])
+    """))
+    self.add_to_build_file('r/data', dedent("""
+      resources(name='data', sources=['r.txt'])
+    """))
+    index = self.new_index()
+    self.assertEqual(set(['r:r', 'r/data:data']), self.owners(index, 'r/data/r.txt'))
+
+  def test_dependees(self):
+    index = self.new_index()
+    self.assertEqual(set(['a:a', 'b:b']), self.dependees(index, 'a'))
+    self.assertEqual(set(['a:a', 'b:b', 'c:c']), self.dependees(index, 'a', transitive=True))
+    self.assertEqual(set(['d:res', 'c:c']), self.dependees(index, 'd:res'))
+
+  def test_walk_dependees(self):
+    self.add_to_build_file('e', dedent("""
+      target(name='e', dependencies=['c'])
+    """))
+    index = self.new_index()
+    self.assertEqual(['b:b', 'c:c', 'e:e'], self.walk_dependees(index, 'a', transitive=True))
+    self.assertEqual(['c:c'], self.walk_dependees(index, 'd:res'))
+
+  def test_walk_dependees_early_termination(self):
+    index = self.new_index()
+    dependees = index.walk_dependees([SyntheticAddress.parse('a')],
+                                     self.address_mapper.scan_buildfiles(self.build_root),
+                                     transitive=True)
+    self.assertEqual(SyntheticAddress.parse('b:b'), next(dependees))
+
+  def test_derived_dependencies(self):
+    self.add_to_build_file('e', dedent("""
+      java_library(name='res', sources=[], resources=['d:res'])
+      java_library(name='from', sources=from_target('a'))
+    """))
+    index = self.new_index()
+    self.assertEqual(['b:b', 'e:from'], self.walk_dependees(index, 'a'))
+    self.assertEqual(['c:c', 'e:res'], self.walk_dependees(index, 'd:res'))
+
+  def test_sourceless_targets_constructed_once_per_type(self):
+    self.add_to_build_file('f', dedent("""
+      target(name='f1', dependencies=['a'])
+      target(name='f2', dependencies=['a'])
+      target(name='f3', dependencies=['b'])
+    """))
+    index = self.new_index()
+    construct = self.build_graph.target_addressable_to_target
+    with mock.patch.object(self.build_graph, 'target_addressable_to_target',
+                           side_effect=construct) as constructed:
+      self.assertEqual(['b:b', 'f:f1', 'f:f2'], self.walk_dependees(index, 'a'))
+    constructed_specs = set(call[0][0].spec for call in constructed.call_args_list)
+    sourceless_specs = set(['f:f1', 'f:f2', 'f:f3'])
+    self.assertEqual(set(['a:a', 'b:b', 'c:c', 'd:res']), constructed_specs - sourceless_specs)
+    # Once a target type is seen to own no sources, its targets are read off their addressables.
+    self.assertEqual(1, len(constructed_specs & sourceless_specs))
+
+  def test_no_targets_injected(self):
+    index = self.new_index()
+    self.dependees(index, 'a', transitive=True)
+    self.owners(index, 'c/C.java')
+    self.assertEqual(0, len(self.build_graph.targets()))
+
+  def test_persisted(self):
+    index = self.new_index()
+    self.dependees(index, 'a')
+    index.save()
+
+    index = self.new_index()
+    with mock.patch.object(index, '_index') as reindex:
+      self.assertEqual(set(['a:a', 'b:b', 'c:c']), self.dependees(index, 'a', transitive=True))
+      self.assertEqual(set(['b:b']), self.owners(index, 'b/B.java'))
+    # Nothing was re-indexed, as no BUILD file changed, so no target was loaded.
+    self.assertFalse(reindex.called)
+    self.assertEqual(0, len(self.build_graph.targets()))
+
+  def test_changed_build_files(self):
+    index = self.new_index()
+    self.dependees(index, 'a')
+    index.save()
+
+    self.create_file('b/BUILD', dedent("""
+      java_library(name='b', sources=['B.java', 'Other.java'])
+    """))
+    self.create_file('e/BUILD', dedent("""
+      java_library(name='e', sources=['E.java'], dependencies=['a'])
+    """))
+    os.unlink(os.path.join(self.build_root, 'c', 'BUILD'))
+
+    index = self.new_index()
+    self.assertEqual(set(['b:b']), self.owners(index, 'b/Other.java'))
+    self.assertEqual(set(['a:a', 'e:e']), self.dependees(index, 'a', transitive=True))
+    self.assertEqual(set(), self.owners(index, 'c/C.java'))
+    index.save()
+
+    index = self.new_index()
+    self.assertEqual(set(['a:a', 'e:e']), self.dependees(index, 'a', transitive=True))
+
+  def test_spec_excludes(self):
+    index = self.new_index()
+    dependees = index.dependees([SyntheticAddress.parse('a')], transitive=True,
+                                spec_excludes=[os.path.join(self.build_root, 'c')])
+    self.assertEqual(set(['a:a', 'b:b']), set(address.spec for address in dependees))
@@ -0,0 +1,105 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import argparse
+import os
+import random
+import time
+
+from pants.cache.artifact import ARTIFACT_CODECS, TarballArtifact
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_file_dump, safe_mkdir
+
+
+# Measures TarballArtifact compress and extract throughput for each available codec, against a
+# synthetic corpus shaped like a zinc classes directory: many small class files made of a shared
+# vocabulary of constant pool strings interleaved with less compressible bytes.
+#
+# Run with: ./pants run tests/python/pants_test/cache:artifact_benchmark -- --help
+
+
+_VOCABULARY = [
+  b'java/lang/Object', b'java/lang/String', b'scala/collection/immutable/List',
+  b'scala/Function1', b'<init>', b'()V', b'Code', b'LineNumberTable', b'LocalVariableTable',
+  b'StackMapTable', b'SourceFile', b'ScalaSig', b'RuntimeVisibleAnnotations', b'this',
+  b'apply', b'equals', b'hashCode', b'toString', b'scala/runtime/BoxesRunTime',
+]
+
+
+def create_corpus(root, num_files, mean_file_size, seed=0):
+  """Creates a synthetic classes dir under root and returns its total size in bytes."""
+  rng = random.Random(seed)
+  total = 0
+  for i in range(num_files):
+    package = os.path.join(root, 'org', 'pantsbuild', 'pkg{}'.format(i % 50))
+    size = max(64, int(rng.gauss(mean_file_size, mean_file_size / 3)))
+    chunks = [b'\xca\xfe\xba\xbe']
+    length = len(chunks[0])
+    while length < size:
+      if rng.random() < 0.7:
+        chunk = rng.choice(_VOCABULARY)
+      else:
+        chunk = bytes(bytearray(rng.getrandbits(8) for _ in range(8)))
+      chunks.append(chunk)
+      length += len(chunk)
+    content = b''.join(chunks)[:size]
+    safe_file_dump(os.path.join(package, 'Class{}.class'.format(i)), content)
+    total += size
+  return total
+
+
+def benchmark_codec(codec, level, artifact_root, classes_dir, tarball, iterations):
+  """Returns the best (compress_secs, extract_secs) over iterations, and the tarball size."""
+  compress_secs = extract_secs = float('inf')
+  for _ in range(iterations):
+    start = time.time()
+    TarballArtifact(artifact_root, tarball, level, codec=codec).collect([classes_dir])
+    compress_secs = min(compress_secs, time.time() - start)
+
+    safe_mkdir(classes_dir, clean=True)
+    start = time.time()
+    TarballArtifact(artifact_root, tarball).extract()
+    extract_secs = min(extract_secs, time.time() - start)
+  return compress_secs, extract_secs, os.path.getsize(tarball)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark artifact cache codecs.')
+  parser.add_argument('--files', type=int, default=5000,
+                      help='The number of class files in the corpus.')
+  parser.add_argument('--mean-file-size', type=int, default=4096,
+                      help='The mean size of a class file, in bytes.')
+  parser.add_argument('--level', type=int, default=5,
+                      help='The compression level to use with each codec.')
+  parser.add_argument('--iterations', type=int, default=3,
+                      help='Report the best of this many runs of each codec.')
+  parser.add_argument('--codec', action='append', dest='codecs',
+                      help='Benchmark only this codec. May be repeated. Defaults to all the '
+                           'available codecs.')
+  args = parser.parse_args()
+
+  codecs = args.codecs or sorted(name for name, codec_type in ARTIFACT_CODECS.items()
+                                 if codec_type.is_available())
+  with temporary_dir() as artifact_root:
+    classes_dir = os.path.join(artifact_root, 'classes')
+    corpus_bytes = create_corpus(classes_dir, args.files, args.mean_file_size)
+    corpus_mb = corpus_bytes / (1024 * 1024)
+    print('Corpus: {} files, {:.1f} MB'.format(args.files, corpus_mb))
+    print('{:>6} {:>14} {:>14} {:>8}'.format('codec', 'compress MB/s', 'extract MB/s', 'ratio'))
+    with temporary_dir() as tmpdir:
+      tarball = os.path.join(tmpdir, 'artifact')
+      for codec in codecs:
+        compress_secs, extract_secs, size = benchmark_codec(codec, args.level, artifact_root,
+                                                            classes_dir, tarball, args.iterations)
+        print('{:>6} {:>14.1f} {:>14.1f} {:>8.2f}'.format(codec,
+                                                         corpus_mb / compress_secs,
+                                                         corpus_mb / extract_secs,
+                                                         corpus_bytes / size))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,111 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import io
+import os
+import tarfile
+import unittest
+
+from pants.cache.artifact import (ARTIFACT_CODECS, ArtifactError, TarballArtifact,
+                                  get_artifact_codec)
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_file_dump, safe_mkdir
+
+
+class TarballArtifactTest(unittest.TestCase):
+
+  def setUp(self):
+    self.artifact_root = os.path.join(self.create_dir(), 'root')
+    self.tarball = os.path.join(self.create_dir(), 'artifact.tgz')
+    self.classes = os.path.join(self.artifact_root, 'classes')
+    safe_file_dump(os.path.join(self.classes, 'org', 'A.class'), 'cafebabe' * 100)
+    safe_file_dump(os.path.join(self.classes, 'org', 'B.class'), 'deadbeef' * 100)
+
+  def create_dir(self):
+    with temporary_dir(cleanup=False) as path:
+      self.addCleanup(lambda: safe_mkdir(path, clean=True))
+      return path
+
+  def assert_extracts(self, artifact):
+    safe_mkdir(self.classes, clean=True)
+    artifact.extract()
+    with open(os.path.join(self.classes, 'org', 'A.class')) as fp:
+      self.assertEqual('cafebabe' * 100, fp.read())
+    with open(os.path.join(self.classes, 'org', 'B.class')) as fp:
+      self.assertEqual('deadbeef' * 100, fp.read())
+    self.assertIn('classes/org/A.class', set(artifact._relpaths))
+
+  def test_round_trip(self):
+    for name, codec_type in ARTIFACT_CODECS.items():
+      if codec_type.is_available():
+        TarballArtifact(self.artifact_root, self.tarball, 5, codec=name).collect([self.classes])
+        self.assert_extracts(TarballArtifact(self.artifact_root, self.tarball))
+
+  def test_gzip_is_headerless(self):
+    TarballArtifact(self.artifact_root, self.tarball, 5, codec='gzip').collect([self.classes])
+    with tarfile.open(self.tarball, 'r:gz') as tarin:
+      self.assertIn('classes/org/A.class', tarin.getnames())
+
+  def test_reads_legacy_tarballs(self):
+    for mode in ('w:gz', 'w'):
+      with tarfile.open(self.tarball, mode) as tarout:
+        tarout.add(self.classes, 'classes')
+      self.assert_extracts(TarballArtifact(self.artifact_root, self.tarball))
+
+  def test_corrupt(self):
+    for name, codec_type in ARTIFACT_CODECS.items():
+      if codec_type.is_available():
+        TarballArtifact(self.artifact_root, self.tarball, 5, codec=name).collect([self.classes])
+        with open(self.tarball, 'rb') as fp:
+          data = fp.read()
+        with open(self.tarball, 'wb') as fp:
+          fp.write(data[:len(data) // 2])
+        with self.assertRaises(ArtifactError):
+          TarballArtifact(self.artifact_root, self.tarball).extract()
+
+  def test_corrupt_leaves_no_partial_artifact(self):
+    with tarfile.open(self.tarball, 'w') as tarout:
+      tarout.add(os.path.join(self.classes, 'org', 'A.class'), 'classes/org/A.class')
+      tarout.add(os.path.join(self.classes, 'org', 'B.class'), 'classes/org/B.class')
+    with open(self.tarball, 'rb') as fp:
+      data = fp.read()
+    # Cut into the header of B.class, after A.class is whole.
+    with open(self.tarball, 'wb') as fp:
+      fp.write(data[:3 * tarfile.BLOCKSIZE + 10])
+    safe_mkdir(self.classes, clean=True)
+    with self.assertRaises(ArtifactError):
+      TarballArtifact(self.artifact_root, self.tarball).extract()
+    self.assertFalse(os.path.exists(os.path.join(self.classes, 'org', 'A.class')))
+    self.assertFalse(os.path.exists(os.path.join(self.classes, 'org', 'B.class')))
+
+  def test_unknown_codec(self):
+    with self.assertRaises(ArtifactError):
+      get_artifact_codec('bogus')
+
+  def test_truncated_gzip_trailer(self):
+    TarballArtifact(self.artifact_root, self.tarball, 5, codec='gzip').collect([self.classes])
+    with open(self.tarball, 'rb') as fp:
+      data = fp.read()
+    with open(self.tarball, 'wb') as fp:
+      fp.write(data[:-4])
+    with self.assertRaises(ArtifactError):
+      TarballArtifact(self.artifact_root, self.tarball).extract()
+
+  def test_extract_from_chunks_tees(self):
+    for name, codec_type in ARTIFACT_CODECS.items():
+      if codec_type.is_available():
+        TarballArtifact(self.artifact_root, self.tarball, 5, codec=name).collect([self.classes])
+        with open(self.tarball, 'rb') as fp:
+          data = fp.read()
+        safe_mkdir(self.classes, clean=True)
+        tee = io.BytesIO()
+        artifact = TarballArtifact(self.artifact_root, None)
+        artifact.extract_from((data[i:i + 7] for i in range(0, len(data), 7)), tee=tee)
+        self.assertEqual(data, tee.getvalue())
+        self.assertIn('classes/org/A.class', set(artifact._relpaths))
+        with open(os.path.join(self.classes, 'org', 'B.class')) as fp:
+          self.assertEqual('deadbeef' * 100, fp.read())
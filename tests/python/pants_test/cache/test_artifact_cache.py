@@ -8,21 +8,23 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import os
 import SimpleHTTPServer
 import SocketServer
+import stat
 import unittest
 from contextlib import contextmanager
 from threading import Thread
 
 from pants.base.build_invalidator import CacheKey
 from pants.cache.artifact_cache import UnreadableArtifact, call_insert, call_use_cached_files
+from pants.cache.content_addressed_artifact_cache import ContentAddressedLocalArtifactCache
 from pants.cache.local_artifact_cache import LocalArtifactCache, TempLocalArtifactCache
 from pants.cache.restful_artifact_cache import InvalidRESTfulCacheProtoError, RESTfulArtifactCache
 from pants.util.contextutil import pushd, temporary_dir, temporary_file
-from pants.util.dirutil import safe_mkdir
+from pants.util.dirutil import safe_file_dump, safe_mkdir
 from pants_test.base.context_utils import create_context
 
 
 # A very trivial server that serves files under the cwd.
-class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+class NoBulkRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
   def __init__(self, request, client_address, server):
     # The base class implements GET and HEAD.
     SimpleHTTPServer.SimpleHTTPRequestHandler.__init__(self, request, client_address, server)
@@ -50,6 +52,52 @@ class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
     self.end_headers()
 
 
+class SimpleRESTHandler(NoBulkRESTHandler):
+  """Adds support for RESTfulArtifactCache's bulk existence probe."""
+
+  def do_POST(self):
+    base, _, endpoint = self.path.rpartition('/')
+    if endpoint != RESTfulArtifactCache.BULK_EXISTS_PATH:
+      self.send_error(404, 'File not found')
+      return
+    content_length = int(self.headers.getheader('content-length'))
+    paths = self.rfile.read(content_length).splitlines()
+    present = [path for path in paths
+               if os.path.isfile(self.translate_path('{0}/{1}'.format(base, path)))]
+    content = '\n'.join(present)
+    self.send_response(200)
+    self.send_header(RESTfulArtifactCache.BULK_EXISTS_HEADER, '1')
+    self.send_header('Content-Length', str(len(content)))
+    self.end_headers()
+    self.wfile.write(content)
+
+
+class CatchAllRESTHandler(NoBulkRESTHandler):
+  """Responds to any POST with an empty success, like a service unaware of the bulk probe."""
+
+  def do_POST(self):
+    self.send_response(200)
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+
+class FlakyBulkRESTHandler(SimpleRESTHandler):
+  """Fails the first bulk existence probe it is sent."""
+
+  failed = False
+
+  def do_POST(self):
+    if FlakyBulkRESTHandler.failed:
+      SimpleRESTHandler.do_POST(self)
+    else:
+      FlakyBulkRESTHandler.failed = True
+      self.send_error(503, 'Service unavailable')
+
+
+class ThreadingTCPServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+  daemon_threads = True
+
+
 class FailRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
   """Reject all requests"""
   def __init__(self, request, client_address, server):
@@ -84,7 +132,13 @@ class TestArtifactCache(unittest.TestCase):
         yield LocalArtifactCache(artifact_root, cache_root, compression=0)
 
   @contextmanager
-  def setup_server(self, return_failed=False):
+  def setup_content_addressed_cache(self, **kwargs):
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as cache_root:
+        yield ContentAddressedLocalArtifactCache(artifact_root, cache_root, compression=0, **kwargs)
+
+  @contextmanager
+  def setup_server(self, return_failed=False, handler=None):
     httpd = None
     httpd_thread = None
     try:
@@ -93,8 +147,8 @@ class TestArtifactCache(unittest.TestCase):
           if return_failed:
             handler = FailRESTHandler
           else:
-            handler = SimpleRESTHandler
-          httpd = SocketServer.TCPServer(('localhost', 0), handler)
+            handler = handler or SimpleRESTHandler
+          httpd = ThreadingTCPServer(('localhost', 0), handler)
           port = httpd.server_address[1]
           httpd_thread = Thread(target=httpd.serve_forever)
           httpd_thread.start()
@@ -106,11 +160,11 @@ class TestArtifactCache(unittest.TestCase):
         httpd_thread.join()
 
   @contextmanager
-  def setup_rest_cache(self, local=None, return_failed=False):
+  def setup_rest_cache(self, local=None, return_failed=False, handler=None, bulk_exists=False):
     with temporary_dir() as artifact_root:
       local = local or TempLocalArtifactCache(artifact_root, 0)
-      with self.setup_server(return_failed=return_failed) as base_url:
-        yield RESTfulArtifactCache(artifact_root, base_url, local)
+      with self.setup_server(return_failed=return_failed, handler=handler) as base_url:
+        yield RESTfulArtifactCache(artifact_root, base_url, local, bulk_exists=bulk_exists)
 
   @contextmanager
   def setup_test_file(self, parent):
@@ -125,6 +179,145 @@ class TestArtifactCache(unittest.TestCase):
     with self.setup_local_cache() as artifact_cache:
       self.do_test_artifact_cache(artifact_cache)
 
+  def test_content_addressed_cache(self):
+    with self.setup_content_addressed_cache() as artifact_cache:
+      self.do_test_artifact_cache(artifact_cache)
+
+  def test_content_addressed_cache_hardlinks(self):
+    with self.setup_content_addressed_cache(use_hardlinks=True) as artifact_cache:
+      self.do_test_artifact_cache(artifact_cache)
+
+  def test_content_addressed_cache_dedups_and_restores_dirs(self):
+    with self.setup_content_addressed_cache() as artifact_cache:
+      root = artifact_cache.artifact_root
+      classes = os.path.join(root, 'classes')
+      safe_file_dump(os.path.join(classes, 'a', 'A.class'), TEST_CONTENT1)
+      safe_file_dump(os.path.join(classes, 'b', 'B.class'), TEST_CONTENT1)
+      safe_mkdir(os.path.join(classes, 'empty'))
+      key1 = CacheKey('target1', 'hash1', 1)
+      key2 = CacheKey('target2', 'hash2', 1)
+      artifact_cache.insert(key1, [classes])
+      artifact_cache.insert(key2, [os.path.join(classes, 'a', 'A.class')])
+      self.assertEquals(1, len(list(artifact_cache._iter_blobs())))
+
+      safe_mkdir(classes, clean=True)
+      self.assertTrue(artifact_cache.use_cached_files(key1))
+      for relpath in ('a/A.class', 'b/B.class'):
+        with open(os.path.join(classes, relpath)) as infile:
+          self.assertEquals(TEST_CONTENT1, infile.read())
+      self.assertTrue(os.path.isdir(os.path.join(classes, 'empty')))
+
+  def test_content_addressed_cache_lru_eviction(self):
+    with self.setup_content_addressed_cache(max_bytes=len(TEST_CONTENT1) * 2) as artifact_cache:
+      keys = [CacheKey('target{0}'.format(i), 'hash', 1) for i in range(3)]
+      paths = []
+      for i, key in enumerate(keys):
+        path = os.path.join(artifact_cache.artifact_root, 'f{0}'.format(i))
+        safe_file_dump(path, '{0}{1}'.format(TEST_CONTENT1[:-1], i))
+        paths.append(path)
+      artifact_cache.insert(keys[0], [paths[0]])
+      artifact_cache.insert(keys[1], [paths[1]])
+      # Blobs written since a prune started are kept, so age the blobs of these entries.
+      for _, blob_path in artifact_cache._iter_blobs():
+        os.utime(blob_path, (0, 0))
+      # Make the second entry the least recently used, even though the first is older.
+      os.utime(artifact_cache._manifest_for_key(keys[1]), (0, 0))
+      self.assertTrue(artifact_cache.use_cached_files(keys[0]))
+      artifact_cache.insert(keys[2], [paths[2]])
+
+      self.assertTrue(artifact_cache.has(keys[0]))
+      self.assertFalse(artifact_cache.has(keys[1]))
+      self.assertTrue(artifact_cache.has(keys[2]))
+      self.assertEquals(2, len(list(artifact_cache._iter_blobs())))
+
+  def test_content_addressed_cache_prune_keeps_fresh_blobs(self):
+    with self.setup_content_addressed_cache(max_bytes=1) as artifact_cache:
+      key = CacheKey('muppet_key', 'fake_hash', 42)
+      with self.setup_test_file(artifact_cache.artifact_root) as path:
+        artifact_cache.insert(key, [path])
+      # An orphan written just now may be for an entry whose manifest has yet to land.
+      artifact_cache.delete(key)
+      artifact_cache.prune()
+      self.assertEquals(1, len(list(artifact_cache._iter_blobs())))
+
+  def test_content_addressed_cache_restores_blob_evicted_before_manifest(self):
+    with self.setup_content_addressed_cache() as artifact_cache:
+      key1 = CacheKey('target1', 'hash1', 1)
+      key2 = CacheKey('target2', 'hash2', 1)
+      with self.setup_test_file(artifact_cache.artifact_root) as path:
+        artifact_cache.insert(key1, [path])
+
+        # Evict the blob, as a concurrent prune might, after the second insert finds it stored.
+        store_blob = artifact_cache._store_blob
+        def store_blob_then_evict(blob_src):
+          digest = store_blob(blob_src)
+          os.unlink(artifact_cache._blob_path(digest))
+          return digest
+        artifact_cache._store_blob = store_blob_then_evict
+        artifact_cache.insert(key2, [path])
+        os.unlink(path)
+
+        self.assertTrue(artifact_cache.use_cached_files(key2))
+        with open(path) as infile:
+          self.assertEquals(TEST_CONTENT1, infile.read())
+
+  def test_content_addressed_cache_missing_blob_leaves_no_partial_artifact(self):
+    with self.setup_content_addressed_cache() as artifact_cache:
+      root = artifact_cache.artifact_root
+      classes = os.path.join(root, 'classes')
+      safe_file_dump(os.path.join(classes, 'A.class'), TEST_CONTENT1)
+      safe_file_dump(os.path.join(classes, 'B.class'), TEST_CONTENT2)
+      key = CacheKey('target', 'hash', 1)
+      artifact_cache.insert(key, [classes])
+      for digest, blob_path in artifact_cache._iter_blobs():
+        with open(blob_path) as infile:
+          if infile.read() == TEST_CONTENT2:
+            os.unlink(blob_path)
+
+      safe_mkdir(classes, clean=True)
+      self.assertIsInstance(artifact_cache.use_cached_files(key), UnreadableArtifact)
+      self.assertEquals([], os.listdir(classes))
+
+  def test_content_addressed_cache_hardlinks_keep_mode(self):
+    with self.setup_content_addressed_cache(use_hardlinks=True) as artifact_cache:
+      key = CacheKey('muppet_key', 'fake_hash', 42)
+      with self.setup_test_file(artifact_cache.artifact_root) as path:
+        os.chmod(path, 0o755)
+        artifact_cache.insert(key, [path])
+        (_, blob_path), = artifact_cache._iter_blobs()
+        blob_mode = stat.S_IMODE(os.stat(blob_path).st_mode)
+        self.assertNotEquals(0o755, blob_mode)
+        os.unlink(path)
+
+        self.assertTrue(artifact_cache.use_cached_files(key))
+        self.assertEquals(0o755, stat.S_IMODE(os.stat(path).st_mode))
+        self.assertEquals(blob_mode, stat.S_IMODE(os.stat(blob_path).st_mode))
+
+  def test_content_addressed_cache_unbounded_skips_size_accounting(self):
+    with self.setup_content_addressed_cache() as artifact_cache:
+      artifact_cache._iter_blobs = lambda: self.fail('Unexpected walk of the blobs.')
+      key = CacheKey('muppet_key', 'fake_hash', 42)
+      with self.setup_test_file(artifact_cache.artifact_root) as path:
+        artifact_cache.insert(key, [path])
+      self.assertTrue(artifact_cache.has(key))
+
+  def test_content_addressed_backed_remote_cache(self):
+    with self.setup_server() as url:
+      with self.setup_content_addressed_cache() as local:
+        tmp = TempLocalArtifactCache(local.artifact_root, 0)
+        remote = RESTfulArtifactCache(local.artifact_root, url, tmp)
+        combined = RESTfulArtifactCache(local.artifact_root, url, local)
+        key = CacheKey('muppet_key', 'fake_hash', 42)
+        with self.setup_test_file(local.artifact_root) as path:
+          remote.insert(key, [path])
+          self.assertFalse(local.has(key))
+          with open(path, 'w') as outfile:
+            outfile.write(TEST_CONTENT2)
+          self.assertTrue(bool(combined.use_cached_files(key)))
+          self.assertTrue(local.has(key))
+          with open(path, 'r') as infile:
+            self.assertEquals(TEST_CONTENT1, infile.read())
+
   def test_restful_cache(self):
     with self.assertRaises(InvalidRESTfulCacheProtoError):
       RESTfulArtifactCache('foo', 'ftp://localhost/bar', 'foo')
@@ -200,6 +393,23 @@ class TestArtifactCache(unittest.TestCase):
           self.assertTrue(local.has(key))
           self.assertTrue(bool(local.use_cached_files(key)))
 
+  def test_store_and_use_truncated_artifact(self):
+    with self.setup_local_cache() as local:
+      with temporary_dir() as tmpdir:
+        tmp = TempLocalArtifactCache(tmpdir, 0)
+        key = CacheKey('muppet_key', 'fake_hash', 42)
+        with self.setup_test_file(tmpdir) as path:
+          with tmp.insert_paths(key, [path]) as tarball:
+            with open(tarball, 'rb') as fp:
+              data = fp.read()
+        chunks = [data[:len(data) // 2]]
+        self.assertIsInstance(local.store_and_use_artifact(key, iter(chunks)), UnreadableArtifact)
+        self.assertFalse(local.has(key))
+
+        chunks = [data[i:i + 100] for i in range(0, len(data), 100)]
+        self.assertTrue(local.store_and_use_artifact(key, iter(chunks)))
+        self.assertTrue(local.has(key))
+
   def test_multiproc(self):
     context = create_context()
     key = CacheKey('muppet_key', 'fake_hash', 42)
@@ -226,3 +436,81 @@ class TestArtifactCache(unittest.TestCase):
       with self.setup_test_file(cache.artifact_root) as path:
         context.subproc_map(call_insert, [(cache, key, [path], False)])
       self.assertFalse(context.subproc_map(call_use_cached_files, [(cache, key)])[0])
+
+  def do_test_bulk_lookup(self, artifact_cache, expect_head_requests=True):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(4)]
+    with self.setup_test_file(artifact_cache.artifact_root) as path:
+      artifact_cache.insert(keys[1], [path])
+      artifact_cache.insert(keys[3], [path])
+      if not expect_head_requests:
+        artifact_cache._remote_has = lambda cache_key: self.fail('Unexpected HEAD request.')
+      self.assertEquals([False, True, False, True], artifact_cache.bulk_has(keys))
+
+      with open(path, 'w') as outfile:
+        outfile.write(TEST_CONTENT2)
+      # Artifacts are downloaded without first asking whether they exist.
+      artifact_cache._remote_has = lambda cache_key: self.fail('Unexpected HEAD request.')
+      self.assertEquals([False, True, False, True], artifact_cache.bulk_use_cached_files(keys))
+      with open(path, 'r') as infile:
+        self.assertEquals(TEST_CONTENT1, infile.read())
+
+  def test_restful_cache_bulk_lookup(self):
+    with self.setup_rest_cache() as artifact_cache:
+      artifact_cache._request = self.fail_bulk_exists_requests(artifact_cache._request)
+      self.do_test_bulk_lookup(artifact_cache)
+
+  def test_restful_cache_bulk_exists_lookup(self):
+    with self.setup_rest_cache(bulk_exists=True) as artifact_cache:
+      self.do_test_bulk_lookup(artifact_cache, expect_head_requests=False)
+      self.assertTrue(artifact_cache._bulk_exists_supported)
+
+  def test_restful_cache_bulk_exists_lookup_fallback(self):
+    with self.setup_rest_cache(handler=NoBulkRESTHandler, bulk_exists=True) as artifact_cache:
+      self.do_test_bulk_lookup(artifact_cache)
+      # Errors may be transient, so the probe is retried on the next lookup.
+      self.assertTrue(artifact_cache._bulk_exists_supported)
+
+  def test_restful_cache_bulk_exists_lookup_ignores_unmarked_response(self):
+    with self.setup_rest_cache(handler=CatchAllRESTHandler, bulk_exists=True) as artifact_cache:
+      self.do_test_bulk_lookup(artifact_cache)
+      self.assertFalse(artifact_cache._bulk_exists_supported)
+
+  def test_restful_cache_bulk_exists_lookup_survives_failure(self):
+    FlakyBulkRESTHandler.failed = False
+    with self.setup_rest_cache(handler=FlakyBulkRESTHandler, bulk_exists=True) as artifact_cache:
+      self.do_test_bulk_lookup(artifact_cache)
+      self.assertTrue(FlakyBulkRESTHandler.failed)
+      self.assertTrue(artifact_cache._bulk_exists_supported)
+      artifact_cache._remote_has = lambda cache_key: self.fail('Unexpected HEAD request.')
+      keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(4)]
+      self.assertEquals([False, True, False, True], artifact_cache.bulk_has(keys))
+
+  def fail_bulk_exists_requests(self, request):
+    def checked_request(method, path, body=None):
+      if method == 'POST':
+        self.fail('Unexpected bulk existence probe.')
+      return request(method, path, body=body)
+    return checked_request
+
+  def test_restful_cache_bulk_lookup_skips_has_for_known_misses(self):
+    with self.setup_rest_cache(bulk_exists=True) as artifact_cache:
+      key = CacheKey('muppet_key', 'fake_hash', 42)
+      self.assertEquals([False], artifact_cache.bulk_use_cached_files([key]))
+      with self.setup_test_file(artifact_cache.artifact_root) as path:
+        artifact_cache._remote_has = lambda cache_key: self.fail('Unexpected HEAD request.')
+        self.assertTrue(artifact_cache.insert(key, [path]))
+        self.assertEquals([True], artifact_cache.bulk_use_cached_files([key]))
+
+  def test_restful_cache_bulk_lookup_records_misses_found_by_get(self):
+    with self.setup_rest_cache() as artifact_cache:
+      key = CacheKey('muppet_key', 'fake_hash', 42)
+      self.assertEquals([False], artifact_cache.bulk_use_cached_files([key]))
+      self.assertIn(key, artifact_cache._known_missing)
+
+  def test_failed_bulk_lookup(self):
+    with self.setup_rest_cache(return_failed=True) as artifact_cache:
+      keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(2)]
+      results = artifact_cache.bulk_use_cached_files(keys)
+      self.assertEquals(2, len(results))
+      for result in results:
+        self.assertIsInstance(result, UnreadableArtifact)
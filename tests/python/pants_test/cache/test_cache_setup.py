@@ -10,6 +10,7 @@ import os
 from pants.backend.core.tasks.task import Task
 from pants.cache.cache_setup import (CacheFactory, CacheSetup, CacheSpecFormatError,
                                      LocalCacheSpecRequiredError, RemoteCacheSpecRequiredError)
+from pants.cache.content_addressed_artifact_cache import ContentAddressedLocalArtifactCache
 from pants.cache.local_artifact_cache import LocalArtifactCache
 from pants.cache.restful_artifact_cache import RESTfulArtifactCache
 from pants.subsystem.subsystem import Subsystem
@@ -53,22 +54,23 @@ class TestCacheSetup(BaseTest):
     self.assertEquals('https://host2:666/path/to', best)
 
   def test_cache_spec_parsing(self):
-    def mk_cache(spec):
+    def mk_cache(spec, local_store='tarball'):
       Subsystem.reset()
       self.set_options_for_scope(CacheSetup.subscope(DummyTask.options_scope),
-                                 read_from=spec, compression=1)
+                                 read_from=spec, compression=1, local_store=local_store)
       self.context(for_task_types=[DummyTask])  # Force option initialization.
       cache_factory = CacheSetup.create_cache_factory_for_task(DummyTask)
       return cache_factory.get_read_cache()
 
-    def check(expected_type, spec):
-      cache = mk_cache(spec)
+    def check(expected_type, spec, local_store='tarball'):
+      cache = mk_cache(spec, local_store=local_store)
       self.assertIsInstance(cache, expected_type)
       self.assertEquals(cache.artifact_root, self.pants_workdir)
 
     with temporary_dir() as tmpdir:
       cachedir = os.path.join(tmpdir, 'cachedir')  # Must be a real path, so we can safe_mkdir it.
       check(LocalArtifactCache, cachedir)
+      check(ContentAddressedLocalArtifactCache, cachedir, local_store='content-addressed')
       check(RESTfulArtifactCache, 'http://localhost/bar')
       check(RESTfulArtifactCache, 'https://localhost/bar')
       check(RESTfulArtifactCache, [cachedir, 'http://localhost/bar'])
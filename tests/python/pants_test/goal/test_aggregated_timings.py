@@ -0,0 +1,32 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import unittest
+
+from pants.goal.aggregated_timings import AggregatedTimings
+from pants.util.contextutil import temporary_dir
+
+
+class AggregatedTimingsTest(unittest.TestCase):
+
+  def test_write_once(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'timings')
+      timings = AggregatedTimings(path)
+      timings.add_timing('main:compile', 1.0)
+      timings.add_timing('main:compile:javac', 3.0, is_tool=True)
+      timings.add_timing('main:compile', 4.0)
+      # Nothing is written until asked.
+      self.assertFalse(os.path.exists(path))
+
+      self.assertEqual([{'label': 'main:compile', 'timing': 5.0, 'is_tool': False},
+                        {'label': 'main:compile:javac', 'timing': 3.0, 'is_tool': True}],
+                       timings.get_all())
+      timings.write()
+      with open(path) as fp:
+        self.assertEqual('main:compile: 5.0\nmain:compile:javac: 3.0\n', fp.read())
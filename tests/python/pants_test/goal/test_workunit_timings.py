@@ -0,0 +1,63 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import json
+import os
+import unittest
+
+from pants.base.workunit import WorkUnit, WorkUnitLabel
+from pants.goal.workunit_timings import WorkUnitTimings
+from pants.util.contextutil import temporary_dir
+
+
+class WorkUnitTimingsTest(unittest.TestCase):
+
+  def read_records(self, path):
+    if not os.path.exists(path):
+      return []
+    with open(path) as fp:
+      return [json.loads(line) for line in fp]
+
+  def test_buffered_records(self):
+    with temporary_dir() as root:
+      path = os.path.join(root, 'run', 'workunit_timings.jsonl')
+      timings = WorkUnitTimings(path, run_id='run_1', buffer_size=2)
+
+      main = WorkUnit(run_info_dir=root, parent=None, name='main')
+      main.start()
+      javac = WorkUnit(run_info_dir=root, parent=main, name='javac', labels=[WorkUnitLabel.TOOL])
+      javac.start()
+      javac.set_outcome(WorkUnit.SUCCESS)
+      javac.end()
+      timings.record(javac, 0.5)
+      self.assertEqual([], self.read_records(path))
+
+      main.end()
+      timings.record(main, 0.25)
+      records = self.read_records(path)
+      self.assertEqual(['main:javac', 'main'], [record['path'] for record in records])
+      javac_record, main_record = records
+      self.assertEqual('run_1', javac_record['run_id'])
+      self.assertEqual(str(main.id), javac_record['parent_id'])
+      self.assertIsNone(main_record['parent_id'])
+      self.assertEqual(['TOOL'], javac_record['labels'])
+      self.assertEqual('SUCCESS', javac_record['outcome'])
+      self.assertEqual(0.5, javac_record['self_time'])
+      self.assertEqual(javac.duration(), javac_record['duration'])
+
+      timings.record(main, 0.25)
+      timings.flush()
+      self.assertEqual(3, len(self.read_records(path)))
+
+  def test_no_path(self):
+    timings = WorkUnitTimings()
+    with temporary_dir() as root:
+      main = WorkUnit(run_info_dir=root, parent=None, name='main')
+      main.start()
+      main.end()
+      timings.record(main, 0.0)
+      timings.flush()
@@ -0,0 +1,204 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import threading
+import time
+import unittest
+
+from mock import Mock
+
+from pants.java.distribution.distribution import Distribution
+from pants.java.nailgun_pool import NailgunPool, PooledNailgunExecutor
+from pants.util.contextutil import temporary_dir
+
+
+class FakeExecutor(object):
+  """Stands in for a NailgunExecutor, keeping server states in a dict shared by all instances."""
+
+  class NonResponsiveProcess(Exception): pass
+
+  def __init__(self, servers, metadata_root, index, on_terminate=None):
+    self._servers = servers
+    self._on_terminate = on_terminate
+    self._metadata_root = metadata_root
+    self.index = index
+    self.name = 'fake_{}'.format(index)
+
+  def fingerprint_for(self, jvm_options, classpath):
+    return ' '.join(list(jvm_options or ()) + list(classpath))
+
+  def is_alive(self):
+    return self.index in self._servers
+
+  def is_running_for(self, fingerprint):
+    return self._servers.get(self.index) == fingerprint
+
+  def ensure_running(self, jvm_options, classpath):
+    self._servers[self.index] = self.fingerprint_for(jvm_options, classpath)
+
+  def terminate(self):
+    if self._on_terminate:
+      self._on_terminate(self)
+    self._servers.pop(self.index, None)
+
+  def get_metadata_dir(self):
+    return os.path.join(self._metadata_root, self.name)
+
+  def get_pid_path(self):
+    return os.path.join(self.get_metadata_dir(), 'pid')
+
+  def runner(self, classpath, main, jvm_options=None, args=None):
+    executor = self
+
+    class Runner(object):
+      def run(self, stdout=None, stderr=None, cwd=None):
+        executor.ensure_running(jvm_options, classpath)
+        return executor.index
+
+    return Runner()
+
+
+class NailgunPoolTest(unittest.TestCase):
+
+  def setUp(self):
+    self.servers = {}
+
+  def create_pool(self, metadata_root, size, idle_timeout=None, idle_scan_interval=0,
+                  on_terminate=None):
+    return NailgunPool(lambda index: FakeExecutor(self.servers, metadata_root, index, on_terminate),
+                       size, idle_timeout=idle_timeout, idle_scan_interval=idle_scan_interval)
+
+  def age(self, root, index, seconds):
+    last_used = os.path.join(root, 'fake_{}'.format(index), 'last_used')
+    long_ago = time.time() - seconds
+    os.utime(last_used, (long_ago, long_ago))
+
+  def test_invalid_size(self):
+    with self.assertRaises(ValueError):
+      NailgunPool(lambda index: None, 0)
+
+  def test_prefers_hot_instances(self):
+    with temporary_dir() as root:
+      pool = self.create_pool(root, 3)
+      self.servers[1] = 'cold.jar'
+      self.servers[2] = 'hot.jar'
+      with pool.checkout([], ['hot.jar']) as executor:
+        self.assertEqual(2, executor.index)
+        # Next best is an instance with no server to kill.
+        with pool.checkout([], ['hot.jar']) as executor:
+          self.assertEqual(0, executor.index)
+          with pool.checkout([], ['hot.jar']) as executor:
+            self.assertEqual(1, executor.index)
+
+  def test_checkout_waits_for_a_free_instance(self):
+    with temporary_dir() as root:
+      pool = self.create_pool(root, 1)
+      checked_out = []
+
+      def checkout():
+        with pool.checkout([], ['a.jar']) as executor:
+          checked_out.append(executor.index)
+
+      with pool.checkout([], ['a.jar']):
+        thread = threading.Thread(target=checkout)
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual([], checked_out)
+      thread.join()
+      self.assertEqual([0], checked_out)
+
+  def test_prewarm(self):
+    with temporary_dir() as root:
+      pool = self.create_pool(root, 3)
+      self.servers[0] = '-Xmx1g a.jar'
+      pool.prewarm(['-Xmx1g'], ['a.jar'], count=2)
+      # Instance 0 already counts as warm, so only instance 1 needs starting.  It is checked out
+      # while it warms, so checking out every instance waits for the warming to finish.
+      with pool.checkout(['-Xmx1g'], ['a.jar']), pool.checkout(['-Xmx1g'], ['a.jar']):
+        with pool.checkout(['-Xmx1g'], ['a.jar']):
+          pass
+      self.assertEqual({0: '-Xmx1g a.jar', 1: '-Xmx1g a.jar'}, self.servers)
+
+  def test_kills_idle_servers(self):
+    with temporary_dir() as root:
+      pool = self.create_pool(root, 2, idle_timeout=60)
+      self.servers[0] = 'a.jar'
+      self.servers[1] = 'a.jar'
+      with pool.checkout([], ['a.jar']) as executor:
+        self.assertEqual(0, executor.index)
+      with pool.checkout([], ['a.jar']):
+        with pool.checkout([], ['a.jar']):
+          pass
+
+      # Age instance 1's last use past the timeout.
+      self.age(root, 1, 120)
+      with pool.checkout([], ['a.jar']) as executor:
+        self.assertEqual(0, executor.index)
+      self.assertEqual({0: 'a.jar'}, self.servers)
+
+  def test_zero_idle_timeout_never_kills(self):
+    with temporary_dir() as root:
+      pool = self.create_pool(root, 2, idle_timeout=0)
+      self.servers[1] = 'a.jar'
+      with pool.checkout([], ['a.jar']):
+        pass
+      self.age(root, 1, 120)
+      with pool.checkout([], ['b.jar']):
+        pass
+      self.assertEqual({1: 'a.jar'}, self.servers)
+
+  def test_idle_scans_are_rate_limited(self):
+    with temporary_dir() as root:
+      pool = self.create_pool(root, 2, idle_timeout=60, idle_scan_interval=3600)
+      self.servers[0] = 'a.jar'
+      self.servers[1] = 'b.jar'
+      with pool.checkout([], ['a.jar']):
+        pass
+      with pool.checkout([], ['b.jar']):
+        pass
+      # The first check in scanned for idle servers, so this one doesn't.
+      self.age(root, 1, 120)
+      with pool.checkout([], ['a.jar']):
+        pass
+      self.assertEqual({0: 'a.jar', 1: 'b.jar'}, self.servers)
+
+  def test_kills_idle_servers_without_blocking_checkouts(self):
+    with temporary_dir() as root:
+      checked_out = []
+
+      def checkout_while_terminating(executor):
+        def checkout():
+          with pool.checkout([], ['a.jar']) as other:
+            checked_out.append(other.index)
+        thread = threading.Thread(target=checkout)
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+
+      pool = self.create_pool(root, 2, idle_timeout=60, on_terminate=checkout_while_terminating)
+      self.servers[0] = 'a.jar'
+      self.servers[1] = 'b.jar'
+      with pool.checkout([], ['b.jar']) as executor:
+        self.assertEqual(1, executor.index)
+      self.age(root, 1, 120)
+      with pool.checkout([], ['a.jar']) as executor:
+        self.assertEqual(0, executor.index)
+      # Instance 1 was being killed, so the checkout got instance 0 once it was checked in.
+      self.assertEqual([0], checked_out)
+      self.assertEqual({0: 'a.jar'}, self.servers)
+
+  def test_pooled_executor(self):
+    with temporary_dir() as root:
+      pool = self.create_pool(root, 2)
+      executor = PooledNailgunExecutor(pool, Mock(spec=Distribution))
+      self.servers[1] = 'b.jar'
+      self.assertEqual(1, executor.execute(['b.jar'], 'Main'))
+      with pool.checkout([], ['b.jar']) as checked_out:
+        self.assertEqual(1, checked_out.index)
+        # The instance in use by another caller isn't shared.
+        self.assertEqual(0, executor.execute(['b.jar'], 'Main'))
@@ -172,3 +172,28 @@ class BootstrapOptionsTest(unittest.TestCase):
 
     vals = parse_options('main', 'args', '--', '-d/tmp/logs')
     self.assertIsNone(vals.logdir)
+
+  def test_bootstrap_only(self):
+    with temporary_file() as fp:
+      fp.write(dedent('''
+      [DEFAULT]
+      pants_workdir: /from_config/.pants.d
+      '''))
+      fp.close()
+      env = {'PANTS_SUPPORTDIR': '/from_env/build-support', 'HOME': '/home/user'}
+      args = ['./pants', '--pants-distdir=/from_args/dist', '--spec-excludes=foo', 'list', '::']
+      bootstrapper = OptionsBootstrapper(env=env, configpath=fp.name, args=args).bootstrap_only()
+
+      self.assertEqual({'PANTS_SUPPORTDIR': '/from_env/build-support'},
+                       bootstrapper.get_option_env())
+      self.assertEqual([fp.name], bootstrapper.get_config_paths())
+      vals = bootstrapper.get_bootstrap_options().for_global_scope()
+      self.assertEqual('/from_config/.pants.d', vals.pants_workdir)
+      self.assertEqual('/from_env/build-support', vals.pants_supportdir)
+      self.assertEqual('/from_args/dist', vals.pants_distdir)
+
+      opts = bootstrapper.get_full_options(known_scope_infos=[ScopeInfo('', ScopeInfo.GLOBAL)])
+      opts.register('', '--pants-distdir')  # So we don't choke on it on the cmd line.
+      opts.register('', '--spec-excludes', action='append')
+      self.assertFalse(opts.for_global_scope().spec_excludes)
+      self.assertEqual([], opts.goals)
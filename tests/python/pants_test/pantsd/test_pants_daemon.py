@@ -0,0 +1,139 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import socket
+import unittest
+from contextlib import contextmanager
+from StringIO import StringIO
+
+import mock
+
+from pants.java.nailgun_client import NailgunSession
+from pants.pantsd.pants_daemon import PantsDaemon, _ChunkReader
+from pants.util.contextutil import temporary_dir
+
+
+class FakeRunner(object):
+  def warm(self):
+    pass
+
+  def invalidate_changed(self):
+    pass
+
+  def run(self, args, env, cwd):
+    # Runs see the client's stdio as their file descriptors 0, 1 and 2.
+    os.write(1, '{} in {}\n'.format(' '.join(args), cwd).encode('utf-8'))
+    os.write(2, '{}\n'.format(env.get('FAKE_RUNNER_VAR')).encode('utf-8'))
+    while env.get('FAKE_RUNNER_ECHO_STDIN'):
+      data = os.read(0, 1024)
+      if not data:
+        break
+      os.write(1, data)
+    return int(args[-1])
+
+
+class TestPantsDaemon(unittest.TestCase):
+  @contextmanager
+  def pants_daemon(self, fingerprint='fp'):
+    with temporary_dir() as metadata_dir:
+      with mock.patch.object(PantsDaemon, 'get_metadata_dir', return_value=metadata_dir):
+        yield PantsDaemon(fingerprint)
+
+  @contextmanager
+  def serving(self, pantsd):
+    pid = os.fork()
+    if pid == 0:
+      try:
+        pantsd.write_pid(os.getpid())
+        pantsd._write_file(pantsd.get_fingerprint_path(), 'fp')
+        pantsd.serve(FakeRunner())
+      finally:
+        os._exit(0)
+    try:
+      pantsd.await_socket(10)
+      yield
+    finally:
+      # The daemon stops serving once it is no longer the registered daemon.
+      os.unlink(pantsd.get_pid_path())
+      os.waitpid(pid, 0)
+
+  def test_fingerprint(self):
+    self.assertEqual(PantsDaemon.fingerprint('a', ['b']), PantsDaemon.fingerprint('a', ['b']))
+    self.assertNotEqual(PantsDaemon.fingerprint('a', ['b']), PantsDaemon.fingerprint('a', ['c']))
+    self.assertNotEqual(PantsDaemon.fingerprint('ab'), PantsDaemon.fingerprint('a', 'b'))
+
+  def test_execute_not_running(self):
+    with self.pants_daemon() as pantsd:
+      self.assertFalse(pantsd.is_running())
+      self.assertIsNone(pantsd.execute(['pants', '0'], {}, '/'))
+
+  def test_execute(self):
+    with self.pants_daemon() as pantsd:
+      with self.serving(pantsd):
+        self.assertTrue(pantsd.is_running())
+        self.assertFalse(PantsDaemon('other').is_running())
+
+        with temporary_dir() as cwd:
+          for exit_code in (0, 3):
+            out, err = StringIO(), StringIO()
+            self.assertEqual(exit_code,
+                             pantsd.execute(['pants', 'goal', str(exit_code)],
+                                            {'FAKE_RUNNER_VAR': 'value'}, cwd,
+                                            ins=None, out=out, err=err))
+            self.assertEqual('pants goal {} in {}\n'.format(exit_code, cwd), out.getvalue())
+            self.assertEqual('value\n', err.getvalue())
+
+  def test_execute_stdin(self):
+    with self.pants_daemon() as pantsd:
+      with self.serving(pantsd):
+        with temporary_dir() as cwd:
+          ins_path = os.path.join(cwd, 'ins')
+          with open(ins_path, 'w') as fp:
+            fp.write('some input\n')
+          out = StringIO()
+          with open(ins_path) as ins:
+            self.assertEqual(0, pantsd.execute(['pants', '0'], {'FAKE_RUNNER_ECHO_STDIN': '1'},
+                                               cwd, ins=ins, out=out, err=StringIO()))
+          self.assertEqual('pants 0 in {}\nsome input\n'.format(cwd), out.getvalue())
+
+  def test_execute_without_token(self):
+    with self.pants_daemon() as pantsd:
+      with self.serving(pantsd):
+        self.assertEqual(0o600, os.stat(pantsd.get_token_path()).st_mode & 0o777)
+        client = socket.create_connection(('127.0.0.1', pantsd.socket))
+        try:
+          for command, payload in (('A', '0'), ('E', 'PANTSD_TOKEN=guess'), ('D', '/'),
+                                   ('C', 'pants')):
+            NailgunSession._send_chunk(client, command, payload)
+          # The daemon hangs up without performing the run.
+          self.assertEqual(b'', client.recv(1024))
+        finally:
+          client.close()
+
+  def test_read_request(self):
+    with self.pants_daemon() as pantsd:
+      client, server = socket.socketpair()
+      try:
+        for command, payload in (('A', 'pants'), ('A', 'list'), ('E', 'A=B=C'),
+                                 ('E', 'PANTSD_TOKEN=secret'), ('D', '/tmp'), ('C', 'pants')):
+          NailgunSession._send_chunk(client, command, payload)
+        reader = _ChunkReader(server)
+        self.assertEqual((['pants', 'list'], {'A': 'B=C'}, '/tmp'),
+                         pantsd._read_request(reader, 'secret'))
+
+        for command, payload in (('A', 'pants'), ('E', 'PANTSD_TOKEN=guess'), ('C', 'pants')):
+          NailgunSession._send_chunk(client, command, payload)
+        with self.assertRaises(NailgunSession.ProtocolError):
+          pantsd._read_request(reader, 'secret')
+
+        NailgunSession._send_chunk(client, 'A', 'pants')
+        client.close()
+        with self.assertRaises(NailgunSession.ProtocolError):
+          pantsd._read_request(_ChunkReader(server), 'secret')
+      finally:
+        server.close()
@@ -0,0 +1,184 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import itertools
+import os
+import random
+import shutil
+import unittest
+from contextlib import contextmanager
+
+import mock
+
+from pants.pantsd.watcher import Changes, InotifyWatcher, PollingWatcher
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_file_dump, safe_mkdir
+
+
+class WatcherTestBase(object):
+  """Churns a synthetic tree under a watcher, and checks it reports exactly what changed."""
+
+  # The synthetic tree has WIDTH ** 2 directories, each with FILES files.
+  WIDTH = 10
+  FILES = 5
+  ROUNDS = 10
+  OPS_PER_ROUND = 25
+
+  def create_watcher(self, root_dir, excludes):
+    raise NotImplementedError()
+
+  @contextmanager
+  def watching(self, excludes=()):
+    with temporary_dir() as root_dir:
+      root_dir = os.path.realpath(root_dir)
+      for i in range(self.WIDTH):
+        for j in range(self.WIDTH):
+          for k in range(self.FILES):
+            path = os.path.join(root_dir, 'd{}'.format(i), 'd{}'.format(j), 'f{}'.format(k))
+            safe_file_dump(path, 'content')
+      safe_file_dump(os.path.join(root_dir, 'excluded', 'f'), 'content')
+      watcher = self.create_watcher(root_dir, excludes)
+      watcher.start()
+      try:
+        yield root_dir, watcher
+      finally:
+        watcher.stop()
+
+  def list_tree(self, root_dir):
+    files, dirs = set(), set()
+    for root, dirnames, filenames in os.walk(root_dir):
+      relroot = os.path.relpath(root, root_dir)
+      relroot = '' if relroot == os.curdir else relroot
+      dirnames[:] = [d for d in dirnames if d != 'excluded']
+      dirs.update(os.path.join(relroot, d) for d in dirnames)
+      files.update(os.path.join(relroot, f) for f in filenames)
+    return files, dirs
+
+  def churn(self, root_dir, rnd, counter):
+    """Makes random changes to the tree, and returns the `Changes` it made."""
+    changed_files, changed_dirs = set(), set()
+    for _ in range(self.OPS_PER_ROUND):
+      # New paths are always new, so that none is deleted and re-created within a round.
+      n = next(counter)
+      files, dirs = self.list_tree(root_dir)
+      files, dirs = sorted(files), sorted(dirs)
+      op = rnd.choice(['modify', 'modify', 'modify', 'create', 'delete', 'rename', 'mkdir',
+                       'rmdir', 'mvdir'])
+      if op == 'modify' and files:
+        path = rnd.choice(files)
+        with open(os.path.join(root_dir, path), 'a') as fp:
+          fp.write('more')
+        changed_files.add(path)
+      elif op == 'create' and dirs:
+        path = os.path.join(rnd.choice(dirs), 'new{}'.format(n))
+        safe_file_dump(os.path.join(root_dir, path), 'new')
+        changed_files.add(path)
+      elif op == 'delete' and files:
+        path = rnd.choice(files)
+        os.unlink(os.path.join(root_dir, path))
+        changed_files.add(path)
+      elif op == 'rename' and files:
+        path = rnd.choice(files)
+        dest = os.path.join(os.path.dirname(path), 'renamed{}'.format(n))
+        os.rename(os.path.join(root_dir, path), os.path.join(root_dir, dest))
+        changed_files.update([path, dest])
+      elif op == 'mkdir' and dirs:
+        path = os.path.join(rnd.choice(dirs), 'newdir{}'.format(n))
+        safe_file_dump(os.path.join(root_dir, path, 'sub', 'f'), 'new')
+        changed_dirs.add(path)
+      elif op == 'rmdir' and dirs:
+        path = rnd.choice(dirs)
+        shutil.rmtree(os.path.join(root_dir, path))
+        changed_dirs.add(path)
+      elif op == 'mvdir' and len(dirs) > 1:
+        path = rnd.choice(dirs)
+        dest = '{}_moved{}'.format(path, n)
+        os.rename(os.path.join(root_dir, path), os.path.join(root_dir, dest))
+        changed_dirs.update([path, dest])
+    return Changes(changed_files, changed_dirs)
+
+  def assert_changes(self, expected, actual, before, after):
+    self.assertIsNotNone(actual)
+    # Paths that were created and then deleted again needn't be reported.
+    existed = before[0] | before[1] | after[0] | after[1]
+    for path in expected.files | expected.dirs:
+      if path in existed:
+        self.assertTrue(actual.is_changed(path), 'Missed a change to {}'.format(path))
+    # Nothing that didn't change is reported.
+    for path in actual.files | actual.dirs:
+      self.assertTrue(expected.is_changed(path), 'Reported an unchanged {}'.format(path))
+
+  def test_no_changes(self):
+    with self.watching() as (_, watcher):
+      self.assertEqual(Changes(set(), set()), watcher.drain())
+
+  def test_churn(self):
+    rnd = random.Random(2015)
+    counter = itertools.count()
+    with self.watching() as (root_dir, watcher):
+      for _ in range(self.ROUNDS):
+        before = self.list_tree(root_dir)
+        expected = self.churn(root_dir, rnd, counter)
+        self.assert_changes(expected, watcher.drain(), before, self.list_tree(root_dir))
+      self.assertEqual(Changes(set(), set()), watcher.drain())
+
+  def test_changes_in_new_dirs(self):
+    with self.watching() as (root_dir, watcher):
+      safe_mkdir(os.path.join(root_dir, 'new'))
+      self.assertEqual(Changes(set(), set(['new'])), watcher.drain())
+      safe_file_dump(os.path.join(root_dir, 'new', 'f'), 'new')
+      self.assertEqual(Changes(set(['new/f']), set()), watcher.drain())
+
+  def test_excludes(self):
+    with self.watching(excludes=['excluded']) as (root_dir, watcher):
+      safe_file_dump(os.path.join(root_dir, 'excluded', 'f'), 'changed')
+      safe_file_dump(os.path.join(root_dir, 'excluded', 'g'), 'new')
+      self.assertEqual(Changes(set(), set()), watcher.drain())
+      self.assertFalse(watcher.watches(os.path.join(root_dir, 'excluded', 'f')))
+      self.assertTrue(watcher.watches(os.path.join(root_dir, 'd0', 'd0', 'f0')))
+
+  def test_watches_no_symlinks(self):
+    with temporary_dir() as outside:
+      safe_file_dump(os.path.join(outside, 'f'), 'content')
+      with self.watching() as (root_dir, watcher):
+        # Make the links before the watcher looks at the tree again.
+        watcher.stop()
+        os.symlink(os.path.join(outside, 'f'), os.path.join(root_dir, 'd0', 'link'))
+        os.symlink(outside, os.path.join(root_dir, 'dirlink'))
+        os.symlink(os.path.join(root_dir, 'd0'), os.path.join(root_dir, 'd0link'))
+        watcher.start()
+        self.assertFalse(watcher.watches(os.path.join(root_dir, 'd0', 'link')))
+        self.assertFalse(watcher.watches(os.path.join(root_dir, 'dirlink', 'f')))
+        self.assertFalse(watcher.watches(os.path.join(root_dir, 'd0link', 'd0', 'f0')))
+        self.assertTrue(watcher.watches(os.path.join(root_dir, 'd0', 'd0', 'f0')))
+
+
+class PollingWatcherTest(WatcherTestBase, unittest.TestCase):
+  def create_watcher(self, root_dir, excludes):
+    return PollingWatcher(root_dir, excludes)
+
+
+@unittest.skipUnless(InotifyWatcher.is_supported(), 'inotify is not available on this platform.')
+class InotifyWatcherTest(WatcherTestBase, unittest.TestCase):
+  def create_watcher(self, root_dir, excludes):
+    return InotifyWatcher(root_dir, excludes)
+
+  def test_overflow_loses_track(self):
+    with self.watching() as (root_dir, watcher):
+      watcher._handle_event(-1, InotifyWatcher.IN_Q_OVERFLOW, '')
+      self.assertIsNone(watcher.drain())
+      self.assertEqual(Changes(set(), set()), watcher.drain())
+
+  def test_exhaustion_loses_track_for_good(self):
+    with self.watching() as (root_dir, watcher):
+      error = InotifyWatcher.Error('Ran out of inotify watches')
+      with mock.patch.object(watcher, '_add_watch', side_effect=error):
+        safe_file_dump(os.path.join(root_dir, 'new', 'f'), 'new')
+        self.assertIsNone(watcher.drain())
+      self.assertTrue(watcher.exhausted)
+      self.assertIsNone(watcher.drain())
+      self.assertFalse(watcher.watches(os.path.join(root_dir, 'new', 'f')))
@@ -0,0 +1,82 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import json
+import os
+import threading
+import unittest
+
+from pants.base.run_info import RunInfo
+from pants.base.workunit import WorkUnit, WorkUnitLabel
+from pants.reporting.report import Report
+from pants.reporting.trace_reporter import TraceReporter
+from pants.util.contextutil import temporary_dir
+
+
+class FakeRunTracker(object):
+
+  def __init__(self, root):
+    self.run_timestamp = 100.0
+    self.run_info = RunInfo(os.path.join(root, 'info'))
+    self.run_info.add_info('id', 'pants_run_1')
+
+
+class TraceReporterTest(unittest.TestCase):
+
+  def workunit(self, root, parent, name, start, end, labels=None):
+    workunit = WorkUnit(run_info_dir=root, parent=parent, name=name, labels=labels)
+    workunit.start_time = start
+    workunit.end_time = end
+    workunit.set_outcome(WorkUnit.SUCCESS)
+    return workunit
+
+  def test_trace(self):
+    with temporary_dir() as root:
+      settings = TraceReporter.Settings(log_level=Report.INFO,
+                                        trace_file=os.path.join(root, 'trace.json'),
+                                        flamegraph_file=os.path.join(root, 'flamegraph.txt'))
+      reporter = TraceReporter(FakeRunTracker(root), settings)
+
+      main = self.workunit(root, None, 'main', 100.0, 104.0)
+      compile = self.workunit(root, main, 'compile', 100.5, 103.5)
+      javac = self.workunit(root, compile, 'javac', 101.0, 103.0, labels=[WorkUnitLabel.TOOL])
+      reporter.start_workunit(compile)
+
+      # Run javac on another thread, as a worker pool would.
+      def run_javac():
+        reporter.start_workunit(javac)
+        reporter.end_workunit(javac)
+      thread = threading.Thread(target=run_javac, name='worker-1')
+      thread.start()
+      thread.join()
+
+      reporter.end_workunit(compile)
+      # The root was started before the reporter was added.
+      reporter.end_workunit(main)
+      reporter.close()
+
+      with open(settings.trace_file) as fp:
+        trace = json.load(fp)
+      events = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+      self.assertEqual(['javac', 'compile', 'main'], [e['name'] for e in events])
+      self.assertEqual([1000000, 500000, 0], [e['ts'] for e in events])
+      self.assertEqual([2000000, 3000000, 4000000], [e['dur'] for e in events])
+      self.assertEqual('TOOL', events[0]['cat'])
+      self.assertEqual('main:compile:javac', events[0]['args']['path'])
+      self.assertEqual('SUCCESS', events[0]['args']['outcome'])
+      javac_tid, compile_tid, main_tid = [e['tid'] for e in events]
+      self.assertNotEqual(javac_tid, compile_tid)
+      self.assertEqual(compile_tid, main_tid)
+
+      thread_names = dict((e['tid'], e['args']['name']) for e in trace['traceEvents']
+                          if e['name'] == 'thread_name')
+      self.assertEqual('worker-1', thread_names[javac_tid])
+
+      with open(settings.flamegraph_file) as fp:
+        self.assertEqual('main 1000000\n'
+                         'main;compile 1000000\n'
+                         'main;compile;javac 2000000\n', fp.read())
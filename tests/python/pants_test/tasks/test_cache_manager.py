@@ -10,6 +10,7 @@ import tempfile
 
 from pants.base.build_invalidator import CacheKey, CacheKeyGenerator
 from pants.base.cache_manager import InvalidationCacheManager, InvalidationCheck, VersionedTarget
+from pants.base.target_durations import TargetDurations
 from pants_test.base_test import BaseTest
 
 
@@ -125,3 +126,24 @@ class InvalidationCacheManagerTest(BaseTest):
     self.assertEquals(1, len(partitioned[0].targets))
     self.assertEquals(3, len(partitioned[1].targets))
     self.assertEquals(1, len(partitioned[2].targets))
+
+  def test_partition_by_past_durations(self):
+    a = self.make_target(':a', dependencies=[])
+    b = self.make_target(':b', dependencies=[a])
+    c = self.make_target(':c', dependencies=[b])
+    d = self.make_target(':d', dependencies=[c])
+    e = self.make_target(':e', dependencies=[d])
+    targets = [a, b, c, d, e]
+
+    # a has taken as long as the rest together, so it costs 4 units to their 0.25.
+    durations = TargetDurations()
+    durations.record('Compile', a.id, 4.0, 1)
+    for target in targets[1:]:
+      durations.record('Compile', target.id, 0.25, 1)
+    cache_manager = InvalidationCacheManager(AppendingCacheKeyGenerator(), self._dir, True,
+                                             task_name='Compile', target_durations=durations)
+
+    all_vts = cache_manager.wrap_targets(targets)
+    self.assertEquals(4, all_vts[0].estimated_cost)
+    partitioned = InvalidationCheck(all_vts, [], 3).all_vts_partitioned
+    self.assertEquals([[a], [b, c, d, e]], [vts.targets for vts in partitioned])
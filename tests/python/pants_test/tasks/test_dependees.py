@@ -5,6 +5,7 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
 from textwrap import dedent
 
 from pants.backend.codegen.targets.java_thrift_library import JavaThriftLibrary
@@ -265,3 +266,16 @@ class ReverseDepmapTest(BaseReverseDepmapTest):
       targets=[self.target('common/a')],
       options={'spec_excludes': ['overlaps']}
     )
+
+  def test_index(self):
+    index = os.path.join(self.build_root, 'target_index.json')
+    for _ in range(2):
+      self.assert_console_output(
+        'overlaps:one',
+        'overlaps:three',
+        'overlaps:four',
+        'overlaps:five',
+        targets=[self.target('common/b')],
+        options={'transitive': True, 'index': index}
+      )
+    self.assertTrue(os.path.exists(index))
@@ -5,11 +5,11 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import time
 import unittest
 
-from pants.backend.jvm.tasks.jvm_compile.execution_graph import (ExecutionFailure, ExecutionGraph,
-                                                                 Job, JobExistsError,
-                                                                 NoRootJobError, UnknownJobError)
+from pants.base.execution_graph import (ExecutionFailure, ExecutionGraph, Job, JobExistsError,
+                                        NoRootJobError, UnknownJobError)
 
 
 class ImmediatelyExecutingPool(object):
@@ -35,20 +35,24 @@ def raising_fn():
   raise Exception("I'm an error")
 
 
+def sleeping_fn():
+  time.sleep(0.01)
+
+
 class ExecutionGraphTest(unittest.TestCase):
 
   def setUp(self):
     self.jobs_run = []
 
-  def execute(self, exec_graph):
-    exec_graph.execute(ImmediatelyExecutingPool(), PrintLogger())
+  def execute(self, exec_graph, max_workers=None):
+    exec_graph.execute(ImmediatelyExecutingPool(), PrintLogger(), max_workers=max_workers)
 
-  def job(self, name, fn, dependencies, on_success=None, on_failure=None):
+  def job(self, name, fn, dependencies, on_success=None, on_failure=None, size=1):
     def recording_fn():
       self.jobs_run.append(name)
       fn()
 
-    return Job(name, recording_fn, dependencies, on_success, on_failure)
+    return Job(name, recording_fn, dependencies, on_success, on_failure, size=size)
 
   def test_single_job(self):
     exec_graph = ExecutionGraph([self.job("A", passing_fn, [])])
@@ -194,3 +198,27 @@ class ExecutionGraphTest(unittest.TestCase):
                       self.job("Same", passing_fn, [])])
 
     self.assertEqual("Unexecutable graph: Job already scheduled u'Same'", str(cm.exception))
+
+  def test_jobs_on_the_longest_path_run_first(self):
+    exec_graph = ExecutionGraph([self.job("A", passing_fn, []),
+                                 self.job("B", passing_fn, []),
+                                 self.job("C", passing_fn, ["B"], size=5),
+                                 self.job("D", passing_fn, ["A"], size=2)])
+    self.execute(exec_graph, max_workers=1)
+
+    self.assertEqual(["B", "C", "A", "D"], self.jobs_run)
+
+  def test_critical_path_report(self):
+    exec_graph = ExecutionGraph([self.job("A", sleeping_fn, ["B"]),
+                                 self.job("B", sleeping_fn, []),
+                                 self.job("C", passing_fn, [])])
+    self.assertEqual('No jobs were run.', exec_graph.format_critical_path_report())
+
+    self.execute(exec_graph, max_workers=2)
+    report = exec_graph.format_critical_path_report().splitlines()
+    self.assertTrue(report[0].startswith('Ran 3 jobs in '))
+    self.assertTrue(report[0].endswith(' with up to 2 workers.'))
+    self.assertIn('critical path of 2 jobs', report[2])
+    self.assertEqual('Critical path:', report[3])
+    self.assertEqual(['B (size 1)', 'A (size 1)'], [line.split('s ', 1)[1] for line in report[4:]])
+
@@ -5,6 +5,7 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
 from textwrap import dedent
 
 from pants.backend.codegen.targets.java_protobuf_library import JavaProtobufLibrary
@@ -362,3 +363,12 @@ class WhatChangedTest(BaseWhatChangedTest):
       workspace=self.workspace(files=['root/proto/BUILD'])
     )
 
+
+
+class WhatChangedWithTargetIndexTest(WhatChangedTest):
+
+  def assert_console_output(self, *output, **kwargs):
+    options = {'target_index': os.path.join(self.pants_workdir, 'target_index.json')}
+    options.update(kwargs.get('options', {}))
+    kwargs['options'] = options
+    super(WhatChangedWithTargetIndexTest, self).assert_console_output(*output, **kwargs)
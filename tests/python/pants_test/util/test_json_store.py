@@ -0,0 +1,39 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import unittest
+
+from pants.util.contextutil import temporary_dir
+from pants.util.json_store import JsonStore
+
+
+class JsonStoreTest(unittest.TestCase):
+
+  def test_round_trip(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'sub', 'store.json')
+      JsonStore(path, (1, 'fp')).save({'a': [1, 2]})
+      self.assertEqual({'a': [1, 2]}, JsonStore(path, (1, 'fp')).load())
+      self.assertEqual(['store.json'], os.listdir(os.path.dirname(path)))
+
+  def test_missing(self):
+    with temporary_dir() as tmpdir:
+      self.assertIsNone(JsonStore(os.path.join(tmpdir, 'store.json'), 1).load())
+
+  def test_corrupt(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'store.json')
+      with open(path, 'w') as fp:
+        fp.write('{"version": 1, "docu')
+      self.assertIsNone(JsonStore(path, 1).load())
+
+  def test_version_mismatch(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'store.json')
+      JsonStore(path, 1).save({'a': 1})
+      self.assertIsNone(JsonStore(path, 2).load())